@@ -0,0 +1,26 @@
+"""
+Benchmarks for :mod:`conrad`.
+
+Standalone scripts (``bench_*.py``) time individual kernels. The
+:mod:`benchmarks.synthetic` module generates parametric synthetic cases,
+and :mod:`benchmarks.run` times suites of planning operations on them
+at a range of sizes, writing machine-readable results.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
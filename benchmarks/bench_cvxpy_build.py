@@ -0,0 +1,94 @@
+"""
+Benchmark construction of the CVXPY planning problem.
+
+Builds a synthetic case with several structures, each carrying an
+objective plus minimum/maximum and percentile dose constraints, and
+times :meth:`conrad.optimization.solver_cvxpy.SolverCVXPY.build`
+followed by canonicalization (:meth:`cvxpy.Problem.get_problem_data`),
+with and without shared per-structure dose variables.
+
+Usage:
+	python benchmarks/bench_cvxpy_build.py [--structures 20]
+		[--voxels 500] [--beams 200] [--density 0.1] [--solver ECOS]
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import argparse
+import timeit
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.medicine import Structure, Anatomy, D
+from conrad.physics import Gy
+from conrad.optimization.solver_cvxpy import SolverCVXPY
+
+def synthetic_anatomy(structures, voxels, beams, density, seed=0):
+	rng = np.random.RandomState(seed)
+	anatomy = Anatomy()
+	for label in xrange(structures):
+		is_target = label == 0
+		A = sp.rand(voxels, beams, density=density, format='csr',
+					random_state=rng)
+		anatomy += Structure(label, 'structure {}'.format(label),
+							 is_target, A=A)
+		s = anatomy[label]
+		if is_target:
+			s.constraints += D('min') >= 0.8 * Gy
+			s.constraints += D(90) >= 0.95 * Gy
+			s.constraints += D(10) <= 1.1 * Gy
+		else:
+			s.constraints += D('max') <= 1.5 * Gy
+			s.constraints += D(30) <= 0.5 * Gy
+	return anatomy
+
+def time_build(anatomy, beams, solver, dose_variables):
+	s = SolverCVXPY()
+	s.init_problem(beams, use_slack=False, dose_variables=dose_variables)
+	t0 = timeit.default_timer()
+	s.build(anatomy.list, exact=False)
+	t_build = timeit.default_timer() - t0
+	data = s.problem.get_problem_data(solver)
+	t_canon = timeit.default_timer() - t0 - t_build
+	return t_build, t_canon, data['A'].nnz + data['G'].nnz
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+	parser.add_argument('--structures', type=int, default=20)
+	parser.add_argument(
+			'--voxels', type=int, default=500, help='voxels per structure')
+	parser.add_argument('--beams', type=int, default=200)
+	parser.add_argument('--density', type=float, default=0.1)
+	parser.add_argument('--solver', default='ECOS')
+	args = parser.parse_args()
+
+	anatomy = synthetic_anatomy(
+			args.structures, args.voxels, args.beams, args.density)
+
+	print('{:>16} {:>10} {:>12} {:>12}'.format(
+			'dose variables', 'build', 'canonicalize', 'nnz(A, G)'))
+	for dose_variables in (False, True):
+		t_build, t_canon, nnz = time_build(
+				anatomy, args.beams, args.solver, dose_variables)
+		print('{:>16} {:>9.4f}s {:>11.4f}s {:>12}'.format(
+				str(dose_variables), t_build, t_canon, nnz))
+
+if __name__ == '__main__':
+	main()
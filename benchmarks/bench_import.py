@@ -0,0 +1,70 @@
+"""
+Benchmark start-up time of ``import conrad``.
+
+Times the import in fresh interpreter processes, and reports which
+optional backends (:mod:`cvxpy`, :mod:`optkit`, :mod:`matplotlib`) were
+loaded as a side effect; these are expected to be imported lazily, on
+first use.
+
+Usage:
+	python benchmarks/bench_import.py [--repeats 5] [--module conrad]
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import argparse
+import json
+import subprocess
+import sys
+
+OPTIONAL_MODULES = ['cvxpy', 'optkit', 'matplotlib']
+
+PROBE = (
+		'import json, sys, timeit\n'
+		't0 = timeit.default_timer()\n'
+		'import {module}\n'
+		't = timeit.default_timer() - t0\n'
+		'print(json.dumps([t, [m for m in {optional!r} if m in sys.modules]]))'
+	)
+
+def time_import(module):
+	output = subprocess.check_output([sys.executable, '-c', PROBE.format(
+			module=module, optional=OPTIONAL_MODULES)])
+	return json.loads(output.decode().strip().splitlines()[-1])
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+	parser.add_argument('--repeats', type=int, default=5)
+	parser.add_argument('--module', default='conrad')
+	args = parser.parse_args()
+
+	times = []
+	for _ in xrange(args.repeats):
+		t, loaded = time_import(args.module)
+		times.append(t)
+
+	print('import {}: best {:.4f}s, median {:.4f}s over {} runs'.format(
+			args.module, min(times), sorted(times)[len(times) // 2],
+			len(times)))
+	print('optional modules loaded: {}'.format(
+			', '.join(loaded) if loaded else 'none'))
+
+if __name__ == '__main__':
+	main()
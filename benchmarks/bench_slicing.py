@@ -0,0 +1,154 @@
+"""
+Benchmark sparse uncompressed-dimension slicing, e.g., selection of beam
+columns from a CSR dose matrix.
+
+Compares :func:`conrad.abstract.matrix.csx_slice_uncompressed` against
+the reference (pure Python, per-entry) implementation it replaced.
+
+Usage:
+	python benchmarks/bench_slicing.py [--voxels 100000 1000000]
+		[--beams 1000] [--density 0.01] [--fraction 0.25] [--skip-legacy]
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import argparse
+import timeit
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.abstract.matrix import csx_slice_uncompressed
+
+def csx_slice_uncompressed_reference(matrix, indices):
+	"""
+	Slice the columns (CSR) or rows (CSC) of a CS[X] sparse matrix
+
+	Arguments:
+		matrix (:class:`scipy.sparse.csr_matrix` or
+			:class:`scipy.sparse.csc_matrix`): Matrix to be sliced into
+		indices (:obj:`list`): Indices of uncompressed dimension to
+			include in submatrix
+
+	Returns:
+		(:class:`scipy.sparse.csr_matrix` or
+		:class:`scipy.sparse.csc_matrix`): Submatrix
+
+	"""
+	indices = list(indices)
+
+	if isinstance(matrix, sp.csr_matrix):
+		m = matrix.shape[0]
+		n = len(indices)
+	else:
+		m = len(indices)
+		n = matrix.shape[1]
+
+	val_full = matrix.data
+	ind_full = matrix.indices
+	ptr_full = matrix.indptr
+
+	ptr_sub = np.zeros_like(ptr_full)
+	included = np.zeros(matrix.nnz, dtype=bool)
+	indices.sort()
+	perm_inverse = {}
+	for i0, i1 in enumerate(indices):
+		perm_inverse[i1] = i0
+
+	for k in xrange(len(ptr_full) - 1):
+		ptr0, ptr1 = ptr_full[k], ptr_full[k + 1]
+		ind_slice = ind_full[ptr0:ptr1]
+		index_iter = iter(indices)
+		i_target = next(index_iter)
+		for j in np.argsort(ind_slice):
+			i_sorted = ind_slice[j]
+			while i_sorted > i_target and i_target < indices[-1]:
+				i_target = next(index_iter)
+			if i_sorted < i_target:
+				continue
+			elif i_sorted == i_target:
+				ptr_sub[k + 1] += 1
+				included[ptr0 + j] = True
+
+	ptr_sub[1:] = ptr_sub[1:].cumsum()
+	nnz_sub = ptr_sub[-1]
+	val_sub = np.zeros(nnz_sub, dtype=val_full.dtype)
+	ind_sub = np.zeros(nnz_sub, dtype=ind_full.dtype)
+
+	head = 0
+	for ptr, include in enumerate(included):
+		if include:
+			ind_sub[head] = perm_inverse[ind_full[ptr]]
+			val_sub[head] = val_full[ptr]
+			head += 1
+
+	return type(matrix)((val_sub, ind_sub, ptr_sub), shape=(m, n))
+
+def random_csr(voxels, beams, density, seed=0):
+	rng = np.random.RandomState(seed)
+	nnz = int(voxels * beams * density)
+	rows = rng.randint(0, voxels, nnz)
+	cols = rng.randint(0, beams, nnz)
+	vals = rng.rand(nnz)
+	A = sp.coo_matrix((vals, (rows, cols)), shape=(voxels, beams)).tocsr()
+	A.sum_duplicates()
+	return A
+
+def time_call(f, *args):
+	t0 = timeit.default_timer()
+	result = f(*args)
+	return timeit.default_timer() - t0, result
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+	parser.add_argument(
+			'--voxels', type=int, nargs='+', default=[100000, 1000000])
+	parser.add_argument('--beams', type=int, default=1000)
+	parser.add_argument('--density', type=float, default=0.01)
+	parser.add_argument(
+			'--fraction', type=float, default=0.25,
+			help='fraction of columns selected')
+	parser.add_argument(
+			'--skip-legacy', action='store_true',
+			help='skip reference implementation (slow on large inputs)')
+	args = parser.parse_args()
+
+	print('{:>10} {:>6} {:>12} {:>12} {:>12} {:>9}'.format(
+			'voxels', 'beams', 'nnz', 'vectorized', 'reference',
+			'speedup'))
+	for voxels in args.voxels:
+		A = random_csr(voxels, args.beams, args.density)
+		rng = np.random.RandomState(1)
+		selection = np.sort(rng.choice(
+				args.beams, int(args.fraction * args.beams),
+				replace=False))
+
+		t_vec, A_vec = time_call(csx_slice_uncompressed, A, selection)
+		if args.skip_legacy:
+			t_ref = np.nan
+		else:
+			t_ref, A_ref = time_call(
+					csx_slice_uncompressed_reference, A, selection)
+			assert (A_vec - A_ref).nnz == 0
+
+		print('{:>10} {:>6} {:>12} {:>11.4f}s {:>11.4f}s {:>8.1f}x'.format(
+				voxels, args.beams, A.nnz, t_vec, t_ref, t_ref / t_vec))
+
+if __name__ == '__main__':
+	main()
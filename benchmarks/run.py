@@ -0,0 +1,195 @@
+"""
+Run benchmark suites on synthetic cases, and record results.
+
+Results are written as JSON: run metadata (time, git revision, Python,
+NumPy and SciPy versions, platform) and one row per benchmark and
+configuration (see :mod:`benchmarks.suites`). Passing a previous results
+file with ``--compare`` prints the change in best run time of each
+benchmark found in both.
+
+Usage:
+	python -m benchmarks.run [--sizes 1e3 1e4 1e5 1e6] [--beams 200]
+		[--structures 6] [--dense] [--voxel-weights] [--repeats 3]
+		[--suites slicing load_physics ...] [--budget 600]
+		[--output results.json] [--compare baseline.json]
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import multiprocessing
+import numpy as np
+import scipy
+
+from benchmarks.suites import SUITES, result
+
+SIZES_DEFAULT = [1e3, 1e4, 1e5]
+REGRESSION_THRESHOLD = 1.2
+
+def configurations(sizes, beams=200, structures=6, sparse=True,
+				   voxel_weights=False, repeats=3, budget=600., seed=0):
+	"""
+	Benchmark configurations, one per size.
+
+	Returns:
+		:obj:`list` of :obj:`dict`: Configurations, with entries
+		``voxels``, ``beams``, ``structures``, ``sparse``,
+		``voxel_weights``, ``repeats``, ``budget`` (seconds; solver
+		benchmarks predicted to run longer are skipped) and ``seed``.
+	"""
+	return [{
+		'voxels': int(float(size)),
+		'beams': int(beams),
+		'structures': int(structures),
+		'sparse': bool(sparse),
+		'voxel_weights': bool(voxel_weights),
+		'repeats': int(repeats),
+		'budget': float(budget),
+		'seed': int(seed),
+	} for size in sizes]
+
+def metadata():
+	""" Description of the machine and source tree being benchmarked. """
+	try:
+		revision = subprocess.check_output(
+				['git', 'rev-parse', 'HEAD'], stderr=subprocess.STDOUT,
+				cwd=os.path.dirname(os.path.abspath(__file__))
+				).decode().strip()
+	except (OSError, subprocess.CalledProcessError):
+		revision = None
+	return {
+		'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+		'revision': revision,
+		'python': platform.python_version(),
+		'numpy': np.__version__,
+		'scipy': scipy.__version__,
+		'platform': platform.platform(),
+		'cpus': multiprocessing.cpu_count(),
+	}
+
+def run(configs, suites=None, log=print):
+	"""
+	Run benchmark ``suites`` for each configuration in ``configs``.
+
+	Arguments:
+		configs: List of configurations, from :func:`configurations`.
+		suites (optional): Names of suites in
+			:data:`benchmarks.suites.SUITES`; by default, all.
+		log (optional): Callable for progress messages.
+
+	Returns:
+		:obj:`list` of :obj:`dict`: Result rows.
+	"""
+	if suites is None:
+		suites = list(SUITES.keys())
+	rows = []
+	for config in configs:
+		for name in suites:
+			log('{} voxels x {} beams: {}'.format(
+					config['voxels'], config['beams'], name))
+			try:
+				rows.extend(SUITES[name](config))
+			except Exception as e:
+				rows.append(result(config, name, '*', error=e))
+	return rows
+
+def _key(row):
+	return (row['suite'], row['benchmark'], row['voxels'], row['beams'],
+			row['structures'], row['sparse'], row['voxel_weights'])
+
+def compare(rows, baseline_rows, threshold=REGRESSION_THRESHOLD):
+	"""
+	Compare best run times to a baseline.
+
+	Returns:
+		:obj:`list` of :obj:`tuple`: ``(row, baseline best, ratio,
+		regressed)`` for each timed row with a timed baseline
+		counterpart.
+	"""
+	baseline = {_key(r): r['best'] for r in baseline_rows if 'best' in r}
+	comparisons = []
+	for row in rows:
+		reference = baseline.get(_key(row), None)
+		if 'best' in row and reference:
+			ratio = row['best'] / reference
+			comparisons.append((row, reference, ratio, ratio > threshold))
+	return comparisons
+
+def print_table(rows):
+	print('{:<14} {:<26} {:>9} {:>6} {:>11} {:>11}'.format(
+			'suite', 'benchmark', 'voxels', 'beams', 'best (s)',
+			'median (s)'))
+	for row in rows:
+		if 'best' in row:
+			status = '{:>11.4f} {:>11.4f}'.format(row['best'], row['median'])
+		else:
+			status = row.get('error', row.get('skipped', ''))
+		print('{:<14} {:<26} {:>9} {:>6} {}'.format(
+				row['suite'], row['benchmark'], row['voxels'], row['beams'],
+				status))
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+	parser.add_argument('--sizes', nargs='+', type=float,
+						default=SIZES_DEFAULT, help='voxels per case')
+	parser.add_argument('--beams', type=int, default=200)
+	parser.add_argument('--structures', type=int, default=6)
+	parser.add_argument('--dense', action='store_true',
+						help='use dense dose matrices')
+	parser.add_argument('--voxel-weights', action='store_true')
+	parser.add_argument('--repeats', type=int, default=3)
+	parser.add_argument('--suites', nargs='+', choices=list(SUITES.keys()))
+	parser.add_argument('--budget', type=float, default=600.,
+						help='skip solvers predicted to run longer (s)')
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--output', help='write results to JSON file')
+	parser.add_argument('--compare', help='baseline JSON results file')
+	args = parser.parse_args()
+
+	configs = configurations(
+			args.sizes, beams=args.beams, structures=args.structures,
+			sparse=not args.dense, voxel_weights=args.voxel_weights,
+			repeats=args.repeats, budget=args.budget, seed=args.seed)
+	rows = run(configs, suites=args.suites,
+			   log=lambda msg: sys.stderr.write(msg + '\n'))
+	print_table(rows)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump({'meta': metadata(), 'results': rows}, f, indent=1)
+
+	if args.compare:
+		with open(args.compare) as f:
+			baseline = json.load(f)['results']
+		print('\n{:<14} {:<26} {:>9} {:>11} {:>8}'.format(
+				'suite', 'benchmark', 'voxels', 'baseline', 'ratio'))
+		for row, reference, ratio, regressed in compare(rows, baseline):
+			print('{:<14} {:<26} {:>9} {:>11.4f} {:>7.2f}x{}'.format(
+					row['suite'], row['benchmark'], row['voxels'],
+					reference, ratio, '  REGRESSION' if regressed else ''))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,272 @@
+"""
+Timed benchmark suites for synthetic cases.
+
+Each suite is a function that takes a benchmark configuration (see
+:func:`benchmarks.run.configurations`) and returns a list of result
+rows, one per benchmark. Every row records the configuration, the
+benchmark name, and the best and median of repeated timings, in
+seconds; benchmarks that fail record the error instead.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import os
+import shutil
+import tempfile
+import timeit
+import collections
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.abstract.matrix import csx_slice_uncompressed
+from conrad.physics import Physics
+from conrad.optimization.solver_registry import SOLVER_REGISTRY, \
+		ProblemSize
+
+from benchmarks.synthetic import synthetic_geometry, \
+		synthetic_dose_matrix, synthetic_case
+
+# synthetic geometry and dose matrices, keyed by configuration
+_DATA = {}
+
+def _data(config):
+	key = (config['voxels'], config['beams'], config['structures'],
+		   config['sparse'], config['seed'])
+	if key not in _DATA:
+		_DATA.clear()
+		positions, labels, center = synthetic_geometry(
+				config['voxels'], structures=config['structures'],
+				seed=config['seed'])
+		A = synthetic_dose_matrix(
+				positions, config['beams'], center=center,
+				sparse=config['sparse'], seed=config['seed'])
+		_DATA[key] = labels, A
+	return _DATA[key]
+
+def _case(config, load=True):
+	case = synthetic_case(
+			voxels=config['voxels'], beams=config['beams'],
+			structures=config['structures'], sparse=config['sparse'],
+			voxel_weights=config['voxel_weights'], seed=config['seed'])
+	if load:
+		case.load_physics_to_anatomy()
+	return case
+
+def _physics(config):
+	labels, A = _data(config)
+	physics = Physics(dose_matrix=A, voxel_labels=labels)
+	if config['voxel_weights']:
+		rng = np.random.RandomState(config['seed'])
+		physics.frame.voxel_weights = rng.randint(1, 5, config['voxels'])
+	return physics
+
+def timed(run, repeats=3, setup=None):
+	"""
+	Time ``run`` repeatedly.
+
+	Arguments:
+		run: Callable, invoked with the output of ``setup`` (if
+			provided) or without arguments.
+		repeats (:obj:`int`, optional): Number of timings.
+		setup (optional): Callable invoked, untimed, before each run.
+
+	Returns:
+		:obj:`list` of :obj:`float`: Run times, in seconds.
+	"""
+	times = []
+	for _ in xrange(max(1, int(repeats))):
+		args = (setup(),) if setup is not None else ()
+		start = timeit.default_timer()
+		run(*args)
+		times.append(timeit.default_timer() - start)
+	return times
+
+def result(config, suite, benchmark, times=None, error=None, **extra):
+	"""
+	Build result row.
+
+	Arguments:
+		config (:obj:`dict`): Benchmark configuration.
+		suite (:obj:`str`): Name of suite.
+		benchmark (:obj:`str`): Name of benchmark within suite.
+		times (optional): Run times, in seconds.
+		error (optional): Exception raised by benchmark, if any.
+		**extra: Additional entries, e.g., problem metrics.
+
+	Returns:
+		:obj:`dict`: Result row.
+	"""
+	row = collections.OrderedDict(suite=suite, benchmark=benchmark)
+	row.update(config)
+	if times:
+		row['best'] = float(min(times))
+		row['median'] = float(np.median(times))
+		row['times'] = [float(t) for t in times]
+	if error is not None:
+		row['error'] = '{}: {}'.format(type(error).__name__, error)
+	row.update(extra)
+	return row
+
+def suite_slicing(config):
+	""" Row slicing by structure label, and beam column slicing. """
+	labels, A = _data(config)
+	rng = np.random.RandomState(config['seed'])
+	columns = np.sort(rng.choice(
+			config['beams'], max(1, config['beams'] // 2), replace=False))
+
+	def slice_rows(physics):
+		for label in np.unique(labels):
+			physics.dose_matrix_by_label(label)
+
+	def slice_columns():
+		if sp.issparse(A):
+			csx_slice_uncompressed(A, columns)
+		else:
+			A[:, columns]
+
+	nnz = A.nnz if sp.issparse(A) else A.size
+	return [
+		result(config, 'slicing', 'rows_by_label', timed(
+				slice_rows, config['repeats'],
+				setup=lambda: _physics(config)), nnz=nnz),
+		result(config, 'slicing', 'beam_columns', timed(
+				slice_columns, config['repeats']), nnz=nnz),
+	]
+
+def suite_load_physics(config):
+	""" Transfer of dose matrices from physics to structures. """
+	case = _case(config, load=False)
+
+	def setup():
+		case.physics = _physics(config)
+		return case
+
+	return [result(config, 'load_physics', 'load_physics_to_anatomy',
+				   timed(lambda c: c.load_physics_to_anatomy(
+						 overwrite=True), config['repeats'], setup=setup))]
+
+def _plan(config, suite, benchmark, case, **options):
+	runs = []
+	def plan():
+		runs.append(case.plan(verbose=0, **options)[1])
+
+	times = timed(plan, config['repeats'])
+	phases = {}
+	for name in runs[-1].phases:
+		phases[name] = float(np.median(
+				[run.phases[name]['wall'] for run in runs
+				 if name in run.phases]))
+	return result(config, suite, benchmark, times, phases=phases,
+				  backend=runs[-1].backend,
+				  feasible=bool(runs[-1].feasible))
+
+def suite_solver(config):
+	"""
+	Planning with each available backend, with phase timings.
+
+	Backends whose predicted run time exceeds the configuration's
+	``budget`` (in seconds) are skipped.
+	"""
+	case = _case(config)
+	size = ProblemSize.from_structures(case.anatomy.list)
+	rows = []
+	for backend in SOLVER_REGISTRY.candidates(size):
+		benchmark = 'plan[{}]'.format(backend.name)
+		estimate = backend.estimate(size)
+		if estimate > config['budget']:
+			rows.append(result(config, 'solver', benchmark,
+							   skipped='predicted {:.0f}s'.format(estimate)))
+			continue
+		try:
+			rows.append(_plan(config, 'solver', benchmark, case,
+							  backend=backend.name))
+		except Exception as e:
+			rows.append(result(config, 'solver', benchmark, error=e))
+	return rows
+
+def suite_two_pass(config):
+	""" Two-pass planning, with exact percentile constraints. """
+	case = _case(config)
+	return [_plan(config, 'two_pass', 'plan_2pass', case, use_2pass=True)]
+
+def suite_dvh(config):
+	""" Dose calculation with DVH updates, and DVH updates alone. """
+	case = _case(config)
+	x = np.random.RandomState(config['seed']).rand(config['beams'])
+	case.calculate_doses(x)
+
+	def update_dvhs():
+		for s in case.anatomy:
+			s.dvh.data = s.y
+
+	return [
+		result(config, 'dvh', 'calculate_doses', timed(
+				lambda: case.calculate_doses(x), config['repeats'])),
+		result(config, 'dvh', 'dvh_update', timed(
+				update_dvhs, config['repeats'])),
+	]
+
+def suite_io(config):
+	""" Case round trip through YAML and data files on disk. """
+	from conrad.io import CaseIO
+
+	case = _case(config)
+	directory = tempfile.mkdtemp()
+	files = []
+
+	def write():
+		name = 'case{}'.format(len(files))
+		os.mkdir(os.path.join(directory, name))
+		files.append(CaseIO().case_to_YAML(
+				case, name, os.path.join(directory, name)))
+
+	try:
+		times_write = timed(write, config['repeats'])
+		times_read = timed(
+				lambda: CaseIO().YAML_to_case(files[-1]), config['repeats'])
+	finally:
+		shutil.rmtree(directory)
+	return [
+		result(config, 'io', 'write_case', times_write),
+		result(config, 'io', 'read_case', times_read),
+	]
+
+def suite_plotting_data(config):
+	""" Extraction of DVH and constraint plotting data. """
+	case = _case(config)
+	x = np.random.RandomState(config['seed']).rand(config['beams'])
+	case.calculate_doses(x)
+	return [
+		result(config, 'plotting_data', 'plotting_data', timed(
+				lambda: case.plotting_data(), config['repeats'])),
+		result(config, 'plotting_data', 'plotting_data_resampled', timed(
+				lambda: case.plotting_data(maxlength=100),
+				config['repeats'])),
+	]
+
+SUITES = collections.OrderedDict([
+		('slicing', suite_slicing),
+		('load_physics', suite_load_physics),
+		('solver', suite_solver),
+		('two_pass', suite_two_pass),
+		('dvh', suite_dvh),
+		('io', suite_io),
+		('plotting_data', suite_plotting_data),
+	])
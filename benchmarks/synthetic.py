@@ -0,0 +1,266 @@
+"""
+Parametric generator of synthetic treatment planning cases.
+
+Voxels are sampled in a unit cube, with spherical targets at the center
+surrounded by spherical organs at risk (OARs), and the remaining voxels
+assigned to a body structure. Voxels are ordered by position, as on a
+dose grid, so that structure labels are interleaved.
+
+Each beam (beamlet) is a pencil beam with a Gaussian lateral profile
+and exponential depth attenuation, aimed through the target region
+from a coplanar angle. Entries below a cutoff fraction of the peak dose
+are dropped, which sets the sparsity of the dose matrix: by default,
+roughly 5-10% of entries are stored.
+
+Usage::
+
+	from benchmarks.synthetic import synthetic_case
+	case = synthetic_case(voxels=10000, beams=200, structures=6)
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.case import Case
+from conrad.medicine import Structure, D
+from conrad.physics.units import Gy
+
+TARGET_RADIUS = 0.15
+OAR_RADIUS = 0.1
+TARGET_FRACTION = 0.1
+OAR_FRACTION = 0.08
+
+# cycled over OARs, as (threshold, fraction of prescribed dose)
+OAR_CONSTRAINTS = [('mean', 0.3), ('max', 0.9), (30, 0.5), (50, 0.4)]
+
+def _sample_sphere(rng, count, center, radius):
+	direction = rng.normal(size=(count, 3))
+	direction /= np.linalg.norm(direction, axis=1)[:, None]
+	distance = radius * rng.rand(count)**(1. / 3)
+	return center + direction * distance[:, None]
+
+def synthetic_geometry(voxels, structures=4, targets=1, seed=0):
+	"""
+	Sample voxel positions and structure labels.
+
+	Arguments:
+		voxels (:obj:`int`): Number of voxels.
+		structures (:obj:`int`, optional): Number of structures,
+			including targets and, if ``structures > targets``, a body
+			structure holding voxels outside targets and OARs.
+		targets (:obj:`int`, optional): Number of target structures.
+		seed (:obj:`int`, optional): Random seed.
+
+	Returns:
+		:obj:`tuple`: Voxel positions (``voxels`` x 3
+		:class:`numpy.ndarray`), voxel labels (length ``voxels``
+		:class:`numpy.ndarray` of labels ``0, ..., structures - 1``,
+		targets first and body last), and center of target region.
+	"""
+	rng = np.random.RandomState(seed)
+	targets = max(1, min(int(targets), int(structures)))
+	oars = max(0, int(structures) - targets - 1)
+	center = np.array([0.5, 0.5, 0.5])
+
+	counts = [max(1, int(TARGET_FRACTION * voxels / targets))] * targets
+	counts += [max(1, int(OAR_FRACTION * voxels))] * oars
+	if structures > targets:
+		counts.append(max(1, voxels - sum(counts)))
+	else:
+		counts[-1] += max(0, voxels - sum(counts))
+	# trim, if too few voxels for requested structures
+	while sum(counts) > voxels:
+		counts[int(np.argmax(counts))] -= 1
+
+	positions = []
+	labels = []
+	for label, count in enumerate(counts):
+		if label < targets:
+			# targets tile the central region
+			offset = 0.5 * TARGET_RADIUS * (label - 0.5 * (targets - 1))
+			positions.append(_sample_sphere(
+					rng, count, center + [offset, 0, 0],
+					TARGET_RADIUS / max(1., 0.5 * targets)))
+		elif label < targets + oars:
+			# OARs ring the targets, in the beam plane
+			angle = 2 * np.pi * (label - targets) / max(1, oars)
+			oar_center = center + (TARGET_RADIUS + 1.5 * OAR_RADIUS) * \
+					np.array([np.cos(angle), np.sin(angle), 0.])
+			positions.append(_sample_sphere(
+					rng, count, oar_center, OAR_RADIUS))
+		else:
+			positions.append(rng.rand(count, 3))
+		labels.append(np.full(count, label, dtype=int))
+
+	positions = np.vstack(positions)
+	labels = np.hstack(labels)
+
+	# order voxels as on a dose grid
+	grid = np.floor(np.clip(positions, 0, 1 - 1e-9) * 64).astype(int)
+	order = np.lexsort((grid[:, 0], grid[:, 1], grid[:, 2]))
+	return positions[order], labels[order], center
+
+def synthetic_dose_matrix(positions, beams, center=None, sparse=True,
+						  beam_width=0.03, attenuation=0.5, cutoff=1e-2,
+						  dtype=np.float64, seed=0):
+	"""
+	Pencil beam dose matrix for voxels at ``positions``.
+
+	Arguments:
+		positions (:class:`numpy.ndarray`): Voxel positions, as rows.
+		beams (:obj:`int`): Number of beams.
+		center (optional): Point that beam axes are aimed near;
+			defaults to center of unit cube.
+		sparse (:obj:`bool`, optional): If ``True``, return CSR matrix,
+			otherwise dense :class:`numpy.ndarray`.
+		beam_width (:obj:`float`, optional): Standard deviation of
+			lateral dose profile.
+		attenuation (:obj:`float`, optional): Attenuation coefficient,
+			per unit depth.
+		cutoff (:obj:`float`, optional): Entries smaller than this
+			fraction of the peak dose are set to zero.
+		dtype (optional): Data type of matrix.
+		seed (:obj:`int`, optional): Random seed.
+
+	Returns:
+		Dose matrix, ``voxels`` x ``beams``.
+	"""
+	rng = np.random.RandomState(seed)
+	if center is None:
+		center = np.array([0.5, 0.5, 0.5])
+	voxels = positions.shape[0]
+	golden_angle = np.pi * (3. - np.sqrt(5.))
+
+	data, indices, indptr = [], [], [0]
+	for j in xrange(beams):
+		angle = golden_angle * j
+		u = np.array([np.cos(angle), np.sin(angle), 0.])
+		v = np.array([-np.sin(angle), np.cos(angle), 0.])
+		offset = TARGET_RADIUS * (2 * rng.rand(2) - 1)
+		axis = center + offset[0] * v + offset[1] * np.array([0, 0, 1.])
+
+		d = positions - axis
+		depth = d.dot(u) + 1.
+		lateral = d.dot(v)**2 + d[:, 2]**2
+		column = np.exp(-0.5 * lateral / beam_width**2 -
+						attenuation * depth)
+		column /= np.exp(-attenuation * 0.5)
+		rows = np.flatnonzero(column >= cutoff)
+		data.append(column[rows].astype(dtype))
+		indices.append(rows)
+		indptr.append(indptr[-1] + rows.size)
+
+	A = sp.csc_matrix(
+			(np.hstack(data), np.hstack(indices), np.array(indptr)),
+			shape=(voxels, beams)).tocsr()
+	return A if sparse else A.toarray()
+
+def synthetic_structures(labels, targets=1, constraints=True,
+						 rx_dose=1.):
+	"""
+	Structures for voxel ``labels``, with mixed dose constraints.
+
+	Targets carry minimum, maximum and percentile constraints; OARs
+	cycle through mean, maximum and percentile constraints; the body
+	structure (last label) carries a maximum dose constraint.
+
+	Arguments:
+		labels: Voxel labels, as from :func:`synthetic_geometry`.
+		targets (:obj:`int`, optional): Number of target structures.
+		constraints (:obj:`bool`, optional): If ``False``, attach no
+			dose constraints.
+		rx_dose (:obj:`float`, optional): Prescribed target dose, in
+			Gy.
+
+	Returns:
+		:obj:`list` of :class:`~conrad.medicine.Structure`: Structures,
+		in order of label.
+	"""
+	n_structures = int(np.max(labels)) + 1
+	targets = max(1, min(int(targets), n_structures))
+	structures = []
+	for label in xrange(n_structures):
+		if label < targets:
+			s = Structure(label, 'PTV{}'.format(label), True,
+						  dose=rx_dose * Gy)
+			if constraints:
+				s.constraints += D('min') >= 0.8 * rx_dose * Gy
+				s.constraints += D('max') <= 1.15 * rx_dose * Gy
+				s.constraints += D(95) >= 0.95 * rx_dose * Gy
+		elif label < n_structures - 1 or n_structures == targets:
+			s = Structure(label, 'OAR{}'.format(label), False)
+			if constraints:
+				threshold, fraction = OAR_CONSTRAINTS[
+						(label - targets) % len(OAR_CONSTRAINTS)]
+				s.constraints += D(threshold) <= fraction * rx_dose * Gy
+		else:
+			s = Structure(label, 'body', False)
+			if constraints:
+				s.constraints += D('max') <= 1.1 * rx_dose * Gy
+		structures.append(s)
+	return structures
+
+def synthetic_case(voxels=1000, beams=100, structures=4, targets=1,
+				   sparse=True, constraints=True, voxel_weights=False,
+				   beam_width=0.03, attenuation=0.5, cutoff=1e-2,
+				   dtype=np.float64, seed=0):
+	"""
+	Build synthetic :class:`~conrad.Case`.
+
+	Arguments:
+		voxels (:obj:`int`, optional): Number of voxels.
+		beams (:obj:`int`, optional): Number of beams.
+		structures (:obj:`int`, optional): Number of structures.
+		targets (:obj:`int`, optional): Number of target structures.
+		sparse (:obj:`bool`, optional): If ``True``, use CSR dose
+			matrix, otherwise dense.
+		constraints (:obj:`bool`, optional): If ``True``, attach mixed
+			dose constraints (see :func:`synthetic_structures`).
+		voxel_weights (:obj:`bool`, optional): If ``True``, assign
+			random integer voxel weights, as in a voxel-clustered
+			frame.
+		beam_width, attenuation, cutoff, dtype: Dose matrix options;
+			see :func:`synthetic_dose_matrix`.
+		seed (:obj:`int`, optional): Random seed.
+
+	Returns:
+		:class:`~conrad.Case`: Case with physics (dose matrix, voxel
+		labels and, optionally, voxel weights) and anatomy set; dose
+		matrices are not yet loaded to structures.
+	"""
+	positions, labels, center = synthetic_geometry(
+			voxels, structures=structures, targets=targets, seed=seed)
+	A = synthetic_dose_matrix(
+			positions, beams, center=center, sparse=sparse,
+			beam_width=beam_width, attenuation=attenuation, cutoff=cutoff,
+			dtype=dtype, seed=seed)
+
+	case = Case()
+	for s in synthetic_structures(
+			labels, targets=targets, constraints=constraints):
+		case.anatomy += s
+	case.physics.voxel_labels = labels
+	case.physics.dose_matrix = A
+	if voxel_weights:
+		rng = np.random.RandomState(seed)
+		case.physics.frame.voxel_weights = rng.randint(1, 5, voxels)
+	return case
@@ -0,0 +1,246 @@
+"""
+Define :class:`SliceCache`, a least recently used, memory-bounded store
+of matrix and vector slices.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import collections
+import numpy as np
+import scipy.sparse as sp
+
+def entry_bytes(entry):
+	"""
+	Memory footprint of a dense or sparse matrix or vector.
+
+	Arguments:
+		entry: :class:`numpy.ndarray`, or :mod:`scipy.sparse` matrix
+			in CSR, CSC or COO format.
+
+	Returns:
+		:obj:`int`: Bytes held by array data (and, for sparse
+		matrices, index arrays, which scale with the number of
+		nonzeros).
+	"""
+	if sp.issparse(entry):
+		size = entry.data.nbytes
+		for attr in ('indices', 'indptr', 'row', 'col'):
+			if hasattr(entry, attr):
+				size += getattr(entry, attr).nbytes
+		return int(size)
+	return int(np.asarray(entry).nbytes)
+
+class SliceCache(object):
+	"""
+	Least recently used store of slices, bounded by a byte budget.
+
+	Inserting an entry evicts least recently used entries until the
+	bytes held fit in :attr:`SliceCache.budget`. Entries that are
+	pinned (e.g., slices in active use) or persistent (e.g., component
+	matrices that cannot be rebuilt) are never evicted.
+
+	Attributes:
+		hits (:obj:`int`): Number of successful lookups.
+		misses (:obj:`int`): Number of failed lookups.
+		evictions (:obj:`int`): Number of entries evicted.
+	"""
+	def __init__(self, budget=None):
+		"""
+		Initialize :class:`SliceCache`.
+
+		Arguments:
+			budget (:obj:`int`, optional): Byte budget; unbounded if
+				``None``.
+		"""
+		self.__entries = collections.OrderedDict()
+		self.__recency = collections.OrderedDict()
+		self.__bytes = {}
+		self.__pins = {}
+		self.__persistent = set()
+		self.__budget = None
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.budget = budget
+
+	def __contains__(self, key):
+		return key in self.__entries
+
+	def __len__(self):
+		return len(self.__entries)
+
+	def __getitem__(self, key):
+		""" Retrieve entry without updating its recency or statistics. """
+		return self.__entries[key]
+
+	@property
+	def budget(self):
+		"""
+		Byte budget, or ``None`` if unbounded.
+
+		Setter evicts entries as needed to meet new budget.
+
+		Raises:
+			ValueError: If budget negative.
+		"""
+		return self.__budget
+
+	@budget.setter
+	def budget(self, budget):
+		if budget is not None:
+			budget = int(budget)
+			if budget < 0:
+				raise ValueError('slice cache budget must be nonnegative')
+		self.__budget = budget
+		self.__evict()
+
+	@property
+	def nbytes(self):
+		""" Bytes held by all entries. """
+		return sum(self.__bytes.values())
+
+	@property
+	def stats(self):
+		""" Dictionary of cache statistics. """
+		return {
+				'hits': self.hits,
+				'misses': self.misses,
+				'evictions': self.evictions,
+				'entries': len(self),
+				'bytes': self.nbytes,
+				'budget': self.budget,
+				'pinned': sum(1 for k in self.__pins if k in self),
+				'persistent': len(self.__persistent),
+		}
+
+	def keys(self, kind=None):
+		"""
+		Keys of cached entries, in order of insertion.
+
+		Arguments:
+			kind (optional): If provided, only return keys of the form
+				``(kind, label)``, as labels.
+		"""
+		if kind is None:
+			return list(self.__entries.keys())
+		return [k[1] for k in self.__entries if k[0] == kind]
+
+	def items(self, kind):
+		""" Pairs of label and entry for keys of the form ``(kind, label)``. """
+		return [(k[1], v) for k, v in self.__entries.items() if k[0] == kind]
+
+	def get(self, key, default=None):
+		"""
+		Retrieve entry, and mark it most recently used.
+
+		Lookups are counted as hits or misses.
+		"""
+		if key not in self.__entries:
+			self.misses += 1
+			return default
+		self.hits += 1
+		self.__recency.pop(key)
+		self.__recency[key] = None
+		return self.__entries[key]
+
+	def put(self, key, entry, persistent=False):
+		"""
+		Store entry, then evict entries as needed to meet budget.
+
+		Arguments:
+			key: Entry key.
+			entry: Matrix or vector, see :func:`entry_bytes`.
+			persistent (:obj:`bool`, optional): If ``True``, entry is
+				never evicted.
+
+		Returns:
+			``entry``.
+		"""
+		self.__entries[key] = entry
+		self.__recency.pop(key, None)
+		self.__recency[key] = None
+		self.__bytes[key] = entry_bytes(entry)
+		if persistent:
+			self.__persistent.add(key)
+		self.__evict()
+		return entry
+
+	def pop(self, key, default=None):
+		""" Remove entry, regardless of pins or persistence. """
+		self.__bytes.pop(key, None)
+		self.__pins.pop(key, None)
+		self.__persistent.discard(key)
+		self.__recency.pop(key, None)
+		return self.__entries.pop(key, default)
+
+	def evictable(self, key):
+		""" ``True`` if entry neither pinned nor persistent. """
+		return key not in self.__pins and key not in self.__persistent
+
+	def persist(self, key):
+		""" Exempt entry from eviction. """
+		if key in self.__entries:
+			self.__persistent.add(key)
+
+	def pin(self, key):
+		"""
+		Exempt entry from eviction until a matching call to
+		:meth:`SliceCache.unpin`.
+
+		Returns:
+			:obj:`bool`: ``True`` if entry found and pinned.
+		"""
+		if key not in self.__entries:
+			return False
+		self.__pins[key] = self.__pins.get(key, 0) + 1
+		return True
+
+	def unpin(self, key):
+		""" Release one pin on entry, then evict as needed to meet budget. """
+		if key in self.__pins:
+			self.__pins[key] -= 1
+			if self.__pins[key] <= 0:
+				del self.__pins[key]
+			self.__evict()
+
+	def pinned(self, key):
+		""" ``True`` if entry pinned. """
+		return key in self.__pins
+
+	def clear(self):
+		""" Drop evictable entries and reset counters. """
+		for key in list(self.__entries.keys()):
+			if self.evictable(key):
+				self.pop(key)
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __evict(self):
+		if self.__budget is None:
+			return
+		held = self.nbytes
+		for key in list(self.__recency.keys()):
+			if held <= self.__budget:
+				break
+			if self.evictable(key):
+				held -= self.__bytes[key]
+				self.pop(key)
+				self.evictions += 1
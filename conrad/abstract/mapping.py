@@ -22,9 +22,59 @@ along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
 from conrad.compat import *
 
 import numpy as np
+import scipy.sparse as sp
 
 from conrad.defs import vec, is_vector, sparse_or_dense
 
+def _add_inplace(out_, increment):
+	"""
+	Add ``increment`` to array ``out_``, in-place.
+
+	Dense outputs are updated with ``+=``. Sparse outputs are updated by
+	swapping the index and value arrays of ``out_`` for those of the
+	(sparse) sum, so that the caller's handle to ``out_`` remains valid.
+
+	Arguments:
+		out_: Dense or sparse (CSR/CSC) array. Modified in-place.
+		increment: Dense or sparse array of same shape as ``out_``.
+
+	Returns:
+		Updated version of ``out_``.
+	"""
+	if isinstance(out_, np.ndarray):
+		if sp.issparse(increment):
+			increment = increment.toarray()
+		out_ += increment.reshape(out_.shape)
+	else:
+		if not sp.issparse(increment):
+			increment = sp.csr_matrix(increment)
+		total = (out_ + increment).asformat(out_.format)
+		out_.data = total.data
+		out_.indices = total.indices
+		out_.indptr = total.indptr
+	return out_
+
+def _scale_rows_inplace(data, scaling):
+	"""
+	Scale ``i``'th entry or row of ``data`` by ``scaling[i]``, in-place.
+
+	Arguments:
+		data: Vector, dense matrix, or sparse (CSR/CSC) matrix. Modified
+			in-place.
+		scaling (:class:`numpy.ndarray`): Vector of row scaling factors.
+
+	Returns:
+		None
+	"""
+	if isinstance(data, sp.csr_matrix):
+		data.data *= np.repeat(scaling, np.diff(data.indptr))
+	elif isinstance(data, sp.csc_matrix):
+		data.data *= scaling[data.indices]
+	elif data.shape[0] == data.size:
+		data *= scaling.reshape(data.shape)
+	else:
+		data *= scaling.reshape((-1, 1))
+
 # TODO: Change module to maps?
 # TODO: Change this to DiscreteMap?
 
@@ -66,6 +116,7 @@ class DiscreteMapping(object):
 		self.__forwardmap = vec(map_vector).astype(int)
 		self.__n_frame0 = len(self.__forwardmap)
 		self.__n_frame1 = self.__forwardmap.max() + 1
+		self.__matrix = None
 
 	@property
 	def vec(self):
@@ -85,29 +136,38 @@ class DiscreteMapping(object):
 		""" Number of elements in second frame/discrete set. """
 		return self.__n_frame1
 
-	def frame0_to_1_inplace(self, in_, out_, clear_output=False):
+	@property
+	def matrix(self):
 		"""
-		Map elements of array ``in_`` to elements of array ``out_``.
-
-		Procedure::
-			# let forward_map be the map: SET_0 --> SET_1.
-			# for each INDEX_0, INDEX_1 in forward_map, do
-			# 	out_[INDEX_1] += in_[INDEX_0]
-			# end for
+		Sparse matrix representation of forward mapping.
 
-		If arrays are matrices, mapping operates on rows. If arrays are
-		vectors, mapping operates on entries.
+		Matrix ``C`` is a :class:`scipy.sparse.csr_matrix` of dimensions
+		:attr:`DiscreteMapping.n_frame1` x
+		:attr:`DiscreteMapping.n_frame0`, with ``C[v[i], i] = 1`` for
+		each entry ``i`` of the mapping vector ``v``. Built on first
+		access and cached.
+		"""
+		if self.__matrix is None:
+			self.__matrix = sp.csr_matrix(
+					(np.ones(self.n_frame0), (
+							self.vec, np.arange(self.n_frame0))),
+					shape=(self.n_frame1, self.n_frame0))
+		return self.__matrix
+
+	@staticmethod
+	def __check_dimensions(in_, out_, rows_in, rows_out):
+		"""
+		Verify input and output arrays are compatible with mapping.
 
 		Arguments:
-			in_: Input array with :attr:`DiscreteMapping.n_frame0` rows
-				and ``k`` >= ``1`` columns.
-			out_: Output array with :attr:`DiscreteMapping.n_frame1`
-				rows and ``k`` >= 1 columns. Modified in-place.
-			clear_output (:obj:`bool`, optional): If ``True``, set
-				output array to ``0`` before adding input values.
+			in_: Input vector or matrix.
+			out_: Output vector or matrix.
+			rows_in (:obj:`int`): Required length/rows of input.
+			rows_out (:obj:`int`): Required length/rows of output.
 
 		Returns:
-			Vector `out_`, after in-place modification.
+			:obj:`bool`: ``True`` if arrays are vectors, ``False`` if
+			they are matrices.
 
 		Raises:
 			TypeError: If input and output arrays are not (jointly)
@@ -132,27 +192,83 @@ class DiscreteMapping(object):
 			dim_out2 = out_.shape[1]
 
 		if bool(
-				dim_in1 != self.n_frame0 or
-				dim_out1 != self.n_frame1 or
+				dim_in1 != rows_in or
+				dim_out1 != rows_out or
 				dim_in2 != dim_out2):
 			raise ValueError('arguments "in_" and "out_" be vectors or '
 							 'matrices of dimensions M x N, and K x N, '
 							 'respectively, with:\nM = {}\nK={}\n'
 							 'Provided:\n input: {}x{}\noutput: {}x{}'
-							 ''.format(self.n_frame0, self.n_frame1,
+							 ''.format(rows_in, rows_out,
 							 dim_in1, dim_in2, dim_out1, dim_out2))
-		if clear_output:
-			out_ *= 0
+		return vector_processing
 
-		if vector_processing:
-			for idx_0, idx_1 in enumerate(self.vec):
-				out_[idx_1] += in_[idx_0]
+	def __forward(self, in_):
+		"""
+		Apply forward mapping ``C`` to ``in_``.
+
+		Vectors are aggregated with :func:`numpy.bincount`; matrices
+		are multiplied by :attr:`DiscreteMapping.matrix`. Sparse inputs
+		yield sparse outputs of the same format.
+		"""
+		if is_vector(in_):
+			return np.bincount(
+					self.vec, weights=in_, minlength=self.n_frame1)
+		elif sp.issparse(in_):
+			return self.matrix.dot(in_).asformat(in_.format)
 		else:
-			for idx_0, idx_1 in enumerate(self.vec):
-				out_[idx_1, :] += in_[idx_0, :]
-		# TODO: use efficient slicing when input is sparse. warn when output sparse??
+			return self.matrix.dot(in_)
 
-		return out_
+	def __reverse(self, in_):
+		"""
+		Apply reverse mapping ``C'`` to ``in_``, i.e., gather rows.
+
+		Sparse inputs yield sparse outputs of the same format.
+		"""
+		if isinstance(in_, np.ndarray):
+			return in_[self.vec]
+		else:
+			return self.matrix.T.dot(in_).asformat(in_.format)
+
+	def frame0_to_1_inplace(self, in_, out_, clear_output=False):
+		"""
+		Map elements of array ``in_`` to elements of array ``out_``.
+
+		Procedure::
+			# let forward_map be the map: SET_0 --> SET_1.
+			# for each INDEX_0, INDEX_1 in forward_map, do
+			# 	out_[INDEX_1] += in_[INDEX_0]
+			# end for
+
+		If arrays are matrices, mapping operates on rows. If arrays are
+		vectors, mapping operates on entries. The loop above is
+		evaluated with :func:`numpy.bincount` for vectors, and as a
+		product with the cached sparse operator
+		:attr:`DiscreteMapping.matrix` for dense or sparse matrices.
+
+		Arguments:
+			in_: Input array with :attr:`DiscreteMapping.n_frame0` rows
+				and ``k`` >= ``1`` columns.
+			out_: Output array with :attr:`DiscreteMapping.n_frame1`
+				rows and ``k`` >= 1 columns. Modified in-place.
+			clear_output (:obj:`bool`, optional): If ``True``, set
+				output array to ``0`` before adding input values.
+
+		Returns:
+			Vector `out_`, after in-place modification.
+
+		Raises:
+			TypeError: If input and output arrays are not (jointly)
+				vectors or matrices.
+			ValueError: If input and output array dimensions are not
+				compatible with each other or consistent with the
+				dimensions of the mapping.
+		"""
+		self.__check_dimensions(in_, out_, self.n_frame0, self.n_frame1)
+		if clear_output:
+			out_ *= 0
+
+		return _add_inplace(out_, self.__forward(in_))
 
 	def frame0_to_1(self, in_):
 		"""
@@ -161,18 +277,20 @@ class DiscreteMapping(object):
 		If input array is a matrix, mapping operates on rows. If array
 		is a vector, mapping operates on entries.
 
-		A new empty vector or matrix
-
 		Arguments:
 			in_: Input array with :attr:`DiscreteMapping.n_frame0` rows
 				and ``k`` >= ``1`` columns.
 
 		Returns:
-			:class:`numpy.ndarray`: Array with
-			:attr:`DiscreteMapping.n_frame1` rows and ``k`` columns.
-			Input entries are mapped one-to-one or one-to-many *into*
-			output.
+			Array with :attr:`DiscreteMapping.n_frame1` rows and ``k``
+			columns; sparse, in the same format as ``in_``, if input is
+			sparse, :class:`numpy.ndarray` otherwise. Input entries are
+			mapped one-to-one or one-to-many *into* output.
 		"""
+		if sp.issparse(in_):
+			if sparse_or_dense(in_) and in_.shape[0] == self.n_frame0:
+				return self.__forward(in_)
+
 		if is_vector(in_):
 			out_ = np.zeros(self.__n_frame1)
 		elif sparse_or_dense(in_):
@@ -194,7 +312,10 @@ class DiscreteMapping(object):
 			# end for
 
 		If arrays are matrices, mapping operates on rows. If arrays are
-		vectors, mapping operates on entries.
+		vectors, mapping operates on entries. The loop above is
+		evaluated as a single gather, ``in_[forward_map]``, for dense
+		inputs, and as a product with the transpose of the cached sparse
+		operator :attr:`DiscreteMapping.matrix` for sparse inputs.
 
 		Arguments:
 			in_: Input array with :attr:`DiscreteMapping.n_frame1` rows
@@ -214,44 +335,11 @@ class DiscreteMapping(object):
 				compatible with each other or consistent with the
 				dimensions of the mapping.
 		"""
-		vector_processing = is_vector(in_) and is_vector(out_)
-		matrix_processing = sparse_or_dense(in_) and sparse_or_dense(out_)
-
-		if not (vector_processing or matrix_processing):
-			raise TypeError('arguments "in_" and "out_" be numpy or '
-							'scipy vectors or matrices')
-
-		dim_in1 = in_.shape[0]
-		dim_out1 = out_.shape[0]
-		if vector_processing:
-			dim_in2 = 1
-			dim_out2 = 1
-		else:
-			dim_in2 = in_.shape[1]
-			dim_out2 = out_.shape[1]
-
-		if bool(
-				dim_in1 != self.n_frame1 or
-				dim_out1 != self.n_frame0 or
-				dim_in2 != dim_out2):
-			raise ValueError('arguments "in_" and "out_" be vectors or '
-							 'matrices of dimensions K x N, and M x N, '
-							 'respectively, with:\nK = {}\nM={}\n'
-							 'Provided:\n input: {}x{}\noutput: {}x{}'
-							 ''.format(self.n_frame1, self.n_frame0,
-							 dim_in1, dim_in2, dim_out1, dim_out2))
+		self.__check_dimensions(in_, out_, self.n_frame1, self.n_frame0)
 		if clear_output:
 			out_ *= 0
 
-		if vector_processing:
-			for idx_0, idx_1 in enumerate(self.vec):
-				out_[idx_0] += in_[idx_1]
-
-		if matrix_processing:
-			for idx_0, idx_1 in enumerate(self.vec):
-				out_[idx_0, :] += in_[idx_1, :]
-
-		return out_
+		return _add_inplace(out_, self.__reverse(in_))
 
 	def frame1_to_0(self, in_):
 		"""
@@ -265,11 +353,16 @@ class DiscreteMapping(object):
 				and ``k`` >= ``1`` columns.
 
 		Returns:
-			:class:`numpy.ndarray`: Array with
-			:attr:`DiscreteMapping.n_frame0` rows and same number of
-			columns as input. Input entries are mapped one-to-one or
+			Array with :attr:`DiscreteMapping.n_frame0` rows and same
+			number of columns as input; sparse, in the same format as
+			``in_``, if input is sparse, :class:`numpy.ndarray`
+			otherwise. Input entries are mapped one-to-one or
 			many-to-one *into* output.
 		"""
+		if sp.issparse(in_):
+			if sparse_or_dense(in_) and in_.shape[0] == self.n_frame1:
+				return self.__reverse(in_)
+
 		if is_vector(in_):
 			out_ = np.zeros(self.__n_frame0)
 		elif sparse_or_dense(in_):
@@ -296,9 +389,8 @@ class ClusterMapping(DiscreteMapping):
 				first set to the v[i]'th cluster in the second set.
 		"""
 		DiscreteMapping.__init__(self, clustering_vector)
-		self.__cluster_weights = np.zeros(self.n_clusters)
-		for cluster_index in self.vec:
-			self.__cluster_weights[cluster_index] += 1.
+		self.__cluster_weights = np.bincount(
+				self.vec, minlength=self.n_clusters).astype(float)
 		self.__empty_clusters = np.sum(self.__cluster_weights == 0) > 0
 
 	@property
@@ -339,14 +431,7 @@ class ClusterMapping(DiscreteMapping):
 		Returns:
 			None
 		"""
-		vector = data.shape[0] == data.size
-		for idx_point, idx_cluster in enumerate(self.vec):
-			w = self.cluster_weights[idx_cluster]
-			if w > 0:
-				if vector:
-					data[idx_point] *= 1. / w
-				else:
-					data[idx_point, :] *= 1. / w
+		_scale_rows_inplace(data, 1. / self.cluster_weights[self.vec])
 
 	def __rescale_len_clusters(self, data):
 		"""
@@ -372,13 +457,10 @@ class ClusterMapping(DiscreteMapping):
 		Returns:
 			None
 		"""
-		vector = data.shape[0] == data.size
-		for idx_cluster, w in enumerate(self.cluster_weights):
-			if w > 0:
-				if vector:
-					data[idx_cluster] *= 1. / w
-				else:
-					data[idx_cluster, :] *= 1. / w
+		w = self.cluster_weights
+		scaling = np.ones(self.n_clusters)
+		scaling[w > 0] = 1. / w[w > 0]
+		_scale_rows_inplace(data, scaling)
 
 	def downsample_inplace(self, in_, out_, rescale_output=True,
 						 clear_output=False):
@@ -512,21 +594,9 @@ class ClusterMapping(DiscreteMapping):
 		if not self.__empty_clusters:
 			return self
 
-		vec = np.zeros(self.vec.size, dtype=int)
-		vec += self.vec
-		idx_order = vec.argsort()
-
-		cluster_new = 0
-		cluster_old = vec[idx_order[0]]
-
-		for idx in idx_order:
-			if vec[idx] != cluster_old:
-				cluster_new += 1
-				cluster_old = vec[idx]
-
-			vec[idx] = cluster_new
-
-		return ClusterMapping(vec)
+		occupied = self.cluster_weights > 0
+		relabel = np.cumsum(occupied) - 1
+		return ClusterMapping(relabel[self.vec])
 
 class PermutationMapping(DiscreteMapping):
 	""" Map ``N`` elements to each other, one-to-one. """
@@ -1,9 +1,12 @@
 from conrad.compat import *
 
+import hashlib
 import numpy as np
 import scipy.sparse as sp
 
-from conrad.defs import vec, sparse_or_dense, CONRAD_MATRIX_TYPES
+from conrad.defs import vec, sparse_or_dense, CONRAD_MATRIX_TYPES, \
+	next_version, matrix_digest
+from conrad.abstract.cache import SliceCache, entry_bytes
 
 def csx_slice_compressed(matrix, indices):
 	"""
@@ -50,6 +53,13 @@ def csx_slice_uncompressed(matrix, indices):
 	"""
 	Slice the columns (CSR) or rows (CSC) of a CS[X] sparse matrix
 
+	Selection is fully vectorized: a lookup table over the uncompressed
+	dimension assigns each stored entry a multiplicity (the number of
+	times its index is requested), and the retained entries are
+	gathered with :func:`numpy.repeat`. Requested indices may be
+	unsorted or duplicated; the submatrix is ordered as in ``indices``,
+	matching :mod:`numpy` fancy indexing.
+
 	Arguments:
 		matrix (:class:`scipy.sparse.csr_matrix` or
 			:class:`scipy.sparse.csc_matrix`): Matrix to be sliced into
@@ -60,64 +70,73 @@ def csx_slice_uncompressed(matrix, indices):
 		(:class:`scipy.sparse.csr_matrix` or
 		:class:`scipy.sparse.csc_matrix`): Submatrix
 
+	Raises:
+		IndexError: If any index out of range for uncompressed
+			dimension of ``matrix``.
 	"""
-	indices = list(indices)
+	indices = np.asarray(indices, dtype=int).ravel()
 
 	if isinstance(matrix, sp.csr_matrix):
 		m = matrix.shape[0]
 		n = len(indices)
+		dim_uncompressed = matrix.shape[1]
 	else:
 		m = len(indices)
 		n = matrix.shape[1]
+		dim_uncompressed = matrix.shape[0]
+
+	if indices.size > 0 and (
+			indices.min() < -dim_uncompressed or
+			indices.max() >= dim_uncompressed):
+		raise IndexError(
+				'slice indices out of range for matrix dimension '
+				'{}'.format(dim_uncompressed))
+	indices = np.where(indices < 0, indices + dim_uncompressed, indices)
 
 	val_full = matrix.data
 	ind_full = matrix.indices
 	ptr_full = matrix.indptr
 
-	ptr_sub = np.zeros_like(ptr_full)
-	included = np.zeros(matrix.nnz, dtype=bool)
-	indices.sort()
-	perm_inverse = {}
-	for i0, i1 in enumerate(indices):
-		perm_inverse[i1] = i0
-
-	for k in xrange(len(ptr_full) - 1):
-		ptr0, ptr1 = ptr_full[k], ptr_full[k + 1]
-		ind_slice = ind_full[ptr0:ptr1]
-		index_iter = iter(indices)
-		i_target = next(index_iter)
-		for j in np.argsort(ind_slice):
-			i_sorted = ind_slice[j]
-			while i_sorted > i_target and i_target < indices[-1]:
-				i_target = next(index_iter)
-			if i_sorted < i_target:
-				continue
-			elif i_sorted == i_target:
-				ptr_sub[k + 1] += 1
-				included[ptr0 + j] = True
-
-	ptr_sub[1:] = ptr_sub[1:].cumsum()
-	nnz_sub = ptr_sub[-1]
-	val_sub = np.zeros(nnz_sub, dtype=val_full.dtype)
-	ind_sub = np.zeros(nnz_sub, dtype=ind_full.dtype)
+	# multiplicity of each index of uncompressed dimension in selection
+	multiplicity = np.bincount(indices, minlength=dim_uncompressed)
+
+	# stable ordering of selection, grouped by index in full matrix:
+	# occurrences of index i are order[first[i]:first[i] + multiplicity[i]]
+	order = np.argsort(indices, kind='mergesort')
+	first = np.zeros(dim_uncompressed, dtype=int)
+	first[1:] = np.cumsum(multiplicity)[:-1]
+
+	# each stored entry is repeated once per occurrence of its index
+	entry_multiplicity = multiplicity[ind_full]
+	entry_offsets = np.zeros(len(ind_full) + 1, dtype=int)
+	np.cumsum(entry_multiplicity, out=entry_offsets[1:])
 
-	head = 0
-	for ptr, include in enumerate(included):
-		if include:
-			ind_sub[head] = perm_inverse[ind_full[ptr]]
-			val_sub[head] = val_full[ptr]
-			head += 1
+	ptr_sub = entry_offsets[ptr_full].astype(ptr_full.dtype)
+	nnz_sub = int(entry_offsets[-1])
 
+	if multiplicity.max(initial=0) <= 1:
+		# fast path: no duplicated indices, selection is a boolean mask
+		included = entry_multiplicity > 0
+		val_sub = val_full[included]
+		ind_sub = order[first[ind_full[included]]]
+	else:
+		source = np.repeat(np.arange(len(ind_full)), entry_multiplicity)
+		rank = np.arange(nnz_sub) - np.repeat(
+				entry_offsets[:-1], entry_multiplicity)
+		val_sub = val_full[source]
+		ind_sub = order[first[ind_full[source]] + rank]
+
+	ind_sub = ind_sub.astype(ind_full.dtype)
 	return type(matrix)((val_sub, ind_sub, ptr_sub), shape=(m, n))
 
 class SliceCachingMatrix(object):
-	def __init__(self, data):
+	def __init__(self, data, cache_budget=None):
 		self.__dim1 = None
 		self.__dim2 = None
 		self.__data = None
-		self.__row_slices = {}
-		self.__column_slices = {}
-		self.__double_slices = {}
+		self.__slices = SliceCache(cache_budget)
+		self.__version = None
+		self.__digest = None
 
 		self.data = data
 
@@ -132,12 +151,9 @@ class SliceCachingMatrix(object):
 		else:
 			lookup = 'row'
 
-		if lookup == 'both':
-			return comparator in self.__double_slices
-		elif lookup == 'column':
-			return comparator in self.__column_slices
-		else:
-			return comparator in self.__row_slices
+		if lookup not in ('both', 'column'):
+			lookup = 'row'
+		return (lookup, comparator) in self.__slices
 
 	@property
 	def contiguous(self):
@@ -162,6 +178,64 @@ class SliceCachingMatrix(object):
 	def data(self):
 		return self.__data
 
+	@property
+	def version(self):
+		"""
+		Version stamp, drawn from a global, increasing counter each
+		time data is assigned to the matrix.
+		"""
+		return self.__version
+
+	@property
+	def slice_cache(self):
+		"""
+		:class:`~conrad.abstract.cache.SliceCache` of row, column and
+		(row, column) slices, keyed by ``('row', label)``,
+		``('column', label)`` and ``('both', (row_label,
+		column_label))``.
+		"""
+		return self.__slices
+
+	@property
+	def cache_budget(self):
+		"""
+		Byte budget for cached slices, or ``None`` if unbounded.
+
+		Least recently used slices are evicted to meet the budget, and
+		rebuilt from the contiguous matrix on request. Component
+		matrices provided in lieu of a contiguous matrix and pinned
+		slices are never evicted.
+		"""
+		return self.__slices.budget
+
+	@cache_budget.setter
+	def cache_budget(self, budget):
+		self.__slices.budget = budget
+
+	@property
+	def cache_stats(self):
+		"""
+		Dictionary of slice cache statistics: hits, misses, evictions,
+		entries, bytes held by slices, budget, and numbers of pinned and
+		persistent entries; also bytes held by the contiguous matrix.
+		"""
+		stats = self.__slices.stats
+		stats['contiguous_bytes'] = entry_bytes(
+				self.data) if self.data is not None else 0
+		return stats
+
+	@property
+	def digest(self):
+		"""
+		Content hash of contiguous matrix data, or ``None`` if not set.
+
+		Computed on first request for each
+		:attr:`SliceCachingMatrix.version`, and cached thereafter.
+		"""
+		if self.__digest is None:
+			self.__digest = matrix_digest(self.data)
+		return self.__digest
+
 	def _preprocess_data(self, data):
 		return data
 
@@ -174,6 +248,8 @@ class SliceCachingMatrix(object):
 	@data.setter
 	def data(self, data):
 		data = self._preprocess_data(data)
+		self.__version = next_version()
+		self.__digest = None
 		if isinstance(data, dict):
 			labeled_by = data.pop('labeled_by', 'rows')
 			data_contiguous = data.pop('contiguous', None)
@@ -219,10 +295,9 @@ class SliceCachingMatrix(object):
 
 			self.__shape_check((rows, columns))
 			self.__dim1, self.__dim2 = rows, columns
-			if labeled_by == 'columns':
-				self.__column_slices.update(data)
-			else:
-				self.__row_slices.update(data)
+			kind = 'column' if labeled_by == 'columns' else 'row'
+			for label, mat in data.items():
+				self.__slices.put((kind, label), mat, persistent=True)
 		else:
 			if not sparse_or_dense(data):
 				raise TypeError(
@@ -248,8 +323,9 @@ class SliceCachingMatrix(object):
 			return csx_slice_uncompressed(data, indices)
 
 	def row_slice(self, label, indices):
-		if label in self.__row_slices:
-			return self.__row_slices[label]
+		cached = self.__slices.get(('row', label))
+		if cached is not None:
+			return cached
 		if self.data is None:
 			raise AttributeError(
 					'unified matrix for all rows not set/built, '
@@ -260,9 +336,8 @@ class SliceCachingMatrix(object):
 		else:
 			if callable(indices):
 				indices = indices(label)
-			self.__row_slices[label] = self.__row_slice_generic(
-					self.data, indices)
-			return self.__row_slices[label]
+			return self.__slices.put(('row', label), self.__row_slice_generic(
+					self.data, indices))
 
 	def row_assemble(self, labels):
 		raise NotImplementedError
@@ -281,8 +356,9 @@ class SliceCachingMatrix(object):
 			return csx_slice_compressed(data, indices)
 
 	def column_slice(self, label, indices):
-		if label in self.__column_slices:
-			return self.__column_slices[label]
+		cached = self.__slices.get(('column', label))
+		if cached is not None:
+			return cached
 		if self.data is None:
 			raise AttributeError(
 					'unified matrix for all columns not set/built, '
@@ -293,9 +369,9 @@ class SliceCachingMatrix(object):
 		else:
 			if callable(indices):
 				indices = indices(label)
-			self.__column_slices[label] = self.__column_slice_generic(
-					self.data, indices)
-			return self.__column_slices[label]
+			return self.__slices.put(
+					('column', label), self.__column_slice_generic(
+							self.data, indices))
 
 	def column_assemble(self, labels):
 		raise NotImplementedError
@@ -311,22 +387,23 @@ class SliceCachingMatrix(object):
 		elif row_label is None and column_label is not None:
 			return self.column_slice(column_label, column_indices)
 		else:
-			key = (row_label, column_label)
-			if key in self.__double_slices:
+			key = ('both', (row_label, column_label))
+			cached = self.__slices.get(key)
+			if cached is not None:
 				# return precomputed (row, column)labeled submatrix, if cached
-				return self.__double_slices[key]
-			elif row_label in self.__row_slices:
+				return cached
+			elif ('row', row_label) in self.__slices:
 				# use precomputed row-labeled submatrix, if cached
 				if callable(column_indices):
 					column_indices = column_indices(column_label)
-				self.__double_slices[key] = self.__column_slice_generic(
-						self.__row_slices[row_label], column_indices)
-			elif column_label in self.__column_slices:
+				submatrix = self.__column_slice_generic(
+						self.row_slice(row_label, None), column_indices)
+			elif ('column', column_label) in self.__slices:
 				# use precomputed column-labeled submatrix, if cached
 				if callable(row_indices):
 					row_indices = row_indices(row_label)
-				self.__double_slices[key] = self.__row_slice_generic(
-						self.__column_slices[column_label], row_indices)
+				submatrix = self.__row_slice_generic(
+						self.column_slice(column_label, None), row_indices)
 			else:
 				if isinstance(self.data, (np.ndarray, sp.csr_matrix)):
 					slice1 = self.row_slice
@@ -341,16 +418,100 @@ class SliceCachingMatrix(object):
 					slice2 = self.__row_slice_generic
 					indices2 = row_indices
 
-				self.__double_slices[key] = slice2(
-						slice1(label, indices1), indices2)
-			return self.__double_slices[key]
+				submatrix = slice2(slice1(label, indices1), indices2)
+			return self.__slices.put(key, submatrix)
+
+	def release_slice(self, row_label=None, column_label=None):
+		"""
+		Drop cached slice, if it can be rebuilt on request.
+
+		A row- or column-labeled slice is rebuilt from the contiguous
+		matrix, and a (row, column)-labeled slice from the contiguous
+		matrix or from a cached row- or column-labeled slice.
+		Component matrices provided in lieu of a contiguous matrix are
+		never released.
+
+		Arguments:
+			row_label (optional): Row label of slice.
+			column_label (optional): Column label of slice.
+
+		Returns:
+			:obj:`bool`: ``True`` if a cached slice was released.
+		"""
+		if row_label is None and column_label is None:
+			return False
+		key = self.__slice_key(row_label, column_label)
+		if key not in self.__slices or not self.__slices.evictable(key):
+			return False
+		self.__slices.pop(key)
+		return True
+
+	def __slice_key(self, row_label, column_label):
+		if row_label is not None and column_label is not None:
+			return ('both', (row_label, column_label))
+		elif row_label is not None:
+			return ('row', row_label)
+		return ('column', column_label)
+
+	def pin_slice(self, row_label=None, column_label=None):
+		"""
+		Exempt cached slice from eviction, e.g., while in active use.
+
+		Pins are counted; each call should be matched by a call to
+		:meth:`SliceCachingMatrix.unpin_slice`.
+
+		Returns:
+			:obj:`bool`: ``True`` if slice cached and pinned.
+		"""
+		return self.__slices.pin(self.__slice_key(row_label, column_label))
+
+	def unpin_slice(self, row_label=None, column_label=None):
+		""" Release one pin on cached slice. """
+		self.__slices.unpin(self.__slice_key(row_label, column_label))
+
+	def drop_data(self, labeled_by='rows'):
+		"""
+		Release contiguous matrix, if cached row (or column) slices
+		cover all of its rows (or columns).
+
+		The slices become the matrix's component matrices: they are no
+		longer evicted or released, and the matrix is no longer
+		:attr:`SliceCachingMatrix.contiguous`, so uncached slices by
+		the other dimension can no longer be built. Labels are assumed
+		to be disjoint, as is the case for slices by label.
+
+		Arguments:
+			labeled_by (:obj:`str`, optional): One of ``'rows'`` or
+				``'columns'``.
+
+		Returns:
+			:obj:`bool`: ``True`` if contiguous matrix released.
+		"""
+		if labeled_by not in ('rows', 'columns'):
+			raise ValueError(
+					'argument `labeled_by` must be one of `rows` or '
+					'`columns`')
+		if self.data is None:
+			return False
+		kind, axis = ('row', 0) if labeled_by == 'rows' else ('column', 1)
+		slices = self.__slices.items(kind)
+		covered = sum(mat.shape[axis] for _, mat in slices)
+		if len(slices) == 0 or covered != self.data.shape[axis]:
+			return False
+
+		# keep content hash of released matrix
+		self.digest
+		for label, _ in slices:
+			self.__slices.persist((kind, label))
+		self.__data = None
+		return True
 
 	@property
 	def __cached_slices(self):
 		return {
-				'row': self.__row_slices.keys(),
-				'column': self.__column_slices.keys(),
-				'both': self.__double_slices.keys(),
+				'row': self.__slices.keys('row'),
+				'column': self.__slices.keys('column'),
+				'both': self.__slices.keys('both'),
 		}
 
 	@property
@@ -362,12 +523,14 @@ class SliceCachingMatrix(object):
 		manifest = {}
 		if self.data is not None:
 			manifest['contiguous'] = self.data
-		if len(self.__row_slices) > 0:
+		row_slices = self.__slices.items('row')
+		column_slices = self.__slices.items('column')
+		if len(row_slices) > 0:
 			manifest['labeled_by'] = 'rows'
-			manifest.update(self.__row_slices)
-		elif len(self.__column_slices) > 0:
+			manifest.update(row_slices)
+		elif len(column_slices) > 0:
 			manifest['labeled_by'] = 'columns'
-			manifest.update(self.__column_slices)
+			manifest.update(column_slices)
 		if len(manifest) == 0:
 			raise ValueError(
 					'{} not exportable as manifest: full matrix or '
@@ -377,3 +540,148 @@ class SliceCachingMatrix(object):
 	@property
 	def manifest(self):
 		return self.__manifest
+
+class LazyMatrixSlice(object):
+	"""
+	Deferred row, column or (row, column) slice of a
+	:class:`SliceCachingMatrix`.
+
+	The slice dimensions are known on construction, but the slice is
+	only built (and cached by the parent matrix) on the first call to
+	:meth:`LazyMatrixSlice.materialize`, and may be dropped again with
+	:meth:`LazyMatrixSlice.release`. While materialized, the slice is
+	pinned in the parent matrix's cache, i.e., exempt from eviction.
+	"""
+	def __init__(self, matrix, row_label=None, column_label=None,
+				 row_indices=None, column_indices=None):
+		"""
+		Initialize :class:`LazyMatrixSlice`.
+
+		Arguments:
+			matrix (:class:`SliceCachingMatrix`): Matrix to slice.
+			row_label (optional): Row label of slice; all rows if not
+				provided.
+			column_label (optional): Column label of slice; all
+				columns if not provided.
+			row_indices (optional): Row indices of slice, or function
+				mapping ``row_label`` to row indices.
+			column_indices (optional): Column indices of slice, or
+				function mapping ``column_label`` to column indices.
+
+		Raises:
+			TypeError: If ``matrix`` not a :class:`SliceCachingMatrix`.
+			ValueError: If neither label provided.
+		"""
+		if not isinstance(matrix, SliceCachingMatrix):
+			raise TypeError(
+					'argument `matrix` must be of type {}'
+					''.format(SliceCachingMatrix))
+		if row_label is None and column_label is None:
+			raise ValueError(
+					'at least one of arguments `row_label` and '
+					'`column_label` must not be `None`')
+		self.__matrix = matrix
+		self.__pinned = False
+		self.__row_label = row_label
+		self.__column_label = column_label
+		self.__row_indices = self.__resolve(
+				'row', row_label, row_indices)
+		self.__column_indices = self.__resolve(
+				'column', column_label, column_indices)
+		self.__shape = (
+				self.__dim('row', row_label, self.__row_indices, 0),
+				self.__dim('column', column_label, self.__column_indices, 1))
+
+	def __resolve(self, lookup, label, indices):
+		if label is not None and (lookup, label) not in self.__matrix:
+			if callable(indices):
+				indices = indices(label)
+		return indices
+
+	def __dim(self, lookup, label, indices, axis):
+		if label is None:
+			return self.__matrix.shape[axis]
+		if (lookup, label) in self.__matrix:
+			cached = getattr(self.__matrix, lookup + '_slice')(label, None)
+			return cached.shape[axis]
+		if indices is None:
+			raise ValueError(
+					'{} indices must be provided for uncached slice with '
+					'label {}'.format(lookup, label))
+		return len(indices)
+
+	@property
+	def matrix(self):
+		""" Parent :class:`SliceCachingMatrix`. """
+		return self.__matrix
+
+	@property
+	def shape(self):
+		""" Dimensions of slice. """
+		return self.__shape
+
+	@property
+	def digest(self):
+		"""
+		Content hash of slice.
+
+		Derived from the parent matrix's (cached)
+		:attr:`SliceCachingMatrix.digest` and the slice indices,
+		without building the slice. If the slice is already cached, or
+		the parent matrix is not contiguous (so that the slice is one
+		of its component matrices), the slice is hashed directly.
+		"""
+		parent = self.__matrix.digest
+		if parent is None or self.materialized:
+			return matrix_digest(self.__matrix.slice(
+					self.__row_label, self.__column_label,
+					self.__row_indices, self.__column_indices))
+		digest = hashlib.sha1(parent.encode())
+		for label, indices in (
+				(self.__row_label, self.__row_indices),
+				(self.__column_label, self.__column_indices)):
+			if label is not None and callable(indices):
+				indices = indices(label)
+			digest.update(str(label is None).encode())
+			if indices is not None:
+				digest.update(np.asarray(indices, dtype=int).tobytes())
+		return digest.hexdigest()
+
+	@property
+	def materialized(self):
+		""" ``True`` if slice cached by parent matrix. """
+		if self.__row_label is not None and self.__column_label is not None:
+			key = ('both', (self.__row_label, self.__column_label))
+		elif self.__row_label is not None:
+			key = ('row', self.__row_label)
+		else:
+			key = ('column', self.__column_label)
+		return key in self.__matrix
+
+	def materialize(self):
+		"""
+		Build slice, or retrieve it from the parent matrix's cache, and
+		pin it there.
+
+		Returns:
+			Slice, as a matrix of the parent matrix's type.
+		"""
+		submatrix = self.__matrix.slice(
+				self.__row_label, self.__column_label,
+				self.__row_indices, self.__column_indices)
+		if not self.__pinned:
+			self.__pinned = self.__matrix.pin_slice(
+					self.__row_label, self.__column_label)
+		return submatrix
+
+	def release(self):
+		"""
+		Unpin slice and drop it from the parent matrix's cache.
+
+		See :meth:`SliceCachingMatrix.release_slice`.
+		"""
+		if self.__pinned:
+			self.__matrix.unpin_slice(self.__row_label, self.__column_label)
+			self.__pinned = False
+		return self.__matrix.release_slice(
+				self.__row_label, self.__column_label)
@@ -3,12 +3,13 @@ from conrad.compat import *
 import numpy as np
 
 from conrad.defs import vec
+from conrad.abstract.cache import SliceCache, entry_bytes
 
 class SliceCachingVector(object):
-	def __init__(self, data):
+	def __init__(self, data, cache_budget=None):
 		self.__size = None
 		self.__data = None
-		self.__slices = {}
+		self.__slices = SliceCache(cache_budget)
 		self.data = data
 
 	def __contains__(self, comparator):
@@ -25,6 +26,47 @@ class SliceCachingVector(object):
 	def _validate(self, data):
 		return True
 
+	@property
+	def cache_budget(self):
+		"""
+		Byte budget for cached slices, or ``None`` if unbounded.
+
+		See :attr:`~conrad.abstract.matrix.SliceCachingMatrix.cache_budget`.
+		"""
+		return self.__slices.budget
+
+	@cache_budget.setter
+	def cache_budget(self, budget):
+		self.__slices.budget = budget
+
+	@property
+	def cache_stats(self):
+		""" Dictionary of slice cache statistics. """
+		stats = self.__slices.stats
+		stats['contiguous_bytes'] = entry_bytes(
+				self.data) if self.data is not None else 0
+		return stats
+
+	def pin_slice(self, label):
+		""" Exempt cached slice from eviction. """
+		return self.__slices.pin(label)
+
+	def unpin_slice(self, label):
+		""" Release one pin on cached slice. """
+		self.__slices.unpin(label)
+
+	def release_slice(self, label):
+		"""
+		Drop cached slice, if it can be rebuilt from contiguous vector.
+
+		Returns:
+			:obj:`bool`: ``True`` if a cached slice was released.
+		"""
+		if label not in self or not self.__slices.evictable(label):
+			return False
+		self.__slices.pop(label)
+		return True
+
 	@property
 	def data(self):
 		return self.__data
@@ -54,38 +96,156 @@ class SliceCachingVector(object):
 			self.__size = size
 
 		if isinstance(data, dict):
-			self.__slices.update(data)
+			for label, subvector in data.items():
+				self.__slices.put(label, subvector, persistent=True)
 			if data_contiguous is not None:
 				self.data = data_contiguous
 		else:
 			self.__data = data
 
 	def slice(self, label, indices=None):
-		# calculate and cache slice
-		if not label in self:
-			if self.data is None:
-				raise AttributeError(
-						'cannot build slice from vector if '
-						'`SliceCachingVector.data` is not set' )
-			self.__slices[label] = self.data[indices]
-
 		# return cached slice
-		return self.__slices[label]
+		cached = self.__slices.get(label)
+		if cached is not None:
+			return cached
+
+		# calculate and cache slice
+		if self.data is None:
+			raise AttributeError(
+					'cannot build slice from vector if '
+					'`SliceCachingVector.data` is not set' )
+		return self.__slices.put(label, self.data[indices])
 
 	def assemble(self):
 		if len(self.__slices) == 0:
 			raise AttributeError('no subvectors to assemble')
-		self.__data = np.hstack(self.__slices.values())
+		self.__data = np.hstack(
+				[self.__slices[k] for k in self.__slices.keys()])
 
 	@property
 	def manifest(self):
 		manifest = {}
 		if self.data is not None:
 			manifest['contiguous'] = self.data
-		if len(self.__slices) > 0:
-			manifest.update(self.__slices)
+		for label in self.__slices.keys():
+			manifest[label] = self.__slices[label]
 		if len(manifest) == 0:
 			raise ValueError(
 					'{} not exportable as manifest: full vector or '
 					'slices not set')
-		return manifest
\ No newline at end of file
+		return manifest
+
+class LabelIndex(object):
+	"""
+	Grouped index of the entries of a label vector.
+
+	Entries are grouped by label with a single stable sort: the
+	permutation :attr:`LabelIndex.order` lists entry indices grouped by
+	label (in ascending label order, with ascending entry indices within
+	each group), and :attr:`LabelIndex.offsets` delimits the groups.
+	Retrieving the indices of all entries with a given label is then a
+	constant-time slice, rather than a scan of the label vector.
+	"""
+	def __init__(self, labels):
+		"""
+		Initialize :class:`LabelIndex`.
+
+		Arguments:
+			labels: Vector-like array of labels.
+		"""
+		labels = vec(labels)
+		self.__size = labels.size
+		self.__order = np.argsort(labels, kind='mergesort')
+		self.__labels, starts = np.unique(
+				labels[self.__order], return_index=True)
+		self.__offsets = np.hstack((starts, self.__size)).astype(int)
+		self.__grouped = bool(np.all(np.diff(labels) >= 0))
+		self.__positions = {
+				label: k for k, label in enumerate(self.__labels.tolist())}
+
+	def __contains__(self, label):
+		return label in self.__positions
+
+	def __len__(self):
+		return len(self.__positions)
+
+	@property
+	def size(self):
+		""" Length of indexed label vector. """
+		return self.__size
+
+	@property
+	def labels(self):
+		""" Unique labels, sorted ascending. """
+		return self.__labels
+
+	@property
+	def offsets(self):
+		"""
+		Group boundaries in :attr:`LabelIndex.order`.
+
+		Entries labeled ``labels[k]`` are located at
+		``order[offsets[k]:offsets[k + 1]]``.
+		"""
+		return self.__offsets
+
+	@property
+	def counts(self):
+		""" Number of entries with each label in :attr:`LabelIndex.labels`. """
+		return np.diff(self.__offsets)
+
+	@property
+	def order(self):
+		""" Permutation of entry indices that groups entries by label. """
+		return self.__order
+
+	@property
+	def grouped(self):
+		"""
+		``True`` if label vector already sorted, i.e., entries sharing a
+		label are contiguous and :attr:`LabelIndex.order` is the
+		identity permutation.
+		"""
+		return self.__grouped
+
+	def group(self, vector):
+		"""
+		Permute entries of ``vector`` so that they are grouped by label.
+
+		Arguments:
+			vector (:class:`numpy.ndarray`): Array with
+				:attr:`LabelIndex.size` entries (or rows).
+
+		Returns:
+			:class:`numpy.ndarray`: Input, if already grouped by label,
+			otherwise a permuted copy. Entries labeled ``labels[k]``
+			occupy positions ``offsets[k]:offsets[k + 1]``.
+		"""
+		if self.__grouped:
+			return vector
+		return vector[self.__order]
+
+	def position(self, label):
+		"""
+		Position of ``label`` in :attr:`LabelIndex.labels`.
+
+		Raises:
+			KeyError: If ``label`` not indexed.
+		"""
+		if label not in self.__positions:
+			raise KeyError('label {} not found in indexed label vector'
+						   ''.format(label))
+		return self.__positions[label]
+
+	def indices(self, label):
+		"""
+		Indices of entries with label ``label``, in ascending order.
+
+		The returned array is a view into :attr:`LabelIndex.order` and
+		should not be modified.
+
+		Raises:
+			KeyError: If ``label`` not indexed.
+		"""
+		k = self.position(label)
+		return self.__order[self.__offsets[k]:self.__offsets[k + 1]]
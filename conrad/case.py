@@ -28,6 +28,9 @@ from conrad.physics import Physics
 from conrad.medicine import Anatomy, Prescription
 from conrad.optimization.problem import PlanningProblem
 from conrad.optimization.history import RunRecord, PlanningHistory
+from conrad.optimization.profiler import PhaseProfile
+from conrad.optimization.sweep import expand_grid, plan_sweep
+from conrad.optimization.frontier import trace_frontier
 
 class Case(object):
 	"""
@@ -83,6 +86,7 @@ class Case(object):
 		self.__anatomy = None
 		self.__prescription = None
 		self.__problem = None
+		self.__history = PlanningHistory()
 
 		self.physics = physics
 		self.anatomy = anatomy
@@ -136,6 +140,16 @@ class Case(object):
 		""" Object managing numerical optimization setup and results. """
 		return self.__problem
 
+	@property
+	def history(self):
+		"""
+		Record of treatment plans formed by :meth:`Case.plan`.
+
+		Plans can be tagged with :meth:`PlanningHistory.tag_last` and
+		used as warm starts for later calls to :meth:`Case.plan`.
+		"""
+		return self.__history
+
 	@property
 	def structures(self):
 		""" Dictionary of structures contained in :attr:`Case.anatomy`. """
@@ -305,6 +319,16 @@ class Case(object):
 		is used to retrieve the dose matrix data and voxel weights from
 		:attr:`Case.physics` for the voxels bearing that label.
 
+		Each structure's full dose matrix is assigned as a handle on
+		the corresponding slice of :attr:`Case.physics.dose_matrix`, and
+		is only sliced on first access; structures that are collapsable
+		(or excluded from planning) may never need their full dose
+		matrix. Structures are assigned their mean dose matrices up
+		front, from the mean dose rows of all labels calculated by
+		:attr:`Case.physics` in one pass, where possible. See
+		:meth:`Anatomy.release_matrices` to release materialized dose
+		matrices.
+
 		The method marks the :attr:`Case.physics.dose_matrix` as seen,
 		in order to prevent redundant data transfers.
 
@@ -334,19 +358,26 @@ class Case(object):
 			if self.physics.data_loaded:
 				return
 
+		weighted = not self.physics.frame.voxel_weights.unweighted
 		for structure in self.anatomy:
-			A = self.physics.dose_matrix_by_label(structure.label)
+			A = self.physics.dose_matrix_handle_by_label(structure.label)
 			if A.shape[0] == 1:
-				structure.A_mean = A
+				structure.A_mean = A.materialize()
+				if weighted:
+					vw = self.physics.voxel_weights_by_label(
+							structure.label)
+					if structure.size is None:
+						structure.size = np.sum(vw)
+					structure.voxel_weights = vw
 			else:
-				structure.A_full = A
-
-		if not self.physics.frame.voxel_weights.unweighted:
-			for structure in self.anatomy:
-				vw = self.physics.voxel_weights_by_label(structure.label)
-				if structure.size is None:
-					structure.size = np.sum(vw)
-				structure.voxel_weights = vw
+				# mean dose rows for all labels are computed in one pass
+				# and cached by the physics frame; if unavailable (None),
+				# structures derive their mean dose matrix on demand
+				structure.set_dose_matrices(
+						A, A_mean=self.physics.mean_dose_by_label(
+								structure.label),
+						voxel_weights=self.physics.voxel_weights_by_label(
+								structure.label))
 		self.physics.mark_data_as_loaded()
 
 	def gather_physics_from_anatomy(self):
@@ -374,17 +405,49 @@ class Case(object):
 				structure.label: structure.voxel_weights
 				for structure in self.anatomy}
 
+	@property
+	def __fused_dose_calculation(self):
+		"""
+		``True`` if structure doses can be calculated in one pass.
+
+		Requires that structures in :attr:`Case.anatomy` hold data
+		from the current frame of :attr:`Case.physics`, and that the
+		frame has a contiguous dose matrix, contiguous voxel weights and
+		voxel labels covering every structure.
+		"""
+		frame = self.physics.frame
+		if not self.physics.data_loaded or self.anatomy.is_empty:
+			return False
+		if frame.dose_matrix is None or not frame.dose_matrix.contiguous:
+			return False
+		if frame.voxel_weights is None or frame.voxel_weights.data is None:
+			return False
+		if frame.voxel_labels is None:
+			return False
+		index = frame.voxel_label_index
+		return all(label in index for label in self.anatomy.labels)
+
 	def calculate_doses(self, x):
 		"""
 		Calculate voxel doses for each structure in :attr:`Case.anatomy`.
 
+		If possible, doses to all structures are calculated with a
+		single multiplication by the dose matrix of the current frame of
+		:attr:`Case.physics` (see
+		:meth:`~conrad.physics.physics.DoseFrame.calculate_doses`);
+		otherwise, each structure calculates its own doses.
+
 		Arguments:
 			x: Vector-like np.array of beam intensities.
 
 		Returns:
 			None
 		"""
-		self.anatomy.calculate_doses(x)
+		if self.__fused_dose_calculation:
+			self.anatomy.propagate_doses(*self.physics.calculate_doses(
+					x, self.anatomy.labels))
+		else:
+			self.anatomy.calculate_doses(x)
 
 	def propagate_doses(self, y):
 		"""
@@ -432,7 +495,25 @@ class Case(object):
 				restrictions of any percentile-type dose constraints
 				included in the plan.
 			**options: Arbitrary keyword arguments. Passed through to
-				:meth:`Case.problem.solve`.
+				:meth:`Case.problem.solve`. With ``persistent=True``,
+				the CVXPY solver keeps its problem between calls, so
+				that re-planning after :meth:`Case.change_constraint`
+				or :meth:`Case.change_objective` only updates
+				parameter values. Keyword ``warm_start`` selects a
+				previous plan to start the solver from: ``'last'``
+				(most recent plan in :attr:`Case.history`, if any), a
+				tag or index of a plan in :attr:`Case.history`, or a
+				:class:`~conrad.optimization.history.RunRecord`.
+				Keyword ``tag`` tags the new plan in
+				:attr:`Case.history`. Keyword ``backend`` names a
+				solver backend (e.g., ``'POGS'``, ``'SCS'`` or
+				``'ECOS'``) to use instead of the one with the lowest
+				predicted run time.
+
+		Time spent in each phase of planning (loading dose matrices
+		from :attr:`Case.physics`, building and solving the problem,
+		calculating doses and plotting data) is recorded in
+		:attr:`~conrad.optimization.history.RunRecord.phases`.
 
 		Returns:
 			:obj:`tuple`: Tuple with :obj:`bool` indicator of planning
@@ -441,9 +522,14 @@ class Case(object):
 			from the setup, execution and output of the planning run.
 
 		Raises:
-			ValueError: If case not plannable due to missing information.
-		"""
-		if not self.plannable:
+			ValueError: If case not plannable due to missing
+				information, or if ``warm_start`` is not a valid key to
+				a plan in :attr:`Case.history`.
+		"""
+		phases = PhaseProfile()
+		with phases.phase('load_physics'):
+			plannable = self.plannable
+		if not plannable:
 			raise ValueError('case not plannable in current state.\n'
 							 'minimum requirements:\n'
 							 '---------------------\n'
@@ -461,28 +547,139 @@ class Case(object):
 		# objective weight for slack minimization
 		gamma = options['gamma'] = options.pop('slack_penalty', None)
 
+		# name planning frame, to key solver caches by
+		options.setdefault('frame', self.physics.frame.name)
+
+		# previous plan to warm start solver from: OFF by default
+		warm_start = options.pop('warm_start', None)
+		tag = options.pop('tag', None)
+		if warm_start is not None and not isinstance(warm_start, RunRecord):
+			if warm_start == 'last':
+				warm_start = self.history.runs[-1] if \
+						len(self.history.runs) > 0 else None
+			else:
+				warm_start = self.history[warm_start]
+
 		run = RunRecord(
 				self.anatomy.list,
 				use_2pass=use_2pass,
 				use_slack=use_slack,
 				gamma=gamma)
+		run.output.phases = phases
 
-		# solve problem
+		# solve problem; structure doses are calculated in one pass
+		# where possible, without materializing lazily assigned dose
+		# matrices of collapsable structures
 		feas = self.problem.solve(self.anatomy.list, run.output,
 								 slack=use_slack, exact_constraints=use_2pass,
+								 warm_start=warm_start,
+								 dose_calculation=self.calculate_doses,
 								 **options)
 
-		# update doses
+		# update doses; after a single pass, structures already hold
+		# the doses of the plan
 		if run.feasible:
-			run.plotting_data[0] = self.plotting_data(x=run.x)
+			with phases.phase('plotting_data'):
+				run.plotting_data[0] = self.plotting_data(
+						x=run.x if use_2pass else None)
 			if use_2pass:
-				run.plotting_data['exact'] = self.plotting_data(x=run.x_exact)
+				with phases.phase('plotting_data_exact'):
+					run.plotting_data['exact'] = self.plotting_data(
+							x=run.x_exact)
 		else:
 			warnings.warn('Problem infeasible as formulated')
 
+		self.history += run
+		if tag is not None:
+			self.history.tag_last(tag)
 		status = (feas == int(1 + int(use_2pass)))
 		return status, run
 
+	def plan_sweep(self, param_grid, workers=None, tag='sweep', **options):
+		"""
+		Plan case once for each variant in a parameter grid.
+
+		Variants are planned in parallel by forked worker processes
+		that share the case's dose matrices read-only; see
+		:func:`~conrad.optimization.sweep.plan_sweep`. The state of the
+		case is unchanged on return.
+
+		Arguments:
+			param_grid (:obj:`dict`): Candidate values, keyed by
+				constraint ID (values passed as dose, or as keyword
+				arguments, to :meth:`Case.change_constraint`) or by
+				``(label, parameter)`` (values passed to
+				:meth:`Case.change_objective`). All combinations of
+				candidate values are planned. A list of such
+				dictionaries is also accepted.
+			workers (:obj:`int`, optional): Number of worker processes;
+				defaults to number of CPUs.
+			tag (optional): Prefix for tags of runs in
+				:attr:`Case.history`; run ``i`` of the sweep is tagged
+				``'{tag}{i}'``.
+			**options: Keyword arguments passed to :meth:`Case.plan`.
+
+		Returns:
+			:obj:`list` of
+			:class:`~conrad.optimization.history.RunRecord`: Records of
+			planning runs, in the order of the expanded grid.
+
+		Raises:
+			ValueError: If case not plannable, or if a key in
+				``param_grid`` does not correspond to a constraint or
+				structure objective in case.
+		"""
+		if not self.plannable:
+			raise ValueError('case not plannable in current state.')
+		variants = expand_grid(param_grid)
+		tags = ['{}{}'.format(tag, i) for i in xrange(len(variants))]
+		return plan_sweep(self, variants, tags, workers=workers, **options)
+
+	def plan_frontier(self, anchors, n_points=50, labels=None,
+					  percentiles=None, tag='frontier', **options):
+		"""
+		Trace frontier of structure objectives along a path of variants.
+
+		The case is planned along a piecewise linear path between
+		``anchors``, with warm starts from neighboring plans and
+		adaptive refinement where the frontier curves; see
+		:func:`~conrad.optimization.frontier.trace_frontier`. The
+		parameters of the case are unchanged on return.
+
+		Arguments:
+			anchors (:obj:`list` of :obj:`dict`): Two or more planning
+				variants with common keys. Keys are constraint IDs
+				(values passed as dose, or as keyword arguments, to
+				:meth:`Case.change_constraint`) or ``(label,
+				parameter)`` pairs (values passed to
+				:meth:`Case.change_objective`).
+			n_points (:obj:`int`, optional): Maximum number of points
+				on frontier.
+			labels (:obj:`list`, optional): Labels of structures to
+				evaluate; defaults to all structures.
+			percentiles (:obj:`list`, optional): Percentiles at which
+				to summarize DVHs, in addition to mean, minimum and
+				maximum dose.
+			tag (optional): Prefix for tags of runs in
+				:attr:`Case.history`.
+			**options: Keyword arguments passed to
+				:func:`~conrad.optimization.frontier.trace_frontier`
+				and :meth:`Case.plan`.
+
+		Returns:
+			:class:`~conrad.optimization.frontier.ParetoFrontier`:
+			Objective values, DVH summaries and beam intensities of
+			frontier points.
+
+		Raises:
+			ValueError: If case not plannable, or if anchors invalid.
+		"""
+		if not self.plannable:
+			raise ValueError('case not plannable in current state.')
+		return trace_frontier(
+				self, anchors, n_points=n_points, labels=labels,
+				percentiles=percentiles, tag=tag, **options)
+
 	def plotting_data(self, x=None, constraints_only=False, maxlength=None):
 		"""
 		Dictionary of :mod:`matplotlib`-compatible plotting data.
@@ -32,7 +32,10 @@ along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
 from conrad.compat import *
 
 import os
-import pip
+import sys
+import hashlib
+import importlib
+import itertools
 import operator as op
 import numpy as np
 import scipy.sparse as sp
@@ -73,6 +76,51 @@ def sparse_or_dense(matrixlike):
 	sparse = isinstance(matrixlike, (sp.csr_matrix, sp.csc_matrix))
 	return sparse or dense
 
+_VERSIONS = itertools.count(1)
+
+def next_version():
+	"""
+	Draw from a global, monotonically increasing counter.
+
+	Used to stamp data (e.g., dose matrices) each time it is assigned,
+	so that equal stamps imply the same assignment.
+	"""
+	return next(_VERSIONS)
+
+def update_digest(digest, matrixlike):
+	"""
+	Update ``digest`` with data type, format, shape and contents of
+	vector or matrix.
+
+	Arguments:
+		digest: :mod:`hashlib` hash object.
+		matrixlike: :class:`~numpy.ndarray`, :class:`sp.csr_matrix` or
+			:class:`sp.csc_matrix`.
+
+	Returns:
+		None
+	"""
+	if sp.issparse(matrixlike):
+		digest.update(str((matrixlike.format, matrixlike.shape)).encode())
+		for array in (matrixlike.indptr, matrixlike.indices, matrixlike.data):
+			update_digest(digest, array)
+	else:
+		array = np.ascontiguousarray(matrixlike)
+		digest.update(str(('dense', array.dtype, array.shape)).encode())
+		digest.update(array.view(np.uint8).ravel())
+
+def matrix_digest(matrixlike):
+	"""
+	Hexadecimal SHA-1 digest of vector or matrix, or ``None``.
+
+	See :func:`update_digest`.
+	"""
+	if matrixlike is None:
+		return None
+	digest = hashlib.sha1()
+	update_digest(digest, matrixlike)
+	return digest.hexdigest()
+
 def vec_or_mat_formatted(arraylike):
 	return is_vector(arraylike) or sparse_or_dense(arraylike)
 
@@ -100,30 +148,105 @@ def cvxpy_var_shape(cvxpy_var):
 	else:
 		return cvxpy_var.size
 
+# availability of modules probed by module_installed(), by module name
+_MODULES_INSTALLED = {}
+
+def _find_module(name):
+	if name in sys.modules:
+		return True
+	try:
+		from importlib.util import find_spec
+	except ImportError:
+		# python 2
+		import imp
+		try:
+			imp.find_module(name)
+			return True
+		except ImportError:
+			return False
+	try:
+		return find_spec(name) is not None
+	except (ImportError, ValueError):
+		return False
+
+def _module_version(name):
+	try:
+		from importlib import metadata
+	except ImportError:
+		# python < 3.8
+		try:
+			import pkg_resources
+			return pkg_resources.get_distribution(name).version
+		except Exception:
+			return ''
+	try:
+		return metadata.version(name)
+	except metadata.PackageNotFoundError:
+		return ''
+	except Exception:
+		return ''
+
 def module_installed(name, version_string=None):
 	"""
 	Test whether queried module is installed.
 
+	Availability is probed with :mod:`importlib`, without importing the
+	module, and cached for the remainder of the process.
+
 	Arguments:
 		name (:obj:`str`): Name of module to query.
 		version_string (:obj:`str`, optional): Specific module version
 			to query.
 
 	Returns:
-		:obj:`bool`: ``True`` if queried module has a matching string in
-		dictionary values returned by
-		:func:`pip.get_installed_distributions`.
+		:obj:`bool`: ``True`` if queried module can be imported and, if
+		``version_string`` is provided, the version of its distribution
+		contains ``version_string``.
 	"""
-	modules = pip.get_installed_distributions()
-	index = -1
+	if name not in _MODULES_INSTALLED:
+		_MODULES_INSTALLED[name] = _find_module(name)
+	installed = _MODULES_INSTALLED[name]
+
+	if installed and version_string:
+		installed &= str(version_string) in _module_version(name)
 
-	installed = False
-	for idx, module in enumerate(modules):
-		if name in str(module):
-			index = idx
-			installed = True
+	return installed
 
-	if version_string:
-		installed &= str(version_string) in str(modules[index])
+class LazyModule(object):
+	"""
+	Stand-in for a module, imported on first attribute access.
+
+	Keeps optional, slow-to-import dependencies (e.g., :mod:`cvxpy`,
+	:mod:`optkit`, :mod:`matplotlib`) out of ``import conrad`` until
+	they are used.
 
-	return installed
\ No newline at end of file
+	Attributes:
+		loaded (:obj:`bool`): ``True`` if module has been imported.
+	"""
+	def __init__(self, name, on_import=None):
+		"""
+		Initialize :class:`LazyModule`.
+
+		Arguments:
+			name (:obj:`str`): Name of module.
+			on_import (optional): Callable, invoked without arguments
+				immediately before the module is imported.
+		"""
+		self.__name = name
+		self.__module = None
+		self.__on_import = on_import
+
+	@property
+	def loaded(self):
+		return self.__module is not None
+
+	def __getattr__(self, attribute):
+		if self.__module is None:
+			if self.__on_import is not None:
+				self.__on_import()
+			self.__module = importlib.import_module(self.__name)
+		return getattr(self.__module, attribute)
+
+	def __repr__(self):
+		return '<lazily imported module {!r}{}>'.format(
+				self.__name, '' if self.loaded else ' (not loaded)')
@@ -113,7 +113,7 @@ class CaseAccessor(ConradDBAccessor):
 
 		return self.DB.set(case_ID, case_entry, overwrite=True)
 
-	def load_case(self, case_entry, frame='default'):
+	def load_case(self, case_entry, frame='default', mmap_mode=None):
 		case_entry = self.DB.get(case_entry)
 		validate_case_entry(case_entry)
 		if not case_entry.complete:
@@ -122,17 +122,19 @@ class CaseAccessor(ConradDBAccessor):
 		return Case(
 			anatomy=self.anatomy_accessor.load_anatomy(case_entry.anatomy),
 			physics=self.physics_accessor.load_physics(
-					case_entry.physics, frame_name=frame),
+					case_entry.physics, frame_name=frame,
+					mmap_mode=mmap_mode),
 			prescription=case_entry.prescription,
 		)
 
-	def load_frame(self, case_entry, frame_name):
+	def load_frame(self, case_entry, frame_name, mmap_mode=None):
 		case_entry = self.DB.get(case_entry)
 		validate_case_entry(case_entry)
 		physics_entry = self.DB.get(case_entry.physics)
 		frame = self.physics_accessor.frame_accessor.select_frame_entry(
 				physics_entry.frames, frame_name)
-		return self.physics_accessor.frame_accessor.load_frame(frame)
+		return self.physics_accessor.frame_accessor.load_frame(
+				frame, mmap_mode)
 
 	def load_frame_mapping(self, case_entry, source_frame, target_frame):
 		case_entry = self.DB.get(case_entry)
@@ -190,13 +192,13 @@ class CaseAccessor(ConradDBAccessor):
 				history_entry.solutions, frame_name, solution_name)
 		return self.history_accessor.solution_accessor.load_solution(sol)
 
-	def load_case_yaml(self, yaml_file):
+	def load_case_yaml(self, yaml_file, mmap_mode=None):
 		# try multi-document specification
 		self.DB.clear_log()
 		self.DB.ingest_yaml(yaml_file)
 		for e in self.DB.logged_entries:
 			if CONRAD_DB_ENTRY_PREFIXES[CaseEntry] in e:
-				return self.load_case(e)
+				return self.load_case(e, mmap_mode=mmap_mode)
 
 		# try single-document specification:
 		if os.path.exists(yaml_file):
@@ -204,7 +206,7 @@ class CaseAccessor(ConradDBAccessor):
 			case_dictionary = yaml.safe_load(f)
 			ce = CaseEntry(**case_dictionary)
 			f.close()
-			return self.load_case(ce)
+			return self.load_case(ce, mmap_mode=mmap_mode)
 
 		# otherwise, return None
 		return None
@@ -75,7 +75,7 @@ class DoseFrameAccessor(ConradDBAccessor):
 
 		))
 
-	def load_frame(self, frame_entry):
+	def load_frame(self, frame_entry, mmap_mode=None):
 		frame_entry = self.DB.get(frame_entry)
 		if not isinstance(frame_entry, DoseFrameEntry):
 			raise ValueError(
@@ -90,15 +90,20 @@ class DoseFrameAccessor(ConradDBAccessor):
 				frame_name=frame_entry.name)
 
 		if frame_entry.dose_matrix is not None:
-			frame.dose_matrix = self.load_entry(frame_entry.dose_matrix)
+			frame.dose_matrix = self.load_entry(
+					frame_entry.dose_matrix, mmap_mode)
 		if frame_entry.voxel_labels is not None:
-			frame.voxel_labels = self.load_entry(frame_entry.voxel_labels)
+			frame.voxel_labels = self.load_entry(
+					frame_entry.voxel_labels, mmap_mode)
 		if frame_entry.voxel_weights is not None:
-			frame.voxel_weights = self.load_entry(frame_entry.voxel_weights)
+			frame.voxel_weights = self.load_entry(
+					frame_entry.voxel_weights, mmap_mode)
 		if frame_entry.beam_labels is not None:
-			frame.beam_labels = self.load_entry(frame_entry.beam_labels)
+			frame.beam_labels = self.load_entry(
+					frame_entry.beam_labels, mmap_mode)
 		if frame_entry.beam_weights is not None:
-			frame.beam_weights = self.load_entry(frame_entry.beam_weights)
+			frame.beam_weights = self.load_entry(
+					frame_entry.beam_weights, mmap_mode)
 
 		return frame
 
@@ -241,7 +246,8 @@ class PhysicsAccessor(ConradDBAccessor):
 				voxel_grid=grid, frames=frames, frame_mappings=mappings
 		))
 
-	def load_physics(self, physics_entry, frame_name='default'):
+	def load_physics(self, physics_entry, frame_name='default',
+					 mmap_mode=None):
 		physics_entry = self.DB.get(physics_entry)
 		if not isinstance(physics_entry, PhysicsEntry):
 			raise ValueError(
@@ -265,12 +271,14 @@ class PhysicsAccessor(ConradDBAccessor):
 		if frame_name == 'default':
 			frame_name = frame_names[0]
 
-		return Physics( dose_grid=grid, dose_frame=self.load_frame(frame_name))
+		return Physics(
+				dose_grid=grid,
+				dose_frame=self.load_frame(frame_name, mmap_mode))
 
-	def load_frame(self, frame_name='default'):
+	def load_frame(self, frame_name='default', mmap_mode=None):
 		return self.frame_accessor.load_frame(
 				self.frame_accessor.select_frame_entry(
-						self.__frame_cache, frame_name))
+						self.__frame_cache, frame_name), mmap_mode)
 
 	def load_frame_mapping(self, source_frame='default',
 						   target_frame='default'):
@@ -31,15 +31,17 @@ import scipy.sparse as sp
 from conrad.defs import sparse_or_dense, CONRAD_MATRIX_TYPES
 from conrad.io.schema import *
 
+MMAP_MODES = (None, 'r', 'r+', 'c')
+
 @add_metaclass(abc.ABCMeta)
 class ConradFilesystemBase(object):
 	def __init__(self):
 		self.__DIGEST = {
-				int : lambda number: number,
-				float : lambda number: number,
-				str : lambda string: string,
-				dict: lambda dictionary: dictionary,
-				type(None) : lambda none_var: None,
+				int : lambda number, mmap_mode=None: number,
+				float : lambda number, mmap_mode=None: number,
+				str : lambda string, mmap_mode=None: string,
+				dict: lambda dictionary, mmap_mode=None: dictionary,
+				type(None) : lambda none_var, mmap_mode=None: None,
 				DataDictionaryEntry : self.to_data_dictionary,
 				VectorEntry : self.to_vector,
 				DenseMatrixEntry : self.to_dense_matrix,
@@ -67,24 +69,25 @@ class ConradFilesystemBase(object):
 		raise NotImplementedError
 
 	@abc.abstractmethod
-	def read(self, file, key):
+	def read(self, file, key, mmap_mode=None):
 		raise NotImplementedError
 
 	@abc.abstractmethod
-	def read_all(self, file):
+	def read_all(self, file, mmap_mode=None):
 		raise NotImplementedError
 
 	@abc.abstractmethod
 	def write(self, file, data, overwrite=False):
 		raise NotImplementedError
 
-	def read_data(self, data_fragment_entry):
+	def read_data(self, data_fragment_entry, mmap_mode=None):
 		data_fragment_entry = cdb_util.route_data_fragment(data_fragment_entry)
 		if type(data_fragment_entry) not in self.__DIGEST:
 			raise TypeError(
 					'no read method for data of type {}'
 					''.format(type(data_fragment_entry)))
-		return self.__DIGEST[type(data_fragment_entry)](data_fragment_entry)
+		return self.__DIGEST[type(data_fragment_entry)](
+				data_fragment_entry, mmap_mode=mmap_mode)
 
 	def write_data(self, directory, name, data, overwrite=False):
 		if type(data) not in self.__DUMP:
@@ -93,7 +96,7 @@ class ConradFilesystemBase(object):
 					''.format(type(data)))
 		return self.__DUMP[type(data)](directory, name, data, overwrite)
 
-	def to_unsafe_data(self, unsafe_file_entry):
+	def to_unsafe_data(self, unsafe_file_entry, mmap_mode=None):
 		if isinstance(unsafe_file_entry, dict):
 			unsafe_file_entry = UnsafeFileEntry(**unsafe_file_entry)
 		if not isinstance(unsafe_file_entry, UnsafeFileEntry):
@@ -103,7 +106,7 @@ class ConradFilesystemBase(object):
 		if not unsafe_file_entry.complete:
 			raise ValueError(
 					'no numpy file assigned to {}'.format(UnsafeFileEntry))
-		typed_data = self.read_all(unsafe_file_entry.file)
+		typed_data = self.read_all(unsafe_file_entry.file, mmap_mode)
 		if isinstance(typed_data, np.ndarray):
 			return typed_data
 		if sparse_or_dense(typed_data):
@@ -111,16 +114,16 @@ class ConradFilesystemBase(object):
 		if isinstance(typed_data, dict):
 			sme = SparseMatrixEntry(**typed_data)
 			if sme.complete:
-				return self.to_sparse_matrix(sme)
+				return self.to_sparse_matrix(sme, mmap_mode)
 			dme = DenseMatrixEntry(**typed_data)
 			if dme.complete:
-				return self.to_dense_matrix(dme)
+				return self.to_dense_matrix(dme, mmap_mode)
 			ve = VectorEntry(**typed_data)
 			if ve.complete:
-				return self.to_vector(ve)
+				return self.to_vector(ve, mmap_mode)
 		return typed_data
 
-	def to_data_dictionary(self, data_dictionary_entry):
+	def to_data_dictionary(self, data_dictionary_entry, mmap_mode=None):
 		if isinstance(data_dictionary_entry, dict):
 			data_dictionary_entry = DataDictionaryEntry(**data_dictionary_entry)
 		if not isinstance(data_dictionary_entry, DataDictionaryEntry):
@@ -133,11 +136,12 @@ class ConradFilesystemBase(object):
 					'input:\n{}'
 					''.format(data_dictionary_entry.nested_dictionary))
 		return {
-				k: self.read_data(data_dictionary_entry.entries[k]) for k in
-				data_dictionary_entry.entries
+				k: self.read_data(
+						data_dictionary_entry.entries[k], mmap_mode)
+				for k in data_dictionary_entry.entries
 		}
 
-	def to_vector(self, vector_entry):
+	def to_vector(self, vector_entry, mmap_mode=None):
 		if isinstance(vector_entry, dict):
 			vector_entry = VectorEntry(**vector_entry)
 		if not isinstance(vector_entry, VectorEntry):
@@ -148,9 +152,10 @@ class ConradFilesystemBase(object):
 			raise ValueError(
 					'data incomplete, could not form vector\n\ninput:\n'
 					'{}'.format(vector_entry.nested_dictionary))
-		return self.read(vector_entry.data_file, vector_entry.data_key)
+		return self.read(
+				vector_entry.data_file, vector_entry.data_key, mmap_mode)
 
-	def to_dense_matrix(self, dense_matrix_entry):
+	def to_dense_matrix(self, dense_matrix_entry, mmap_mode=None):
 		if isinstance(dense_matrix_entry, dict):
 			dense_matrix_entry = DenseMatrixEntry(**dense_matrix_entry)
 
@@ -165,11 +170,16 @@ class ConradFilesystemBase(object):
 					'input:\n{}'
 					''.format(dense_matrix_entry.nested_dictionary))
 		data = self.read(
-				dense_matrix_entry.data_file, dense_matrix_entry.data_key)
+				dense_matrix_entry.data_file, dense_matrix_entry.data_key,
+				mmap_mode)
 		order = 'C' if dense_matrix_entry.layout_rowmajor else 'F'
+		if mmap_mode is not None:
+			# keep memory map unless layout conversion forces a copy
+			if data.flags['{}_CONTIGUOUS'.format(order)]:
+				return data
 		return np.array(data, order=order)
 
-	def to_sparse_matrix(self, sparse_matrix_entry):
+	def to_sparse_matrix(self, sparse_matrix_entry, mmap_mode=None):
 		sm_entry = sparse_matrix_entry
 		if isinstance(sm_entry, dict):
 			sm_entry = SparseMatrixEntry(**sm_entry)
@@ -183,14 +193,19 @@ class ConradFilesystemBase(object):
 					'input:\n{}'.format(sm_entry.nested_dictionary))
 		constructor = sp.csr_matrix if sm_entry.layout_CSR else \
 					  sp.csc_matrix
-		values = self.read(sm_entry.data_values_file, sm_entry.data_values_key)
+		values = self.read(
+				sm_entry.data_values_file, sm_entry.data_values_key,
+				mmap_mode)
 		indices = self.read(
-				sm_entry.data_indices_file, sm_entry.data_indices_key)
+				sm_entry.data_indices_file, sm_entry.data_indices_key,
+				mmap_mode)
 		pointers = self.read(
-				sm_entry.data_pointers_file, sm_entry.data_pointers_key)
+				sm_entry.data_pointers_file, sm_entry.data_pointers_key,
+				mmap_mode)
 		if sm_entry.layout_fortran_indexing:
-			indices -=1
-			pointers -=1
+			# not in-place: never write through to memory-mapped files
+			indices = indices - 1
+			pointers = pointers - 1
 
 		return constructor((values, indices, pointers), shape=sm_entry.shape)
 
@@ -290,31 +305,57 @@ class LocalFilesystem(ConradFilesystemBase):
 					os.mkdir(d)
 		return d
 
-	def read(self, file, key=None):
+	def read(self, file, key=None, mmap_mode=None):
+		"""
+		Read array from ``file``.
+
+		Arguments:
+			file (:obj:`str`): Path to ``.npy``, ``.npz`` or ``.txt``
+				file.
+			key (:obj:`str`, optional): Key of array in ``.npz`` file.
+			mmap_mode (:obj:`str`, optional): If one of ``'r'``,
+				``'r+'`` or ``'c'``, arrays in ``.npy`` files are
+				memory-mapped in the corresponding mode (see
+				:func:`numpy.load`) rather than read into memory.
+				Ignored for ``.npz`` and ``.txt`` files, which cannot
+				be memory-mapped.
+
+		Returns:
+			:class:`numpy.ndarray` or :class:`numpy.memmap`: Array.
+
+		Raises:
+			OSError: If ``file`` does not exist.
+			ValueError: If file extension not supported, if no key
+				provided for ``.npz`` file, or if ``mmap_mode`` is not
+				a supported mode.
+		"""
 		file = str(file)
+		if mmap_mode not in MMAP_MODES:
+			raise ValueError('argument `mmap_mode` must be one of {}'
+							 ''.format(MMAP_MODES))
 		if not os.path.exists(file):
 			raise OSError('file {} does not exist'.format(file))
 		if file.endswith('.npy'):
-			return np.load(file)
+			return np.load(file, mmap_mode=mmap_mode)
 		elif file.endswith('.npz'):
 			if key is None:
 				raise ValueError('no key provided for `.npz` file')
-			return np.load(filename)[key]
+			return np.load(file)[key]
 		elif file.endswith('.txt'):
-			return np.loadtxt(filename)
+			return np.loadtxt(file)
 		else:
 			raise ValueError('file extension must be one of {}'.format(
 							('.npz', '.npy', '.txt')))
 
-	def read_all(self, file):
+	def read_all(self, file, mmap_mode=None):
 		file = str(file)
 		if not os.path.exists(file):
 			raise OSError('file {} does not exist'.format(file))
 		if file.endswith(('.txt', '.npy')):
-			return self.read(file)
+			return self.read(file, mmap_mode=mmap_mode)
 		else:
 			data = {}
-			repository = np.load(filename)
+			repository = np.load(file)
 			for k in repository.files:
 				data[k] = self.read(str(k) + '.npy')
 			return data
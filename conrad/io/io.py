@@ -141,7 +141,8 @@ class CaseIO(object):
 				'no case found for case name=`{}`, case_ID=`{}`'
 				''.format(case_name, case_ID))
 
-	def load_case(self, case_name, case_ID=None, case_entry=None):
+	def load_case(self, case_name, case_ID=None, case_entry=None,
+				  mmap_mode=None):
 		self.close_active_case()
 
 		if isinstance(case_entry, CaseEntry):
@@ -154,7 +155,8 @@ class CaseIO(object):
 		else:
 			self.__active_case_ID = None
 		self.__active_case_entry = ce
-		self.__active_case_object = self.accessor.load_case(ce)
+		self.__active_case_object = self.accessor.load_case(
+				ce, mmap_mode=mmap_mode)
 		return self.active_case
 
 	def save_new_case(self, case, case_name, directory=None):
@@ -209,7 +211,7 @@ class CaseIO(object):
 		self.__active_case_entry = None
 		self.__active_case_directory = None
 
-	def load_frame(self, frame_name):
+	def load_frame(self, frame_name, mmap_mode=None):
 		if self.active_meta is None or self.active_case is None:
 			raise ValueError('no active case')
 
@@ -219,7 +221,8 @@ class CaseIO(object):
 		if frame_name not in self.active_case.physics.available_frames:
 			case.physics.add_dose_frame(
 					frame_name,
-					dose_frame=self.accessor.load_frame(entry, frame_name))
+					dose_frame=self.accessor.load_frame(
+							entry, frame_name, mmap_mode))
 		case.physics.change_dose_frame(frame_name)
 
 	def load_frame_mapping(self, source_frame, target_frame):
@@ -303,6 +306,6 @@ class CaseIO(object):
 				case, case_name, directory, single_document=True,
 				yaml_directory=yaml_directory)
 
-	def YAML_to_case(self, yaml_file):
+	def YAML_to_case(self, yaml_file, mmap_mode=None):
 		self.close_active_case()
-		return self.accessor.load_case_yaml(yaml_file)
+		return self.accessor.load_case_yaml(yaml_file, mmap_mode=mmap_mode)
@@ -212,6 +212,24 @@ class Anatomy(object):
 		for s in self:
 			s.constraints.clear()
 
+	def release_matrices(self, collapsable_only=False):
+		"""
+		Release lazily assigned dose matrices of structures in :class:`Anatomy`.
+
+		See :meth:`Structure.release_matrices`.
+
+		Arguments:
+			collapsable_only (:obj:`bool`, optional): If ``True``,
+				only release dose matrices of collapsable structures,
+				which are planned with their mean dose matrices.
+
+		Returns:
+			:obj:`list`: Labels of structures with released matrices.
+		"""
+		return [s.label for s in self
+				if s.collapsable >= collapsable_only and
+				s.release_matrices()]
+
 	def calculate_doses(self, beam_intensities):
 		"""
 		Calculate voxel doses to each structure in :class:`Anatomy`.
@@ -226,7 +244,7 @@ class Anatomy(object):
 		for s in self:
 			s.calculate_dose(beam_intensities)
 
-	def propagate_doses(self, voxel_doses):
+	def propagate_doses(self, voxel_doses, mean_doses=None):
 		"""
 		Assign pre-calculated voxel doses to each structure in
 		:class:`Anatomy`
@@ -234,12 +252,15 @@ class Anatomy(object):
 		Arguments:
 			voxel_doses (:obj:`dict`): Dictionary mapping structure
 				labels to voxel dose subvectors.
+			mean_doses (:obj:`dict`, optional): Dictionary mapping
+				structure labels to pre-calculated mean doses.
 
 		Returns:
 			None
 		"""
 		for s in self:
-			s.assign_dose(voxel_doses[s.label])
+			y_mean = None if mean_doses is None else mean_doses[s.label]
+			s.assign_dose(voxel_doses[s.label], y_mean=y_mean)
 
 	def dose_summary_data(self, percentiles=[2, 98]):
 		"""
@@ -21,6 +21,9 @@ You should have received a copy of the GNU General Public License
 along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
 """
 from conrad.compat import *
+
+import timeit
+
 from conrad.medicine.dose.constraints import *
 from conrad.medicine.dose.parsing import eval_constraint
 
@@ -64,7 +67,7 @@ class ConstraintList(object):
 			:obj:`str`: Seven character key.
 		"""
 		return hashlib.sha1(str(
-				str(time.clock()) +
+				str(timeit.default_timer()) +
 				str(constraint.dose) +
 				str(constraint.threshold) +
 				str(constraint.relop)
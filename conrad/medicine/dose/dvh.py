@@ -46,13 +46,26 @@ class DVH(object):
 	two sorted, length-matched, vectors of dose and percentile values,
 	respectively.
 
+	In lazy mode (default), assigning dose data only records the raw
+	dose vector. Percentile and dose queries are answered by partial
+	selection (:func:`numpy.partition`), in linear time; the dose
+	buffer is fully sorted only when the whole curve is requested
+	(e.g., :attr:`DVH.plotting_data` or :meth:`DVH.resample`), or when
+	a batch of queries is large enough that sorting is cheaper. Each
+	new assignment of dose data invalidates the sorted state.
+
 	Attributes:
 		MAX_LENGTH (:obj:`int`): Default maximum length constant to use
 			when constructing and possibly sampling DVH cures.
+		MAX_SELECTION_QUERIES (:obj:`int`): Largest number of distinct
+			order statistics (or dose thresholds) retrieved by partial
+			selection from an unsorted dose buffer; larger batches of
+			queries trigger a full sort.
 	"""
 	MAX_LENGTH = 1000
+	MAX_SELECTION_QUERIES = 16
 
-	def __init__(self, n_voxels, maxlength=MAX_LENGTH):
+	def __init__(self, n_voxels, maxlength=MAX_LENGTH, lazy=True):
 		"""
 		Initialize :class:`DVH`.
 
@@ -65,6 +78,8 @@ class DVH(object):
 			maxlength (:obj:`int`, optional): Maximum series length,
 				above which data will be sampled to maintain a suitably
 				short representation of the DVH.
+			lazy (:obj:`bool`, optional): If ``True``, defer sorting of
+				dose data until required.
 
 		Raises:
 			ValueError: If ``n_voxels`` is not an :obj:`int` >= `1`.
@@ -79,6 +94,9 @@ class DVH(object):
 		self.__percentiles = np.zeros(length)
 		self.__percentiles[0] = 100.
 		self.__percentiles[1:] = np.linspace(100, 0, length - 1)
+		self.__lazy = bool(lazy)
+		self.__sorted = True
+		self.__extrema = None
 		self.__DATA_ENTERED = False
 
 
@@ -87,6 +105,51 @@ class DVH(object):
 		""" True if DVH curve is populated. """
 		return self.__DATA_ENTERED
 
+	@property
+	def lazy(self):
+		""" ``True`` if sorting of dose data deferred until required. """
+		return self.__lazy
+
+	@property
+	def sorted(self):
+		""" ``True`` if dose buffer (and DVH curve) currently sorted. """
+		return self.__sorted
+
+	def __sort(self):
+		""" Sort dose buffer and sample DVH curve, if not already done. """
+		if self.__sorted:
+			return
+
+		# maintain sorted buffer
+		self.__dose_buffer.sort()
+
+		# sample doses from buffer
+		self.__doses[1:] = self.__dose_buffer[::self.__stride]
+		self.__sorted = True
+
+	def __order_statistics(self, ranks):
+		"""
+		Retrieve entries of sorted dose buffer at integer ``ranks``.
+
+		If the buffer is unsorted and few distinct ranks are requested,
+		partition the buffer in place around the requested ranks
+		instead of sorting it.
+
+		Arguments:
+			ranks (:class:`numpy.ndarray`): Integer indices into sorted
+				dose buffer.
+
+		Returns:
+			:class:`numpy.ndarray`: Doses at ``ranks``.
+		"""
+		if not self.__sorted:
+			kth = np.unique(ranks)
+			if kth.size > self.MAX_SELECTION_QUERIES:
+				self.__sort()
+			elif kth.size > 0:
+				self.__dose_buffer.partition(kth)
+		return self.__dose_buffer[ranks]
+
 	@property
 	def data(self):
 		"""
@@ -95,13 +158,15 @@ class DVH(object):
 		The data provided to the setter are sorted to form the abscissa
 		values for the DVH curve. If the length of the input exceeds the
 		maximum data series length (as determined when the object was
-		initialized), the input data is sampled.
+		initialized), the input data is sampled. In lazy mode, sorting
+		is deferred until the getter is called.
 
 		Raises:
 			ValueError: If size of input data does not match size of
 			structure associated with :class:`DVH` as specified to
 			object initializer.
 		"""
+		self.__sort()
 		return self.__doses[1:]
 
 	@data.setter
@@ -112,53 +177,68 @@ class DVH(object):
 
 		# populate dose buffer from y
 		self.__dose_buffer[:] = y[:]
+		self.__sorted = False
+		self.__extrema = None
 
-		# maintain sorted buffer
-		self.__dose_buffer.sort()
-
-		# sample doses from buffer
-		self.__doses[1:] = self.__dose_buffer[::self.__stride]
+		if not self.__lazy:
+			self.__sort()
 
 		# flag DVH curve as populated
 		self.__DATA_ENTERED = True
 
 	@staticmethod
-	def __interpolate_percentile(p1, p2, p_des):
-		r"""
-		Get ``alpha`` such that:
-
-		:math: alpha * `p1` + (1-alpha) * `p2` = `p_des`.
+	def __unwrap(values, unit_type):
+		"""
+		Convert scalar or array-like input to a float array.
 
 		Arguments:
-			p1 (:obj:`float`): First endpoint of interval (``p1``,
-				``p2``).
-			p2 (:obj:`float`): Second endpoint of interval (``p1``,
-				``p2``).
-			p_des (:obj:`float`): Desired percentile. Should be
-				contained in interval (``p1``, ``p2``) for this method
-				to be a linear interpolation.
+			values: Scalar or iterable of numbers or ``unit_type``
+				instances.
+			unit_type: Type with attribute ``value`` to be unwrapped
+				(e.g., :class:`Percent` or :class:`DeliveredDose`).
 
 		Returns:
-			float: Value ``alpha`` such that linear combination
-			``alpha`` * ``p1`` + ``(1 - alpha)`` * ``p2`` yields
-			``p_des``.
-
-		Raises:
-			ValueError: If request is ill-posed because ``p1`` and
-				``p2`` coincide, but ``p_des`` is a different value.
+			:class:`numpy.ndarray`: Array of floats, with same shape as
+			input.
+		"""
+		if isinstance(values, unit_type):
+			return np.array(float(values.value))
+		values = np.asarray(values)
+		if values.dtype == object:
+			values = np.array([
+					v.value if isinstance(v, unit_type) else v
+					for v in values.ravel()],
+					dtype=float).reshape(values.shape)
+		return values.astype(float)
+
+	def percentiles_at_doses(self, doses):
 		"""
+		Read off DVH curve to get percentile values at each of ``doses``.
+
+		All queries are answered with a single binary search
+		(:func:`numpy.searchsorted`) over the sorted dose buffer, or,
+		for a few queries against an unsorted buffer, by counting.
 
-		if p1 == p2 and p_des == p1:
-			return 1.
-		elif p1 == p2 and p_des != p1:
-			raise ValueError('arguments "p1", "p2" must be distinct to '
-							 'perform interpolation.\nprovided interval: '
-							 '[{},{}]\ntarget value: {}'.format(p1, p2, p_des))
+		Arguments:
+			doses: Array-like collection of queried doses (numbers or
+				:class:`DeliveredDose` objects) for which to retrieve
+				the corresponding percentiles. Assumed to have same
+				units as DVH data.
+
+		Returns:
+			:class:`numpy.ndarray`: Percentage of voxels receiving a
+			dose strictly below each queried dose, with same shape as
+			``doses``.
+		"""
+		doses = self.__unwrap(doses, DeliveredDose)
+		if not self.__sorted and doses.size <= self.MAX_SELECTION_QUERIES:
+			counts = np.reshape([
+					np.count_nonzero(self.__dose_buffer < d)
+					for d in doses.ravel()], doses.shape)
 		else:
-			# alpha * p1 + (1 - alpha) * p2 = p_des
-			# (p1 - p2) * alpha = p_des - p2
-			# alpha = (p_des - p2) / (p1 - p2)
-			return float(p_des - p2) / float(p1 - p2)
+			self.__sort()
+			counts = np.searchsorted(self.__dose_buffer, doses, side='left')
+		return 100. * counts / float(self.__dose_buffer.size)
 
 	def percentile_at_dose(self, dose):
 		"""
@@ -174,27 +254,56 @@ class DVH(object):
 			dose, or :attr:`~numpy.np.nan` if the curve has not been
 			populated with data.
 		"""
-		if isinstance(dose, DeliveredDose):
-			dose = dose.value
-
 		if self.__doses is None: return np.nan
+		return float(self.percentiles_at_doses(dose))
+
+	def doses_at_percentiles(self, percentiles):
+		"""
+		Read off DVH curve to get dose values at each of ``percentiles``.
+
+		Percentile ``p`` maps to the fractional rank
+		``(100 - p) / 100 * (n_voxels - 1)`` in the sorted dose buffer;
+		the dose is interpolated linearly between the two order
+		statistics that bracket this rank. Percentiles of ``100`` and
+		``0`` therefore yield the minimum and maximum dose, respectively.
+
+		Order statistics are retrieved by partial selection when the
+		dose buffer is unsorted (see :class:`DVH`).
+
+		Arguments:
+			percentiles: Array-like collection of queried percentiles
+				(numbers or :class:`Percent` objects) in the interval
+				``[0, 100]``.
+
+		Returns:
+			:class:`numpy.ndarray`: Dose values from DVH curve at
+			queried percentiles, with same shape as ``percentiles``.
 
-		return 100. * (
-				sum(self.__dose_buffer < dose) /
-				float(self.__dose_buffer.size))
+		Raises:
+			ValueError: If any queried percentile lies outside of the
+				interval ``[0, 100]``.
+		"""
+		percentiles = self.__unwrap(percentiles, Percent)
+		if np.any(percentiles < 0) or np.any(percentiles > 100):
+			raise ValueError('queried percentiles must be in interval '
+							 '[0, 100]')
+
+		size = self.__dose_buffer.size
+		ranks = 0.01 * (100. - percentiles) * (size - 1)
+		lower = np.floor(ranks).astype(int)
+		upper = np.minimum(lower + 1, size - 1)
+		alpha = ranks - lower
+		doses = self.__order_statistics(np.hstack((
+				lower.ravel(), upper.ravel())))
+		return (1 - alpha) * doses[:lower.size].reshape(lower.shape) + \
+				alpha * doses[lower.size:].reshape(upper.shape)
 
 	def dose_at_percentile(self, percentile):
 		"""
 		Read off DVH curve to get dose value at ``percentile``.
 
-		Since the :class:`DVH` object maintains the DVH curve of
-		(dose, percentile) pairs as two sorted vectors, to approximate
-		the dose d at percentile ``percentile``, we retrieve the
-		index i that yields the nearest percentile value. The
-		corresponding i'th dose is returned. When the nearest percentile
-		is not within 0.5%, the two nearest neighbor percentiles and
-		two nearest neighbor dose values are used to approximate the
-		dose at the queried percentile by linear interpolation.
+		See :meth:`DVH.doses_at_percentiles` for the interpolation
+		scheme.
 
 		Arguments:
 			percentile (:obj:`int`, :obj:`float` or :class:`Percent`):
@@ -206,71 +315,35 @@ class DVH(object):
 			percentile, or :attr:`~numpy.np.nan` if the curve has not been
 			populated with data.
 		"""
-		if isinstance(percentile, Percent):
-			percentile = percentile.value
-
 		if self.__doses is None: return np.nan
+		return float(self.doses_at_percentiles(percentile))
 
-		if percentile == 100:
-			return self.min_dose
-		if percentile == 0:
-			return self.max_dose
-
-		# bisection retrieval of index @ percentile
-		# ----------------------------------------
-		u = len(self.__percentiles) - 1
-		l = 1
-		i = int(l + (u - l) / 2)
-
-		# set tolerance based on bucket width
-		tol = (self.__percentiles[-2] - self.__percentiles[-1]) / 2
-
-		# get to within 0.5 of a percentile if possible
-		abstol = 0.5
-
-		while (u - l > 5):
-			# percentile sorted descending
-			if self.__percentiles[i] > percentile:
-				l = i
-			else:
-				u = i
-			i = int(l + (u - l) / 2)
-
-		# break to iterative search
-		# -------------------------
-		idx = None
-		for i in xrange(l, u):
-			if abs(self.__percentiles[i] - percentile) < tol:
-				idx = i
-				break
-
-		# retrieve dose from index, interpolate if needed
-		# -----------------------------------------------
-		if idx is None: idx = u
-		if abs(self.__percentiles[idx] - percentile) <= abstol:
-			# return dose if available percentile bucket is close enough
-			return self.__doses[idx]
-		else:
-			# interpolate dose by interpolating percentiles if not close enough
-			alpha = self.__interpolate_percentile(self.__percentiles[i],
-				self.__percentiles[i + 1], percentile)
-			return alpha * self.__doses[i] + (1 - alpha) * self.__doses[i + 1]
+	@property
+	def __dose_extrema(self):
+		""" Smallest and largest values in dose buffer. """
+		if self.__sorted:
+			return self.__dose_buffer[0], self.__dose_buffer[-1]
+		if self.__extrema is None:
+			self.__extrema = (
+					self.__dose_buffer.min(), self.__dose_buffer.max())
+		return self.__extrema
 
 	@property
 	def min_dose(self):
 		""" Smallest dose value in DVH curve. """
 		if self.__doses is None: return np.nan
-		return self.__dose_buffer[0]
+		return self.__dose_extrema[0]
 
 	@property
 	def max_dose(self):
 		""" Largest dose value in DVH curve. """
 		if self.__doses is None: return np.nan
-		return self.__dose_buffer[-1]
+		return self.__dose_extrema[1]
 
 	@property
 	def plotting_data(self):
 		""" Dictionary of :mod:`matplotlib`-compatible plotting data. """
+		self.__sort()
 		return {'percentile' : self.__percentiles, 'dose' : self.__doses.copy()}
 
 	def resample(self, maxlength):
@@ -289,6 +362,8 @@ class DVH(object):
 		if maxlength is None:
 			return self
 
-		dvh = DVH(self.__dose_buffer.size, maxlength=int(maxlength))
+		self.__sort()
+		dvh = DVH(self.__dose_buffer.size, maxlength=int(maxlength),
+				  lazy=False)
 		dvh.data = self.__dose_buffer
 		return dvh
\ No newline at end of file
@@ -265,12 +265,12 @@ class Prescription(object):
 		rx_constraints = self.constraints_by_label
 		report = {}
 		for label, s in anatomy.structures.items():
-			sat = []
-			for constr in rx_constraints[label].itervalues():
-				status, dose_achieved = s.satisfies(constr)
-				sat.append({'constraint': constr, 'status': status,
-							'dose_achieved': dose_achieved})
-			report[label] = sat
+			constraints = rx_constraints[label].list
+			report[label] = [
+					{'constraint': constr, 'status': status,
+					 'dose_achieved': dose_achieved}
+					for constr, (status, dose_achieved) in zip(
+							constraints, s.satisfies_each(constraints))]
 		return report
 
 	def report_string(self, anatomy):
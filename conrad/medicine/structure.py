@@ -34,7 +34,8 @@ import scipy.sparse as sp
 import operator
 
 from conrad.defs import CONRAD_DEBUG_PRINT, positive_real_valued, \
-						sparse_or_dense, vec
+						sparse_or_dense, vec, next_version, matrix_digest
+from conrad.abstract.matrix import LazyMatrixSlice
 from conrad.physics.units import cm3, Gy, DeliveredDose
 from conrad.medicine.dose import Constraint, MeanConstraint, ConstraintList, \
 								 PercentileConstraint, DVH, RELOPS
@@ -113,7 +114,10 @@ class Structure(object):
 		self.__dose = 0. * Gy
 		self.__boost = 1.
 		self.__A_full = None
+		self.__A_handle = None
 		self.__A_mean = None
+		self.__A_version = next_version()
+		self.__A_digests = {}
 		self.__voxel_weights = None
 		self.__y = None
 		self.__y_mean = np.nan
@@ -149,12 +153,12 @@ class Structure(object):
 			- Structure collapsable and mean dose matrix assigned.
 		"""
 		size_determined = positive_real_valued(self.size)
-		full_mat_usable = sparse_or_dense(self.A_full)
+		full_mat_usable = self.A_shape is not None
 		if full_mat_usable:
-			full_mat_usable &= self.size == self.A_full.shape[0]
+			full_mat_usable &= self.size == self.A_shape[0]
 
 		collapsed_mat_usable = bool(
-				isinstance(self.A_mean, np.ndarray) and self.collapsable)
+				isinstance(self.__A_mean, np.ndarray) and self.collapsable)
 
 		usable_matrix_loaded = full_mat_usable or collapsed_mat_usable
 		return size_determined and usable_matrix_loaded
@@ -211,7 +215,56 @@ class Structure(object):
 	def reset_matrices(self):
 		""" Reset structure's dose and mean dose matrices to ``None`` """
 		self.__A_full = None
+		self.__A_handle = None
 		self.__A_mean = None
+		self.__stamp_matrices()
+
+	def __stamp_matrices(self):
+		self.__A_version = next_version()
+		self.__A_digests = {}
+
+	@property
+	def A_version(self):
+		"""
+		Version stamp of structure's dose matrices.
+
+		Drawn from a global, increasing counter each time
+		:attr:`Structure.A_full` or :attr:`Structure.A_mean` is
+		assigned (or recalculated), so that equal versions imply the
+		same matrix data. Matrices modified in place must be
+		reassigned to update the version.
+		"""
+		return self.__A_version
+
+	def A_digest(self, mean=False):
+		"""
+		Content hash of structure's full or mean dose matrix.
+
+		Computed on first request for each :attr:`Structure.A_version`,
+		and cached thereafter. A lazily assigned full dose matrix that
+		has not been materialized is not materialized to be hashed: its
+		digest is taken from the handle (see
+		:attr:`~conrad.abstract.matrix.LazyMatrixSlice.digest`).
+
+		Arguments:
+			mean (:obj:`bool`, optional): If ``True``, hash
+				:attr:`Structure.A_mean` instead of
+				:attr:`Structure.A_full`.
+
+		Returns:
+			:obj:`str`: Hexadecimal digest, or ``None`` if matrix not
+			set.
+		"""
+		mean = bool(mean)
+		if mean not in self.__A_digests:
+			if mean:
+				digest = matrix_digest(self.A_mean)
+			elif self.__A_full is None and self.__A_handle is not None:
+				digest = self.__A_handle.digest
+			else:
+				digest = matrix_digest(self.__A_full)
+			self.__A_digests[mean] = digest
+		return self.__A_digests[mean]
 
 	@property
 	def collapsable(self):
@@ -224,29 +277,41 @@ class Structure(object):
 		"""
 		Full dose matrix (dimensions = voxels x beams).
 
+		Setter also accepts a :class:`~conrad.abstract.matrix.LazyMatrixSlice`,
+		e.g., a handle on a slice of a physics frame's dose matrix, in
+		which case the matrix is materialized on first access (see
+		:meth:`Structure.release_matrices`).
+
 		Setter method will perform two additional tasks:
 			- If :attr:`Structure.size` is not set, set it based on
 				number of rows in ``A_full``.
-			- Trigger :attr:`Structure.A_mean` to be calculated from
-				:attr:`Structure.A_full`.
+			- Mark :attr:`Structure.A_mean` to be calculated from
+				:attr:`Structure.A_full` on next access.
 
 		Raises:
 			TypeError: If ``A_full`` is not a matrix in
 				:class:`np.ndarray`, :class:`sp.csc_matrix`, or
-				:class:`sp.csr_matrix` formats.
+				:class:`sp.csr_matrix` formats, or a
+				:class:`~conrad.abstract.matrix.LazyMatrixSlice`.
 			ValueError: If :attr:`Structure.size` is set, and the number
 				of rows in ``A_full`` does not match
 				:attr:`Structure.size`.
 		"""
+		if self.__A_full is None and self.__A_handle is not None:
+			self.__A_full = self.__A_handle.materialize()
 		return self.__A_full
 
 	@A_full.setter
 	def A_full(self, A_full):
+		self.__assign_A_full(A_full)
+
+	def __assign_A_full(self, A_full, A_mean=None):
 		if A_full is None:
 			return
 
 		# verify type of A_full
-		if not sparse_or_dense(A_full):
+		lazy = isinstance(A_full, LazyMatrixSlice)
+		if not (lazy or sparse_or_dense(A_full)):
 			raise TypeError('input A must by a numpy or scipy csr/csc '
 							'sparse matrix')
 
@@ -258,11 +323,83 @@ class Structure(object):
 		else:
 			self.size = A_full.shape[0]
 
-		self.__A_full = A_full
+		self.__A_full = None if lazy else A_full
+		self.__A_handle = A_full if lazy else None
+		self.__stamp_matrices()
 
 		# Pass "None" to self.A_mean setter to trigger calculation of
 		# mean dose matrix from full dose matrix.
-		self.A_mean = None
+		self.A_mean = A_mean
+
+	def set_dose_matrices(self, A_full, A_mean=None, voxel_weights=None):
+		"""
+		Assign full dose matrix, with mean dose matrix and voxel weights.
+
+		Unlike assigning :attr:`Structure.A_full` and then
+		:attr:`Structure.voxel_weights`, which calculates the mean dose
+		matrix twice, the mean dose matrix is calculated at most once;
+		not at all if a precomputed ``A_mean`` (e.g., from
+		:meth:`~conrad.physics.Physics.mean_dose_by_label`) is provided.
+
+		Arguments:
+			A_full: Full dose matrix. Must be compatible with the
+				setter for :attr:`Structure.A_full`.
+			A_mean (:class:`numpy.ndarray`, optional): Mean dose
+				matrix, weighted by ``voxel_weights`` (or by existing
+				:attr:`Structure.voxel_weights`, if not provided).
+				Calculated from ``A_full`` if not provided.
+			voxel_weights (optional): Voxel weights. Must be compatible
+				with the setter for :attr:`Structure.voxel_weights`.
+
+		Returns:
+			None
+		"""
+		self.reset_matrices()
+		if voxel_weights is not None:
+			if self.size is None:
+				self.size = A_full.shape[0]
+			self.voxel_weights = voxel_weights
+		self.__assign_A_full(A_full, A_mean)
+
+	@property
+	def A_shape(self):
+		"""
+		Dimensions of full dose matrix, or ``None`` if not set.
+
+		Available without materializing a lazily assigned
+		:attr:`Structure.A_full`.
+		"""
+		if self.__A_full is not None:
+			return self.__A_full.shape
+		if self.__A_handle is not None:
+			return self.__A_handle.shape
+		return None
+
+	@property
+	def A_materialized(self):
+		""" ``True`` if full dose matrix is held in memory. """
+		return self.__A_full is not None
+
+	def release_matrices(self):
+		"""
+		Release lazily assigned full dose matrix.
+
+		The materialized matrix is dropped here and from the cache of
+		the matrix it was sliced from, and rebuilt on next access to
+		:attr:`Structure.A_full`. No-op if the full dose matrix was not
+		assigned lazily. The mean dose matrix is retained, after being
+		calculated if necessary.
+
+		Returns:
+			:obj:`bool`: ``True`` if a materialized matrix was released.
+		"""
+		if self.__A_handle is None or self.__A_full is None:
+			return False
+		if self.__A_mean is None:
+			self.__calculate_A_mean()
+		self.__A_full = None
+		self.__A_handle.release()
+		return True
 
 	@property
 	def A_mean(self):
@@ -284,6 +421,8 @@ class Structure(object):
 				conflicts with number of beams implied by
 				:attr:`Structure.A_full`.
 		 """
+		if self.__A_mean is None and self.A_shape is not None:
+			self.__calculate_A_mean()
 		return self.__A_mean
 
 	@A_mean.setter
@@ -299,35 +438,38 @@ class Structure(object):
 						'a row or column vector. shape of argument: {}'
 						''.format(A_mean.shape))
 			else:
-				if self.__A_full is not None:
-					if len(A_mean) != self.__A_full.shape[1]:
+				if self.A_shape is not None:
+					if len(A_mean) != self.A_shape[1]:
 						raise ValueError(
 								'field "A_full" already set; proposed '
 								'value for "A_mean" must have same '
 								'number of entries ({}) as columns in '
 								'A_full ({})'.format(
-										len(A_mean),
-										self.__A_full.shape[1]))
+										len(A_mean), self.A_shape[1]))
 			self.__A_mean = vec(A_mean)
-		elif self.__A_full is not None:
-			if not sparse_or_dense(self.A_full):
-				raise TypeError(
-						'cannot calculate structure.A_mean from'
-						'structure.A_full: A_full must be one of '
-						'({},{},{})'.format(
-								np.ndarray, sp.csc_matrix,
-								sp.csr_matrix))
-			else:
-				if isinstance(self.A_full, np.ndarray):
-					self.__A_mean = np.dot(self.voxel_weights, self.A_full)
-				else:
-					self.__A_mean = vec(self.voxel_weights * self.A_full)
-				self.__A_mean /= float(self.weighted_size)
+			self.__stamp_matrices()
+		elif self.A_shape is not None:
+			# calculated from full dose matrix on next access
+			self.__A_mean = None
+			self.__stamp_matrices()
+
+	def __calculate_A_mean(self):
+		if not sparse_or_dense(self.A_full):
+			raise TypeError(
+					'cannot calculate structure.A_mean from'
+					'structure.A_full: A_full must be one of '
+					'({},{},{})'.format(
+							np.ndarray, sp.csc_matrix, sp.csr_matrix))
+		if isinstance(self.A_full, np.ndarray):
+			self.__A_mean = np.dot(self.voxel_weights, self.A_full)
+		else:
+			self.__A_mean = vec(self.voxel_weights * self.A_full)
+		self.__A_mean /= float(self.weighted_size)
 
 	@property
 	def A(self):
 		""" Alias for :attr:`Structure.A_full`. """
-		return self.__A_full
+		return self.A_full
 
 	@property
 	def voxel_weights(self):
@@ -364,7 +506,7 @@ class Structure(object):
 		self.__voxel_weights = vec(weights)
 		self.__weighted_size = np.sum(self.__voxel_weights)
 		self.objective.normalization = 1. / self.weighted_size
-		if self.weighted_size != self.size and self.A_full is not None:
+		if self.weighted_size != self.size and self.A_shape is not None:
 			# Pass "None" to self.A_mean setter to trigger calculation of
 			# mean dose matrix from full dose matrix.
 			self.A_mean = None
@@ -493,12 +635,15 @@ class Structure(object):
 		""" Alias for :meth:`Structure.calc_y`. """
 		self.calc_y(beam_intensities)
 
-	def assign_dose(self, y):
+	def assign_dose(self, y, y_mean=None):
 		"""
 		Assign dose vector to structure.
 
 		Arguments:
 			y: Vector-like input of voxel doses.
+			y_mean (:obj:`float`, optional): Pre-calculated mean dose;
+				calculated from ``y`` and structure's voxel weights if
+				not provided.
 
 		Returns:
 			None
@@ -515,7 +660,9 @@ class Structure(object):
 					'size of dose vector ({}) incompatible with size '
 					'of structure ({})'.format(y.size, self.size))
 		self.__y = y
-		self.__y_mean = np.dot(self.voxel_weights, y) / self.weighted_size
+		if y_mean is None:
+			y_mean = np.dot(self.voxel_weights, y) / self.weighted_size
+		self.__y_mean = float(y_mean)
 		self.dvh.data = self.__y
 
 	def calc_y(self, x):
@@ -523,12 +670,17 @@ class Structure(object):
 		Calculate voxel doses as:
 		attr:`Structure.y` = :attr:`Structure.A` * ``x``.
 
+		A lazily assigned full dose matrix that is materialized for the
+		calculation is released afterwards, so that calculating doses
+		does not pin the matrices of, e.g., collapsable structures.
+
 		Arguments:
 			x: Vector-like input of beam intensities.
 
 		Returns:
 			None
 		"""
+		release = not self.A_materialized
 
 		# calculate dose from input vector x:
 		# 	y = Ax
@@ -542,6 +694,9 @@ class Structure(object):
 		if isinstance(self.__y_mean, np.ndarray):
 			self.__y_mean = self.__y_mean[0]
 
+		if release:
+			self.release_matrices()
+
 		# make DVH curve from calculated dose
 		if self.y is not None:
 			self.dvh.data = self.y
@@ -584,54 +739,91 @@ class Structure(object):
 				against structure's voxel doses.
 
 		Returns:
-			:obj:`bool`: ``True`` if structure's voxel doses conform to
-			the queried	constraint.
+			:obj:`tuple`: Pair of :obj:`bool`, ``True`` if structure's
+			voxel doses conform to the queried constraint, and the dose
+			achieved at the constraint's threshold.
 
 		Raises:
 			TypeError: If ``constraint`` not of type :class:`Constraint`.
 			ValueError: If :attr:`Structure.dvh` not initialized or not
 				populated with dose data.
 		"""
-		if not isinstance(constraint, Constraint):
+		return self.satisfies_each([constraint])[0]
+
+	def satisfies_each(self, constraints):
+		"""
+		Test whether structure's voxel doses satisfy each of ``constraints``.
+
+		All percentile thresholds are read off the structure's DVH in a
+		single batched query.
+
+		Arguments:
+			constraints: Iterable collection of :class:`Constraint`
+				objects to test against structure's voxel doses.
+
+		Returns:
+			:obj:`list`: List of (status, dose achieved) pairs, as
+			returned by :meth:`Structure.satisfies`, ordered as
+			``constraints``.
+
+		Raises:
+			TypeError: If any entry of ``constraints`` not of type
+				:class:`Constraint`.
+			ValueError: If :attr:`Structure.dvh` not initialized or not
+				populated with dose data.
+		"""
+		constraints = list(constraints)
+		if not all(isinstance(c, Constraint) for c in constraints):
 			raise TypeError('argument "constraint" must be of type '
 				'conrad.dose.Constraint')
 
-		if self.dvh is None and constraint.threshold != 'mean':
+		dvh_required = any(
+				not isinstance(c.threshold, str) or c.threshold != 'mean'
+				for c in constraints)
+		if self.dvh is None and dvh_required:
 			raise ValueError('structure DVH does not exist, cannot evaluate '
 							 'constraint satisfaction.\n(assign structure '
 							 'size explicitly by setting field "{}.size"\nor '
 							 'impicitly by assigning a dose matrix with '
 							 'field "{}.A_full"\nto trigger DVH instantiation)'
 							 ''.format(Structure, Structure))
-		if not self.dvh.populated and constraint.threshold != 'mean':
+		if dvh_required and not self.dvh.populated:
 			raise ValueError('structure DVH not populated by dose data, '
 							 'cannot evaluate constraint satisfaction\n'
 							 '(assign dose by setting field "{}.y")'
 							 ''.format(Structure))
 
-		relop = operator.le if constraint.relop == RELOPS.LEQ else operator.ge
-
-		if isinstance(constraint.threshold, str):
-			if constraint.threshold == 'mean':
-				dose_achieved = self.mean_dose
-			elif constraint.threshold == 'min':
-				dose_achieved = self.min_dose
-			elif constraint.threshold == 'max':
-				dose_achieved = self.max_dose
-		else:
-			dose_achieved = self.dvh.dose_at_percentile(
-				constraint.threshold)
+		percentile_queries = [
+				c.threshold for c in constraints
+				if not isinstance(c.threshold, str)]
+		if len(percentile_queries) > 0:
+			percentile_doses = iter(
+					self.dvh.doses_at_percentiles(percentile_queries))
+
+		results = []
+		for constraint in constraints:
+			relop = operator.le if constraint.relop == RELOPS.LEQ \
+					else operator.ge
+
+			if isinstance(constraint.threshold, str):
+				if constraint.threshold == 'mean':
+					dose_achieved = self.mean_dose
+				elif constraint.threshold == 'min':
+					dose_achieved = self.min_dose
+				elif constraint.threshold == 'max':
+					dose_achieved = self.max_dose
+			else:
+				dose_achieved = next(percentile_doses)
 
-		status = relop(float(dose_achieved), float(constraint.dose))
-		dose = float(dose_achieved) / float(constraint.dose) * constraint.dose
-		return (status, dose)
+			status = relop(float(dose_achieved), float(constraint.dose))
+			dose = float(dose_achieved) / float(constraint.dose) * \
+					constraint.dose
+			results.append((status, dose))
+		return results
 
 	def satisfies_all(self, constraint_list):
-		return all(listmap(
-				lambda status_dose_tuple: status_dose_tuple[0],
-				listmap(
-						self.satisfies,
-						ConstraintList(constraint_list).list)))
+		return all(status for status, _ in self.satisfies_each(
+				ConstraintList(constraint_list).list))
 
 	def plotting_data(self, constraints_only=False, maxlength=None):
 		"""
@@ -713,8 +905,9 @@ class Structure(object):
 		s['mean'] = self.mean_dose
 		s['min'] = self.min_dose
 		s['max'] = self.max_dose
-		for p in percentiles:
-			s['D' + str(p)] = self.dvh.dose_at_percentile(p) * self.dose_unit
+		doses = self.dvh.doses_at_percentiles(percentiles)
+		for p, dose in zip(percentiles, doses):
+			s['D' + str(p)] = float(dose) * self.dose_unit
 		return s
 
 	@property
@@ -1,4 +1,8 @@
 """
+Cluster beams by dose matrix column similarity to build reduced dose
+frames for treatment planning.
+"""
+"""
 Copyright 2016 Baris Ungun, Anqi Fu
 
 This file is part of CONRAD.
@@ -16,3 +20,160 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
 """
+from conrad.compat import *
+
+import numpy as np
+
+from conrad.abstract.mapping import ClusterMapping
+from conrad.abstract.vector import LabelIndex
+from conrad.physics.physics import DoseFrame, DoseFrameMapping
+from conrad.optimization.voxel_clustering import FrameClustering, \
+	sketch_rows, reduce_rows
+
+class BeamClustering(FrameClustering):
+	"""
+	Cluster beams by dose matrix column similarity into super-beams.
+
+	Beams are grouped within each beam label, if the source frame has
+	beam labels, so that each super-beam inherits exactly one beam
+	label; see :class:`FrameClustering` for options. Columns are
+	sketched through products with the (sparse) transposed dose
+	matrix, so the dose matrix is never densified.
+
+	Each super-beam delivers the summed dose of its member beams at
+	unit intensity: if ``C`` is the :class:`ClusterMapping` from beams
+	to super-beams and ``A`` the source dose matrix, the reduced dose
+	matrix is ``A * C'``. Accordingly, the clustered intensities ``u``
+	correspond to full-resolution intensities ``x = C' * u``
+	(:meth:`BeamClustering.upsample`), and the two deliver identical
+	voxel doses. Beam weights of super-beams are cluster sums of the
+	source beam weights.
+	"""
+
+	def cluster_mapping(self, frame):
+		"""
+		Cluster beams of ``frame``, within each beam label.
+
+		Clusters are numbered contiguously, ordered by beam label.
+
+		Arguments:
+			frame (:class:`DoseFrame`): Frame with dose matrix and,
+				optionally, beam labels.
+
+		Returns:
+			:obj:`tuple`: :class:`ClusterMapping` from beams of
+			``frame`` to super-beams, and vector giving the beam label
+			of each super-beam (all ``0`` if ``frame`` has no beam
+			labels).
+
+		Raises:
+			AttributeError: If ``frame`` has no contiguous dose matrix.
+		"""
+		sketch = sketch_rows(
+				self.contiguous_dose_matrix(frame).T, self.sketch_dim,
+				self.seed)
+		if frame.beam_labels is None:
+			index = LabelIndex(np.zeros(frame.beams, dtype=int))
+		else:
+			index = frame.beam_label_index
+		return self.cluster_by_label(sketch, index)
+
+	def reduce_frame(self, frame, mapping, cluster_labels, frame_name=None):
+		"""
+		Build beam-clustered version of ``frame``.
+
+		Arguments:
+			frame (:class:`DoseFrame`): Source frame.
+			mapping (:class:`ClusterMapping`): Mapping from beams of
+				``frame`` to super-beams.
+			cluster_labels: Vector of beam labels for super-beams.
+			frame_name (:obj:`str`, optional): Name of reduced frame.
+
+		Returns:
+			:class:`DoseFrame`: Frame with one column per super-beam,
+			equal to the sum of the columns of its member beams, and
+			whose beam weights are cluster sums of source beam weights.
+			Voxel data are carried over unchanged.
+		"""
+		weights = np.ones(frame.beams)
+		if frame.beam_weights is not None:
+			if frame.beam_weights.data is not None:
+				weights = frame.beam_weights.data
+
+		matrix = self.contiguous_dose_matrix(frame)
+		return DoseFrame(
+				data=reduce_rows(matrix.T, mapping.matrix).T,
+				voxel_labels=frame.voxel_labels,
+				beam_labels=cluster_labels if frame.beam_labels is not None
+						else None,
+				voxel_weights=None if frame.voxel_weights is None else
+						frame.voxel_weights.data,
+				beam_weights=mapping.frame0_to_1(weights),
+				frame_name=frame_name)
+
+	def cluster(self, physics, target_frame=None, source_frame=None):
+		"""
+		Cluster beams of a frame attached to ``physics``.
+
+		The reduced frame is added to ``physics`` and the corresponding
+		:class:`DoseFrameMapping` registered with the beam mapping.
+
+		Arguments:
+			physics (:class:`Physics`): Physics to update.
+			target_frame (:obj:`str`, optional): Name of reduced frame.
+				Defaults to ``<source>_beam_clustered``.
+			source_frame (:obj:`str`, optional): Name of frame to
+				cluster. Defaults to current :attr:`Physics.frame`.
+
+		Returns:
+			:class:`DoseFrameMapping`: Registered mapping from source
+			frame to reduced frame.
+
+		Raises:
+			KeyError: If ``source_frame`` not attached to ``physics``.
+		"""
+		frame = self.source_frame(physics, source_frame)
+		if target_frame is None:
+			target_frame = '{}_beam_clustered'.format(frame.name)
+
+		mapping, cluster_labels = self.cluster_mapping(frame)
+		reduced = self.reduce_frame(
+				frame, mapping, cluster_labels, target_frame)
+		frame_mapping = DoseFrameMapping(
+				frame.name, target_frame, beam_map=mapping)
+
+		physics.add_dose_frame(target_frame, dose_frame=reduced)
+		physics.add_frame_mapping(frame_mapping)
+		return frame_mapping
+
+	@staticmethod
+	def upsample(mapping, beam_intensities):
+		"""
+		Convert super-beam intensities to full-resolution intensities.
+
+		Each beam is assigned the intensity of its super-beam, so that
+		the full-resolution intensities deliver the same voxel doses in
+		the source frame as the super-beam intensities deliver in the
+		reduced frame.
+
+		Arguments:
+			mapping: :class:`ClusterMapping` from beams to super-beams,
+				or :class:`DoseFrameMapping` with such a beam mapping.
+			beam_intensities: Vector of super-beam intensities.
+
+		Returns:
+			:class:`numpy.ndarray`: Vector of full-resolution beam
+			intensities.
+
+		Raises:
+			TypeError: If ``mapping`` provides no beam mapping.
+			ValueError: If ``beam_intensities`` length does not match
+				number of super-beams.
+		"""
+		if isinstance(mapping, DoseFrameMapping):
+			mapping = mapping.beam_map
+		if not isinstance(mapping, ClusterMapping):
+			raise TypeError(
+					'argument `mapping` must be a {} or a {} with beam '
+					'clustering'.format(ClusterMapping, DoseFrameMapping))
+		return mapping.upsample(np.asarray(beam_intensities, dtype=float))
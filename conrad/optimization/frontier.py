@@ -0,0 +1,343 @@
+"""
+Trace Pareto frontiers of competing structure objectives, by planning
+a case along a path of objective weightings or constraint levels.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import numbers
+import numpy as np
+
+from conrad.physics.units import AbstractNonnegativeUnit
+from conrad.optimization.sweep import snapshot_variant, restore_variant, \
+	apply_variant
+
+SUMMARY_FIELDS_DEFAULT = ['mean', 'min', 'max']
+
+def interpolate_value(start, end, weight):
+	"""
+	Interpolate linearly between two values of a planning parameter.
+
+	Arguments:
+		start: Value at ``weight = 0``. Either a real number (including
+			:mod:`numpy` scalars), a unit object
+			(e.g., a dose), or a :obj:`dict` of such values.
+		end: Value at ``weight = 1``, of the same type as ``start``.
+		weight (:obj:`float`): Interpolation weight in ``[0, 1]``.
+
+	Returns:
+		Value ``(1 - weight) * start + weight * end``, of the same type
+		as ``start``.
+
+	Raises:
+		TypeError: If ``start`` and ``end`` differ in type, or are
+			neither numbers nor units and differ in value.
+	"""
+	if isinstance(start, dict):
+		if not isinstance(end, dict) or set(start) != set(end):
+			raise TypeError('interpolated dictionaries must have same keys')
+		return {k: interpolate_value(start[k], end[k], weight) for k in start}
+	if isinstance(start, AbstractNonnegativeUnit):
+		if type(start) is not type(end):
+			raise TypeError(
+					'cannot interpolate between values of type {} and {}'
+					''.format(type(start), type(end)))
+		return type(start)(
+				(1. - weight) * float(start) + weight * float(end))
+	if isinstance(start, numbers.Real) and isinstance(end, numbers.Real):
+		return (1. - weight) * start + weight * end
+	if start != end:
+		raise TypeError(
+				'cannot interpolate between values {} and {}'
+				''.format(start, end))
+	return start
+
+def interpolate_variant(anchors, t):
+	"""
+	Planning variant at position ``t`` along piecewise linear path.
+
+	Arguments:
+		anchors (:obj:`list` of :obj:`dict`): Planning variants (see
+			:func:`~conrad.optimization.sweep.expand_grid`) with common
+			keys, visited in order.
+		t (:obj:`float`): Position along path, in
+			``[0, len(anchors) - 1]``; integer positions correspond to
+			anchors.
+
+	Returns:
+		:obj:`dict`: Interpolated planning variant.
+	"""
+	segment = min(int(np.floor(t)), len(anchors) - 2)
+	weight = float(t) - segment
+	start, end = anchors[segment], anchors[segment + 1]
+	return {k: interpolate_value(start[k], end[k], weight) for k in start}
+
+def refinement_scores(t, objective_values):
+	"""
+	Score intervals between adjacent frontier points for refinement.
+
+	Objective values are scaled by their range over the frontier. Each
+	interval scores its length in scaled objective space, increased by
+	up to a factor of three according to the turning angles of the
+	frontier at its endpoints, so that long intervals and intervals
+	where the frontier curves are refined first. Intervals between a
+	feasible and an infeasible point score ``inf``; intervals between
+	infeasible points score zero.
+
+	Arguments:
+		t: Sorted vector of path positions, of length ``n``.
+		objective_values: ``n`` by ``k`` array of objective values;
+			rows of infeasible points are ``nan``.
+
+	Returns:
+		:class:`numpy.ndarray`: Vector of ``n - 1`` interval scores.
+	"""
+	F = np.asarray(objective_values, dtype=float)
+	feasible = np.all(np.isfinite(F), axis=1)
+	scores = np.zeros(len(t) - 1)
+	if feasible.sum() == 0:
+		return scores
+
+	scale = np.ptp(F[feasible], axis=0)
+	scale[scale == 0] = 1.
+	segments = np.diff(F / scale, axis=0)
+	lengths = np.sqrt(np.sum(segments**2, axis=1))
+
+	# turning angle at each interior point with finite, nonzero segments
+	# on either side
+	angles = np.zeros(len(t))
+	norms = lengths[:-1] * lengths[1:]
+	interior = np.isfinite(norms) & (norms > 0)
+	cosines = np.sum(segments[:-1] * segments[1:], axis=1)[interior]
+	angles[1:-1][interior] = np.arccos(
+			np.clip(cosines / norms[interior], -1., 1.))
+
+	scores = lengths * (1. + (angles[:-1] + angles[1:]) / np.pi)
+	boundary = feasible[:-1] != feasible[1:]
+	scores[boundary] = np.inf
+	scores[~feasible[:-1] & ~feasible[1:]] = 0.
+	return scores
+
+class ParetoFrontier(object):
+	"""
+	Compact record of a traced frontier.
+
+	Frontier points are ordered by position along the traced path.
+
+	Attributes:
+		t (:class:`numpy.ndarray`): Path position of each point.
+		variants (:obj:`list` of :obj:`dict`): Planning variant of each
+			point.
+		labels (:obj:`list`): Labels of structures evaluated.
+		objective_values (:class:`numpy.ndarray`): ``n_points`` by
+			``n_structures`` array of structure objective values,
+			evaluated with the objective parameters of the case when the
+			frontier was traced; ``nan`` for infeasible points.
+		summary_fields (:obj:`list` of :obj:`str`): Names of DVH
+			summary statistics, e.g., ``'mean'`` or ``'D98'``.
+		dvh_summaries (:class:`numpy.ndarray`): ``n_points`` by
+			``n_structures`` by ``n_fields`` array of DVH summary
+			statistics, in each structure's dose units.
+		x (:class:`numpy.ndarray`): ``n_points`` by ``n_beams`` array
+			of beam intensities.
+		feasible (:class:`numpy.ndarray`): Feasibility of each point.
+		runs (:obj:`list`): Record of planning run for each point.
+	"""
+	def __init__(self, t, variants, labels, objective_values,
+				 summary_fields, dvh_summaries, x, feasible, runs):
+		order = np.argsort(t, kind='mergesort')
+		self.t = np.asarray(t, dtype=float)[order]
+		self.variants = [variants[i] for i in order]
+		self.labels = list(labels)
+		self.objective_values = np.asarray(objective_values)[order]
+		self.summary_fields = list(summary_fields)
+		self.dvh_summaries = np.asarray(dvh_summaries)[order]
+		self.x = np.asarray(x)[order]
+		self.feasible = np.asarray(feasible, dtype=bool)[order]
+		self.runs = [runs[i] for i in order]
+
+	def __len__(self):
+		return len(self.t)
+
+	@property
+	def pareto_optimal(self):
+		"""
+		Mask of feasible points not dominated by another feasible point.
+		"""
+		F = self.objective_values
+		mask = self.feasible.copy()
+		for i in np.flatnonzero(self.feasible):
+			others = F[self.feasible]
+			dominated = np.all(others <= F[i], axis=1) & \
+					np.any(others < F[i], axis=1)
+			mask[i] = not dominated.any()
+		return mask
+
+	def dvh_summary(self, label, field):
+		"""
+		Series of DVH summary statistic ``field`` for structure
+		``label`` along the frontier.
+		"""
+		return self.dvh_summaries[:, self.labels.index(label),
+								  self.summary_fields.index(field)]
+
+def trace_frontier(case, anchors, n_points=50, n_initial=None, labels=None,
+				   percentiles=None, min_step=None, tag='frontier',
+				   **options):
+	"""
+	Plan ``case`` along a path of planning variants to trace a frontier.
+
+	The path interpolates linearly between consecutive ``anchors``
+	(objective weightings, constraint doses, etc.), and is first
+	sampled at ``n_initial`` evenly spaced points. The frontier is then
+	refined adaptively: in each round, midpoints are added to the
+	intervals with the highest :func:`refinement_scores`, until
+	``n_points`` points are planned or no interval longer than
+	``min_step`` remains.
+
+	Each point is planned with a homotopy-style warm start from its
+	neighbor along the path. Points are planned in order of path
+	position within each round, and by default the solver keeps its
+	problem between plans (``persistent=True``), so that consecutive
+	solves differ only in parameter values.
+
+	Objective values of all points are evaluated with the objective
+	parameters the case had when the frontier was traced. The case
+	parameters set by the anchors are restored on return; each run is
+	recorded in :attr:`~conrad.Case.history`, tagged ``'{tag}{i}'`` in
+	the order planned.
+
+	Arguments:
+		case (:class:`~conrad.Case`): Case to plan.
+		anchors (:obj:`list` of :obj:`dict`): Two or more planning
+			variants with common keys, as accepted by
+			:func:`~conrad.optimization.sweep.apply_variant`.
+		n_points (:obj:`int`, optional): Maximum number of frontier
+			points.
+		n_initial (:obj:`int`, optional): Number of points in initial
+			sampling of path; defaults to one fifth of ``n_points``,
+			and at least the number of anchors.
+		labels (:obj:`list`, optional): Labels of structures to
+			evaluate; defaults to all structures in case.
+		percentiles (:obj:`list`, optional): Percentiles at which to
+			summarize each structure's DVH, in addition to mean,
+			minimum and maximum dose.
+		min_step (:obj:`float`, optional): Smallest interval between
+			path positions to refine; defaults to the path length
+			divided by ``4 * n_points``.
+		tag (optional): Prefix for tags of runs in case history.
+		**options: Keyword arguments passed to
+			:meth:`~conrad.Case.plan`.
+
+	Returns:
+		:class:`ParetoFrontier`: Traced frontier.
+
+	Raises:
+		ValueError: If fewer than two anchors given, anchors have
+			different keys, or a key does not correspond to a
+			constraint or structure objective in ``case``.
+		TypeError: If anchor values cannot be interpolated.
+	"""
+	anchors = list(anchors)
+	if len(anchors) < 2:
+		raise ValueError('at least two anchors required to trace frontier')
+	keys = set(anchors[0])
+	if any(set(a) != keys for a in anchors):
+		raise ValueError('frontier anchors must set same parameters')
+
+	length = float(len(anchors) - 1)
+	n_points = max(int(n_points), len(anchors))
+	if n_initial is None:
+		n_initial = n_points // 5
+	n_initial = min(max(int(n_initial), len(anchors)), n_points)
+	if min_step is None:
+		min_step = length / (4. * n_points)
+	if labels is None:
+		labels = case.anatomy.labels
+	labels = list(labels)
+	percentiles = list(percentiles) if percentiles is not None else []
+	fields = SUMMARY_FIELDS_DEFAULT + ['D{}'.format(p) for p in percentiles]
+
+	options.setdefault('persistent', True)
+	warm_start = options.pop('warm_start', None)
+
+	reference = snapshot_variant(case, anchors[0])
+	for segment in xrange(len(anchors) - 1):
+		interpolate_variant(anchors, segment + 0.5)
+
+	t, variants, runs = [], [], []
+	objective_values, dvh_summaries, xs = [], [], []
+
+	def evaluate(run):
+		if not run.feasible or run.x is None:
+			xs.append(np.nan * np.ones(case.n_beams))
+			objective_values.append(np.nan * np.ones(len(labels)))
+			dvh_summaries.append(np.nan * np.ones((len(labels), len(fields))))
+			return
+		xs.append(np.array(run.x, dtype=float))
+		case.calculate_doses(run.x)
+		values, summaries = [], []
+		for label in labels:
+			s = case.anatomy[label]
+			values.append(float(s.objective.eval(s.y, s.voxel_weights)))
+			summary = s.summary(percentiles=percentiles)
+			summaries.append([float(summary[f]) for f in fields])
+		objective_values.append(values)
+		dvh_summaries.append(summaries)
+
+	def plan(position, neighbor):
+		variant = interpolate_variant(anchors, position)
+		apply_variant(case, variant)
+		start = runs[neighbor] if neighbor is not None else warm_start
+		_, run = case.plan(
+				warm_start=start, tag='{}{}'.format(tag, len(runs)),
+				**options)
+		# evaluate objectives with reference parameters
+		restore_variant(case, reference)
+		t.append(position)
+		variants.append(variant)
+		runs.append(run)
+		evaluate(run)
+
+	try:
+		for position in np.linspace(0, length, n_initial):
+			plan(float(position), len(runs) - 1 if runs else None)
+
+		while len(runs) < n_points:
+			order = np.argsort(t, kind='mergesort')
+			t_sorted = np.array(t)[order]
+			scores = refinement_scores(
+					t_sorted, np.array(objective_values)[order])
+			scores[np.diff(t_sorted) <= 2 * min_step] = 0.
+			candidates = [i for i in np.argsort(-scores, kind='mergesort')
+						  if scores[i] > 0]
+			if len(candidates) == 0:
+				break
+			batch = max(1, min(n_points - len(runs), len(runs) // 4))
+			for i in sorted(candidates[:batch]):
+				neighbor = order[i] if runs[order[i]].feasible else \
+						order[i + 1]
+				plan(0.5 * (t_sorted[i] + t_sorted[i + 1]), neighbor)
+	finally:
+		restore_variant(case, reference)
+
+	return ParetoFrontier(
+			t, variants, labels, objective_values, fields, dvh_summaries,
+			xs, [r.feasible for r in runs], runs)
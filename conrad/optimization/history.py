@@ -24,6 +24,8 @@ from conrad.compat import *
 
 import numpy as np
 
+from conrad.optimization.profiler import PhaseProfile
+
 class RunProfile(object):
 	"""
 	Record of solver input associated with a treatment planning run.
@@ -140,6 +142,10 @@ class RunOutput(object):
 			a minimum, has entries solver
 			run time (first pass/restricted constraints, and second
 			pass/exact constraints).
+		phases (:class:`~conrad.optimization.profiler.PhaseProfile`):
+			Wall-clock and CPU time spent in each phase of the run
+			(e.g., loading physics, problem construction, solve,
+			gathering solver output, dose calculation, plotting data).
 		"""
 	def __init__(self):
 		""" Intialize empty `RunOutput`. """
@@ -148,6 +154,7 @@ class RunOutput(object):
 		self.optimal_dvh_slopes = {}
 		self.optimal_slacks = {}
 		self.solver_info = {'time': np.nan, 'time_exact': np.nan}
+		self.phases = PhaseProfile()
 		self.feasible = False
 
 	@property
@@ -271,6 +278,44 @@ class RunRecord(object):
 		""" Run time for second-pass solve (exact dose constraints). """
 		return self.output.solvetime
 
+	@property
+	def warm_started(self):
+		""" ``True`` if first-pass solve was warm started. """
+		return bool(self.info.get('warm_start', False))
+
+	@property
+	def iters_saved(self):
+		"""
+		Solver iterations saved by warm starting first-pass solve.
+
+		``None`` if the solve was not warm started, or if the solver
+		does not report iteration counts.
+		"""
+		return self.info.get('iters_saved', None)
+
+	@property
+	def solver_selection(self):
+		"""
+		Record of solver backend selection for the run.
+
+		Dictionary with the name of the selected backend, whether it was
+		requested rather than chosen by predicted run time, the
+		predicted run times of the candidate backends, and the problem
+		size; ``None`` if not recorded.
+		"""
+		return self.info.get('solver_selection', None)
+
+	@property
+	def backend(self):
+		""" Name of solver backend used for run, or ``None``. """
+		selection = self.solver_selection
+		return selection['backend'] if selection is not None else None
+
+	@property
+	def phases(self):
+		""" Time spent in each phase of run, from solver output. """
+		return self.output.phases
+
 class PlanningHistory(object):
 	"""
 	Class for tracking treatment plans generated by a :class:`~conrad.Case`.
@@ -425,4 +470,41 @@ class PlanningHistory(object):
 			raise ValueError(
 					'no optimization runs performed, cannot apply tag '
 					'"{}" to most recent plan'.format(tag))
-		self.run_tags[tag] = len(self.runs) - 1
\ No newline at end of file
+		self.run_tags[tag] = len(self.runs) - 1
+
+	def phase_totals(self, keys=None):
+		"""
+		Time spent in each phase, summed over treatment plans.
+
+		Arguments:
+			keys (optional): Tags or indices of plans to include; by
+				default, all plans in history.
+
+		Returns:
+			:class:`~conrad.optimization.profiler.PhaseProfile`:
+			Accumulated phase timings.
+		"""
+		runs = self.runs if keys is None else [self[k] for k in keys]
+		totals = PhaseProfile()
+		for run in runs:
+			totals += run.phases
+		return totals
+
+	def phase_table(self):
+		"""
+		Flat table of phase timings of each treatment plan in history.
+
+		Returns:
+			:obj:`list` of :obj:`dict`: One row per phase per plan, in
+			order, with entries ``'run'`` (index of plan in
+			:attr:`PlanningHistory.runs`), ``'tag'`` (tag of plan, or
+			``None``), and the entries of
+			:attr:`~conrad.optimization.profiler.PhaseProfile.table`.
+		"""
+		tags = {index: tag for tag, index in self.run_tags.items()}
+		rows = []
+		for index, run in enumerate(self.runs):
+			for row in run.phases.table:
+				row.update(run=index, tag=tags.get(index, None))
+				rows.append(row)
+		return rows
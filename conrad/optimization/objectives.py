@@ -3,9 +3,8 @@ from conrad.compat import *
 import abc
 import numpy as np
 import operator as op
-import cvxpy
 
-from conrad.defs import vec, module_installed
+from conrad.defs import vec, module_installed, LazyModule
 from conrad.physics.units import Gy, DeliveredDose
 from conrad.physics.string import dose_from_string
 
@@ -14,9 +13,11 @@ WEIGHT_PWL_OVER_DEFAULT = 0.05
 WEIGHT_HINGE_DEFAULT = 1.
 WEIGHT_LIN_NONTARGET_DEFAULT = 0.03
 
+cvxpy = LazyModule('cvxpy')
+
 OPTKIT_INSTALLED = module_installed('optkit')
 if OPTKIT_INSTALLED:
-	import optkit as ok
+	ok = LazyModule('optkit')
 
 @add_metaclass(abc.ABCMeta)
 class TreatmentObjective(object):
@@ -27,6 +28,7 @@ class TreatmentObjective(object):
 		self.__doses = {}
 		self.__aliases = {}
 		self.__structure = None
+		self.__expr_parameters = None
 		alias_dict = dose_and_weight_params.pop('aliases', {})
 		for k, v in dose_and_weight_params.items():
 			self.__setattr__(str(k), v)
@@ -104,6 +106,43 @@ class TreatmentObjective(object):
 		else:
 			raise ValueError('scaling must be nonnegative')
 
+	def parametrize(self, parameters=None):
+		"""
+		Route weights and doses in :mod:`cvxpy` expressions through
+		``parameters``.
+
+		While a dictionary is attached, each weight or dose read by
+		:meth:`TreatmentObjective.primal_expr` is represented by a
+		:class:`cvxpy.Parameter`, registered in ``parameters`` under the
+		attribute's name and set to the attribute's current value. Pass
+		``None`` to detach the dictionary and build expressions from
+		constants again.
+		"""
+		self.__expr_parameters = parameters
+
+	def update_parameters(self, parameters):
+		"""
+		Set each :class:`cvxpy.Parameter` in ``parameters`` to the
+		current value of the objective attribute it represents.
+		"""
+		for name in parameters:
+			parameters[name].value = float(getattr(self, name))
+
+	def _expr_scalar(self, name):
+		value = float(getattr(self, name))
+		if self.__expr_parameters is None:
+			return value
+		if name not in self.__expr_parameters:
+			# weights scale convex terms and must be nonnegative, except
+			# for the coefficient of the (affine) linear term
+			if 'weight' in name and name != 'weight_linear':
+				sign = 'positive'
+			else:
+				sign = 'unknown'
+			self.__expr_parameters[name] = cvxpy.Parameter(sign=sign)
+		self.__expr_parameters[name].value = value
+		return self.__expr_parameters[name]
+
 	def __mul__(self, other):
 		return self.__imul__(other)
 
@@ -231,17 +270,19 @@ class NontargetObjectiveLinear(TreatmentObjective):
 		r"""
 		Return :math:`c * \omega^T y`, for :math:`\omega\equiv```voxel_weights``
 		"""
+		weight = self._expr_scalar('weight')
 		if voxel_weights is None:
-			return self.weight * cvxpy.sum_entries(y_var)
+			return weight * cvxpy.sum_entries(y_var)
 		else:
-			return self.weight * cvxpy.sum_entries(
+			return weight * cvxpy.sum_entries(
 					cvxpy.mul_elemwise(voxel_weights, y_var))
 
 	def primal_expr_Ax(self, A, x_var, voxel_weights=None):
+		weight = self._expr_scalar('weight')
 		if voxel_weights is None:
-			return self.weight * cvxpy.sum_entries(x_var.T * A.T)
+			return weight * cvxpy.sum_entries(x_var.T * A.T)
 		else:
-			return self.weight * cvxpy.sum_entries(
+			return weight * cvxpy.sum_entries(
 					cvxpy.mul_elemwise(voxel_weights, (x_var.T * A.T).T))
 
 	def dual_expr(self, nu_var, voxel_weights=None):
@@ -347,18 +388,18 @@ class TargetObjectivePWL(TreatmentObjective):
 			return -float(self.target_dose) * np.dot(voxel_weights, nu)
 
 	def primal_expr(self, y_var, voxel_weights=None):
-		residuals = y_var.T - float(self.target_dose)
+		residuals = y_var.T - self._expr_scalar('target_dose')
 		if voxel_weights is not None:
 			residuals = cvxpy.mul_elemwise(voxel_weights, residuals.T)
-		return self.weight_abs * cvxpy.norm(residuals, 1) + \
-			self.weight_linear * cvxpy.sum_entries(residuals)
+		return self._expr_scalar('weight_abs') * cvxpy.norm(residuals, 1) + \
+			self._expr_scalar('weight_linear') * cvxpy.sum_entries(residuals)
 
 	def primal_expr_Ax(self, A, x_var, voxel_weights=None):
-		residuals = (x_var.T * A.T).T - float(self.target_dose)
+		residuals = (x_var.T * A.T).T - self._expr_scalar('target_dose')
 		if voxel_weights is not None:
 			residuals = cvxpy.mul_elemwise(voxel_weights, residuals)
-		return self.weight_abs * cvxpy.norm(residuals, 1) + \
-			self.weight_linear * cvxpy.sum_entries(residuals)
+		return self._expr_scalar('weight_abs') * cvxpy.norm(residuals, 1) + \
+			self._expr_scalar('weight_linear') * cvxpy.sum_entries(residuals)
 
 	def dual_expr(self, nu_var, voxel_weights=None):
 		if voxel_weights is None:
@@ -439,16 +480,17 @@ class ObjectiveHinge(TreatmentObjective):
 			return -float(self.deadzone_dose) * np.dot(voxel_weights, nu)
 
 	def primal_expr(self, y_var, voxel_weights=None):
-		residuals = cvxpy.pos(y_var.T - float(self.deadzone_dose))
+		residuals = cvxpy.pos(y_var.T - self._expr_scalar('deadzone_dose'))
 		if voxel_weights is not None:
 			residuals = cvxpy.mul_elemwise(voxel_weights, residuals.T)
-		return self.weight * cvxpy.sum_entries(residuals)
+		return self._expr_scalar('weight') * cvxpy.sum_entries(residuals)
 
 	def primal_expr_Ax(self, A, x_var, voxel_weights=None):
-		residuals = cvxpy.pos((x_var.T * A.T).T - float(self.deadzone_dose))
+		residuals = cvxpy.pos(
+				(x_var.T * A.T).T - self._expr_scalar('deadzone_dose'))
 		if voxel_weights is not None:
 			residuals = cvxpy.mul_elemwise(voxel_weights, residuals)
-		return self.weight * cvxpy.sum_entries(residuals)
+		return self._expr_scalar('weight') * cvxpy.sum_entries(residuals)
 
 	def dual_expr(self, nu_var, voxel_weights=None):
 		if voxel_weights is None:
@@ -23,11 +23,16 @@ along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
 from conrad.compat import *
 
 import os
+import timeit
+import numpy as np
 
 from conrad.medicine.dose import PercentileConstraint
 from conrad.optimization.solver_cvxpy import SolverCVXPY
 from conrad.optimization.solver_optkit import SolverOptkit
-from conrad.optimization.history import RunOutput
+from conrad.optimization.solver_registry import SOLVER_REGISTRY, \
+		ProblemSize
+from conrad.optimization.history import RunOutput, RunRecord
+from conrad.optimization.profiler import cpu_time
 
 class PlanningProblem(object):
 	"""
@@ -43,6 +48,10 @@ class PlanningProblem(object):
 			:mod:`cvxpy`-baed solver, if available.
 		solver_pogs (:class:`SolverOptkit` or :class:`NoneType`): POGS
 			solver, if available.
+		registry (:class:`~conrad.optimization.solver_registry.SolverRegistry`):
+			Solver backends to select from, by predicted run time.
+		selection (:class:`~conrad.optimization.solver_registry.SolverSelection`):
+			Backend selected for most recent solve, or ``None``.
 	"""
 
 	def __init__(self):
@@ -55,6 +64,8 @@ class PlanningProblem(object):
 		self.solver_cvxpy = SolverCVXPY()
 		self.solver_pogs = SolverOptkit()
 		self.__solver = None
+		self.registry = SOLVER_REGISTRY
+		self.selection = None
 
 	@property
 	def solver(self):
@@ -94,7 +105,7 @@ class PlanningProblem(object):
 				if slack < -slack_tol or slack > slack_tol:
 					structure.constraints[cid].slack = slack
 
-	def __update_structure(self, structure, exact=False):
+	def __update_structure(self, structure, exact=False, calculate_dose=True):
 		"""
 		Calculate structure dose from solver's optimal beam intensities.
 
@@ -104,11 +115,14 @@ class PlanningProblem(object):
 			exact (:obj:`bool`, optional): If ``False`` (i.e.,
 				reading first-pass results), trigger call to update
 				constraints as well.
+			calculate_dose (:obj:`bool`, optional): If ``False``,
+				structure doses have already been calculated.
 
 		Returns:
 			None
 		"""
-		structure.calc_y(self.solver.x)
+		if calculate_dose:
+			structure.calc_y(self.solver.x)
 		if not exact:
 			self.__update_constraints(structure)
 
@@ -137,6 +151,8 @@ class PlanningProblem(object):
 		run_output.solver_info['time' + keymod] = self.solver.solvetime
 		run_output.solver_info['objective' + keymod] = self.solver.objective_value
 		run_output.solver_info['iters' + keymod] = self.solver.solveiters
+		run_output.solver_info['warm_start' + keymod] = bool(
+				self.solver.warm_started)
 
 	def __gather_solver_vars(self, run_output, exact=False):
 		"""
@@ -226,36 +242,49 @@ class PlanningProblem(object):
 				run_output.optimal_slacks[cid] = self.solver.get_slack_value(
 						cid)
 
-	def __set_solver_fastest_available(self, structures):
+	@property
+	def __solver_kinds(self):
+		""" Kinds of solver instantiated, as in registered backends. """
+		kinds = []
+		if self.solver_cvxpy is not None:
+			kinds.append('cvxpy')
+		if self.solver_pogs is not None:
+			kinds.append('pogs')
+		return kinds
+
+	def __set_solver_fastest_available(self, structures, override=None):
 		"""
 		Set active solver to fastest solver than can handle problem.
 
-		If ``structures`` includes any dose constraints, only
-		:mod:`cvxpy`-based solvers can be used. If no dose constraints
-		are present, and the module :mod:`optkit` is installed, the POGS
-		solver is the fastest option.
+		Backends in :attr:`PlanningProblem.registry` that are installed
+		and can handle the problem (e.g., only :mod:`cvxpy`-based
+		backends handle dose constraints) are ranked by the run time
+		their cost models predict for the problem's size, and the
+		fastest is selected.
 
 		Arguments:
 			structures: Iterable collection of
-				:class:`~conrad.medicine.Structure` objects, passed to
-				:meth:`SolverOptkit.can_solve`.
+				:class:`~conrad.medicine.Structure` objects.
+			override (:obj:`str`, optional): Name of backend to select
+				regardless of predicted run time.
 
 		Returns:
-			None
+			:class:`~conrad.optimization.solver_registry.SolverSelection`:
+			Selected backend, with predicted run times of all candidate
+			backends.
 
 		Raises:
-			ValueError: If neither a CVXPY solver nor an OPTKIT/POGS
-				solver is available.
+			ValueError: If no available solver can handle the problem,
+				or if ``override`` does not name a capable backend.
 		"""
-		if self.solver_pogs is not None:
-			if self.solver_pogs.can_solve(structures):
-				self.__solver = self.solver_pogs
-				return
-		if self.solver_cvxpy is not None:
+		self.selection = self.registry.select(
+				ProblemSize.from_structures(structures), override=override,
+				solvers=self.__solver_kinds)
+		if self.selection.backend.solver == 'pogs':
+			self.__solver = self.solver_pogs
+		else:
 			self.__solver = self.solver_cvxpy
-			return
-
-		raise ValueError('no solvers available')
+		return self.selection
 
 	def __verify_2pass_applicable(self, structures):
 		"""
@@ -277,8 +306,102 @@ class PlanningProblem(object):
 						s.constraints[key], PercentileConstraint)
 		return percentile_constraints_included
 
+	@staticmethod
+	def __warm_start_options(warm_start, n_beams):
+		"""
+		Gather starting iterates from a previous planning run.
+
+		Arguments:
+			warm_start (:class:`RunRecord` or :class:`RunOutput`):
+				Output of previous run, or ``None``.
+			n_beams (:obj:`int`): Number of beams in current problem.
+
+		Returns:
+			:obj:`dict`: Solver options ``x0`` (first-pass beam
+			intensities) and, where recorded, ``nu0`` (dual variable
+			for voxel doses). Empty if ``warm_start`` is ``None`` or has
+			no primal solution of length ``n_beams``.
+
+		Raises:
+			TypeError: If ``warm_start`` is not ``None``, a
+				:class:`RunRecord` or a :class:`RunOutput`.
+		"""
+		if warm_start is None:
+			return {}
+		if isinstance(warm_start, RunRecord):
+			warm_start = warm_start.output
+		if not isinstance(warm_start, RunOutput):
+			raise TypeError(
+					'argument "warm_start" must be of type {} or {}'
+					''.format(RunRecord, RunOutput))
+
+		x0 = warm_start.optimal_variables.get('x', None)
+		if x0 is None or len(x0) != n_beams:
+			return {}
+		options = {'x0': x0}
+		nu0 = warm_start.optimal_variables.get('nu', None)
+		if nu0 is not None:
+			options['nu0'] = nu0
+		return options
+
+	@staticmethod
+	def __iters_saved(warm_start, run_output):
+		"""
+		Compare iterations of a warm-started run to its source run.
+
+		The source run's count is corrected by its own savings, if it
+		was itself warm started, so that the comparison is against a
+		cold start.
+
+		Returns:
+			:obj:`int`: Iterations saved, or ``None`` if either
+			count is unavailable (e.g., solver reports ``'n/a'``).
+		"""
+		if isinstance(warm_start, RunRecord):
+			warm_start = warm_start.output
+		try:
+			reference = int(warm_start.solver_info['iters'])
+			reference += int(warm_start.solver_info.get('iters_saved') or 0)
+			return reference - int(run_output.solver_info['iters'])
+		except (KeyError, TypeError, ValueError):
+			return None
+
+	def __timed_solve(self, run_output, exact=False, **options):
+		"""
+		Run active solver, and record time spent in
+		:attr:`RunOutput.phases`.
+
+		If the solver reports the part of its run time spent before the
+		numerical solve (e.g., :mod:`cvxpy` canonicalization), that part
+		is recorded as phase ``'canonicalize'``, and the remainder as
+		phase ``'solve'``. The solver does not report CPU time of the
+		parts: CPU time of both is recorded under ``'solve'``, and CPU
+		time of ``'canonicalize'`` is ``NaN``.
+
+		Arguments:
+			run_output (:class:`RunOutput`): Container for solver data.
+			exact (:obj:`bool`, optional): If ``True``, append
+				'_exact' to phase names.
+			**options: Keyword arguments passed to solver.
+
+		Returns:
+			:obj:`bool`: Solver feasibility flag.
+		"""
+		keymod = '_exact' if exact else ''
+		wall, cpu = timeit.default_timer(), cpu_time()
+		feasible = self.solver.solve(**options)
+		wall, cpu = timeit.default_timer() - wall, cpu_time() - cpu
+
+		setup = getattr(self.solver, 'setuptime', None)
+		if setup is not None and not np.isnan(setup):
+			run_output.phases.add('canonicalize' + keymod, setup, np.nan)
+			wall -= setup
+		run_output.phases.add('solve' + keymod, wall, cpu)
+		return feasible
+
 	def solve(self, structures, run_output, slack=True,
-			  exact_constraints=False, **options):
+			  exact_constraints=False, warm_start=None,
+			  dose_calculation=None, **options):
 		"""
 		Run treatment plan optimization.
 
@@ -298,9 +421,32 @@ class PlanningProblem(object):
 				using convex restrictions of the percentile constraints
 				on the firstpass,  and exact versions of the constraints
 				on the second pass.
+			warm_start (:class:`RunRecord` or :class:`RunOutput`,
+				optional): Previous planning run; its first-pass beam
+				intensities (and voxel dual variable, if recorded) are
+				used as the starting iterate of the first pass when the
+				active solver supports warm starts. Whether a warm start
+				was used, and how many iterations it saved relative to
+				the previous run, are recorded in
+				:attr:`RunOutput.solver_info` under the keys
+				``'warm_start'`` and ``'iters_saved'``.
+			dose_calculation (optional): Callable that calculates and
+				assigns doses to all of ``structures`` from a vector of
+				beam intensities, e.g., :meth:`conrad.Case.calculate_doses`.
+				By default, each structure calculates its own doses.
 			**options: Abitrary keyword arguments, passed through to
 				:meth:`PlanningProblem.solver.init_problem` and
-				:meth:`PlanningProblem.solver.build`.
+				:meth:`PlanningProblem.solver.build`. Keyword
+				``backend`` (or, for compatibility, ``solver``) names a
+				backend in :attr:`PlanningProblem.registry`, e.g.,
+				``'ECOS'``, to use instead of the one with the lowest
+				predicted run time. The selection is recorded in
+				:attr:`RunOutput.solver_info` under the key
+				``'solver_selection'``.
+
+		Time spent selecting a solver, building and solving the problem,
+		gathering solver output and calculating structure doses is
+		recorded in :attr:`RunOutput.phases`.
 
 		Returns:
 			:obj:`int`: Number of feasible solver runs performed: ``0``
@@ -308,7 +454,8 @@ class PlanningProblem(object):
 			``2`` if two-pass method requested and both passes feasible.
 
 		Raises:
-			ValueError: If no solvers avaialable.
+			ValueError: If no solvers avaialable, or if requested
+				backend cannot solve the problem.
 		"""
 		if self.solver_cvxpy is None and self.solver_pogs is None:
 			raise ValueError(
@@ -329,12 +476,20 @@ class PlanningProblem(object):
 		use_slack = options.pop('dvh_slack', slack)
 		use_2pass = options.pop('dvh_exact', exact_constraints)
 		use_2pass &= self.__verify_2pass_applicable(structures)
-		self.__set_solver_fastest_available(structures)
-		self.solver.init_problem(n_beams, use_slack=use_slack,
-								 use_2pass=use_2pass, **options)
+		phases = run_output.phases
+		with phases.phase('select_solver'):
+			override = options.pop('backend', None)
+			if override is None and 'solver' in options:
+				override = options.pop('solver')
+			selection = self.__set_solver_fastest_available(
+					structures, override=override)
+			options.update(selection.backend.options)
 
 		# build problem
-		construction_report = self.solver.build(structures, **options)
+		with phases.phase('build'):
+			self.solver.init_problem(n_beams, use_slack=use_slack,
+									 use_2pass=use_2pass, **options)
+			construction_report = self.solver.build(structures, **options)
 
 		if PRINT_PROBLEM_CONSTRUCTION:
 			print('\nPROBLEM CONSTRUCTION:')
@@ -342,34 +497,88 @@ class PlanningProblem(object):
 				print(cr)
 
 		# solve
-		run_output.feasible = self.solver.solve(**options)
+		solve_options = dict(options)
+		solve_options.update(self.__warm_start_options(warm_start, n_beams))
+		run_output.feasible = self.__timed_solve(run_output, **solve_options)
 
 		# relay output to run_output object
-		self.__gather_solver_info(run_output)
-		self.__gather_solver_vars(run_output)
-		self.__gather_dvh_slopes(run_output, structures)
-		self.__gather_constraint_slacks(run_output, structures)
-		run_output.solver_info['time'] = self.solver.solvetime
+		with phases.phase('gather'):
+			self.__gather_solver_info(run_output)
+			run_output.solver_info['solver_selection'] = selection.dict
+			run_output.solver_info['iters_saved'] = None
+			if self.solver.warm_started:
+				run_output.solver_info['iters_saved'] = self.__iters_saved(
+						warm_start, run_output)
+			self.__gather_solver_vars(run_output)
+			self.__gather_dvh_slopes(run_output, structures)
+			self.__gather_constraint_slacks(run_output, structures)
+			run_output.solver_info['time'] = self.solver.solvetime
 
 		if not run_output.feasible:
 			return 0
 
 		# relay output to structures
-		for s in structures:
-			self.__update_structure(s)
+		calculate_dose = dose_calculation is None
+		with phases.phase('dose'):
+			if not calculate_dose:
+				dose_calculation(self.solver.x)
+			for s in structures:
+				self.__update_structure(s, calculate_dose=calculate_dose)
 
 		# second pass, if applicable
 		if use_2pass and run_output.feasible:
-			self.solver.build(structures, exact=True)
-			self.solver.solve(**options)
-
-			self.__gather_solver_info(run_output, exact=True)
-			self.__gather_solver_vars(run_output, exact=True)
-			run_output.solver_info['time_exact'] = self.solver.solvetime
-
-			for s in structures:
-				self.__update_structure(s, exact=True)
+			# second pass shares first-pass terms and dose expressions
+			# (see solver build); it is not warm started, since the
+			# exact constraints make it a new problem, and solvers
+			# cannot seed a new problem with the first-pass iterate
+			with phases.phase('build_exact'):
+				self.solver.build(structures, exact=True)
+			self.__timed_solve(run_output, exact=True, **options)
+
+			with phases.phase('gather_exact'):
+				self.__gather_solver_info(run_output, exact=True)
+				self.__gather_solver_vars(run_output, exact=True)
+				run_output.solver_info['time_exact'] = self.solver.solvetime
+
+			with phases.phase('dose_exact'):
+				if not calculate_dose:
+					dose_calculation(self.solver.x)
+				for s in structures:
+					self.__update_structure(
+							s, exact=True, calculate_dose=calculate_dose)
 
 			return 2
 		else:
-			return 1
\ No newline at end of file
+			return 1
+
+	def calibrate_solvers(self, sizes=None, repeats=1, **options):
+		"""
+		Calibrate cost models of solver backends on this machine.
+
+		Times each available backend in :attr:`PlanningProblem.registry`
+		on small probe problems, and rescales its cost model to match.
+
+		Arguments:
+			sizes (optional): List of ``(voxels, beams)`` probe sizes;
+				see :meth:`SolverRegistry.calibrate`.
+			repeats (:obj:`int`, optional): Number of timings per
+				probe; the fastest is used.
+			**options: Keyword arguments passed to
+				:meth:`PlanningProblem.solve`.
+
+		Returns:
+			:obj:`dict`: Calibrated cost model scale of each backend,
+			keyed by backend name.
+		"""
+		# keep probe problems out of the shared solver cache store
+		options.setdefault('auto_cache', False)
+
+		def timer(backend, structures):
+			start = timeit.default_timer()
+			self.solve(structures, RunOutput(), backend=backend.name,
+					   **options)
+			return timeit.default_timer() - start
+
+		return self.registry.calibrate(
+				timer, sizes=sizes, repeats=repeats,
+				solvers=self.__solver_kinds)
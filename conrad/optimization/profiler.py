@@ -0,0 +1,177 @@
+"""
+Define :class:`PhaseProfile`, record of wall-clock and CPU time spent in
+each phase of a treatment planning run.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import time
+import timeit
+import contextlib
+import collections
+import numpy as np
+
+if hasattr(time, 'process_time'):
+	cpu_time = time.process_time
+else:
+	# python 2: processor time on POSIX systems
+	cpu_time = time.clock
+
+class PhaseProfile(object):
+	"""
+	Wall-clock and CPU time spent in named phases of a planning run.
+
+	Phases are recorded in the order they are first entered; repeated
+	entries into a phase accumulate. CPU time is the processor time of
+	the current process, so that it exceeds wall-clock time when
+	multi-threaded libraries (e.g., BLAS, solvers) run in parallel.
+	"""
+	def __init__(self):
+		""" Initialize empty :class:`PhaseProfile`. """
+		self.__phases = collections.OrderedDict()
+
+	def __len__(self):
+		return len(self.__phases)
+
+	def __contains__(self, name):
+		return name in self.__phases
+
+	def __iter__(self):
+		return iter(self.__phases)
+
+	def __getitem__(self, name):
+		"""
+		Timing of phase ``name``.
+
+		Returns:
+			:obj:`dict`: Wall-clock time (``'wall'``) and CPU time
+			(``'cpu'``) in seconds, and number of entries into phase
+			(``'calls'``).
+
+		Raises:
+			KeyError: If no phase named ``name`` recorded.
+		"""
+		return dict(self.__phases[name])
+
+	@property
+	def phases(self):
+		""" Names of recorded phases, in order. """
+		return list(self.__phases.keys())
+
+	@contextlib.contextmanager
+	def phase(self, name):
+		"""
+		Context manager that records time spent in its body as ``name``.
+
+		Arguments:
+			name (:obj:`str`): Name of phase.
+		"""
+		wall, cpu = timeit.default_timer(), cpu_time()
+		try:
+			yield
+		finally:
+			self.add(name, timeit.default_timer() - wall, cpu_time() - cpu)
+
+	def add(self, name, wall, cpu=None, calls=1):
+		"""
+		Add time to phase ``name``.
+
+		Arguments:
+			name (:obj:`str`): Name of phase.
+			wall (:obj:`float`): Wall-clock time, in seconds.
+			cpu (:obj:`float`, optional): CPU time, in seconds; if not
+				provided, CPU time of phase is unaffected. If ``NaN``,
+				the phase's CPU time is not measured separately (i.e.,
+				it is counted in another phase), and is reported as
+				``NaN``.
+			calls (:obj:`int`, optional): Number of entries into phase.
+
+		Returns:
+			None
+		"""
+		entry = self.__phases.setdefault(
+				name, {'wall': 0., 'cpu': 0., 'calls': 0})
+		entry['wall'] += float(wall)
+		if cpu is not None:
+			entry['cpu'] += float(cpu)
+		entry['calls'] += int(calls)
+
+	def __iadd__(self, other):
+		"""
+		Overload operator +=.
+
+		Accumulate phases recorded in ``other``.
+
+		Raises:
+			TypeError: If ``other`` not of type :class:`PhaseProfile`.
+		"""
+		if not isinstance(other, PhaseProfile):
+			raise TypeError('operator += only defined for rvalues of '
+							'type {}'.format(PhaseProfile))
+		for name in other:
+			entry = other[name]
+			self.add(name, entry['wall'], entry['cpu'], entry['calls'])
+		return self
+
+	@property
+	def wall(self):
+		""" Total wall-clock time of all phases, in seconds. """
+		return sum(entry['wall'] for entry in self.__phases.values())
+
+	@property
+	def cpu(self):
+		"""
+		Total CPU time of all phases, in seconds.
+
+		Phases with CPU time ``NaN`` are counted in other phases, and
+		skipped.
+		"""
+		return float(np.nansum(
+				[entry['cpu'] for entry in self.__phases.values()]))
+
+	@property
+	def table(self):
+		"""
+		Flat table of phase timings.
+
+		Returns:
+			:obj:`list` of :obj:`dict`: One row per phase, in order,
+			with entries ``'phase'``, ``'wall'``, ``'cpu'``, ``'calls'``
+			and ``'fraction'`` (share of total wall-clock time).
+		"""
+		total = self.wall
+		rows = []
+		for name, entry in self.__phases.items():
+			row = {'phase': name}
+			row.update(entry)
+			row['fraction'] = entry['wall'] / total if total > 0 else np.nan
+			rows.append(row)
+		return rows
+
+	def __str__(self):
+		lines = ['{:<24} {:>10} {:>10} {:>6} {:>7}'.format(
+				'phase', 'wall (s)', 'cpu (s)', 'calls', '% wall')]
+		for row in self.table:
+			lines.append('{:<24} {:>10.4f} {:>10.4f} {:>6} {:>6.1f}%'.format(
+					row['phase'], row['wall'], row['cpu'], row['calls'],
+					100 * row['fraction']))
+		lines.append('{:<24} {:>10.4f} {:>10.4f}'.format(
+				'total', self.wall, self.cpu))
+		return '\n'.join(lines)
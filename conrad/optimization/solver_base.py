@@ -81,6 +81,15 @@ class Solver(object):
 			constraint in the problem.
 		feasible (:obj:`bool`): ``True`` if most recent optimization run
 			was feasible.
+		warm_started (:obj:`bool`): ``True`` if most recent optimization
+			run was started from a supplied iterate.
+		content_hash (:obj:`bool`): If ``True``, solvers compare
+			structure dose matrices between builds by content hash,
+			so that bit-identical matrices (e.g., after re-slicing or
+			reloading a case) are not rebuilt; otherwise (default), by
+			version stamp only. Hashing reads each matrix whose version
+			changes, and is skipped for the full dose matrices of
+			collapsable structures.
 	"""
 	def __init__(self):
 		"""
@@ -96,6 +105,8 @@ class Solver(object):
 		self.dvh_vars = {}
 		self.slack_vars = {}
 		self.feasible = False
+		self.warm_started = False
+		self.content_hash = False
 		self.__global_weight_scaling = 1.
 		self.__global_dose_scaling = 1.
 
@@ -150,6 +161,19 @@ class Solver(object):
 			raise ValueError('argument "priority" must be one of: '
 							 '{1, 2, 3}')
 
+	def __matrix_key(self, structure, mean=False):
+		"""
+		Key to data of full (or, if ``mean`` is ``True``, mean) dose
+		matrix of ``structure``: its content hash if
+		:attr:`Solver.content_hash` is ``True``, and its version stamp
+		otherwise. The full dose matrix of a collapsable structure is
+		always keyed by version stamp, so that it is not read (or, if
+		assigned lazily, materialized) just to be hashed.
+		"""
+		if self.content_hash and (mean or not structure.collapsable):
+			return structure.A_digest(mean)
+		return structure.A_version
+
 	def init_problem(self, n_beams, **options):
 		""" Prototype for problem initialization. """
 		raise RuntimeError('solver method "init_problem" not implemented')
@@ -179,8 +203,8 @@ class Solver(object):
 		"""
 		cols = [0] * len(structures)
 		for i, s in enumerate(structures):
-			if s.A is not None:
-				cols[i] = s.A.shape[1]
+			if s.A_shape is not None:
+				cols[i] = s.A_shape[1]
 			elif s.A_mean is not None:
 				cols[i] = s.A_mean.size
 			else:
@@ -209,10 +233,9 @@ class Solver(object):
 		"""
 		report = []
 		for structure in structures:
-			A = structure.A
-			if A is not None:
+			if structure.A_shape is not None:
 				matrix_info = str('using dose matrix, dimensions {}x{}'.format(
-							  *structure.A.shape))
+							  *structure.A_shape))
 			if structure.is_target:
 				reason  = 'structure is target'
 			else:
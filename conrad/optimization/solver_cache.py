@@ -0,0 +1,206 @@
+"""
+Content-addressed store of solver caches (equilibrated matrices,
+preconditioners and projector factorizations), keyed by fingerprints
+of assembled dose matrices.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import os
+import hashlib
+import collections
+import numpy as np
+
+from conrad.defs import update_digest
+from conrad.abstract.cache import entry_bytes
+
+SOLVER_CACHE_CAPACITY_DEFAULT = 4
+SOLVER_CACHE_BUDGET_DEFAULT = 2**28
+
+def matrix_fingerprint(A, structures, frame=None, backend=None):
+	"""
+	Fingerprint of a dose matrix assembled from ``structures``.
+
+	Arguments:
+		A: Assembled dose matrix, as :class:`numpy.ndarray`,
+			:class:`scipy.sparse.csr_matrix` or
+			:class:`scipy.sparse.csc_matrix`.
+		structures: Iterable collection of
+			:class:`~conrad.medicine.Structure` objects from which
+			``A`` was assembled.
+		frame (optional): Name of the physics frame that supplied the
+			structures' dose matrices.
+		backend (optional): Description of numerical backend, e.g.,
+			device and precision.
+
+	Returns:
+		:obj:`str`: Hexadecimal SHA-1 digest of the structure layout
+		(order, sizes and collapsable flags), ``frame``, ``backend``,
+		and the matrix data type, format, shape and contents.
+	"""
+	digest = hashlib.sha1()
+	layout = [(s.label, s.size, bool(s.collapsable)) for s in structures]
+	digest.update(str((layout, frame, backend)).encode())
+	update_digest(digest, A)
+	return digest.hexdigest()
+
+def _flatten(cache, prefix=''):
+	flat = {}
+	for key, value in cache.items():
+		if isinstance(value, dict):
+			flat.update(_flatten(value, prefix + key + '/'))
+		elif value is not None:
+			flat[prefix + key] = value
+	return flat
+
+def _cache_bytes(cache):
+	return sum(entry_bytes(value) for value in _flatten(cache).values())
+
+def _unflatten(flat):
+	cache = {}
+	for key, value in flat.items():
+		entry = cache
+		path = key.split('/')
+		for k in path[:-1]:
+			entry = entry.setdefault(k, {})
+		if isinstance(value, np.ndarray) and value.ndim == 0:
+			value = value.item()
+		entry[path[-1]] = value
+	return cache
+
+class SolverCacheStore(object):
+	"""
+	Least recently used store of solver caches, keyed by fingerprint.
+
+	Entries are held in memory, up to a capacity and a byte budget;
+	since each entry holds (at least) a copy of a dose matrix, least
+	recently used entries are evicted to meet the budget, and entries
+	larger than the budget are not held in memory at all. If a
+	directory is given, entries are also written there as
+	``<fingerprint>.npz`` files, and lookups that miss in memory fall
+	back to the directory, so that caches persist across sessions.
+
+	Attributes:
+		capacity (:obj:`int`): Maximum number of entries held in
+			memory.
+		budget (:obj:`int`): Maximum bytes held by entries in memory,
+			or ``None`` if unbounded.
+		directory (:obj:`str`): Directory for persisted entries, or
+			``None``.
+		hits (:obj:`int`): Number of successful lookups.
+		misses (:obj:`int`): Number of failed lookups.
+	"""
+	def __init__(self, capacity=SOLVER_CACHE_CAPACITY_DEFAULT,
+				 directory=None, budget=SOLVER_CACHE_BUDGET_DEFAULT):
+		self.capacity = int(capacity)
+		self.budget = None if budget is None else int(budget)
+		self.directory = directory
+		self.hits = 0
+		self.misses = 0
+		self.__entries = collections.OrderedDict()
+		self.__bytes = {}
+
+	def __len__(self):
+		return len(self.__entries)
+
+	def __contains__(self, key):
+		return key in self.__entries or (
+				self.__path(key) is not None and
+				os.path.exists(self.__path(key)))
+
+	@property
+	def nbytes(self):
+		""" Bytes held by entries in memory. """
+		return sum(self.__bytes.values())
+
+	def __path(self, key):
+		if self.directory is None:
+			return None
+		return os.path.join(self.directory, '{}.npz'.format(key))
+
+	def __insert(self, key, cache):
+		self.__entries[key] = cache
+		self.__bytes[key] = _cache_bytes(cache)
+		budget = self.budget
+		while len(self.__entries) > max(self.capacity, 0) or (
+				budget is not None and self.nbytes > budget):
+			evicted, _ = self.__entries.popitem(last=False)
+			del self.__bytes[evicted]
+
+	def lookup(self, key):
+		"""
+		Retrieve solver cache stored under ``key``.
+
+		Arguments:
+			key (:obj:`str`): Fingerprint, e.g., from
+				:func:`matrix_fingerprint`.
+
+		Returns:
+			:obj:`dict`: Copy of stored solver cache (so that callers
+			may consume its entries), or ``None`` if no entry found.
+		"""
+		cache = self.__entries.pop(key, None)
+		self.__bytes.pop(key, None)
+		if cache is None:
+			path = self.__path(key)
+			if path is not None and os.path.exists(path):
+				with np.load(path) as data:
+					cache = _unflatten({k: data[k] for k in data.files})
+		if cache is None:
+			self.misses += 1
+			return None
+		self.hits += 1
+		self.__insert(key, cache)
+		return _unflatten(_flatten(cache))
+
+	def store(self, key, cache):
+		"""
+		Store solver ``cache`` under ``key``.
+
+		Arguments:
+			key (:obj:`str`): Fingerprint, e.g., from
+				:func:`matrix_fingerprint`.
+			cache (:obj:`dict`): Solver cache, possibly nested, with
+				array or scalar values; ``None`` values are dropped.
+
+		Returns:
+			None
+		"""
+		if cache is None:
+			return
+		cache = _unflatten(_flatten(cache))
+		self.__entries.pop(key, None)
+		self.__bytes.pop(key, None)
+		self.__insert(key, cache)
+		path = self.__path(key)
+		if path is not None:
+			if not os.path.exists(self.directory):
+				os.makedirs(self.directory)
+			np.savez(path, **_flatten(cache))
+
+	def clear(self):
+		""" Drop entries held in memory, and reset counters. """
+		self.__entries.clear()
+		self.__bytes.clear()
+		self.hits = 0
+		self.misses = 0
+
+# store shared by solvers that are not given one explicitly
+SOLVER_CACHE_STORE = SolverCacheStore()
@@ -34,10 +34,12 @@ along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
 """
 from conrad.compat import *
 
-import time
+import timeit
 import numpy as np
+import scipy.sparse as sp
 
-from conrad.defs import vec as conrad_vec, module_installed, println
+from conrad.defs import vec as conrad_vec, module_installed, println, \
+						cvxpy_var_size, LazyModule
 from conrad.medicine.dose import Constraint, MeanConstraint, MinConstraint, \
 								 MaxConstraint, PercentileConstraint
 from conrad.medicine.anatomy import Anatomy
@@ -45,12 +47,14 @@ from conrad.optimization.preprocessing import ObjectiveMethods
 from conrad.optimization.solver_base import *
 
 if module_installed('cvxpy'):
-	import cvxpy
+	# imported on first use
+	cvxpy = LazyModule('cvxpy')
 
+	# names of cvxpy solvers, as in cvxpy.SCS and cvxpy.ECOS
 	if module_installed('scs'):
-		SOLVER_DEFAULT = cvxpy.SCS
+		SOLVER_DEFAULT = 'SCS'
 	else:
-		SOLVER_DEFAULT = cvxpy.ECOS
+		SOLVER_DEFAULT = 'ECOS'
 
 	class SolverCVXPY(Solver):
 		"""
@@ -69,6 +73,21 @@ if module_installed('cvxpy'):
 		Attributes:
 			problem (:class:`cvxpy.Minimize`): CVXPY representation of
 				optimization problem.
+			use_dose_variables (:obj:`bool`): When ``True``, each
+				structure whose dose is referenced by more than one
+				objective or constraint term is given an auxiliary
+				dose variable ``y_s``, with the single coupling
+				constraint ``y_s == A_s * x``, so that the structure's
+				dose matrix appears exactly once in the problem.
+			persistent (:obj:`bool`): When ``True``, objective weights
+				and doses, constraint doses and slack penalties are
+				represented by :class:`cvxpy.Parameter` objects, and
+				the problem is kept between calls to
+				:meth:`SolverCVXPY.build`. Rebuilding after edits that
+				only change those values updates the parameters and
+				reuses the problem (and its cached canonicalization);
+				otherwise, only terms for structures whose objective or
+				constraint layout changed are rebuilt.
 			constraint_dual_vars (:obj:`dict`): Dictionary, keyed by
 				constraint ID, of dual variables associated with each
 				dose constraint in the CVXPY problem representation.
@@ -93,8 +112,17 @@ if module_installed('cvxpy'):
 			self.problem = None
 			self.__x = cvxpy.Variable(0)
 			self.__constraint_indices = {}
+			self.__doses = {}
+			self.__blocks = {}
+			self.__block_order = []
+			self.__block = None
+			self.__selections = {}
+			self.__last_solved = None
 			self.constraint_dual_vars = {}
 			self.__solvetime = np.nan
+			self.__setuptime = np.nan
+			self.use_dose_variables = True
+			self.persistent = False
 
 			if isinstance(n_beams, int):
 				self.init_problem(n_beams, **options)
@@ -118,16 +146,27 @@ if module_installed('cvxpy'):
 					percentile-type dose constraints as exact
 					constraints instead of convex restrictions thereof,
 					assuming other requirements are met.
-				**options: Arbitrary keyword arguments.
+				**options: Arbitrary keyword arguments. Keywords
+					``dose_variables``, ``persistent`` and
+					``content_hash`` set
+					:attr:`SolverCVXPY.use_dose_variables`,
+					:attr:`SolverCVXPY.persistent` and
+					:attr:`SolverCVXPY.content_hash`, respectively.
 
 			Returns:
 				None
 			"""
-			self.__x = cvxpy.Variable(n_beams)
-			self.clear()
+			persistent = bool(options.pop('persistent', False))
+			if not (persistent and self.persistent and
+					self.problem is not None and n_beams == self.n_beams):
+				self.__x = cvxpy.Variable(n_beams)
+				self.clear()
+			self.persistent = persistent
 
 			self.use_slack = use_slack
 			self.use_2pass = use_2pass
+			self.use_dose_variables = bool(options.pop('dose_variables', True))
+			self.content_hash = bool(options.pop('content_hash', False))
 			self.gamma = options.pop('gamma', GAMMA_DEFAULT)
 
 		@property
@@ -145,16 +184,124 @@ if module_installed('cvxpy'):
 
 			Reset dictionaries of:
 				- Slack variables (all dose constraints),
-				- Dual variables (all dose constraints), and
-				- Slope variables for convex restrictions (percentile dose constraints).
+				- Dual variables (all dose constraints),
+				- Slope variables for convex restrictions (percentile dose constraints), and
+				- Shared dose expressions (all structures), and
+				- Per-structure problem terms kept for persistent builds.
 			"""
 			self.problem = cvxpy.Problem(cvxpy.Minimize(0), [self.__x >= 0])
 			self.dvh_vars = {}
 			self.slack_vars = {}
 			self.constraint_dual_vars = {}
+			self.__constraint_indices = {}
+			self.__doses = {}
+			self.__blocks = {}
+			self.__block_order = []
+
+		def __parameter(self, value, sign='unknown'):
+			"""
+			Represent a constant in the problem under construction.
+
+			Arguments:
+				value: Callable returning the current value of the
+					constant.
+				sign (:obj:`str`, optional): Sign of
+					:class:`cvxpy.Parameter`, if one is formed.
+
+			Returns:
+				The current value if :attr:`SolverCVXPY.persistent` is
+				``False``. Otherwise, a :class:`cvxpy.Parameter` set to
+				the current value and registered with the structure's
+				terms so that it is refreshed by later builds.
+			"""
+			if not self.persistent or self.__block is None:
+				return value()
+			parameter = cvxpy.Parameter(sign=sign)
+			parameter.value = value()
+			self.__block['parameters'].append((parameter, value))
+			return parameter
+
+		@staticmethod
+		def __dose_references(structure):
+			"""
+			Count problem terms that reference full dose of ``structure``.
+
+			The objective counts once, unless ``structure`` is
+			collapsable (i.e., planned by mean dose only); each minimum,
+			maximum and percentile dose constraint counts once.
+			"""
+			references = int(not structure.collapsable)
+			for c in structure.constraints.list:
+				if isinstance(c, (
+						MinConstraint, MaxConstraint, PercentileConstraint)):
+					references += 1
+			return references
+
+		def dose_expression(self, structure):
+			"""
+			Shared :mod:`cvxpy` expression for dose to ``structure``.
+
+			The expression is built on the first request for each
+			structure label after :meth:`SolverCVXPY.clear` (or after
+			the data of the structure's dose matrix changes), and the same
+			expression is returned to every subsequent caller, so that
+			the objective and all dose constraints on the structure
+			share one dose expression, including across the two passes
+			of two-pass planning. If
+			:attr:`SolverCVXPY.use_dose_variables` is ``True`` and the
+			dose is referenced by more than one term of the problem, the
+			expression is an auxiliary variable ``y_s``, and the
+			constraint ``y_s == A_s * x`` is added to the problem;
+			otherwise, it is the product ``A_s * x``.
+
+			Arguments:
+				structure (:class:`~conrad.medicine.Structure`):
+					Structure with full dose matrix.
+
+			Returns:
+				:mod:`cvxpy` expression of length :attr:`Structure.size`.
+			"""
+			if structure.label in self.__doses:
+				dose, coupling, matrix_key = self.__doses[structure.label]
+				if matrix_key == self._Solver__matrix_key(structure):
+					return dose
+			dose = structure.A * self.__x
+			coupling = None
+			shared = self.__dose_references(structure) > 1
+			if self.use_dose_variables and shared:
+				y = cvxpy.Variable(structure.A.shape[0])
+				coupling = y == dose
+				self.problem.constraints += [coupling]
+				dose = y
+			self.__doses[structure.label] = (
+					dose, coupling, self._Solver__matrix_key(structure))
+			return dose
+
+		def mean_dose_expression(self, structure):
+			"""
+			Shared :mod:`cvxpy` expression for mean dose to ``structure``.
+
+			Arguments:
+				structure (:class:`~conrad.medicine.Structure`):
+					Structure with mean dose matrix.
+
+			Returns:
+				:mod:`cvxpy` expression of length ``1``, ``A_mean * x``.
+			"""
+			key = (structure.label, 'mean')
+			if key in self.__doses:
+				dose, _, matrix_key = self.__doses[key]
+				if matrix_key == self._Solver__matrix_key(structure, True):
+					return dose
+			A_mean = structure.A_mean
+			dose = A_mean.reshape((1, A_mean.size)) * self.__x
+			self.__doses[key] = (
+					dose, None, self._Solver__matrix_key(structure, True))
+			return dose
 
 		@staticmethod
-		def __percentile_constraint_restricted(A, x, constr, beta, slack=None):
+		def __percentile_constraint_restricted(dose_expr, constr, beta,
+											   slack=None, dose=None):
 			r"""
 			Form convex restriction to DVH constraint.
 
@@ -174,11 +321,14 @@ if module_installed('cvxpy'):
 			   threshold.}
 
 			Arguments:
-				A: Structure-specific dose matrix to use in constraint.
-				x (:class:`cvxpy.Variable`): Beam intensity variable.
+				dose_expr: :mod:`cvxpy` expression for structure dose,
+					e.g., ``A * x``.
 				constr (:class:`PercentileConstraint`): Dose constraint.
 				slack (:obj:`bool`, optional): If ``True``, include
 					slack variable in constraint formulation.
+				dose (optional): Dose bound to use in place of
+					``constr.dose.value``, e.g., a
+					:class:`cvxpy.Parameter`.
 
 			Returns:
 				:class:`cvxpy.Constraint`: :mod:`cvxpy` representation
@@ -195,26 +345,37 @@ if module_installed('cvxpy'):
 
 			sign = 1 if constr.upper else -1
 			fraction = float(sign < 0) + sign * constr.percentile.fraction
-			p = fraction * A.shape[0]
-			dose = constr.dose.value
+			p = fraction * cvxpy_var_size(dose_expr)
+			if dose is None:
+				dose = constr.dose.value
 			if slack is None:
 				slack = 0.
 			return cvxpy.sum_entries(cvxpy.pos(
-					beta + sign * (A*x - (dose + sign * slack)) )) <= beta * p
+					beta + sign * (dose_expr - (dose + sign * slack)) )) <= \
+					beta * p
 
 		@staticmethod
-		def __percentile_constraint_exact(A, x, y, constr, had_slack=False):
+		def __percentile_constraint_exact(dose_expr, y, constr,
+										  had_slack=False, selections=None):
 			"""
 			Form exact version of DVH constraint.
 
+			The voxels selected for the exact constraint are picked out
+			of the shared structure dose expression by a sparse
+			selection matrix, so no rows of the dose matrix are copied.
+			If a cache is provided, the selection matrix is reused when
+			the same voxels are selected again for ``constr``.
+
 			Arguments:
-				A: Structure-specific dose matrix to use in constraint.
-				x (:class:`cvxpy.Variable`): Beam intensity variable.
+				dose_expr: :mod:`cvxpy` expression for structure dose,
+					e.g., ``A * x``.
 				y: Vector of doses, feasible with respect to constraint
 					``constr``.
 				constr (:class:`PercentileConstraint`): Dose constraint.
 				slack (:obj:`bool`, optional): If ``True``, include
 					slack variable in constraint formulation.
+				selections (:obj:`dict`, optional): Cache of selection
+					matrices, keyed by ``id(constr)``.
 
 			Returns:
 				:class:`cvxpy.Constraint`: :mod:`cvxpy` representation
@@ -231,8 +392,22 @@ if module_installed('cvxpy'):
 			sign = 1 if constr.upper else -1
 			dose = constr.dose_achieved if had_slack else constr.dose
 			idx_exact = constr.get_maxmargin_fulfillers(y, had_slack)
-			A_exact = np.copy(A[idx_exact, :])
-			return sign * (A_exact * x - dose.value) <= 0
+			n_exact = len(idx_exact)
+			shape = (n_exact, cvxpy_var_size(dose_expr))
+
+			selection = None
+			if selections is not None and id(constr) in selections:
+				idx_cached, selection = selections[id(constr)]
+				if selection.shape != shape or \
+						not np.array_equal(idx_cached, idx_exact):
+					selection = None
+			if selection is None:
+				selection = sp.csr_matrix(
+						(np.ones(n_exact), (np.arange(n_exact), idx_exact)),
+						shape=shape)
+				if selections is not None:
+					selections[id(constr)] = (np.copy(idx_exact), selection)
+			return sign * (selection * dose_expr - dose.value) <= 0
 
 		def __add_constraints(self, structure, exact=False):
 			"""
@@ -291,15 +466,20 @@ if module_installed('cvxpy'):
 
 			for cid in structure.constraints:
 				c = structure.constraints[cid]
+				dose = self.__parameter(
+						lambda cid=cid: structure.constraints[cid].dose.value)
 				cslack = not exact and self.use_slack and c.priority > 0
 				if cslack:
-					gamma = self.gamma_prioritized(c.priority)
+					gamma = self.__parameter(
+							lambda cid=cid: self.gamma_prioritized(
+									structure.constraints[cid].priority),
+							sign='positive')
 					slack = cvxpy.Variable(1)
 					self.slack_vars[cid] = slack
 					self.problem.objective += cvxpy.Minimize(gamma * slack)
 					self.problem.constraints += [slack >= 0]
 					if not c.upper:
-						self.problem.constraints += [slack <= c.dose.value]
+						self.problem.constraints += [slack <= dose]
 				else:
 					slack = 0.
 					self.slack_vars[cid] = None
@@ -307,27 +487,28 @@ if module_installed('cvxpy'):
 				if isinstance(c, MeanConstraint):
 					if c.upper:
 						self.problem.constraints += [
-								structure.A_mean * self.__x - slack <=
-								c.dose.value]
+								self.mean_dose_expression(structure) -
+								slack <= dose]
 					else:
 						self.problem.constraints += [
-								structure.A_mean * self.__x + slack >=
-								c.dose.value]
+								self.mean_dose_expression(structure) +
+								slack >= dose]
 
 				elif isinstance(c, MinConstraint):
-					self.problem.constraints += \
-						[structure.A * self.__x >= c.dose.value]
+					self.problem.constraints += [
+							self.dose_expression(structure) >= dose]
 
 				elif isinstance(c, MaxConstraint):
-					self.problem.constraints += \
-						[structure.A * self.__x <= c.dose.value]
+					self.problem.constraints += [
+							self.dose_expression(structure) <= dose]
 
 				elif isinstance(c, PercentileConstraint):
 					if exact:
 						# build exact constraint
 						dvh_constr = self.__percentile_constraint_exact(
-								structure.A, self.__x, structure.y, c,
-								had_slack=self.use_slack)
+								self.dose_expression(structure),
+								structure.y, c, had_slack=self.use_slack,
+								selections=self.__selections)
 
 						# add it to problem
 						self.problem.constraints += [ dvh_constr ]
@@ -340,7 +521,8 @@ if module_installed('cvxpy'):
 
 						# build convex restriction to constraint
 						dvh_constr = self.__percentile_constraint_restricted(
-							structure.A, self.__x, c, beta, slack)
+							self.dose_expression(structure), c, beta, slack,
+							dose=dose)
 
 						# add it to problem
 						self.problem.constraints += [ dvh_constr ]
@@ -428,9 +610,18 @@ if module_installed('cvxpy'):
 
 		@property
 		def solvetime(self):
-			""" Solver run time. """
+			""" Wall-clock time of :meth:`SolverCVXPY.solve`. """
 			return self.__solvetime
 
+		@property
+		def setuptime(self):
+			"""
+			Wall-clock time of :meth:`SolverCVXPY.solve` spent before
+			the numerical solver ran (e.g., in canonicalization), or
+			``NaN`` if :mod:`cvxpy` does not report solver time.
+			"""
+			return self.__setuptime
+
 		@property
 		def status(self):
 			""" Solver status. """
@@ -454,6 +645,153 @@ if module_installed('cvxpy'):
 				return structure.objective.expr(
 						structure.A * self.x, structure.voxel_weights)
 
+		def __structure_signature(self, structure, exact=False):
+			"""
+			Summarize layout of problem terms contributed by ``structure``.
+
+			Two builds that yield equal signatures for a structure differ
+			at most in values represented by :class:`cvxpy.Parameter`
+			objects in a persistent build (objective weights and doses,
+			constraint doses, slack penalties), so the structure's terms
+			from the earlier build can be reused. Dose matrices enter
+			the signature by content hash or version stamp (see
+			:attr:`SolverCVXPY.content_hash`), rather than by identity.
+
+			Returns:
+				:obj:`tuple`, or ``None`` if ``exact`` is ``True`` and
+				``structure`` has percentile constraints, since exact
+				constraints depend on the structure's current dose and
+				are always rebuilt.
+			"""
+			constraints = []
+			for cid in structure.constraints:
+				c = structure.constraints[cid]
+				fraction = None
+				if isinstance(c, PercentileConstraint):
+					if exact:
+						return None
+					fraction = c.percentile.fraction
+				cslack = not exact and self.use_slack and c.priority > 0
+				constraints.append((cid, type(c), c.upper, fraction, cslack))
+			return (
+					id(structure),
+					None if structure.collapsable else
+					self._Solver__matrix_key(structure),
+					self._Solver__matrix_key(structure, True),
+					id(structure.voxel_weights), structure.collapsable,
+					id(structure.objective), self.use_dose_variables,
+					tuple(constraints))
+
+		@staticmethod
+		def __block_decision(block, signature):
+			"""
+			Describe whether terms in ``block`` can be reused for a
+			structure with current ``signature``, and if not, why.
+			"""
+			if block is None:
+				return 'built'
+			if signature is None:
+				return 'rebuilt (exact constraints)'
+			previous = block['signature']
+			if previous == signature:
+				return 'reused'
+			if previous is not None and previous[1:3] != signature[1:3] and \
+					previous[:1] + previous[3:] == signature[:1] + signature[3:]:
+				return 'rebuilt (dose matrix data changed)'
+			return 'rebuilt'
+
+		def __build_block(self, structure, signature, exact=False):
+			"""
+			Form objective and constraint terms for ``structure``.
+
+			Terms are built into a scratch problem, and collected with
+			the slack, slope and dose variables they introduce, so that
+			they can be assembled into :attr:`SolverCVXPY.problem` and
+			reused by later builds. Dose expressions from earlier builds
+			are reused (with their coupling constraints) by structures
+			that are not collapsable.
+
+			Returns:
+				:obj:`dict`: Terms and variables for ``structure``.
+			"""
+			block = {'signature': signature, 'parameters': []}
+			objective_parameters = {} if self.persistent else None
+
+			problem = self.problem
+			slack_vars, dvh_vars = self.slack_vars, self.dvh_vars
+			indices = self.__constraint_indices
+			self.problem = cvxpy.Problem(cvxpy.Minimize(0), [])
+			self.slack_vars, self.dvh_vars = {}, {}
+			self.__constraint_indices = {}
+			self.__block = block
+			try:
+				# re-couple dose variable kept from an earlier build,
+				# unless structure is now planned by its mean dose
+				if structure.label in self.__doses and \
+						not structure.collapsable:
+					_, coupling, matrix_key = self.__doses[structure.label]
+					if coupling is not None and matrix_key == \
+							self._Solver__matrix_key(structure):
+						self.problem.constraints += [coupling]
+
+				if structure.collapsable:
+					dose = self.mean_dose_expression(structure)
+				else:
+					dose = self.dose_expression(structure)
+				structure.objective.parametrize(objective_parameters)
+				try:
+					self.problem.objective += cvxpy.Minimize(
+							ObjectiveMethods.expr(structure, dose))
+				finally:
+					structure.objective.parametrize(None)
+				self.__add_constraints(structure, exact=exact)
+
+				block['objective'] = self.problem.objective
+				block['constraints'] = list(self.problem.constraints)
+				block['objective_parameters'] = objective_parameters
+				block['slack_vars'] = self.slack_vars
+				block['dvh_vars'] = self.dvh_vars
+				block['constraint_indices'] = self.__constraint_indices
+			finally:
+				self.problem = problem
+				self.slack_vars, self.dvh_vars = slack_vars, dvh_vars
+				self.__constraint_indices = indices
+				self.__block = None
+			return block
+
+		def __update_block(self, structure, block):
+			"""
+			Refresh parameter values in reused terms for ``structure``.
+			"""
+			if block['objective_parameters'] is not None:
+				ObjectiveMethods.normalize(structure)
+				structure.objective.update_parameters(
+						block['objective_parameters'])
+			for parameter, value in block['parameters']:
+				parameter.value = value()
+
+		def __assemble(self, blocks):
+			"""
+			Form :attr:`SolverCVXPY.problem` from per-structure terms.
+
+			The nonnegativity constraint on the beam intensities is
+			always the first constraint of the assembled problem.
+			"""
+			objective = cvxpy.Minimize(0)
+			constraints = [self.__x >= 0]
+			self.slack_vars = {}
+			self.dvh_vars = {}
+			self.__constraint_indices = {}
+			for block in blocks:
+				offset = len(constraints)
+				objective += block['objective']
+				constraints += block['constraints']
+				self.slack_vars.update(block['slack_vars'])
+				self.dvh_vars.update(block['dvh_vars'])
+				for cid, index in block['constraint_indices'].items():
+					self.__constraint_indices[cid] = offset + index
+			self.problem = cvxpy.Problem(objective, constraints)
+
 		def build(self, structures, exact=False, **options):
 			"""
 			Update :mod:`cvxpy` optimization based on structure data.
@@ -468,40 +806,78 @@ if module_installed('cvxpy'):
 			(When constraints include slack variables, a penalty on each
 			slack variable is added to the objective.)
 
+			If :attr:`SolverCVXPY.persistent` is ``True``, terms from the
+			previous build are reused for each structure whose layout is
+			unchanged, after refreshing their parameters. If no
+			structure's terms are rebuilt, :attr:`SolverCVXPY.problem` is
+			kept as is.
+
+			An exact (second-pass) build always reuses the previous
+			build: terms of structures without percentile or slack
+			constraints are kept, and rebuilt terms share the previous
+			dose expressions.
+
 			Arguments:
 				structures: Iterable collection of :class:`Structure`
 					objects.
+				exact (:obj:`bool`, optional): If ``True``, build
+					percentile constraints as exact constraints.
 
 			Returns:
 				:obj:`str`: String documenting how data in
 				``structures`` were parsed to form an optimization
 				problem.
 			"""
-			self.clear()
 			if isinstance(structures, Anatomy):
 				structures = structures.list
-			# A, dose, weight_abs, weight_lin = \
-					# self._Solver__gather_matrix_and_coefficients(structures)
+			if not (self.persistent or exact):
+				self.clear()
 
-			self.problem.objective = cvxpy.Minimize(0)
+			blocks = []
+			rebuilt = False
+			decisions = []
 			for s in structures:
-				self.problem.objective += cvxpy.Minimize(
-						ObjectiveMethods.expr(s, self.__x))
-				self.__add_constraints(s, exact=exact)
-
-			# self.problem.objective = cvxpy.Minimize(
-			# 		weight_abs.T * cvxpy.abs(A * self.__x - dose) +
-			# 		weight_lin.T * (A * self.__x - dose))
-
-			# for s in structures:
-				# self.__add_constraints(s, exact=exact)
+				signature = self.__structure_signature(s, exact)
+				block = self.__blocks.get(s.label, None)
+				decision = self.__block_decision(block, signature)
+				if decision != 'reused':
+					block = self.__build_block(s, signature, exact=exact)
+					rebuilt = True
+				else:
+					self.__update_block(s, block)
+				blocks.append(block)
+				decisions.append('structure {} (label = {}): terms {}'.format(
+						s.name, s.label, decision))
 
-			return self._Solver__construction_report(structures)
+			if exact:
+				# drop selections for constraints no longer planned
+				live = set()
+				for s in structures:
+					for cid in s.constraints:
+						live.add(id(s.constraints[cid]))
+				for key in list(self.__selections.keys()):
+					if key not in live:
+						del self.__selections[key]
+
+			labels = [s.label for s in structures]
+			if rebuilt or labels != self.__block_order:
+				self.__assemble(blocks)
+			self.__blocks = dict(zip(labels, blocks))
+			self.__block_order = labels
+
+			return self._Solver__construction_report(structures) + decisions
 
 		def solve(self, **options):
 			"""
 			Execute optimization of a previously built planning problem.
 
+			Warm starts are supported for SCS: if a starting iterate is
+			supplied (keyword ``x0``), SCS is started from the solution
+			cached by :mod:`cvxpy` for the previous solve of the same
+			:attr:`SolverCVXPY.problem`, e.g., in persistent mode. The
+			value of ``x0`` only signals the request, since
+			:mod:`cvxpy` does not accept iterates from other problems.
+
 			Arguments:
 				**options: Keyword arguments specifying solver options,
 					passed to :meth:`cvxpy.Problem.solve`.
@@ -524,10 +900,14 @@ if module_installed('cvxpy'):
 			maxiter = int(options.pop('maxiter', MAXITER_DEFAULT))
 			use_gpu = bool(options.pop('gpu', GPU_DEFAULT))
 			use_indirect = bool(options.pop('use_indirect', INDIRECT_DEFAULT))
+			warm_start = options.pop('x0', None) is not None
+			warm_start &= solver == cvxpy.SCS
+			warm_start &= self.problem is self.__last_solved
+			self.warm_started = warm_start
 
 			# solve
 			PRINT('running solver...')
-			start = time.clock()
+			start = timeit.default_timer()
 			if solver == cvxpy.ECOS:
 				ret = self.problem.solve(
 						solver=cvxpy.ECOS,
@@ -544,19 +924,27 @@ if module_installed('cvxpy'):
 							verbose=VERBOSE,
 							max_iters=maxiter,
 							eps=reltol,
-							gpu=use_gpu)
+							gpu=use_gpu,
+							warm_start=warm_start)
 				else:
 					ret = self.problem.solve(
 							solver=cvxpy.SCS,
 							verbose=VERBOSE,
 							max_iters=maxiter,
 							eps=reltol,
-							use_indirect=use_indirect)
+							use_indirect=use_indirect,
+							warm_start=warm_start)
 			else:
 				raise ValueError('invalid solver specified: {}\n'
 								 'no optimization performed'.format(solver))
-			self.__solvetime = time.clock() - start
-
+			self.__solvetime = timeit.default_timer() - start
+			self.__last_solved = self.problem
+			stats = getattr(self.problem, 'solver_stats', None)
+			solver_time = getattr(stats, 'solve_time', None)
+			if solver_time is not None:
+				self.__setuptime = max(0., self.__solvetime - solver_time)
+			else:
+				self.__setuptime = np.nan
 
 			PRINT("status: {}".format(self.problem.status))
 			PRINT("optimal value: {}".format(self.problem.value))
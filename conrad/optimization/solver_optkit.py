@@ -37,14 +37,18 @@ along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
 from conrad.compat import *
 
 import numpy as np
+import scipy.sparse as sp
 
-from conrad.defs import module_installed, CONRAD_DEBUG_PRINT
+from conrad.defs import module_installed, CONRAD_DEBUG_PRINT, LazyModule
 from conrad.medicine.anatomy import Anatomy
 from conrad.optimization.preprocessing import ObjectiveMethods
 from conrad.optimization.solver_base import *
+from conrad.optimization.solver_cache import matrix_fingerprint, \
+	SOLVER_CACHE_STORE
 
 if module_installed('optkit'):
-	import optkit as ok
+	# imported on first use
+	ok = LazyModule('optkit')
 
 	class SolverOptkit(Solver):
 		r"""
@@ -77,6 +81,15 @@ if module_installed('optkit'):
 			pogs_solver (:class:`optkit.PogsSolver`): POGS solver with
 				fixed representation of the problem matrix. Must be
 				rebuilt each time the dose matrix is changed.
+			cache_store (:class:`~conrad.optimization.solver_cache.SolverCacheStore`):
+				Store of solver caches, keyed by fingerprints of
+				assembled dose matrices. Shared by all solvers by
+				default.
+			cache_hit (:obj:`bool`): ``True`` if the last rebuild of
+				:attr:`SolverOptkit.pogs_solver` was initialized from
+				:attr:`SolverOptkit.cache_store`, ``False`` if the
+				store missed, and ``None`` if the store was not
+				consulted.
 		"""
 
 		def __init__(self):
@@ -92,10 +105,15 @@ if module_installed('optkit'):
 			self.pogs_solver = None
 			self.__A_current = None
 			self.__A_dict = {}
+			self.__A_order = None
+			self.__update_report = []
 			self.__n_beams = None
 			self.__curr_config = None
 			self.__resume = False
-
+			self.cache_store = SOLVER_CACHE_STORE
+			self.cache_hit = None
+			self.__cache_key = None
+			self.__cache_pending = False
 
 		def init_problem(self, n_beams=None, **options):
 			"""
@@ -334,6 +352,7 @@ if module_installed('optkit'):
 					}
 			}
 			if isinstance(solver_cache, dict):
+				projector = solver_cache.pop('projector', None) or {}
 				cache_options['solver_cache']['A_equil'] = solver_cache.pop(
 						'A_equil', solver_cache.pop('matrix', None))
 				cache_options['solver_cache']['d'] = solver_cache.pop(
@@ -341,7 +360,8 @@ if module_installed('optkit'):
 				cache_options['solver_cache']['e'] = solver_cache.pop(
 						'e', solver_cache.pop('right_preconditioner', None))
 				cache_options['solver_cache']['LLT'] = solver_cache.pop(
-						'LLT', solver_cache.pop('projector_matrix', None))
+						'LLT', solver_cache.pop(
+								'projector_matrix', projector.get('matrix')))
 			cache_options['bypass_initialization'] = bool(
 					cache_options['solver_cache']['A_equil'] is not None and
 					cache_options['solver_cache']['d'] is not None and
@@ -349,20 +369,85 @@ if module_installed('optkit'):
 			return cache_options
 
 		def __check_for_updates(self, structures):
-			A_dict_curr = {s.label: None for s in structures}
+			"""
+			Compare each structure's dose matrix block with the block
+			used to assemble :attr:`SolverOptkit.pogs_solver`'s matrix.
+
+			A block is unchanged if the structure is still (or still
+			not) collapsable, and the structure's matrix has the same
+			version stamp as before or, failing that, the same content
+			hash (see :attr:`SolverOptkit.content_hash`).
+
+			Arguments:
+				structures: Iterable collection of
+					:class:`~conrad.medicine.Structure` objects.
+
+			Returns:
+				:obj:`list`: Labels of structures with changed blocks;
+				all labels if structure order changed.
+			"""
+			blocks_curr = {}
+			changed = []
 			for s in structures:
-				if s.collapsable:
-					A_dict_curr[s.label] = s.A_mean
+				mean = bool(s.collapsable)
+				block = self.__A_dict.get(s.label, None)
+				if block is not None and block['mean'] == mean and \
+						block['version'] == s.A_version:
+					decision = 'unchanged (same version)'
+					digest = block['digest']
 				else:
-					A_dict_curr[s.label] = s.A_full
+					digest = self._Solver__matrix_key(s, mean) if \
+							self.content_hash else None
+					if block is not None and block['mean'] == mean and \
+							digest is not None and block['digest'] == digest:
+						decision = 'unchanged (same content)'
+					else:
+						decision = 'changed'
+						changed.append(s.label)
+				blocks_curr[s.label] = {
+						'mean': mean, 'version': s.A_version,
+						'digest': digest}
+				self.__update_report.append(str(
+						'structure {} (label = {}): dose matrix block {}'
+						''.format(s.name, s.label, decision)))
+
+			labels = [s.label for s in structures]
+			if labels != self.__A_order:
+				changed = labels
+			self.__A_dict = blocks_curr
+			self.__A_order = labels
+			return changed
+
+		def __update_matrix(self, structures, changed):
+			"""
+			Overwrite rows of changed blocks in dense
+			:attr:`SolverOptkit._SolverOptkit__A_current`, if possible.
 
-			updated = True
-			if len(self.__A_dict) > 0:
-				updated = any([
-						self.__A_dict[label] is not A_dict_curr[label]
-						for label in A_dict_curr])
-			self.__A_dict.update(A_dict_curr)
-			return updated
+			Returns:
+				:obj:`bool`: ``True`` if matrix updated in place;
+				``False`` if it must be reassembled.
+			"""
+			A = self.__A_current
+			if not isinstance(A, np.ndarray):
+				return False
+			blocks = [s.A_mean if s.collapsable else s.A_full
+					  for s in structures if s.label in changed]
+			if any(sp.issparse(b) for b in blocks):
+				return False
+			if np.result_type(A.dtype, *[b.dtype for b in blocks]) != A.dtype:
+				return False
+			rows = sum([s.size if not s.collapsable else 1 for s in structures])
+			if A.shape != (rows, self._Solver__check_dimensions(structures)):
+				return False
+
+			ptr = 0
+			for s in structures:
+				size = 1 if s.collapsable else s.size
+				if s.label in changed:
+					A[ptr : ptr + size, :] = s.A_mean if s.collapsable \
+							else s.A_full
+				ptr += size
+			return True
 
 		def __build_matrix(self, structures):
 			r"""Gather dose matrix from ``structures``.
@@ -377,16 +462,41 @@ if module_installed('optkit'):
 				#		append structure's M_structure x N dose matrix to A.
 				# end for
 
+			If any structure's dose matrix is sparse, blocks are stacked
+			into a single sparse matrix (in CSC format if all sparse
+			blocks are CSC, and CSR otherwise), without forming a dense
+			intermediate; mean dose rows of collapsable structures
+			enter as one-row sparse blocks. Otherwise, blocks are copied
+			into a dense matrix. In either case, the assembled matrix
+			has the common data type of the blocks.
+
 			Arguments:
 				structures: Iterable collection of
 					:class:`~conrad.medicine.Structure` objects.
 
 			Returns:
-				:class:`np.ndarray`: Dose matrix
+				:class:`np.ndarray`, :class:`sp.csr_matrix` or
+				:class:`sp.csc_matrix`: Dose matrix
 			"""
 			cols = self._Solver__check_dimensions(structures)
+			blocks = [s.A_mean if s.collapsable else s.A_full
+					  for s in structures]
+			dtype = np.result_type(*[b.dtype for b in blocks])
+
+			if any(sp.issparse(b) for b in blocks):
+				fmt = 'csc' if all(
+						sp.isspmatrix_csc(b) for b in blocks
+						if sp.issparse(b)) else 'csr'
+				blocks = [
+						b if sp.issparse(b) else
+						sp.csr_matrix(np.reshape(b, (-1, cols)))
+						for b in blocks]
+				A = sp.vstack(blocks, format=fmt, dtype=dtype)
+				CONRAD_DEBUG_PRINT('BUILT MATRIX NNZ: {}'.format(A.nnz))
+				return A
+
 			rows = sum([s.size if not s.collapsable else 1 for s in structures])
-			A = np.zeros((rows, cols))
+			A = np.zeros((rows, cols), dtype=dtype)
 			CONRAD_DEBUG_PRINT('BUILT MATRIX SIZE: {}'.format(A.size))
 
 			ptr = 0
@@ -395,7 +505,7 @@ if module_installed('optkit'):
 					A[ptr, :] = s.A_mean[:]
 					ptr += 1
 				else:
-					A[ptr : ptr + s.size, :] += s.A_full
+					A[ptr : ptr + s.size, :] = s.A_full
 					ptr += s.size
 
 			return A
@@ -441,15 +551,37 @@ if module_installed('optkit'):
 			(:attr:`SolverOptkit.objective_voxels` and
 			:attr:`SolverOptkit.objective_beams`). POGS solver's dose
 			matrix only updated if matrix gathered from structures has
-			changed.
+			changed, as judged by the version stamp or content hash of
+			each structure's block; when possible, only changed blocks
+			are copied into the matrix. The decision for each block is
+			recorded in the construction report.
 
 			Arguments:
 				structures: Iterable collection of :class:`Structure`
 					objects.
 				solver_cache (:obj:`dict`, optional): If provided,
 					solver will try to skip equilibration and
-					factorization based on provided data.
-				**options: Keyword arguments.
+					factorization based on provided data. Otherwise,
+					a cache is looked up in
+					:attr:`SolverOptkit.cache_store` by fingerprint of
+					the assembled dose matrix (see
+					:func:`~conrad.optimization.solver_cache.matrix_fingerprint`)
+					whenever the POGS solver is rebuilt; on a miss, the
+					cache of the new solver is stored after its first
+					solve.
+				**options: Keyword arguments. Keyword ``frame`` names
+					the physics frame of the structures' dose matrices,
+					to include in the fingerprint; ``auto_cache=False``
+					disables lookups in (and additions to)
+					:attr:`SolverOptkit.cache_store`. Each stored
+					cache holds an equilibrated copy of the assembled
+					dose matrix and its factorization; the shared
+					store keeps them in memory only within its byte
+					budget (see
+					:class:`~conrad.optimization.solver_cache.SolverCacheStore`).
+					Keyword
+					``content_hash`` sets
+					:attr:`SolverOptkit.content_hash`.
 
 			Returns:
 				:obj:`str`: String documenting how data in
@@ -473,8 +605,15 @@ if module_installed('optkit'):
 					options.pop(
 							'double', not ok.api.backend.precision_is_32bit))
 
-			matrix_updated = self.__check_for_updates(structures)
-			if self.__A_current is None or matrix_updated:
+			frame = options.pop('frame', None)
+			auto_cache = options.pop('auto_cache', True)
+
+			self.content_hash = options.pop('content_hash', self.content_hash)
+			self.__update_report = []
+			changed = self.__check_for_updates(structures)
+			matrix_updated = len(changed) > 0
+			if self.__A_current is None or (matrix_updated and
+					not self.__update_matrix(structures, changed)):
 				A = self.__A_current = self.__build_matrix(structures)
 			else:
 				A = self.__A_current
@@ -496,14 +635,33 @@ if module_installed('optkit'):
 			else:
 				self.__update_beam_objective(structures)
 
-			if self.pogs_solver is None or matrix_updated:
+			rebuilt = self.pogs_solver is None or matrix_updated
+			if rebuilt:
+				self.__cache_key = None
+				self.cache_hit = None
+				if solver_cache is None and auto_cache:
+					self.__cache_key = matrix_fingerprint(
+							A, structures, frame=frame, backend=(
+									ok.api.backend.device_is_gpu,
+									ok.api.backend.precision_is_32bit))
+					solver_cache = self.cache_store.lookup(self.__cache_key)
+					self.cache_hit = solver_cache is not None
+				self.__cache_pending = self.cache_hit is False
 				cache_options = self.__preprocess_solver_cache(solver_cache)
 				self.pogs_solver = ok.api.PogsSolver(A, **cache_options)
 				self.__resume = False
 			else:
 				self.__resume = True
 
-			return self._Solver__construction_report(structures)
+			report = self._Solver__construction_report(structures)
+			report += self.__update_report
+			if rebuilt and self.__cache_key is not None:
+				report.append('solver cache {} (key = {}): {}'.format(
+						'hit' if self.cache_hit else 'miss',
+						self.__cache_key,
+						'equilibration and factorization skipped' if
+						self.cache_hit else 'cache stored after first solve'))
+			return report
 
 		def solve(self, **options):
 			"""
@@ -516,7 +674,10 @@ if module_installed('optkit'):
 
 			Arguments:
 				**options: Keyword arguments specifying solver options,
-					passed to :meth:`optkit.PogsSolver.solve`.
+					passed to :meth:`optkit.PogsSolver.solve`. Keywords
+					``x0`` and ``nu0`` give a primal and dual iterate
+					to warm start from; ``nu0`` is dropped if its size
+					does not match the number of voxels in the problem.
 
 			Returns:
 				:obj:`bool`: ``True`` if POGS solver converged.
@@ -539,6 +700,12 @@ if module_installed('optkit'):
 			options['maxiters'] = options.pop(
 					'maxiters', options.pop('maxiter', MAXITER_DEFAULT))
 			options['resume'] = self.__resume
+			options.pop('frame', None)
+			options.pop('auto_cache', None)
+			if 'nu0' in options and \
+					len(options['nu0']) != self.__A_current.shape[0]:
+				options.pop('nu0')
+			self.warm_started = 'x0' in options
 
 
 			scale_doses = options.pop('scale_doses', True)
@@ -546,7 +713,7 @@ if module_installed('optkit'):
 			if scale_doses:
 				self.objective_voxels._Objective__b /= self.global_dose_scaling
 				if 'x0' in options:
-					options['x0'] /= self.global_dose_scaling
+					options['x0'] = options['x0'] / self.global_dose_scaling
 
 			self.pogs_solver.solve(
 					self.objective_voxels, self.objective_beams, **options)
@@ -554,6 +721,10 @@ if module_installed('optkit'):
 			if scale_doses:
 				self.pogs_solver.output.x *= self.global_dose_scaling
 				self.pogs_solver.output.y *= self.global_dose_scaling
+
+			if self.__cache_pending:
+				self.cache_store.store(self.__cache_key, self.cache)
+				self.__cache_pending = False
 			return self.pogs_solver.info.converged
 
 		@property
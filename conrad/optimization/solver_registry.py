@@ -0,0 +1,513 @@
+"""
+Registry of solver backends available to
+:class:`~conrad.optimization.problem.PlanningProblem`.
+
+Each backend advertises the problems it can solve (e.g., whether it
+handles dose constraints, dense or sparse dose matrices) and a cost
+model predicting its run time from the size of a problem. The planning
+problem solves with the capable backend with the lowest predicted cost,
+unless overridden. Cost models can be calibrated to the current machine
+by timing small probe problems.
+
+Attributes:
+	SOLVER_REGISTRY (:class:`SolverRegistry`): Registry shared by
+		planning problems that are not given one explicitly, populated
+		with the POGS, SCS and ECOS backends.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.defs import module_installed
+from conrad.medicine.dose import PercentileConstraint
+
+# (voxels, beams) of probe problems timed by SolverRegistry.calibrate()
+CALIBRATION_SIZES = [(200, 20), (1000, 50), (4000, 100)]
+
+class ProblemSize(object):
+	"""
+	Size of a treatment planning problem, as seen by a solver.
+
+	Attributes:
+		voxels (:obj:`int`): Number of dose matrix rows passed to the
+			solver; structures that can be planned with their mean dose
+			(see :attr:`~conrad.medicine.Structure.collapsable`) count
+			once.
+		beams (:obj:`int`): Number of beams.
+		nnz (:obj:`int`): Number of stored entries in the dose matrix
+			rows passed to the solver.
+		constraints (:obj:`int`): Number of dose constraints.
+		constraint_rows (:obj:`int`): Number of voxel rows touched by
+			dose constraints, summed over constraints.
+		percentile_constraints (:obj:`int`): Number of percentile-type
+			dose constraints.
+		sparse (:obj:`bool`): ``True`` if any structure has a sparse
+			dose matrix.
+	"""
+	def __init__(self, voxels=0, beams=0, nnz=0, constraints=0,
+				 constraint_rows=0, percentile_constraints=0, sparse=False):
+		self.voxels = int(voxels)
+		self.beams = int(beams)
+		self.nnz = int(nnz)
+		self.constraints = int(constraints)
+		self.constraint_rows = int(constraint_rows)
+		self.percentile_constraints = int(percentile_constraints)
+		self.sparse = bool(sparse)
+
+	@staticmethod
+	def from_structures(structures):
+		"""
+		Measure problem formed by ``structures``.
+
+		Arguments:
+			structures: Iterable collection of
+				:class:`~conrad.medicine.Structure` objects with
+				attached dose matrices.
+
+		Returns:
+			:class:`ProblemSize`: Size of problem.
+		"""
+		size = ProblemSize()
+		for s in structures:
+			size.beams = max(size.beams, len(s.A_mean))
+			if s.collapsable or s.A_shape is None:
+				rows = 1
+				size.nnz += np.count_nonzero(s.A_mean)
+			else:
+				A = s.A_full
+				rows = A.shape[0]
+				if sp.issparse(A):
+					size.nnz += A.nnz
+					size.sparse = True
+				else:
+					size.nnz += A.size
+			size.voxels += rows
+			for cid in s.constraints:
+				size.constraints += 1
+				size.constraint_rows += rows
+				size.percentile_constraints += int(isinstance(
+						s.constraints[cid], PercentileConstraint))
+		return size
+
+	@property
+	def dict(self):
+		""" Dictionary of problem size attributes. """
+		return {
+			'voxels': self.voxels,
+			'beams': self.beams,
+			'nnz': self.nnz,
+			'constraints': self.constraints,
+			'constraint_rows': self.constraint_rows,
+			'percentile_constraints': self.percentile_constraints,
+			'sparse': self.sparse,
+		}
+
+	def __str__(self):
+		return '{} voxels x {} beams, {} nonzeros ({}), {} constraints'.format(
+				self.voxels, self.beams, self.nnz,
+				'sparse' if self.sparse else 'dense', self.constraints)
+
+class CostModel(object):
+	"""
+	Predicted run time of a solver backend, as a function of problem size.
+
+	The model is
+
+		``scale * (overhead + per_unit * work ** exponent)``,
+
+	where ``work`` counts the dose matrix entries, voxels, beams and
+	constrained voxel rows of the problem, and is multiplied by
+	``dense_factor`` for problems with dense dose matrices.
+
+	Attributes:
+		overhead (:obj:`float`): Fixed cost per solve, in seconds.
+		per_unit (:obj:`float`): Cost per unit of work, in seconds.
+		exponent (:obj:`float`): Growth of cost with work; ``1`` for
+			first-order methods, larger for interior-point methods.
+		dense_factor (:obj:`float`): Penalty on dense problems.
+		scale (:obj:`float`): Machine-specific correction, set by
+			:meth:`SolverRegistry.calibrate`.
+	"""
+	def __init__(self, overhead, per_unit, exponent=1., dense_factor=1.,
+				 scale=1.):
+		self.overhead = float(overhead)
+		self.per_unit = float(per_unit)
+		self.exponent = float(exponent)
+		self.dense_factor = float(dense_factor)
+		self.scale = float(scale)
+
+	@staticmethod
+	def work(size):
+		"""
+		Units of work in a problem of given ``size``.
+
+		Arguments:
+			size (:class:`ProblemSize`): Problem size.
+
+		Returns:
+			:obj:`float`: Work, for use in :meth:`CostModel.estimate`.
+		"""
+		return float(size.nnz + size.voxels + size.beams +
+					 size.constraint_rows)
+
+	def estimate(self, size, calibrated=True):
+		"""
+		Predict run time of a solve.
+
+		Arguments:
+			size (:class:`ProblemSize`): Problem size.
+			calibrated (:obj:`bool`, optional): If ``True``, apply
+				:attr:`CostModel.scale`.
+
+		Returns:
+			:obj:`float`: Predicted run time, in seconds.
+		"""
+		work = self.work(size)
+		if not size.sparse:
+			work *= self.dense_factor
+		cost = self.overhead + self.per_unit * work**self.exponent
+		return cost * (self.scale if calibrated else 1.)
+
+class SolverBackend(object):
+	"""
+	Description of a solver backend.
+
+	Attributes:
+		name (:obj:`str`): Name of backend, e.g., ``'ECOS'``.
+		solver (:obj:`str`): Kind of :mod:`conrad` solver that runs the
+			backend: ``'cvxpy'`` (:class:`SolverCVXPY`) or ``'pogs'``
+			(:class:`SolverOptkit`).
+		options (:obj:`dict`): Solver options selecting the backend,
+			e.g., ``{'solver': 'ECOS'}`` for a :mod:`cvxpy` sub-solver.
+		modules (:obj:`list` of :obj:`str`): Modules required by the
+			backend.
+		constraints (:obj:`bool`): ``True`` if backend handles dose
+			constraints.
+		dense (:obj:`bool`): ``True`` if backend handles dense dose
+			matrices.
+		sparse (:obj:`bool`): ``True`` if backend handles sparse dose
+			matrices.
+		cost (:class:`CostModel`): Run time model.
+	"""
+	def __init__(self, name, solver, cost, options=None, modules=None,
+				 constraints=True, dense=True, sparse=True):
+		self.name = str(name)
+		self.solver = str(solver)
+		self.cost = cost
+		self.options = dict(options) if options is not None else {}
+		self.modules = list(modules) if modules is not None else []
+		self.constraints = bool(constraints)
+		self.dense = bool(dense)
+		self.sparse = bool(sparse)
+
+	@property
+	def available(self):
+		""" ``True`` if all modules required by backend are installed. """
+		return all(module_installed(m) for m in self.modules)
+
+	def supports(self, size):
+		"""
+		Test if backend can solve problem of given ``size``.
+
+		Arguments:
+			size (:class:`ProblemSize`): Problem size.
+
+		Returns:
+			:obj:`bool`: ``True`` if backend handles the problem's dose
+			constraints (if any) and dose matrix format.
+		"""
+		if size.constraints > 0 and not self.constraints:
+			return False
+		return self.sparse if size.sparse else self.dense
+
+	def estimate(self, size):
+		""" Predicted run time of backend for problem of given ``size``. """
+		return self.cost.estimate(size)
+
+	def __str__(self):
+		return '{} ({})'.format(self.name, self.solver)
+
+class SolverSelection(object):
+	"""
+	Record of a backend selection.
+
+	Attributes:
+		backend (:class:`SolverBackend`): Selected backend.
+		size (:class:`ProblemSize`): Size of problem.
+		estimates (:obj:`dict`): Predicted run time of each capable,
+			available backend, keyed by backend name.
+		override (:obj:`bool`): ``True`` if backend was requested,
+			rather than selected by predicted cost.
+	"""
+	def __init__(self, backend, size, estimates, override=False):
+		self.backend = backend
+		self.size = size
+		self.estimates = estimates
+		self.override = bool(override)
+
+	@property
+	def dict(self):
+		""" Dictionary of selection, for storage in run records. """
+		return {
+			'backend': self.backend.name,
+			'solver': self.backend.solver,
+			'override': self.override,
+			'estimates': dict(self.estimates),
+			'size': self.size.dict,
+		}
+
+class SolverRegistry(object):
+	"""
+	Collection of solver backends, with selection by predicted cost.
+	"""
+	def __init__(self, backends=None):
+		"""
+		Initialize :class:`SolverRegistry`.
+
+		Arguments:
+			backends (optional): Iterable collection of
+				:class:`SolverBackend` objects to register.
+		"""
+		self.__backends = []
+		for backend in backends or []:
+			self.register(backend)
+
+	def __len__(self):
+		return len(self.__backends)
+
+	def __contains__(self, name):
+		return self.get(name) is not None
+
+	def __getitem__(self, name):
+		backend = self.get(name)
+		if backend is None:
+			raise KeyError('no solver backend named {}'.format(name))
+		return backend
+
+	@property
+	def backends(self):
+		""" Registered backends, in order of registration. """
+		return list(self.__backends)
+
+	def get(self, name):
+		"""
+		Retrieve backend by (case-insensitive) ``name``.
+
+		Returns:
+			:class:`SolverBackend`: Backend, or ``None`` if none found.
+		"""
+		for backend in self.__backends:
+			if backend.name.lower() == str(name).lower():
+				return backend
+		return None
+
+	def register(self, backend):
+		"""
+		Add ``backend`` to registry, replacing any backend of same name.
+
+		Arguments:
+			backend (:class:`SolverBackend`): Backend to register.
+
+		Returns:
+			None
+
+		Raises:
+			TypeError: If ``backend`` not of type
+				:class:`SolverBackend`.
+		"""
+		if not isinstance(backend, SolverBackend):
+			raise TypeError('argument "backend" must be of type {}'.format(
+					SolverBackend))
+		self.unregister(backend.name)
+		self.__backends.append(backend)
+
+	def unregister(self, name):
+		""" Remove backend by name, if registered. """
+		self.__backends = [
+				b for b in self.__backends
+				if b.name.lower() != str(name).lower()]
+
+	def candidates(self, size, solvers=None):
+		"""
+		Available backends capable of solving problem of given ``size``.
+
+		Arguments:
+			size (:class:`ProblemSize`): Problem size.
+			solvers (optional): Kinds of solver (see
+				:attr:`SolverBackend.solver`) that may be used; by
+				default, all.
+
+		Returns:
+			:obj:`list` of :class:`SolverBackend`: Candidate backends.
+		"""
+		return [b for b in self.__backends if b.available and
+				(solvers is None or b.solver in solvers) and
+				b.supports(size)]
+
+	def select(self, size, override=None, solvers=None):
+		"""
+		Choose backend to solve problem of given ``size``.
+
+		Arguments:
+			size (:class:`ProblemSize`): Problem size.
+			override (:obj:`str`, optional): Name of backend to use
+				instead of the one with the lowest predicted cost.
+			solvers (optional): Kinds of solver that may be used.
+
+		Returns:
+			:class:`SolverSelection`: Selected backend, with predicted
+			run times of all candidates.
+
+		Raises:
+			ValueError: If no candidate backend can solve the problem,
+				or if backend named by ``override`` is unknown,
+				unavailable or incapable of solving the problem.
+		"""
+		candidates = self.candidates(size, solvers=solvers)
+		estimates = {b.name: b.estimate(size) for b in candidates}
+
+		if override is not None:
+			backend = self.get(override)
+			if backend is None:
+				raise ValueError(
+						'no solver backend named {}; registered backends: '
+						'{}'.format(override, [
+								b.name for b in self.__backends]))
+			if backend not in candidates:
+				raise ValueError(
+						'solver backend {} unavailable or cannot solve '
+						'problem of size: {}'.format(backend, size))
+			return SolverSelection(backend, size, estimates, override=True)
+
+		if not candidates:
+			raise ValueError('no solvers available for problem of size: '
+							 '{}'.format(size))
+		backend = min(candidates, key=lambda b: estimates[b.name])
+		return SolverSelection(backend, size, estimates)
+
+	def calibrate(self, timer, sizes=None, repeats=1, solvers=None):
+		"""
+		Fit cost model scales to run times measured on this machine.
+
+		For each available backend, times probe problems (see
+		:func:`probe_structures`) of each size with ``timer``, and sets
+		the backend's :attr:`CostModel.scale` to the median ratio of
+		measured to predicted run time. Probe problems carry dose
+		constraints only for backends that handle them.
+
+		Arguments:
+			timer: Callable, invoked as ``timer(backend, structures)``,
+				that solves the probe problem formed by ``structures``
+				with ``backend`` and returns its run time in seconds,
+				e.g., :meth:`PlanningProblem.calibrate_solvers`.
+			sizes (optional): List of ``(voxels, beams)`` probe sizes;
+				defaults to :data:`CALIBRATION_SIZES`.
+			repeats (:obj:`int`, optional): Number of timings per
+				probe; the fastest is used.
+			solvers (optional): Kinds of solver to calibrate.
+
+		Returns:
+			:obj:`dict`: Calibrated scale of each backend, keyed by
+			backend name.
+		"""
+		if sizes is None:
+			sizes = CALIBRATION_SIZES
+		scales = {}
+		for backend in self.__backends:
+			if not backend.available:
+				continue
+			if solvers is not None and backend.solver not in solvers:
+				continue
+			ratios = []
+			for voxels, beams in sizes:
+				structures = probe_structures(
+						voxels, beams, constrained=backend.constraints,
+						sparse=backend.sparse and not backend.dense)
+				size = ProblemSize.from_structures(structures)
+				if not backend.supports(size):
+					continue
+				elapsed = min(timer(backend, structures) for _ in
+							  xrange(max(1, int(repeats))))
+				ratios.append(elapsed / backend.cost.estimate(
+						size, calibrated=False))
+			if ratios:
+				backend.cost.scale = float(np.median(ratios))
+				scales[backend.name] = backend.cost.scale
+		return scales
+
+def probe_structures(voxels, beams, constrained=True, sparse=False,
+					 seed=0):
+	"""
+	Build small synthetic planning problem for calibration.
+
+	Arguments:
+		voxels (:obj:`int`): Total number of voxels, split 1:3 between a
+			target and an organ at risk.
+		beams (:obj:`int`): Number of beams.
+		constrained (:obj:`bool`, optional): If ``True``, attach
+			minimum, maximum and percentile dose constraints.
+		sparse (:obj:`bool`, optional): If ``True``, use sparse (CSR)
+			dose matrices with 10% density.
+		seed (:obj:`int`, optional): Random seed.
+
+	Returns:
+		:obj:`list` of :class:`~conrad.medicine.Structure`: Target and
+		organ at risk.
+	"""
+	from conrad.medicine import Structure, D
+	from conrad.physics.units import Gy
+
+	rng = np.random.RandomState(seed)
+	m_target = max(1, voxels // 4)
+	m_oar = max(1, voxels - m_target)
+	if sparse:
+		A_target = sp.rand(m_target, beams, density=0.1, format='csr',
+						   random_state=rng)
+		A_oar = sp.rand(m_oar, beams, density=0.1, format='csr',
+						random_state=rng)
+	else:
+		A_target = rng.rand(m_target, beams)
+		A_oar = rng.rand(m_oar, beams)
+	target = Structure(0, 'target', True, A=A_target)
+	oar = Structure(1, 'oar', False, A=A_oar)
+	if constrained:
+		target.constraints += D('min') >= 0.8 * Gy
+		target.constraints += D(90) >= 0.95 * Gy
+		oar.constraints += D(30) <= 0.5 * Gy
+	return [target, oar]
+
+SOLVER_REGISTRY = SolverRegistry([
+		# first-order, no dose constraints; fastest without constraints
+		SolverBackend(
+				'POGS', 'pogs', CostModel(2e-3, 2e-8),
+				modules=['optkit'], constraints=False),
+		# first-order, via cvxpy; scales linearly with problem size
+		SolverBackend(
+				'SCS', 'cvxpy', CostModel(2e-2, 1e-7, dense_factor=1.5),
+				options={'solver': 'SCS'}, modules=['cvxpy', 'scs']),
+		# interior point, via cvxpy; fast on small problems, but cost
+		# grows superlinearly, especially with dense dose matrices
+		SolverBackend(
+				'ECOS', 'cvxpy',
+				CostModel(5e-3, 2e-8, exponent=1.3, dense_factor=2.),
+				options={'solver': 'ECOS'}, modules=['cvxpy', 'ecos']),
+	])
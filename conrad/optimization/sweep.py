@@ -0,0 +1,245 @@
+"""
+Plan a case repeatedly over a grid of constraint and objective
+variants, optionally in parallel worker processes.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import os
+import copy
+import itertools
+import multiprocessing
+
+# case planned by worker processes; set in parent before workers are
+# forked, so that workers inherit its dose matrices without pickling
+_SWEEP_CASE = None
+
+def expand_grid(param_grid):
+	"""
+	Expand parameter grid to list of planning variants.
+
+	Arguments:
+		param_grid (:obj:`dict`): Dictionary of candidate values. Each
+			key is either a constraint ID, with values to be passed as
+			the dose (or as a :obj:`dict` of keyword arguments) to
+			:meth:`~conrad.Case.change_constraint`, or a tuple
+			``(label, parameter)`` naming a structure and objective
+			parameter, with values to be passed to
+			:meth:`~conrad.Case.change_objective`. A list of such
+			dictionaries is also accepted, with grids expanded in
+			order.
+
+	Returns:
+		:obj:`list` of :obj:`dict`: One dictionary per element of the
+		Cartesian product of candidate values, mapping each key in
+		``param_grid`` to a single value.
+	"""
+	if isinstance(param_grid, (list, tuple)):
+		variants = []
+		for grid in param_grid:
+			variants.extend(expand_grid(grid))
+		return variants
+
+	keys = list(param_grid.keys())
+	candidates = [param_grid[k] for k in keys]
+	return [dict(zip(keys, values)) for values in
+			itertools.product(*candidates)]
+
+def _find_constraint(case, constr_id):
+	for s in case.anatomy:
+		if constr_id in s.constraints:
+			return s.constraints[constr_id]
+	raise ValueError(
+			'key {} does not correspond to a constraint or '
+			'(label, objective parameter) pair in case'.format(constr_id))
+
+def snapshot_variant(case, variant):
+	"""
+	Record current values of the case parameters set by ``variant``.
+
+	Arguments:
+		case (:class:`~conrad.Case`): Case to read.
+		variant (:obj:`dict`): Planning variant, as produced by
+			:func:`expand_grid`.
+
+	Returns:
+		:obj:`dict`: Snapshot that, passed to :func:`restore_variant`,
+		restores the current state of ``case``.
+
+	Raises:
+		ValueError: If a key in ``variant`` does not correspond to a
+			constraint or structure objective in ``case``.
+	"""
+	snapshot = {}
+	for key in variant:
+		if isinstance(key, tuple):
+			label, parameter = key
+			snapshot[key] = getattr(
+					case.anatomy[label].objective, parameter + '_raw')
+		else:
+			# constraint setters replace (rather than mutate) values,
+			# so a shallow copy preserves the current state
+			snapshot[key] = copy.copy(_find_constraint(case, key))
+	return snapshot
+
+def restore_variant(case, snapshot):
+	"""
+	Restore case parameters recorded by :func:`snapshot_variant`.
+
+	Arguments:
+		case (:class:`~conrad.Case`): Case to modify.
+		snapshot (:obj:`dict`): Output of :func:`snapshot_variant`.
+
+	Returns:
+		None
+	"""
+	for key, value in snapshot.items():
+		if isinstance(key, tuple):
+			label, parameter = key
+			case.change_objective(label, **{parameter: value})
+		else:
+			vars(_find_constraint(case, key)).update(vars(value))
+
+def apply_variant(case, variant):
+	"""
+	Set case parameters to the values in ``variant``.
+
+	Arguments:
+		case (:class:`~conrad.Case`): Case to modify.
+		variant (:obj:`dict`): Planning variant, as produced by
+			:func:`expand_grid`.
+
+	Returns:
+		None
+
+	Raises:
+		ValueError: If a key in ``variant`` does not correspond to a
+			constraint or structure objective in ``case``.
+	"""
+	for key, value in variant.items():
+		if isinstance(key, tuple):
+			label, parameter = key
+			case.change_objective(label, **{parameter: value})
+		else:
+			_find_constraint(case, key)
+			if isinstance(value, dict):
+				case.change_constraint(key, **value)
+			else:
+				case.change_constraint(key, dose=value)
+
+def _plan_variant(task):
+	"""
+	Plan one variant of the case shared with worker processes.
+
+	The case parameters touched by the variant are restored after
+	planning, so that a process planning several variants in turn
+	starts each from the original case.
+
+	Arguments:
+		task (:obj:`tuple`): Planning variant, tag for the run, and
+			keyword arguments to :meth:`~conrad.Case.plan`.
+
+	Returns:
+		:class:`~conrad.optimization.history.RunRecord`: Record of
+		planning run.
+	"""
+	variant, tag, options = task
+	snapshot = snapshot_variant(_SWEEP_CASE, variant)
+	try:
+		apply_variant(_SWEEP_CASE, variant)
+		_, run = _SWEEP_CASE.plan(tag=tag, **options)
+	finally:
+		restore_variant(_SWEEP_CASE, snapshot)
+	return run
+
+def _fork_pool(workers):
+	"""
+	Build pool of ``workers`` forked processes, or ``None`` if forking
+	not supported on this platform.
+	"""
+	if os.name != 'posix':
+		return None
+	if hasattr(multiprocessing, 'get_context'):
+		return multiprocessing.get_context('fork').Pool(workers)
+	return multiprocessing.Pool(workers)
+
+def plan_sweep(case, variants, tags, workers=None, **options):
+	"""
+	Plan ``case`` once per variant, and record runs in its history.
+
+	With more than one worker, variants are planned in a pool of
+	forked processes. Each worker inherits ``case`` from the parent
+	process at fork time, so dose matrices (including memory-mapped
+	ones) are shared read-only rather than pickled; only variants and
+	run records pass between processes. The case in the parent process
+	is not modified.
+
+	Without a process pool (one worker, or a platform without
+	:func:`os.fork`), variants are planned serially. In either case,
+	each variant is planned from the original case parameters: those
+	touched by a variant are restored after it is planned.
+
+	Arguments:
+		case (:class:`~conrad.Case`): Case to plan.
+		variants (:obj:`list` of :obj:`dict`): Planning variants, as
+			produced by :func:`expand_grid`.
+		tags (:obj:`list`): Tag for each run in
+			:attr:`~conrad.Case.history`.
+		workers (:obj:`int`, optional): Number of worker processes;
+			defaults to number of CPUs.
+		**options: Keyword arguments passed to
+			:meth:`~conrad.Case.plan`.
+
+	Returns:
+		:obj:`list` of
+		:class:`~conrad.optimization.history.RunRecord`: Records of
+		planning runs, in the order of ``variants``.
+
+	Raises:
+		ValueError: If a key in any variant does not correspond to a
+			constraint or structure objective in ``case``.
+	"""
+	global _SWEEP_CASE
+
+	if workers is None:
+		workers = multiprocessing.cpu_count()
+	workers = max(1, min(int(workers), len(variants)))
+	# validate variant keys before planning
+	for variant in variants:
+		snapshot_variant(case, variant)
+
+	_SWEEP_CASE = case
+	try:
+		pool = _fork_pool(workers) if workers > 1 else None
+		tasks = [(v, t, options) for v, t in zip(variants, tags)]
+		if pool is not None:
+			try:
+				runs = pool.map(_plan_variant, tasks, chunksize=1)
+			finally:
+				pool.close()
+				pool.join()
+			for run, tag in zip(runs, tags):
+				case.history += run
+				case.history.tag_last(tag)
+		else:
+			runs = [_plan_variant(task) for task in tasks]
+	finally:
+		_SWEEP_CASE = None
+	return runs
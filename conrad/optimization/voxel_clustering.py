@@ -1,4 +1,8 @@
 """
+Cluster voxels by dose matrix row similarity to build reduced dose
+frames for treatment planning.
+"""
+"""
 Copyright 2016 Baris Ungun, Anqi Fu
 
 This file is part of CONRAD.
@@ -16,3 +20,442 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
 """
+from conrad.compat import *
+
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.defs import vec
+from conrad.abstract.mapping import ClusterMapping
+from conrad.physics.physics import DoseFrame, DoseFrameMapping
+
+DEFAULT_SKETCH_DIM = 20
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_ITERATIONS = 50
+DEFAULT_SEED = 0
+
+# bound on entries of (points x centers) distance blocks held in memory
+ASSIGNMENT_BLOCK = 2**22
+
+def sketch_rows(matrix, sketch_dim=DEFAULT_SKETCH_DIM, seed=DEFAULT_SEED):
+	"""
+	Form low-dimensional sketch of each row of ``matrix``.
+
+	Rows are projected onto ``sketch_dim`` Gaussian random directions,
+	so that Euclidean distances between rows are approximately
+	preserved in the sketch. Sparse matrices are never densified; only
+	the ``m`` x ``sketch_dim`` sketch is allocated.
+
+	Arguments:
+		matrix: Dense or sparse matrix of dimensions ``m`` x ``n``.
+		sketch_dim (:obj:`int`, optional): Dimension of row sketches.
+		seed (:obj:`int`, optional): Seed for random projection.
+
+	Returns:
+		:class:`numpy.ndarray`: Matrix of row sketches, of dimensions
+		``m`` x ``sketch_dim``.
+	"""
+	rng = np.random.RandomState(seed)
+	projection = rng.standard_normal((matrix.shape[1], int(sketch_dim)))
+	projection /= np.sqrt(sketch_dim)
+	sketch = matrix.dot(projection)
+	return np.asarray(sketch)
+
+def nearest_centers(points, centers):
+	"""
+	Assign each point to the nearest (Euclidean distance) center.
+
+	Distances are evaluated in blocks of points, so that memory use is
+	bounded independently of the number of points.
+
+	Arguments:
+		points (:class:`numpy.ndarray`): Matrix of ``m`` points.
+		centers (:class:`numpy.ndarray`): Matrix of ``k`` centers.
+
+	Returns:
+		:class:`numpy.ndarray`: Vector of ``m`` center indices.
+	"""
+	m = points.shape[0]
+	k = centers.shape[0]
+	assignments = np.zeros(m, dtype=int)
+	center_norms = np.sum(centers**2, axis=1)
+	block = max(1, ASSIGNMENT_BLOCK // max(k, 1))
+	for start in xrange(0, m, block):
+		stop = min(start + block, m)
+		# |x - c|^2 - |x|^2 = |c|^2 - 2<x, c>
+		distances = center_norms - 2 * points[start:stop, :].dot(centers.T)
+		assignments[start:stop] = distances.argmin(axis=1)
+	return assignments
+
+def kmeans_plusplus(points, n_clusters, rng):
+	"""
+	Choose ``n_clusters`` initial centers from points by k-means++.
+
+	Each new center is drawn with probability proportional to the
+	squared distance from each point to its nearest existing center.
+
+	Arguments:
+		points (:class:`numpy.ndarray`): Matrix of ``m`` points.
+		n_clusters (:obj:`int`): Number of centers, ``k`` <= ``m``.
+		rng (:class:`numpy.random.RandomState`): Random generator.
+
+	Returns:
+		:class:`numpy.ndarray`: Matrix of ``k`` centers.
+	"""
+	m = points.shape[0]
+	centers = np.zeros((n_clusters, points.shape[1]))
+	centers[0, :] = points[rng.randint(m), :]
+	distances = np.sum((points - centers[0, :])**2, axis=1)
+	for i in xrange(1, n_clusters):
+		total = distances.sum()
+		if total > 0:
+			choice = np.searchsorted(
+					np.cumsum(distances), rng.uniform(0, total))
+			choice = min(choice, m - 1)
+		else:
+			choice = rng.randint(m)
+		centers[i, :] = points[choice, :]
+		distances = np.minimum(distances, np.sum(
+				(points - centers[i, :])**2, axis=1))
+	return centers
+
+def minibatch_kmeans(points, n_clusters, batch_size=DEFAULT_BATCH_SIZE,
+					 iterations=DEFAULT_ITERATIONS, seed=DEFAULT_SEED):
+	"""
+	Cluster points with mini-batch k-means.
+
+	Centers are initialized by k-means++ on a random sample of the
+	points (:func:`kmeans_plusplus`), then updated with per-center
+	learning rates from random mini-batches.
+	All points are assigned to their nearest center at the end; the
+	returned labels are contiguous, i.e., centers that do not attract
+	any points are dropped.
+
+	Arguments:
+		points (:class:`numpy.ndarray`): Matrix of ``m`` points.
+		n_clusters (:obj:`int`): Maximum number of clusters, ``k``.
+		batch_size (:obj:`int`, optional): Points per mini-batch.
+		iterations (:obj:`int`, optional): Number of mini-batches.
+		seed (:obj:`int`, optional): Seed for initialization and batch
+			sampling.
+
+	Returns:
+		:class:`numpy.ndarray`: Vector of ``m`` cluster labels, with
+		values in ``0, ..., k' - 1``, ``k'`` <= ``k``.
+	"""
+	m = points.shape[0]
+	n_clusters = int(n_clusters)
+	if n_clusters >= m:
+		return np.arange(m)
+	if n_clusters <= 1:
+		return np.zeros(m, dtype=int)
+
+	rng = np.random.RandomState(seed)
+	batch_size = min(int(batch_size), m)
+	init_size = min(m, 3 * max(batch_size, n_clusters))
+	centers = kmeans_plusplus(
+			points[rng.choice(m, init_size, replace=False), :],
+			n_clusters, rng)
+	counts = np.zeros(n_clusters)
+
+	for i in xrange(int(iterations)):
+		batch = points[rng.randint(0, m, batch_size), :]
+		assignments = nearest_centers(batch, centers)
+		batch_counts = np.bincount(assignments, minlength=n_clusters)
+		batch_sums = np.zeros(centers.shape)
+		np.add.at(batch_sums, assignments, batch)
+
+		hit = batch_counts > 0
+		totals = counts[hit] + batch_counts[hit]
+		centers[hit, :] = (
+				centers[hit, :] * counts[hit].reshape((-1, 1)) +
+				batch_sums[hit, :]) / totals.reshape((-1, 1))
+		counts[hit] = totals
+
+	labels = nearest_centers(points, centers)
+	return np.unique(labels, return_inverse=True)[1].reshape(-1)
+
+def aggregation_operator(mapping, weights=None):
+	"""
+	Build sparse operator forming weighted averages over clusters.
+
+	Given cluster mapping ``C`` and point weights ``w``, operator is
+	``diag(Cw)^{-1} * C * diag(w)``, so that applying it to a matrix
+	replaces each cluster of rows with their weighted mean.
+
+	Arguments:
+		mapping (:class:`ClusterMapping`): Mapping of ``m`` points to
+			``k`` clusters.
+		weights (optional): Vector of ``m`` nonnegative point weights;
+			all ``1`` if not provided.
+
+	Returns:
+		:obj:`tuple`: Sparse ``k`` x ``m`` operator, and vector of ``k``
+		cluster weights, ``Cw``.
+	"""
+	if weights is None:
+		weights = np.ones(mapping.n_points)
+	weights = vec(weights)
+	cluster_weights = mapping.frame0_to_1(weights)
+	scaling = np.zeros(mapping.n_clusters)
+	nonzero = cluster_weights > 0
+	scaling[nonzero] = 1. / cluster_weights[nonzero]
+	operator = sp.diags(scaling).dot(mapping.matrix).dot(sp.diags(weights))
+	return operator.tocsr(), cluster_weights
+
+def reduce_rows(matrix, operator):
+	"""
+	Apply ``operator`` to ``matrix``, preserving sparse formats.
+
+	Arguments:
+		matrix: Dense or sparse (CSR/CSC) matrix.
+		operator: Sparse matrix.
+
+	Returns:
+		Product ``operator * matrix``; sparse, in the same format as
+		``matrix``, if input is sparse, :class:`numpy.ndarray` otherwise.
+	"""
+	if sp.issparse(matrix):
+		return operator.dot(matrix).asformat(matrix.format)
+	return np.asarray(operator.dot(matrix))
+
+class FrameClustering(object):
+	"""
+	Options and shared steps for clustering the voxels or beams of a
+	:class:`DoseFrame`.
+
+	Points (dose matrix rows or columns) are clustered label-by-label,
+	so that each cluster inherits exactly one label. Points are
+	compressed to random sketches (:func:`sketch_rows`), and the
+	sketches for each label are clustered by mini-batch k-means
+	(:func:`minibatch_kmeans`). All randomness is drawn from seeded
+	generators, so repeated clusterings of the same frame agree.
+
+	Attributes:
+		compression: Target ratio of points to clusters; :obj:`float`,
+			or :obj:`dict` of ratios keyed by label.
+		sketch_dim (:obj:`int`): Dimension of dose matrix sketches.
+		batch_size (:obj:`int`): Points per k-means mini-batch.
+		iterations (:obj:`int`): Number of k-means mini-batches.
+		seed (:obj:`int`): Seed for sketches and k-means.
+	"""
+
+	def __init__(self, compression=10., sketch_dim=DEFAULT_SKETCH_DIM,
+				 batch_size=DEFAULT_BATCH_SIZE, iterations=DEFAULT_ITERATIONS,
+				 seed=DEFAULT_SEED):
+		"""
+		Initialize :class:`FrameClustering`.
+
+		Arguments:
+			compression (optional): Target ratio of points to clusters,
+				as a number >= ``1``, or a dictionary of such numbers
+				keyed by label. Labels missing from a dictionary are not
+				clustered.
+			sketch_dim (:obj:`int`, optional): Dimension of dose matrix
+				sketches.
+			batch_size (:obj:`int`, optional): Points per k-means
+				mini-batch.
+			iterations (:obj:`int`, optional): Number of k-means
+				mini-batches.
+			seed (:obj:`int`, optional): Seed for sketches and k-means.
+
+		Raises:
+			ValueError: If any compression ratio is less than ``1``.
+		"""
+		ratios = compression.values() if isinstance(
+				compression, dict) else [compression]
+		if any(float(r) < 1 for r in ratios):
+			raise ValueError('argument `compression` must be >= 1')
+		self.compression = compression
+		self.sketch_dim = int(sketch_dim)
+		self.batch_size = int(batch_size)
+		self.iterations = int(iterations)
+		self.seed = int(seed)
+
+	def n_clusters(self, label, size):
+		"""
+		Number of clusters targeted for points with label ``label``.
+
+		Arguments:
+			label: Label of points.
+			size (:obj:`int`): Number of points with label.
+
+		Returns:
+			:obj:`int`: ``ceil(size / ratio)``, for the compression
+			ratio associated with ``label``.
+		"""
+		if isinstance(self.compression, dict):
+			ratio = float(self.compression.get(label, 1.))
+		else:
+			ratio = float(self.compression)
+		return int(np.ceil(size / ratio))
+
+	@staticmethod
+	def contiguous_dose_matrix(frame):
+		"""
+		Dose matrix of ``frame`` as a single dense or sparse matrix.
+
+		Raises:
+			AttributeError: If ``frame`` has no contiguous dose matrix.
+		"""
+		matrix = None
+		if frame.dose_matrix is not None:
+			matrix = frame.dose_matrix.data
+		if matrix is None:
+			raise AttributeError(
+					'`{}.dose_matrix` must be set as a single matrix '
+					'to cluster voxels or beams'.format(DoseFrame))
+		return matrix
+
+	@staticmethod
+	def source_frame(physics, source_frame=None):
+		"""
+		Retrieve frame ``source_frame`` from ``physics``.
+
+		Defaults to current :attr:`Physics.frame`.
+
+		Raises:
+			KeyError: If ``source_frame`` not attached to ``physics``.
+		"""
+		if source_frame is None:
+			return physics.frame
+		return physics.retrieve_dose_frame(source_frame)
+
+	def cluster_by_label(self, sketch, label_index):
+		"""
+		Cluster points label-by-label.
+
+		Clusters are numbered contiguously, ordered by label.
+
+		Arguments:
+			sketch (:class:`numpy.ndarray`): Matrix of point sketches.
+			label_index (:class:`~conrad.abstract.vector.LabelIndex`):
+				Index of point labels.
+
+		Returns:
+			:obj:`tuple`: :class:`ClusterMapping` from points to
+			clusters, and vector giving the label of each cluster.
+		"""
+		clusters = np.zeros(label_index.size, dtype=int)
+		cluster_labels = []
+		offset = 0
+		for i, label in enumerate(label_index.labels):
+			indices = label_index.indices(label)
+			n_clusters = self.n_clusters(label, indices.size)
+			local = minibatch_kmeans(
+					sketch[indices, :], n_clusters, self.batch_size,
+					self.iterations, self.seed + i)
+			clusters[indices] = offset + local
+			n_local = local.max() + 1
+			cluster_labels.append(np.repeat(label, n_local))
+			offset += n_local
+
+		return ClusterMapping(clusters), np.hstack(cluster_labels)
+
+class VoxelClustering(FrameClustering):
+	"""
+	Cluster voxels within each structure by dose matrix row similarity.
+
+	Voxels are grouped structure-by-structure, so that each cluster
+	inherits exactly one voxel label; see :class:`FrameClustering` for
+	options.
+
+	The clustering yields a :class:`ClusterMapping` from the source
+	frame's voxels to clusters, and a reduced :class:`DoseFrame` in
+	which each row of the dose matrix is the (voxel-weighted) mean of
+	the rows in its cluster, and each voxel weight is the sum of the
+	source voxel weights in its cluster.
+	"""
+
+	def cluster_mapping(self, frame):
+		"""
+		Cluster voxels of ``frame``, structure-by-structure.
+
+		Clusters are numbered contiguously, ordered by voxel label.
+
+		Arguments:
+			frame (:class:`DoseFrame`): Frame with dose matrix and voxel
+				labels.
+
+		Returns:
+			:obj:`tuple`: :class:`ClusterMapping` from voxels of
+			``frame`` to clusters, and vector giving the voxel label of
+			each cluster.
+
+		Raises:
+			AttributeError: If ``frame`` has no contiguous dose matrix.
+			ValueError: If ``frame`` has no voxel labels.
+		"""
+		sketch = sketch_rows(
+				self.contiguous_dose_matrix(frame), self.sketch_dim,
+				self.seed)
+		return self.cluster_by_label(sketch, frame.voxel_label_index)
+
+	def reduce_frame(self, frame, mapping, cluster_labels, frame_name=None):
+		"""
+		Build voxel-clustered version of ``frame``.
+
+		Arguments:
+			frame (:class:`DoseFrame`): Source frame.
+			mapping (:class:`ClusterMapping`): Mapping from voxels of
+				``frame`` to clusters.
+			cluster_labels: Vector of voxel labels for clusters.
+			frame_name (:obj:`str`, optional): Name of reduced frame.
+
+		Returns:
+			:class:`DoseFrame`: Frame with one (meta-)voxel per cluster,
+			whose dose matrix rows are voxel-weighted means of source
+			rows, and whose voxel weights are cluster sums of source
+			voxel weights. Beam data are carried over unchanged.
+		"""
+		weights = None
+		if frame.voxel_weights is not None:
+			weights = frame.voxel_weights.data
+		operator, cluster_weights = aggregation_operator(mapping, weights)
+
+		return DoseFrame(
+				data=reduce_rows(frame.dose_matrix.data, operator),
+				voxel_labels=cluster_labels,
+				beam_labels=frame.beam_labels,
+				voxel_weights=cluster_weights,
+				beam_weights=None if frame.beam_weights is None else
+						frame.beam_weights.data,
+				frame_name=frame_name)
+
+	def cluster(self, physics, target_frame=None, source_frame=None):
+		"""
+		Cluster voxels of a frame attached to ``physics``.
+
+		The reduced frame is added to ``physics`` and the corresponding
+		:class:`DoseFrameMapping` registered, so that the reduced frame
+		can be selected with :meth:`Physics.change_dose_frame`, and
+		retrieved alongside its mapping with
+		:meth:`Physics.retrieve_frame_mapping`.
+
+		Arguments:
+			physics (:class:`Physics`): Physics to update.
+			target_frame (:obj:`str`, optional): Name of reduced frame.
+				Defaults to ``<source>_voxel_clustered``.
+			source_frame (:obj:`str`, optional): Name of frame to
+				cluster. Defaults to current :attr:`Physics.frame`.
+
+		Returns:
+			:class:`DoseFrameMapping`: Registered mapping from source
+			frame to reduced frame.
+
+		Raises:
+			KeyError: If ``source_frame`` not attached to ``physics``.
+		"""
+		frame = self.source_frame(physics, source_frame)
+		if target_frame is None:
+			target_frame = '{}_voxel_clustered'.format(frame.name)
+
+		mapping, cluster_labels = self.cluster_mapping(frame)
+		reduced = self.reduce_frame(
+				frame, mapping, cluster_labels, target_frame)
+		frame_mapping = DoseFrameMapping(
+				frame.name, target_frame, voxel_map=mapping)
+
+		physics.add_dose_frame(target_frame, dose_frame=reduced)
+		physics.add_frame_mapping(frame_mapping)
+		return frame_mapping
@@ -25,8 +25,8 @@ from conrad.abstract.vector import SliceCachingVector
 from conrad.abstract.matrix import SliceCachingMatrix
 
 class WeightVector(SliceCachingVector):
-	def __init__(self, data):
-		SliceCachingVector.__init__(self, data)
+	def __init__(self, data, cache_budget=None):
+		SliceCachingVector.__init__(self, data, cache_budget)
 
 	def _validate(self, data):
 		nonneg = lambda v: np.sum(v < 0) == 0
@@ -43,8 +43,8 @@ class WeightVector(SliceCachingVector):
 		return self.data is not None and np.sum(self.data == 1) == self.size
 
 class DoseMatrix(SliceCachingMatrix):
-	def __init__(self, data):
-		SliceCachingMatrix.__init__(self, data)
+	def __init__(self, data, cache_budget=None):
+		SliceCachingMatrix.__init__(self, data, cache_budget)
 
 	def __contains__(self, comparator):
 		if isinstance(comparator, tuple):
@@ -67,6 +67,11 @@ class DoseMatrix(SliceCachingMatrix):
 					'voxels', 'rows').replace('beams', 'columns')
 		return data
 
+	def drop_data(self, labeled_by='voxels'):
+		labeled_by = labeled_by.replace('voxels', 'rows').replace(
+				'beams', 'columns')
+		return SliceCachingMatrix.drop_data(self, labeled_by)
+
 	def voxel_slice(self, label, indices):
 		return self.row_slice(label, indices)
 
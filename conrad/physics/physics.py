@@ -26,6 +26,8 @@ import numpy as np
 import scipy.sparse as sp
 
 from conrad.defs import vec
+from conrad.abstract.vector import LabelIndex
+from conrad.abstract.matrix import LazyMatrixSlice
 from conrad.abstract.mapping import DiscreteMapping, map_type_to_string
 from conrad.physics.beams import BeamSet
 from conrad.physics.voxels import VoxelGrid
@@ -99,8 +101,11 @@ class DoseFrame(object):
 		self.__dose_matrix = None
 		self.__voxel_labels = None
 		self.__beam_labels = None
+		self.__voxel_label_index = None
+		self.__beam_label_index = None
 		self.__voxel_weights = None
 		self.__beam_weights = None
+		self.__mean_dose_rows = None
 		self.__name = 'unnamed_frame'
 
 		if isinstance(beams, BeamSet):
@@ -199,6 +204,7 @@ class DoseFrame(object):
 			self.beams = mat.beam_dim
 
 		self.__dose_matrix = mat
+		self.__mean_dose_rows = None
 
 	@property
 	def voxels(self):
@@ -256,7 +262,7 @@ class DoseFrame(object):
 
 		Setter will also use dimension of input vector to set voxel
 		dimensions (:attr:`DoseFrame.voxels`) if not already assigned at
-		call time.
+		call time, and invalidate :attr:`DoseFrame.voxel_label_index`.
 
 		Raises:
 			ValueError: If provided vector dimensions inconsistent with
@@ -273,6 +279,25 @@ class DoseFrame(object):
 							 'number of voxels in frame ({})'
 							 ''.format(len(voxel_labels), self.voxels))
 		self.__voxel_labels = vec(voxel_labels).astype(int)
+		self.__voxel_label_index = None
+		self.__mean_dose_rows = None
+
+	@property
+	def voxel_label_index(self):
+		"""
+		:class:`LabelIndex` of :attr:`DoseFrame.voxel_labels`.
+
+		Built on first access and cached until voxel labels reassigned.
+
+		Raises:
+			ValueError: If :attr:`DoseFrame.voxel_labels` not set.
+		"""
+		if self.__voxel_label_index is None:
+			if self.voxel_labels is None:
+				raise ValueError('`{}.{}` not set, retrieval by label '
+								 'impossible'.format(DoseFrame, 'voxel_labels'))
+			self.__voxel_label_index = LabelIndex(self.voxel_labels)
+		return self.__voxel_label_index
 
 	@property
 	def beam_labels(self):
@@ -281,7 +306,7 @@ class DoseFrame(object):
 
 		Setter will also use dimension of input vector to set beam
 		dimensions (:attr:`DoseFrame.beams`) if not already assigned at
-		call time.
+		call time, and invalidate :attr:`DoseFrame.beam_label_index`.
 
 		Raises:
 			ValueError: If provided vector dimensions inconsistent with
@@ -298,6 +323,24 @@ class DoseFrame(object):
 							 'number of beams in frame ({})'
 							 ''.format(len(beam_labels), self.beams))
 		self.__beam_labels = vec(beam_labels).astype(int)
+		self.__beam_label_index = None
+
+	@property
+	def beam_label_index(self):
+		"""
+		:class:`LabelIndex` of :attr:`DoseFrame.beam_labels`.
+
+		Built on first access and cached until beam labels reassigned.
+
+		Raises:
+			ValueError: If :attr:`DoseFrame.beam_labels` not set.
+		"""
+		if self.__beam_label_index is None:
+			if self.beam_labels is None:
+				raise ValueError('`{}.{}` not set, retrieval by label '
+								 'impossible'.format(DoseFrame, 'beam_labels'))
+			self.__beam_label_index = LabelIndex(self.beam_labels)
+		return self.__beam_label_index
 
 	@property
 	def voxel_weights(self):
@@ -327,6 +370,7 @@ class DoseFrame(object):
 							 'number of voxels in frame ({})'
 							 ''.format(voxel_weights.size, self.voxels))
 		self.__voxel_weights = weights
+		self.__mean_dose_rows = None
 
 	@property
 	def beam_weights(self):
@@ -392,25 +436,173 @@ class DoseFrame(object):
 			raise ValueError('`{}.{}` not set, retrieval by label '
 							 'impossible'.format(DoseFrame, vector_name))
 
-		indices = listmap(lambda x: x[0], listfilter(
-				lambda x: x[1] == label, enumerate(label_vector)))
+		indices = np.flatnonzero(vec(label_vector) == label)
 		if len(indices) == 0:
 			raise KeyError('label {} not found in entries of field '
 						   '"{}"'.format(label, vector_name))
 
-		return vec(indices)
+		return indices
+
+	@staticmethod
+	def __lookup_by_label(label_index, label, vector_name):
+		"""
+		Retrieve indices of entries labeled ``label`` from ``label_index``.
+
+		Raises:
+			KeyError: If ``label`` not found in ``label_index``.
+		"""
+		if label not in label_index:
+			raise KeyError('label {} not found in entries of field '
+						   '"{}"'.format(label, vector_name))
+		return label_index.indices(label)
 
 	def voxel_lookup_by_label(self, label):
 		"""
 		Get indices of voxels labeled ``label`` in this :class:`DoseFrame`.
+
+		Indices are sliced from :attr:`DoseFrame.voxel_label_index`.
 		"""
-		return self.indices_by_label(self.voxel_labels, label, 'voxel_labels')
+		return self.__lookup_by_label(
+				self.voxel_label_index, label, 'voxel_labels')
 
 	def beam_lookup_by_label(self, label):
 		"""
 		Get indices of beam labeled ``label`` in this :class:`DoseFrame`.
+
+		Indices are sliced from :attr:`DoseFrame.beam_label_index`.
+		"""
+		return self.__lookup_by_label(
+				self.beam_label_index, label, 'beam_labels')
+
+	def calculate_doses(self, beam_intensities, labels=None):
 		"""
-		return self.indices_by_label(self.beam_labels, label, 'beam_labels')
+		Calculate voxel doses and mean doses for each voxel label.
+
+		All voxel doses are calculated with a single multiplication by
+		the contiguous :attr:`DoseFrame.dose_matrix`. The result is
+		grouped by label (a no-op if voxel labels are already sorted)
+		and split into per-label subvectors, which are views into the
+		grouped dose vector. Weighted mean doses for every label are
+		derived from the same product with one segmented sum.
+
+		Arguments:
+			beam_intensities: Vector of beam intensities.
+			labels (optional): Iterable collection of labels for which
+				to return doses. Defaults to all voxel labels in frame.
+
+		Returns:
+			:obj:`tuple`: Pair of dictionaries, keyed by label, of voxel
+			dose subvectors and of (weighted) mean doses.
+
+		Raises:
+			AttributeError: If :attr:`DoseFrame.dose_matrix` not set, or
+				not contiguous, or if voxel weights not contiguous.
+			ValueError: If length of ``beam_intensities`` does not match
+				number of beams in frame, or if voxel labels not set.
+			KeyError: If any of ``labels`` not found in voxel labels.
+		"""
+		if self.dose_matrix is None or not self.dose_matrix.contiguous:
+			raise AttributeError(
+					'`{}.dose_matrix` must be set and contiguous to '
+					'calculate doses'.format(DoseFrame))
+		if self.voxel_weights is None or self.voxel_weights.data is None:
+			raise AttributeError(
+					'`{}.voxel_weights` must be contiguous to calculate '
+					'doses'.format(DoseFrame))
+		x = vec(beam_intensities)
+		if x.size != self.beams:
+			raise ValueError('length of beam intensity vector ({}) must '
+							 'match number of beams in frame ({})'
+							 ''.format(x.size, self.beams))
+
+		index = self.voxel_label_index
+		if labels is None:
+			labels = index.labels.tolist()
+
+		y = vec(self.dose_matrix.data.dot(x))
+		y_grouped = index.group(y)
+		w_grouped = index.group(self.voxel_weights.data)
+		starts = index.offsets[:-1]
+		weighted_sums = np.add.reduceat(w_grouped * y_grouped, starts)
+		weighted_sizes = np.add.reduceat(w_grouped, starts)
+
+		voxel_doses = {}
+		mean_doses = {}
+		for label in labels:
+			k = index.position(label)
+			voxel_doses[label] = y_grouped[
+					index.offsets[k]:index.offsets[k + 1]]
+			mean_doses[label] = weighted_sums[k] / weighted_sizes[k]
+		return voxel_doses, mean_doses
+
+	@property
+	def mean_dose_rows(self):
+		"""
+		Weighted mean dose rows for every voxel label.
+
+		All rows are calculated with a single sparse segmented sum over
+		the contiguous :attr:`DoseFrame.dose_matrix`, i.e., one product
+		with a (labels x voxels) matrix holding each voxel's weight,
+		normalized by the weighted size of its label, in the voxel's
+		label row. The result is cached alongside
+		:attr:`DoseFrame.voxel_label_index` until the dose matrix (or
+		its version), voxel labels or voxel weights are reassigned.
+
+		Row ``k`` corresponds to label ``voxel_label_index.labels[k]``.
+
+		Raises:
+			AttributeError: If :attr:`DoseFrame.dose_matrix` not set, or
+				not contiguous, or if voxel weights not contiguous.
+			ValueError: If voxel labels not set.
+		"""
+		if self.dose_matrix is None or not self.dose_matrix.contiguous:
+			raise AttributeError(
+					'`{}.dose_matrix` must be set and contiguous to '
+					'calculate mean dose rows'.format(DoseFrame))
+		version = self.dose_matrix.version
+		if self.__mean_dose_rows is not None:
+			if self.__mean_dose_rows[0] == version:
+				return self.__mean_dose_rows[1]
+
+		if self.voxel_weights is None or self.voxel_weights.data is None:
+			raise AttributeError(
+					'`{}.voxel_weights` must be contiguous to calculate '
+					'mean dose rows'.format(DoseFrame))
+		index = self.voxel_label_index
+		weights = vec(self.voxel_weights.data).astype(float)
+
+		rows = np.empty(index.size, dtype=int)
+		rows[index.order] = np.repeat(np.arange(len(index)), index.counts)
+		weighted_sizes = np.bincount(
+				rows, weights=weights, minlength=len(index))
+		weighted_sizes[weighted_sizes == 0] = np.inf
+		averaging = sp.csr_matrix(
+				(weights / weighted_sizes[rows],
+				 (rows, np.arange(index.size))),
+				shape=(len(index), index.size))
+
+		means = averaging.dot(self.dose_matrix.data)
+		if sp.issparse(means):
+			means = means.toarray()
+		means = np.asarray(means)
+		self.__mean_dose_rows = (version, means)
+		return means
+
+	def mean_dose_by_label(self, label):
+		"""
+		Weighted mean dose row for voxels labeled ``label``.
+
+		Sliced from :attr:`DoseFrame.mean_dose_rows`.
+
+		Returns:
+			:class:`numpy.ndarray`: Copy of mean dose row, with one
+			entry per beam.
+
+		Raises:
+			KeyError: If ``label`` not found in voxel labels.
+		"""
+		k = self.voxel_label_index.position(label)
+		return np.array(self.mean_dose_rows[k, :])
 
 	def submatrix(self, voxel_label=None, beam_label=None):
 		if self.dose_matrix is None:
@@ -421,6 +613,25 @@ class DoseFrame(object):
 				voxel_label, beam_label, self.voxel_lookup_by_label,
 				self.beam_lookup_by_label)
 
+	def submatrix_handle(self, voxel_label=None, beam_label=None):
+		"""
+		Deferred submatrix of :attr:`DoseFrame.dose_matrix`.
+
+		Same arguments as :meth:`DoseFrame.submatrix`.
+
+		Returns:
+			:class:`~conrad.abstract.matrix.LazyMatrixSlice`: Handle
+			with the dimensions of the submatrix, which is only sliced
+			(and cached by the dose matrix) when materialized.
+		"""
+		if self.dose_matrix is None:
+			raise AttributeError(
+					'`{}.dose_matrix` must be set tp slice into '
+					'submatrices'.format(DoseFrame))
+		return LazyMatrixSlice(
+				self.dose_matrix, voxel_label, beam_label,
+				self.voxel_lookup_by_label, self.beam_lookup_by_label)
+
 	def __str__(self):
 		""" String of :class:`DoseFrame` dimensions. """
 		return str('Dose Frame: {} VOXELS by {} BEAMS'.format(
@@ -636,6 +847,17 @@ class Physics(object):
 		self.__dose_frame = self.__frames[key]
 		self.__FRAME_LOAD_FLAG = False
 
+	def retrieve_dose_frame(self, key):
+		"""
+		Retrieve :class:`DoseFrame` attached to :class:`Physics` by key.
+
+		Raises:
+			KeyError: If no frame attached with key ``key``.
+		"""
+		if not key in self.__frames:
+			raise KeyError('no dose data frame found for key {}'.format(key))
+		return self.__frames[key]
+
 	@property
 	def available_frames(self):
 		"""
@@ -717,6 +939,15 @@ class Physics(object):
 		"""
 		return self.frame.submatrix(voxel_label, beam_label)
 
+	def dose_matrix_handle_by_label(self, voxel_label=None, beam_label=None):
+		"""
+		Deferred submatrix of dose matrix, filtered by voxel and beam labels.
+
+		See :meth:`Physics.dose_matrix_by_label` and
+		:meth:`DoseFrame.submatrix_handle`.
+		"""
+		return self.frame.submatrix_handle(voxel_label, beam_label)
+
 	def voxel_weights_by_label(self, label):
 		""" Subvector of voxel weights, filtered by ``label``. """
 		if label not in self.frame.voxel_weights:
@@ -725,6 +956,25 @@ class Physics(object):
 			indices = None
 		return self.frame.voxel_weights.slice(label, indices)
 
+	def mean_dose_by_label(self, label):
+		"""
+		Weighted mean dose row for voxels labeled ``label``.
+
+		See :meth:`DoseFrame.mean_dose_by_label`.
+
+		Returns:
+			:class:`numpy.ndarray`: Mean dose row from current
+			:attr:`Physics.frame`, or ``None`` if the frame's dose
+			matrix or voxel weights are not contiguous, in which case
+			mean doses must be calculated from the submatrix.
+		"""
+		frame = self.frame
+		if frame.dose_matrix is None or not frame.dose_matrix.contiguous:
+			return None
+		if frame.voxel_weights is None or frame.voxel_weights.data is None:
+			return None
+		return frame.mean_dose_by_label(label)
+
 	def beam_weights_by_label(self, label):
 		""" Subvector of beam weights, filtered by ``label``. """
 		if label not in self.frame.beam_weights:
@@ -733,16 +983,42 @@ class Physics(object):
 			indices = None
 		return self.frame.beam_weights.slice(label, indices)
 
+	def calculate_doses(self, beam_intensities, labels=None):
+		"""
+		Calculate voxel doses by label in current :attr:`Physics.frame`.
+
+		See :meth:`DoseFrame.calculate_doses`.
+		"""
+		return self.frame.calculate_doses(beam_intensities, labels)
+
 	def split_dose_by_label(self, dose_vector, labels):
+		"""
+		Split vector of voxel doses into subvectors, by voxel label.
+
+		Arguments:
+			dose_vector: Vector of doses for all voxels in current
+				:attr:`Physics.frame`, or dictionary of dose vectors
+				already keyed by label.
+			labels: Iterable collection of labels for which to build
+				subvectors.
+
+		Returns:
+			:obj:`dict`: Dictionary of dose subvectors keyed by label.
+
+		Raises:
+			ValueError: If length of ``dose_vector`` does not match
+				voxel dimension of current :attr:`Physics.frame`.
+		"""
 		if isinstance(dose_vector, dict):
-			doses = dose_vector
-		else:
-			y = vec(dose_vector)
-			if y.size != self.voxels:
-				raise ValueError(
-						'input vector must match voxel dimension of '
-						'current dose frame')
-			doses = {label: y[self.frame.voxel_lookup_by_label(label)]}
+			return dose_vector
+
+		y = vec(dose_vector)
+		if y.size != self.voxels:
+			raise ValueError(
+					'input vector must match voxel dimension of '
+					'current dose frame')
+		return {label: y[self.frame.voxel_lookup_by_label(label)]
+				for label in labels}
 
 	@property
 	def available_frame_mappings(self):
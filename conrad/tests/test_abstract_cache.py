@@ -0,0 +1,104 @@
+"""
+Unit tests for :mod:`conrad.abstract.cache`.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.abstract.cache import *
+from conrad.tests.base import *
+
+class EntryBytesTestCase(ConradTestCase):
+	def test_entry_bytes(self):
+		A = np.random.rand(30, 20)
+		self.assertEqual( entry_bytes(A), A.nbytes )
+		B = sp.rand(30, 20, 0.2).tocsr()
+		self.assertEqual(
+				entry_bytes(B),
+				B.data.nbytes + B.indices.nbytes + B.indptr.nbytes )
+		C = B.tocoo()
+		self.assertEqual(
+				entry_bytes(C), C.data.nbytes + C.row.nbytes + C.col.nbytes )
+
+class SliceCacheTestCase(ConradTestCase):
+	def test_slice_cache_lru(self):
+		v = np.ones(100)
+		cache = SliceCache(budget=3 * v.nbytes)
+		for i in xrange(3):
+			cache.put(i, np.ones(100))
+		self.assertEqual( len(cache), 3 )
+		self.assertEqual( cache.nbytes, 3 * v.nbytes )
+
+		# lookup of entry 0 makes entry 1 least recently used
+		self.assertIsNotNone( cache.get(0) )
+		self.assertIsNone( cache.get(5) )
+		cache.put(3, np.ones(100))
+		self.assertIn( 0, cache )
+		self.assertNotIn( 1, cache )
+		self.assertEqual( cache.keys(), [0, 2, 3] )
+
+		stats = cache.stats
+		self.assertEqual( stats['hits'], 1 )
+		self.assertEqual( stats['misses'], 1 )
+		self.assertEqual( stats['evictions'], 1 )
+		self.assertEqual( stats['entries'], 3 )
+		self.assertEqual( stats['bytes'], 3 * v.nbytes )
+
+		# shrinking budget evicts
+		cache.budget = v.nbytes
+		self.assertEqual( cache.keys(), [3] )
+		self.assertEqual( cache.evictions, 3 )
+		with self.assertRaises(ValueError):
+			cache.budget = -1
+
+		# oversized entry returned, but not held
+		cache.budget = 0
+		w = np.ones(10)
+		self.assertIs( cache.put(7, w), w )
+		self.assertEqual( len(cache), 0 )
+
+	def test_slice_cache_pins(self):
+		v = np.ones(100)
+		cache = SliceCache(budget=v.nbytes)
+		cache.put(('row', 0), np.ones(100), persistent=True)
+		cache.put(('row', 1), np.ones(100))
+		self.assertIn( ('row', 0), cache )
+		self.assertNotIn( ('row', 1), cache )
+
+		self.assertFalse( cache.pin(('row', 1)) )
+		cache.budget = None
+		cache.put(('row', 1), np.ones(100))
+		self.assertTrue( cache.pin(('row', 1)) )
+		self.assertTrue( cache.pin(('row', 1)) )
+		self.assertEqual( cache.stats['pinned'], 1 )
+		self.assertEqual( cache.keys('row'), [0, 1] )
+
+		cache.budget = v.nbytes
+		self.assertIn( ('row', 1), cache )
+		cache.unpin(('row', 1))
+		self.assertIn( ('row', 1), cache )
+		cache.unpin(('row', 1))
+		self.assertNotIn( ('row', 1), cache )
+
+		cache.clear()
+		self.assertIn( ('row', 0), cache )
+		self.assertEqual( cache.evictions, 0 )
@@ -22,6 +22,7 @@ along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
 from conrad.compat import *
 
 import numpy as np
+import scipy.sparse as sp
 
 from conrad.abstract.mapping import *
 from conrad.tests.base import *
@@ -156,6 +157,57 @@ class DiscreteMappingTestCase(ConradTestCase):
 		with self.assertRaises(ValueError):
 			dmap.frame1_to_0_inplace(vec_1, np.zeros(2 * dmap.n_frame0))
 
+	def test_discrete_mapping_matrix(self):
+		dmap = DiscreteMapping([0, 2, 2, 1])
+		C = dmap.matrix
+		self.assertIsInstance( C, sp.csr_matrix )
+		self.assertEqual( C.shape, (dmap.n_frame1, dmap.n_frame0) )
+		self.assert_vector_equal(
+				C.toarray(), np.array([[1, 0, 0, 0], [0, 0, 0, 1],
+									   [0, 1, 1, 0]]) )
+		self.assertIs( dmap.matrix, C )
+
+	def test_discrete_mapping_sparse(self):
+		dmap = DiscreteMapping([0, 2, 2, 1, 4])
+		n = 6
+		C = dmap.matrix.toarray()
+
+		for fmt in (sp.csr_matrix, sp.csc_matrix):
+			mat_0 = fmt(sp.rand(dmap.n_frame0, n, density=0.5))
+			mat_1 = fmt(sp.rand(dmap.n_frame1, n, density=0.5))
+
+			# allocating: sparse in, sparse (same format) out
+			out_1 = dmap.frame0_to_1(mat_0)
+			self.assertIsInstance( out_1, fmt )
+			self.assert_vector_equal( out_1.toarray(), C.dot(mat_0.toarray()) )
+
+			out_0 = dmap.frame1_to_0(mat_1)
+			self.assertIsInstance( out_0, fmt )
+			self.assert_vector_equal(
+					out_0.toarray(), C.T.dot(mat_1.toarray()) )
+
+			# in-place: sparse in, dense out
+			dense_1 = np.ones((dmap.n_frame1, n))
+			dmap.frame0_to_1_inplace(mat_0, dense_1)
+			self.assert_vector_equal(
+					dense_1, 1 + C.dot(mat_0.toarray()) )
+
+			# in-place: sparse in, sparse out
+			sparse_0 = fmt(np.ones((dmap.n_frame0, n)))
+			handle = sparse_0
+			dmap.frame1_to_0_inplace(mat_1, sparse_0)
+			self.assertIs( sparse_0, handle )
+			self.assert_vector_equal(
+					sparse_0.toarray(), 1 + C.T.dot(mat_1.toarray()) )
+
+			dmap.frame1_to_0_inplace(mat_1, sparse_0, clear_output=True)
+			self.assert_vector_equal(
+					sparse_0.toarray(), C.T.dot(mat_1.toarray()) )
+
+			with self.assertRaises(ValueError):
+				dmap.frame0_to_1_inplace(
+						mat_0, np.ones((dmap.n_frame1, n + 1)))
+
 class ClusterMappingTestCase(ConradTestCase):
 	def test_cluster_mapping_init(self):
 		cmap = ClusterMapping([1, 2, 2, 3, 3, 3])
@@ -274,6 +326,23 @@ class ClusterMappingTestCase(ConradTestCase):
 		ro = cmap.downsample(cmap.upsample(ri))
 		self.assert_vector_equal( ri, ro )
 
+	def test_cluster_mapping_sparse(self):
+		cmap = ClusterMapping([0, 1, 1, 2, 2, 2])
+		n = 4
+		scaling = 1. / cmap.cluster_weights[cmap.vec]
+
+		for fmt in (sp.csr_matrix, sp.csc_matrix):
+			pts = fmt(np.ones((cmap.n_points, n)))
+			clus = cmap.downsample(pts)
+			self.assertIsInstance( clus, fmt )
+			self.assert_vector_equal(
+					clus.toarray(), np.ones((cmap.n_clusters, n)) )
+
+			pgen = cmap.upsample(clus, rescale_output=True)
+			self.assertIsInstance( pgen, fmt )
+			self.assert_vector_equal(
+					pgen.toarray(), np.outer(scaling, np.ones(n)) )
+
 	def test_cluster_mapping_to_contiguous(self):
 		cmap = ClusterMapping([0, 1, 1, 2])
 		self.assertIs( cmap.contiguous, cmap )
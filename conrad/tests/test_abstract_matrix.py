@@ -51,14 +51,37 @@ class SparseMatrixSlicingTestCase(ConradTestCase):
 		# 10 rows or columns
 		indices = [1, 4, 7, 12, 19, 22, 25, 34, 37, 38]
 
-		# A_csr_sub = csx_slice_uncompressed(A_csr, indices)
-		# A_csr_sub_check = A_csr[:, indices]
-		# self.assertEqual( (A_csr_sub - A_csr_sub_check).nnz, 0 )
+		A_csr_sub = csx_slice_uncompressed(A_csr, indices)
+		A_csr_sub_check = A_csr[:, indices]
+		self.assertEqual( (A_csr_sub - A_csr_sub_check).nnz, 0 )
 
 		A_csc_sub = csx_slice_uncompressed(A_csc, indices)
 		A_csc_sub_check = A_csc[indices, :]
 		self.assertEqual( (A_csc_sub - A_csc_sub_check).nnz, 0 )
 
+		# unsorted, duplicated and negative indices
+		indices = [38, 4, 22, 4, 1, -3, 19, 38, 38]
+
+		A_csr_sub = csx_slice_uncompressed(A_csr, indices)
+		A_csr_sub_check = A_csr[:, indices]
+		self.assertEqual( A_csr_sub.shape, A_csr_sub_check.shape )
+		self.assertEqual( (A_csr_sub - A_csr_sub_check).nnz, 0 )
+
+		A_csc_sub = csx_slice_uncompressed(A_csc, indices)
+		A_csc_sub_check = A_csc[indices, :]
+		self.assertEqual( A_csc_sub.shape, A_csc_sub_check.shape )
+		self.assertEqual( (A_csc_sub - A_csc_sub_check).nnz, 0 )
+
+		# empty selection
+		A_csr_sub = csx_slice_uncompressed(A_csr, [])
+		self.assertEqual( A_csr_sub.shape, (m, 0) )
+		self.assertEqual( A_csr_sub.nnz, 0 )
+
+		with self.assertRaises(IndexError):
+			csx_slice_uncompressed(A_csr, [0, n])
+		with self.assertRaises(IndexError):
+			csx_slice_uncompressed(A_csc, [-m - 1])
+
 class SliceCachingMatrixTestCase(ConradTestCase):
 	def test_sc_mat_init_attr(self):
 		m, n = 20, 10
@@ -68,9 +91,9 @@ class SliceCachingMatrixTestCase(ConradTestCase):
 		self.assertEqual( A.row_dim, m )
 		self.assertEqual( A.column_dim, n )
 		self.assert_vector_equal( A.data, A_ )
-		self.assertEqual( len(A._SliceCachingMatrix__row_slices), 0 )
-		self.assertEqual( len(A._SliceCachingMatrix__column_slices), 0 )
-		self.assertEqual( len(A._SliceCachingMatrix__double_slices), 0 )
+		self.assertEqual( len(A.cached_slices['row']), 0 )
+		self.assertEqual( len(A.cached_slices['column']), 0 )
+		self.assertEqual( len(A.cached_slices['both']), 0 )
 
 		with self.assertRaises(TypeError):
 			# 1-D array not accepted
@@ -92,9 +115,9 @@ class SliceCachingMatrixTestCase(ConradTestCase):
 		A = SliceCachingMatrix(data)
 		self.assertEqual( A.row_dim, 4 * m )
 		self.assertEqual( A.column_dim, n )
-		self.assertEqual( len(A._SliceCachingMatrix__row_slices), 4 )
-		self.assertEqual( len(A._SliceCachingMatrix__column_slices), 0 )
-		self.assertEqual( len(A._SliceCachingMatrix__double_slices), 0 )
+		self.assertEqual( len(A.cached_slices['row']), 4 )
+		self.assertEqual( len(A.cached_slices['column']), 0 )
+		self.assertEqual( len(A.cached_slices['both']), 0 )
 
 		self.assertTrue( all(i in A for i in xrange(4)) )
 		self.assertTrue( all(('row', i) in A for i in xrange(4)) )
@@ -105,9 +128,9 @@ class SliceCachingMatrixTestCase(ConradTestCase):
 		A = SliceCachingMatrix(data)
 		self.assertEqual( A.row_dim, 4 * m )
 		self.assertEqual( A.column_dim, n )
-		self.assertEqual( len(A._SliceCachingMatrix__row_slices), 4 )
-		self.assertEqual( len(A._SliceCachingMatrix__column_slices), 0 )
-		self.assertEqual( len(A._SliceCachingMatrix__double_slices), 0 )
+		self.assertEqual( len(A.cached_slices['row']), 4 )
+		self.assertEqual( len(A.cached_slices['column']), 0 )
+		self.assertEqual( len(A.cached_slices['both']), 0 )
 
 		self.assertTrue( all(i in A for i in xrange(4)) )
 		self.assertTrue( all(('row', i) in A for i in xrange(4)) )
@@ -118,9 +141,9 @@ class SliceCachingMatrixTestCase(ConradTestCase):
 		A = SliceCachingMatrix(data)
 		self.assertEqual( A.row_dim, m )
 		self.assertEqual( A.column_dim, 4 * n )
-		self.assertEqual( len(A._SliceCachingMatrix__row_slices), 0 )
-		self.assertEqual( len(A._SliceCachingMatrix__column_slices), 4 )
-		self.assertEqual( len(A._SliceCachingMatrix__double_slices), 0 )
+		self.assertEqual( len(A.cached_slices['row']), 0 )
+		self.assertEqual( len(A.cached_slices['column']), 4 )
+		self.assertEqual( len(A.cached_slices['both']), 0 )
 
 		self.assertFalse( any(i in A for i in xrange(4)) )
 		self.assertTrue( all(('column', i) in A for i in xrange(4)) )
@@ -131,6 +154,23 @@ class SliceCachingMatrixTestCase(ConradTestCase):
 			data['labeled_by'] = 'invalid specification'
 			A = SliceCachingMatrix(data)
 
+	def test_sc_mat_version(self):
+		A_ = np.random.rand(20, 10)
+		A = SliceCachingMatrix(A_)
+		version, digest = A.version, A.digest
+		self.assertIsInstance( digest, str )
+
+		A.data = A_.copy()
+		self.assertTrue( A.version > version )
+		self.assertEqual( A.digest, digest )
+
+		A.data = 2 * A_
+		self.assertNotEqual( A.digest, digest )
+
+		# no contiguous data to hash
+		A = SliceCachingMatrix({0: A_})
+		self.assertIsNone( A.digest )
+
 	def test_sc_mat_row_slice(self):
 		m, n = 30, 40
 		SCM = SliceCachingMatrix(np.random.rand(2, 2))
@@ -280,3 +320,125 @@ class SliceCachingMatrixTestCase(ConradTestCase):
 			else:
 				self.assertEqual(
 					(F.slice(row_label=0, column_label=0) - A_sub_vb).nnz, 0 )
+
+	def test_sc_mat_release_slice(self):
+		m, n = 30, 20
+		A = np.random.rand(m, n)
+		indices = [2, 5, 11]
+		B = SliceCachingMatrix(A)
+		self.assertFalse( B.release_slice() )
+		self.assertFalse( B.release_slice(row_label=0) )
+		B.row_slice(0, indices)
+		B.slice(0, 1, column_indices=[0, 1])
+		self.assertTrue( B.release_slice(row_label=0) )
+		self.assertNotIn( ('row', 0), B )
+		self.assertTrue( B.release_slice(row_label=0, column_label=1) )
+		self.assertNotIn( ('both', (0, 1)), B )
+
+		# component matrices are not released
+		C = SliceCachingMatrix({0: A[:10, :], 1: A[10:, :]})
+		self.assertFalse( C.release_slice(row_label=0) )
+		self.assertIn( ('row', 0), C )
+
+class LazyMatrixSliceTestCase(ConradTestCase):
+	def test_lazy_matrix_slice(self):
+		m, n = 30, 20
+		A = sp.rand(m, n, 0.3).tocsr()
+		indices = [2, 5, 11]
+		lookup = lambda label: indices
+
+		with self.assertRaises(TypeError):
+			LazyMatrixSlice(A, 0)
+		with self.assertRaises(ValueError):
+			LazyMatrixSlice(SliceCachingMatrix(A))
+
+		B = SliceCachingMatrix(A)
+		L = LazyMatrixSlice(B, 0, row_indices=lookup)
+		self.assertEqual( L.shape, (3, n) )
+		self.assertFalse( L.materialized )
+		self.assertNotIn( ('row', 0), B )
+
+		A_sub = L.materialize()
+		self.assertTrue( L.materialized )
+		self.assertIs( L.materialize(), A_sub )
+		self.assertEqual( (A_sub - A[indices, :]).nnz, 0 )
+
+		self.assertTrue( L.release() )
+		self.assertFalse( L.materialized )
+		self.assertEqual( (L.materialize() - A_sub).nnz, 0 )
+
+		L = LazyMatrixSlice(B, 0, 1, lookup, [0, 1])
+		self.assertEqual( L.shape, (3, 2) )
+		L = LazyMatrixSlice(B, column_label=1, column_indices=[0, 1])
+		self.assertEqual( L.shape, (m, 2) )
+
+		# dimensions of cached slices known without indices
+		C = SliceCachingMatrix({0: A[:10, :], 1: A[10:, :]})
+		self.assertEqual( LazyMatrixSlice(C, 1).shape, (20, n) )
+		with self.assertRaises(ValueError):
+			LazyMatrixSlice(C, 2)
+
+	def test_sc_mat_cache_budget(self):
+		m, n = 40, 20
+		A = np.random.rand(m, n)
+		indices = {k: np.arange(10 * k, 10 * (k + 1)) for k in xrange(4)}
+		lookup = lambda label: indices[label]
+		slice_bytes = A[:10, :].nbytes
+
+		B = SliceCachingMatrix(A, cache_budget=2 * slice_bytes)
+		self.assertEqual( B.cache_budget, 2 * slice_bytes )
+		for k in xrange(4):
+			self.assert_vector_equal( B.row_slice(k, lookup), A[indices[k], :] )
+		self.assertEqual( B.cached_slices['row'], [2, 3] )
+		stats = B.cache_stats
+		self.assertEqual( stats['misses'], 4 )
+		self.assertEqual( stats['evictions'], 2 )
+		self.assertEqual( stats['bytes'], 2 * slice_bytes )
+		self.assertEqual( stats['contiguous_bytes'], A.nbytes )
+
+		# evicted slices rebuilt on request; pinned slices retained
+		self.assertTrue( B.pin_slice(3) )
+		B.row_slice(0, lookup)
+		B.row_slice(1, lookup)
+		self.assertEqual( B.cached_slices['row'], [3, 1] )
+		B.unpin_slice(3)
+		self.assertEqual( B.cache_stats['hits'], 0 )
+
+		# pinned by lazy slice while materialized
+		L = LazyMatrixSlice(B, 2, row_indices=lookup)
+		L.materialize()
+		B.row_slice(0, lookup)
+		self.assertIn( ('row', 2), B )
+		L.release()
+		self.assertNotIn( ('row', 2), B )
+
+		B.cache_budget = None
+		self.assertEqual( B.cache_budget, None )
+
+	def test_sc_mat_drop_data(self):
+		m, n = 40, 20
+		A = sp.rand(m, n, 0.3).tocsr()
+		indices = {k: np.arange(10 * k, 10 * (k + 1)) for k in xrange(4)}
+		B = SliceCachingMatrix(A)
+		digest = B.digest
+		version = B.version
+		for k in xrange(3):
+			B.row_slice(k, indices[k])
+		self.assertFalse( B.drop_data() )
+		self.assertTrue( B.contiguous )
+
+		B.row_slice(3, indices[3])
+		with self.assertRaises(ValueError):
+			B.drop_data('voxels')
+		self.assertTrue( B.drop_data() )
+		self.assertFalse( B.contiguous )
+		self.assertFalse( B.drop_data() )
+		self.assertEqual( B.digest, digest )
+		self.assertEqual( B.version, version )
+
+		# slices now persistent
+		B.cache_budget = 0
+		self.assertFalse( B.release_slice(row_label=0) )
+		self.assertEqual( (B.row_slice(0, None) - A[:10, :]).nnz, 0 )
+		self.assertEqual( B.cache_stats['contiguous_bytes'], 0 )
+		self.assertEqual( B.manifest['labeled_by'], 'rows' )
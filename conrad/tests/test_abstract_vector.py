@@ -71,4 +71,71 @@ class SliceCachingVectorTestCase(ConradTestCase):
 		v_ = {i: np.random.rand(i) for i in [4, 7, 9]}
 		v = SliceCachingVector(v_)
 		v.assemble()
-		self.assertEqual( v.data.size, 4 + 7 + 9 )
\ No newline at end of file
+		self.assertEqual( v.data.size, 4 + 7 + 9 )
+
+	def test_sc_vec_cache_budget(self):
+		v_ = np.random.rand(30)
+		idx = {k: np.arange(10 * k, 10 * (k + 1)) for k in xrange(3)}
+		v = SliceCachingVector(v_, cache_budget=v_[:20].nbytes)
+		for k in xrange(3):
+			self.assert_vector_equal( v.slice(k, idx[k]), v_[idx[k]] )
+		self.assertNotIn( 0, v )
+		self.assertEqual( v.cache_stats['evictions'], 1 )
+		self.assertEqual( v.cache_stats['bytes'], v_[:20].nbytes )
+
+		self.assertTrue( v.pin_slice(1) )
+		v.slice(0, idx[0])
+		self.assertIn( 1, v )
+		self.assertNotIn( 2, v )
+		v.unpin_slice(1)
+		self.assertTrue( v.release_slice(1) )
+		self.assertNotIn( 1, v )
+		self.assertEqual( v.cache_stats['hits'], 0 )
+
+		# component subvectors never evicted
+		v = SliceCachingVector({0: v_[:10], 1: v_[10:]}, cache_budget=0)
+		self.assertIn( 0, v )
+		self.assertFalse( v.release_slice(0) )
+
+class LabelIndexTestCase(ConradTestCase):
+	def test_label_index(self):
+		labels = np.array([3, 1, 3, 0, 1, 3, 7, 0])
+		index = LabelIndex(labels)
+
+		self.assertEqual( index.size, labels.size )
+		self.assertEqual( len(index), 4 )
+		self.assert_vector_equal( index.labels, [0, 1, 3, 7] )
+		self.assert_vector_equal( index.counts, [2, 2, 3, 1] )
+		self.assert_vector_equal( index.offsets, [0, 2, 4, 7, 8] )
+		self.assert_vector_equal( labels[index.order], np.sort(labels) )
+
+		for label in [0, 1, 3, 7]:
+			self.assertIn( label, index )
+			self.assert_vector_equal(
+					index.indices(label), np.flatnonzero(labels == label) )
+		self.assertEqual( index.position(3), 2 )
+
+		self.assertNotIn( 2, index )
+		with self.assertRaises(KeyError):
+			index.indices(2)
+
+		labels = (10 * np.random.rand(500)).astype(int)
+		index = LabelIndex(labels)
+		for label in np.unique(labels):
+			self.assert_vector_equal(
+					index.indices(label), np.flatnonzero(labels == label) )
+
+	def test_label_index_grouping(self):
+		labels = np.array([3, 1, 3, 0, 1])
+		index = LabelIndex(labels)
+		self.assertFalse( index.grouped )
+		v = np.random.rand(5)
+		v_grouped = index.group(v)
+		for k, label in enumerate(index.labels):
+			self.assert_vector_equal(
+					v_grouped[index.offsets[k]:index.offsets[k + 1]],
+					v[labels == label] )
+
+		index = LabelIndex(np.sort(labels))
+		self.assertTrue( index.grouped )
+		self.assertIs( index.group(v), v )
@@ -0,0 +1,116 @@
+"""
+Unit tests for :mod:`conrad.optimization.beam_clustering`.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.abstract.mapping import ClusterMapping
+from conrad.physics.physics import Physics, DoseFrame, DoseFrameMapping
+from conrad.optimization.beam_clustering import *
+from conrad.tests.base import *
+
+class BeamClusteringTestCase(ConradTestCase):
+	@classmethod
+	def setUpClass(self):
+		# 2 beam groups, each with 3 distinct column profiles repeated
+		self.m = 80
+		self.n_per = 3 * 10
+		self.beam_labels = np.repeat([2, 5], self.n_per)
+		profiles = np.random.rand(self.m, 6)
+		self.profile = np.hstack([
+				np.tile(np.arange(3), 10) + 3 * k for k in xrange(2)])
+		self.A = profiles[:, self.profile]
+		self.voxel_labels = np.random.randint(0, 3, self.m)
+
+	def test_cluster_mapping(self):
+		bc = BeamClustering(compression=10)
+		frame = DoseFrame(data=self.A, beam_labels=self.beam_labels)
+		cmap, cluster_labels = bc.cluster_mapping(frame)
+
+		self.assertIsInstance( cmap, ClusterMapping )
+		self.assertEqual( cmap.n_points, 2 * self.n_per )
+		self.assertEqual( cmap.n_clusters, 6 )
+		self.assert_vector_equal( cluster_labels, [2, 2, 2, 5, 5, 5] )
+		self.assert_vector_equal( cluster_labels[cmap.vec], self.beam_labels )
+		for p in xrange(6):
+			self.assertEqual( len(np.unique(cmap.vec[self.profile == p])), 1 )
+
+		# no beam labels: cluster all beams jointly
+		frame = DoseFrame(data=self.A)
+		cmap, cluster_labels = bc.cluster_mapping(frame)
+		self.assertEqual( cmap.n_clusters, 6 )
+		self.assert_vector_equal( cluster_labels, np.zeros(6) )
+
+		with self.assertRaises(AttributeError):
+			bc.cluster_mapping(DoseFrame(self.m, 2 * self.n_per))
+
+	def test_cluster(self):
+		bc = BeamClustering(compression=10)
+		weights = np.random.rand(2 * self.n_per)
+
+		for A in (self.A, sp.csr_matrix(self.A), sp.csc_matrix(self.A)):
+			p = Physics(
+					dose_matrix=A, voxel_labels=self.voxel_labels,
+					beam_labels=self.beam_labels, beam_weights=weights)
+			fm = bc.cluster(p)
+
+			self.assertIsInstance( fm, DoseFrameMapping )
+			self.assertEqual( fm.target, 'frame0_beam_clustered' )
+			self.assertIsNone( fm.voxel_map )
+			self.assertIs( p.retrieve_frame_mapping(
+					'frame0', 'frame0_beam_clustered'), fm )
+
+			f = p.retrieve_dose_frame(fm.target)
+			self.assertEqual( f.voxels, self.m )
+			self.assertEqual( f.beams, 6 )
+			self.assertEqual( type(f.dose_matrix.data), type(A) )
+			self.assert_vector_equal( f.voxel_labels, self.voxel_labels )
+			self.assert_vector_equal(
+					f.beam_labels[fm.beam_map.vec], self.beam_labels )
+			self.assert_vector_equal(
+					f.beam_weights.data, fm.beam_map.frame0_to_1(weights) )
+
+			# super-beam intensities and upsampled intensities deliver
+			# identical doses
+			u = np.random.rand(6)
+			x = BeamClustering.upsample(fm, u)
+			self.assertEqual( x.size, 2 * self.n_per )
+			self.assert_vector_equal( x, u[fm.beam_map.vec] )
+			self.assert_vector_equal(
+					f.dose_matrix.data.dot(u), self.A.dot(x) )
+
+	def test_upsample(self):
+		cmap = ClusterMapping([0, 1, 1, 2, 0])
+		u = np.array([1., 2., 3.])
+		self.assert_vector_equal(
+				BeamClustering.upsample(cmap, u), [1, 2, 2, 3, 1] )
+		self.assert_vector_equal(
+				BeamClustering.upsample(
+						DoseFrameMapping('a', 'b', beam_map=cmap), u),
+				[1, 2, 2, 3, 1] )
+
+		with self.assertRaises(TypeError):
+			BeamClustering.upsample(
+					DoseFrameMapping('a', 'b', voxel_map=cmap), u)
+		with self.assertRaises(ValueError):
+			BeamClustering.upsample(cmap, np.ones(4))
@@ -323,6 +323,13 @@ class CaseTestCase(ConradTestCase):
 		case.load_physics_to_anatomy()
 		self.assertTrue( case.physics.data_loaded )
 
+		# mean dose matrices of all structures from one-pass calculation
+		for structure in case.anatomy:
+			self.assert_vector_equal(
+					structure.A_mean,
+					case.physics.mean_dose_by_label(structure.label) )
+			self.assertFalse( structure.A_materialized )
+
 		for structure in case.anatomy:
 			A = case.physics.dose_matrix_by_label(structure.label)
 			vw = case.physics.voxel_weights_by_label(structure.label)
@@ -341,6 +348,42 @@ class CaseTestCase(ConradTestCase):
 		for structure in case.anatomy:
 			self.assert_vector_equal( structure.y, structure.A.dot(x) )
 
+		# one-pass calculation matches structure-by-structure calculation
+		y_mean = {s.label: s.y_mean for s in case.anatomy}
+		case.anatomy.calculate_doses(x)
+		for structure in case.anatomy:
+			self.assert_vector_equal( structure.y, structure.A.dot(x) )
+			self.assert_scalar_equal( structure.y_mean, y_mean[structure.label] )
+
+		# non-contiguous voxel weights: structure-by-structure calculation
+		frame = case.physics.frame
+		frame.voxel_weights = {
+				s.label: case.physics.voxel_weights_by_label(s.label)
+				for s in case.anatomy}
+		self.assertIsNone( frame.voxel_weights.data )
+		case.calculate_doses(x)
+		for structure in case.anatomy:
+			self.assert_vector_equal( structure.y, structure.A.dot(x) )
+			self.assert_scalar_equal( structure.y_mean, y_mean[structure.label] )
+
+	def test_plan_lazy_matrices(self):
+		case = Case(Anatomy([
+				Structure(0, 'PTV', True),
+				Structure(1, 'OAR1', False),
+				Structure(2, 'OAR2', False)
+			]), self.physics)
+
+		success, run = case.plan(verbose=0)
+		self.assertTrue( success )
+
+		# collapsable structures planned and dosed without materializing
+		# their full dose matrices
+		for structure in case.anatomy:
+			if structure.collapsable:
+				self.assertFalse( structure.A_materialized )
+			A = case.physics.dose_matrix_by_label(structure.label)
+			self.assert_vector_equal( structure.y, A.dot(run.x) )
+
 	def test_plotting_data(self):
 		c = Case(self.anatomy, self.physics)
 		plot_data = c.plotting_data()
@@ -375,3 +418,14 @@ class CaseTestCase(ConradTestCase):
 				self.assertIn( 0, run.plotting_data )
 				if exact:
 					self.assertIn( 'exact', run.plotting_data )
+
+		# plans recorded in history, usable as warm starts
+		self.assertIs( case.history.runs[0], run0 )
+		self.assertIs( case.history.runs[-1], run )
+		case.history.tag_last('reference')
+		for warm_start in ('last', 'reference', run0):
+			success, run = case.plan(warm_start=warm_start, verbose=0)
+			self.assertTrue( success )
+			self.assertIn( 'warm_start', run.info )
+		with self.assertRaises(ValueError):
+			case.plan(warm_start='untagged', verbose=0)
@@ -0,0 +1,67 @@
+"""
+Unit tests for :mod:`conrad.defs`.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import sys
+import subprocess
+
+from conrad.defs import *
+from conrad.tests.base import *
+
+class DefsTestCase(ConradTestCase):
+	def test_module_installed(self):
+		self.assertTrue( module_installed('numpy') )
+		self.assertTrue( module_installed('numpy', version_string='') )
+		self.assertFalse( module_installed('numpy', version_string='x.y') )
+		self.assertFalse( module_installed('conrad_no_such_module') )
+		self.assertFalse( module_installed('conrad_no_such_module.sub') )
+
+		# module without distribution metadata, pkg_resources unavailable
+		pkg_resources = sys.modules.get('pkg_resources', None)
+		sys.modules['pkg_resources'] = None
+		try:
+			self.assertFalse( module_installed('json', version_string='1') )
+		finally:
+			if pkg_resources is None:
+				del sys.modules['pkg_resources']
+			else:
+				sys.modules['pkg_resources'] = pkg_resources
+
+	def test_lazy_module(self):
+		calls = []
+		m = LazyModule('json', on_import=lambda: calls.append(1))
+		self.assertFalse( m.loaded )
+		self.assertEqual( len(calls), 0 )
+		self.assertEqual( m.loads('[1]'), [1] )
+		self.assertTrue( m.loaded )
+		self.assertEqual( m.dumps([1]), '[1]' )
+		self.assertEqual( len(calls), 1 )
+
+		m = LazyModule('conrad_no_such_module')
+		with self.assertRaises(ImportError):
+			m.anything
+
+	def test_import_defers_backends(self):
+		probe = ('import sys, conrad; print(sorted(m for m in '
+				 '("cvxpy", "optkit", "matplotlib") if m in sys.modules))')
+		output = subprocess.check_output([sys.executable, '-c', probe])
+		self.assertEqual( output.decode().strip(), '[]' )
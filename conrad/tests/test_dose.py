@@ -879,25 +879,6 @@ class DVHTestCase(ConradTestCase):
 		self.assertEqual( dvh.min_dose, y.min() )
 		self.assertEqual( dvh.max_dose, y.max() )
 
-	def test_interpolate_percentile(self):
-		""" test DVH object static method interpolate_percentile """
-		dvh = DVH(100)
-		first = 1
-		second = 5
-		interp = first + (second - first) * np.random.rand()
-		alpha = dvh._DVH__interpolate_percentile(first, second, interp)
-
-		self.assert_scalar_equal(alpha * first + (1 - alpha) * second, interp,
-								 1e-7, 1e-7)
-
-		alpha_identity = dvh._DVH__interpolate_percentile(
-				second, second, second)
-		self.assertEqual( alpha_identity, 1 )
-
-		with self.assertRaises(ValueError):
-			alpha_fail = dvh._DVH__interpolate_percentile(
-					second, second, interp)
-
 	def test_dose_at_percentile(self):
 		""" test DVH object method dose_at_percentile """
 
@@ -947,6 +928,106 @@ class DVHTestCase(ConradTestCase):
 		self.assertLessEqual( dose_lower, dose_retrieved)
 		self.assertLessEqual( dose_retrieved, dose_upper)
 
+	def test_doses_at_percentiles(self):
+		""" test DVH object method doses_at_percentiles """
+		m = 3000
+		y = np.random.rand(m)
+		y_sort = np.sort(y)
+		dvh = DVH(m)
+		dvh.data = y
+
+		percentiles = np.array([100, 98, 60.2, 50, 2, 0])
+		doses = dvh.doses_at_percentiles(percentiles)
+		self.assertEqual( doses.shape, percentiles.shape )
+		self.assertEqual( doses[0], y.min() )
+		self.assertEqual( doses[-1], y.max() )
+		self.assertTrue( all(np.diff(doses) >= 0) )
+
+		# batched query matches scalar queries
+		for p, d in zip(percentiles, doses):
+			self.assertEqual( dvh.dose_at_percentile(p), d )
+			self.assertEqual( dvh.dose_at_percentile(p * Percent()), d )
+
+		# retrieved doses bracketed by neighboring order statistics
+		for p, d in zip(percentiles, doses):
+			rank = 0.01 * (100 - p) * (m - 1)
+			self.assertLessEqual( y_sort[int(np.floor(rank))], d )
+			self.assertLessEqual( d, y_sort[int(np.ceil(rank))] )
+
+		# unit-bearing inputs
+		doses_units = dvh.doses_at_percentiles(
+				[p * Percent() for p in percentiles])
+		self.assert_vector_equal( doses_units, doses )
+
+		with self.assertRaises(ValueError):
+			dvh.doses_at_percentiles([50, 101])
+		with self.assertRaises(ValueError):
+			dvh.doses_at_percentiles([-1])
+
+	def test_percentiles_at_doses(self):
+		""" test DVH object method percentiles_at_doses """
+		m = 500
+		y = np.random.rand(m)
+		dvh = DVH(m)
+		dvh.data = y
+
+		doses = np.array([-1., 0.1, 0.5, 0.9, 2.])
+		percentiles = dvh.percentiles_at_doses(doses)
+		self.assertEqual( percentiles.shape, doses.shape )
+		for d, p in zip(doses, percentiles):
+			self.assert_scalar_equal( p, 100. * sum(y < d) / m )
+			self.assertEqual( dvh.percentile_at_dose(d), p )
+			if d >= 0:
+				self.assertEqual( dvh.percentile_at_dose(float(d) * Gy), p )
+		self.assertEqual( percentiles[0], 0 )
+		self.assertEqual( percentiles[-1], 100 )
+
+	def test_lazy_sorting(self):
+		""" test DVH object deferred sorting of dose data """
+		m = 5000
+		y = np.random.rand(m)
+		dvh = DVH(m)
+		dvh_eager = DVH(m, lazy=False)
+		self.assertTrue( dvh.lazy )
+		self.assertFalse( dvh_eager.lazy )
+
+		dvh.data = y
+		dvh_eager.data = y
+		self.assertTrue( dvh.populated )
+		self.assertFalse( dvh.sorted )
+		self.assertTrue( dvh_eager.sorted )
+
+		# few queries answered by selection, without sorting
+		percentiles = [98, 75, 25, 2]
+		self.assert_vector_equal(
+				dvh.doses_at_percentiles(percentiles),
+				dvh_eager.doses_at_percentiles(percentiles) )
+		self.assertEqual( dvh.min_dose, y.min() )
+		self.assertEqual( dvh.max_dose, y.max() )
+		doses = [0.2, 0.5]
+		self.assert_vector_equal(
+				dvh.percentiles_at_doses(doses),
+				dvh_eager.percentiles_at_doses(doses) )
+		self.assertFalse( dvh.sorted )
+
+		# full curve requested: sort
+		self.assert_vector_equal(
+				dvh.plotting_data['dose'], dvh_eager.plotting_data['dose'] )
+		self.assertTrue( dvh.sorted )
+
+		# new dose data invalidates sorted state
+		y = 2 + np.random.rand(m)
+		dvh.data = y
+		self.assertFalse( dvh.sorted )
+		self.assertEqual( dvh.min_dose, y.min() )
+		self.assertEqual( dvh.max_dose, y.max() )
+
+		# large batch of queries: sort
+		percentiles = np.linspace(0, 100, 2 * DVH.MAX_SELECTION_QUERIES)
+		dvh.doses_at_percentiles(percentiles)
+		self.assertTrue( dvh.sorted )
+		self.assertEqual( dvh.dose_at_percentile(100), y.min() )
+
 	def test_plotting_data(self):
 		""" test DVH object property plotting_data """
 		m = 2500
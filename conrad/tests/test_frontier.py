@@ -0,0 +1,150 @@
+"""
+Unit tests for :mod:`conrad.optimization.frontier`.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import numpy as np
+
+from conrad.physics import Physics, Gy
+from conrad.physics.units import cGy
+from conrad.medicine import Anatomy, Structure, D
+from conrad.case import Case
+from conrad.optimization.frontier import *
+from conrad.tests.base import *
+
+class FrontierTestCase(ConradTestCase):
+	def setUp(self):
+		m, n = 100, 50
+		self.anatomy = Anatomy([
+				Structure(0, 'PTV', True),
+				Structure(1, 'OAR', False),
+			])
+		self.physics = Physics(
+				dose_matrix=np.random.rand(m, n),
+				voxel_labels=(2 * np.random.rand(m)).astype(int))
+
+	def test_interpolate_value(self):
+		self.assert_scalar_equal( interpolate_value(1., 3., 0.25), 1.5 )
+		anchors = np.arange(1, 4, 2)
+		self.assert_scalar_equal(
+				interpolate_value(anchors[0], anchors[1], 0.25), 1.5 )
+		self.assert_scalar_equal(
+				interpolate_value(np.float32(1), 3, 0.25), 1.5 )
+		dose = interpolate_value(10 * Gy, 20 * Gy, 0.5)
+		self.assertIsInstance( dose, type(Gy) )
+		self.assert_scalar_equal( dose.value, 15. )
+		self.assertEqual(
+				interpolate_value({'dose': 1.}, {'dose': 2.}, 1.),
+				{'dose': 2.} )
+		self.assertEqual( interpolate_value('<', '<', 0.5), '<' )
+
+		with self.assertRaises(TypeError):
+			interpolate_value(10 * Gy, 2000 * cGy, 0.5)
+		with self.assertRaises(TypeError):
+			interpolate_value('<', '>', 0.5)
+
+	def test_interpolate_variant(self):
+		anchors = [{'w': 0.}, {'w': 1.}, {'w': 3.}]
+		self.assert_scalar_equal( interpolate_variant(anchors, 0)['w'], 0. )
+		self.assert_scalar_equal(
+				interpolate_variant(anchors, 0.5)['w'], 0.5 )
+		self.assert_scalar_equal(
+				interpolate_variant(anchors, 1.5)['w'], 2. )
+		self.assert_scalar_equal( interpolate_variant(anchors, 2)['w'], 3. )
+
+	def test_refinement_scores(self):
+		t = np.arange(4.)
+
+		# straight frontier: intervals scored by length
+		F = np.array([[0., 3.], [1., 2.], [2., 1.], [4., -1.]])
+		scores = refinement_scores(t, F)
+		self.assertEqual( scores.size, 3 )
+		self.assert_vector_equal(
+				scores, np.sqrt(2.) / 4. * np.array([1., 1., 2.]) )
+
+		# frontier turns at second point: adjacent intervals favored
+		F = np.array([[0., 3.], [1., 2.], [2., 2.], [3., 2.]])
+		scores = refinement_scores(t, F)
+		self.assertTrue( scores[0] > np.sqrt(2.) / 3. )
+		self.assertTrue( scores[1] > scores[2] )
+
+		# feasibility boundary refined first; infeasible interval never
+		F = np.array([[0., 3.], [1., 2.], [np.nan, np.nan], [np.nan, np.nan]])
+		scores = refinement_scores(t, F)
+		self.assertTrue( np.isinf(scores[1]) )
+		self.assertEqual( scores[2], 0 )
+
+	def test_pareto_frontier(self):
+		t = [1., 0., 2.]
+		F = [[1., 1.], [0., 2.], [2., 2.]]
+		summaries = np.zeros((3, 2, 3))
+		summaries[:, 0, 0] = t
+		frontier = ParetoFrontier(
+				t, ['b', 'a', 'c'], [0, 1], F, ['mean', 'min', 'max'],
+				summaries, np.zeros((3, 5)), [True, True, True],
+				['rb', 'ra', 'rc'])
+		self.assertEqual( len(frontier), 3 )
+		self.assert_vector_equal( frontier.t, np.arange(3.) )
+		self.assertEqual( frontier.variants, ['a', 'b', 'c'] )
+		self.assertEqual( frontier.runs, ['ra', 'rb', 'rc'] )
+		self.assert_vector_equal(
+				frontier.dvh_summary(0, 'mean'), np.arange(3.) )
+		self.assertEqual(
+				list(frontier.pareto_optimal), [True, True, False] )
+
+	def test_plan_frontier(self):
+		case = Case(self.anatomy, self.physics)
+		case.anatomy['OAR'].constraints += D(30) < 20 * Gy
+		cid = case.anatomy['OAR'].constraints.last_key
+		w_over = case.anatomy['OAR'].objective.weight_raw
+		anchors = [{(1, 'weight'): 0.1 * w_over},
+				   {(1, 'weight'): 10 * w_over}]
+
+		n_runs = len(case.history.runs)
+		frontier = case.plan_frontier(
+				anchors, n_points=8, n_initial=3, percentiles=[2, 98],
+				verbose=0)
+		self.assertTrue( 3 <= len(frontier) <= 8 )
+		self.assertEqual( len(case.history.runs), n_runs + len(frontier) )
+		self.assertEqual( frontier.objective_values.shape,
+						  (len(frontier), 2) )
+		self.assertEqual( frontier.dvh_summaries.shape,
+						  (len(frontier), 2, 5) )
+		self.assertEqual( frontier.x.shape, (len(frontier), case.n_beams) )
+		self.assertTrue( all(frontier.feasible) )
+		self.assertTrue( all(np.diff(frontier.t) > 0) )
+		self.assertEqual( frontier.t[0], 0 )
+		self.assertEqual( frontier.t[-1], 1 )
+
+		# raising OAR weight lowers OAR mean dose
+		oar_mean = frontier.dvh_summary(1, 'mean')
+		self.assertTrue( oar_mean[-1] <= oar_mean[0] )
+
+		# case unchanged by frontier
+		self.assert_scalar_equal(
+				case.anatomy['OAR'].objective.weight_raw, w_over )
+		self.assertEqual(
+				case.anatomy['OAR'].constraints[cid].dose, 20 * Gy )
+
+		with self.assertRaises(ValueError):
+			case.plan_frontier(anchors[:1])
+		with self.assertRaises(ValueError):
+			case.plan_frontier([{cid: 10 * Gy}, {(1, 'weight'): 1.}])
@@ -143,6 +143,18 @@ class RunRecordTestCase(ConradTestCase):
 		self.assertIsInstance( rr.x_exact, np.ndarray )
 		self.assertEqual( rr.nonzero_beam_count_exact, count_exact )
 
+		self.assertFalse( rr.warm_started )
+		self.assertIsNone( rr.iters_saved )
+		rr.output.solver_info['warm_start'] = True
+		rr.output.solver_info['iters_saved'] = 40
+		self.assertTrue( rr.warm_started )
+		self.assertEqual( rr.iters_saved, 40 )
+
+		self.assertIsNone( rr.solver_selection )
+		self.assertIsNone( rr.backend )
+		rr.output.solver_info['solver_selection'] = {'backend': 'ECOS'}
+		self.assertEqual( rr.backend, 'ECOS' )
+
 class PlanningHistoryTestCase(ConradTestCase):
 	def test_planning_history_init(self):
 		h = PlanningHistory()
@@ -195,4 +207,24 @@ class PlanningHistoryTestCase(ConradTestCase):
 		self.assertEqual( h.run_tags['my tag'], 0 )
 		self.assertIsInstance( h[0], RunRecord )
 		self.assertIsInstance( h['my tag'], RunRecord )
-		self.assertEqual( h[0], h['my tag'] )
\ No newline at end of file
+		self.assertEqual( h[0], h['my tag'] )
+
+	def test_planning_history_phases(self):
+		h = PlanningHistory()
+		for i in xrange(3):
+			h += RunRecord()
+			h.runs[-1].phases.add('build', 1.)
+			h.runs[-1].phases.add('solve', 2., 4.)
+		h.tag_last('last')
+
+		totals = h.phase_totals()
+		self.assertEqual( totals['solve']['calls'], 3 )
+		self.assert_scalar_equal( totals.wall, 9. )
+		self.assert_scalar_equal( h.phase_totals(['last', 0]).cpu, 8. )
+
+		table = h.phase_table()
+		self.assertEqual( len(table), 6 )
+		self.assertEqual( table[-1]['run'], 2 )
+		self.assertEqual( table[-1]['tag'], 'last' )
+		self.assertIsNone( table[0]['tag'] )
+		self.assertEqual( table[0]['phase'], 'build' )
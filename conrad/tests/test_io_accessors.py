@@ -23,6 +23,8 @@ from conrad.compat import *
 
 import os
 import re
+import shutil
+import tempfile
 import numpy as np
 import operator as op
 import scipy.sparse as sp
@@ -214,6 +216,29 @@ class DoseFrameAccessorTestCase(ConradTestCase):
 		self.assert_vector_equal( df.voxel_weights.data, self.vw )
 		self.assert_vector_equal( df.beam_weights.data, self.bw )
 
+	def test_dose_frame_accessor_load_mmap(self):
+		directory = tempfile.mkdtemp()
+		try:
+			dfa = DoseFrameAccessor()
+			for mat in (self.mat, sp.csr_matrix(self.mat)):
+				frame = DoseFrame(data=mat, voxel_weights=self.vw)
+				ptr = dfa.save_frame(frame, directory, overwrite=True)
+				df = dfa.load_frame(ptr, mmap_mode='r')
+				data = df.dose_matrix.data
+				if isinstance(mat, np.ndarray):
+					self.assertIsInstance( data, np.memmap )
+					self.assert_vector_equal( data, self.mat )
+				else:
+					self.assertIsInstance( data, sp.csr_matrix )
+					base = data.data
+					while not isinstance(base, np.memmap):
+						base = base.base
+					self.assertIsInstance( base, np.memmap )
+					self.assert_vector_equal( data.toarray(), self.mat )
+				self.assert_vector_equal( df.voxel_weights.data, self.vw )
+		finally:
+			shutil.rmtree(directory)
+
 	def test_dose_frame_accessor_select(self):
 		dfa = DoseFrameAccessor(filesystem=FilesystemTestCaching())
 
@@ -33,9 +33,9 @@ class FilesystemTestBase(ConradFilesystemBase):
 		raise NotImplementedError
 	def join_mkdir(self, directory, *subdir):
 		raise NotImplementedError
-	def read(self, file, key):
+	def read(self, file, key, mmap_mode=None):
 		raise NotImplementedError
-	def read_all(self, file):
+	def read_all(self, file, mmap_mode=None):
 		raise NotImplementedError
 	def write(self, file, data, overwrite=False):
 		raise NotImplementedError
@@ -48,9 +48,9 @@ class FilesystemTestNaming(ConradFilesystemBase):
 		for s in subdir:
 			d += '/' + str(subdir)
 		return d
-	def read(self, file, key):
+	def read(self, file, key, mmap_mode=None):
 		return 'reading at file `{}` with key `{}`'.format(file, key)
-	def read_all(self, file):
+	def read_all(self, file, mmap_mode=None):
 		raise NotImplementedError
 	def write(self, file, data, overwrite=False):
 		return {'file': 'writing at file `{}`'.format(file), 'key': None}
@@ -77,13 +77,13 @@ class FilesystemTestCaching(ConradFilesystemBase):
 				d += '/'
 		return d
 
-	def read(self, file, key):
+	def read(self, file, key, mmap_mode=None):
 		if str(file) in self.__files:
 			return self.__files[file]
 		else:
 			return None
 
-	def read_all(self, file):
+	def read_all(self, file, mmap_mode=None):
 		raise NotImplementedError
 
 	def write(self, file, data, overwrite=False):
@@ -506,6 +506,18 @@ class LocaFilesystemTestCase(ConradTestCase):
 		v_read = lfs.read(v_written['file'], v_written['key'])
 		self.assert_vector_equal( v, v_read )
 
+		v_read = lfs.read(v_written['file'], v_written['key'], mmap_mode='r')
+		self.assertIsInstance( v_read, np.memmap )
+		self.assert_vector_equal( v, v_read )
+
+		with self.assertRaises(ValueError):
+			lfs.read(v_written['file'], v_written['key'], mmap_mode='w+')
+
+		v_written = lfs.write(f_ + 'npz', {'v': v})
+		v_read = lfs.read(
+				v_written['v']['file'], v_written['v']['key'], mmap_mode='r')
+		self.assert_vector_equal( v, v_read )
+
 	def test_lfs_write(self):
 		lfs = LocalFilesystem()
 
@@ -557,4 +569,49 @@ class LocaFilesystemTestCase(ConradTestCase):
 				for subk in input_[k]:
 					self.assertIn( subk, output_[k] )
 					self.assert_vector_equal(
-							input_[k][subk], output_[k][subk] )
\ No newline at end of file
+							input_[k][subk], output_[k][subk] )
+
+	def test_lfs_functionality_mmap(self):
+		lfs = LocalFilesystem()
+		def mapped(array):
+			while array is not None:
+				if isinstance(array, np.memmap):
+					return True
+				array = getattr(array, 'base', None)
+			return False
+
+		input_ = {
+				1: np.random.rand(30),
+				2: np.random.rand(30, 20),
+				3: np.asfortranarray(np.random.rand(30, 20)),
+				4: sp.rand(30, 20, 0.2, format='csr'),
+				5: sp.rand(30, 20, 0.2, format='csc'),
+		}
+		output_ = lfs.read_data(lfs.write_data(
+				os.getcwd(), self.file_tag + 'mmap', input_), mmap_mode='r')
+		for k in input_:
+			self.assertIn( k, output_ )
+			if k <= 3:
+				self.assertTrue( mapped(output_[k]) )
+				self.assert_vector_equal( input_[k], output_[k] )
+			else:
+				self.assertEqual( type(input_[k]), type(output_[k]) )
+				self.assertTrue( mapped(output_[k].data) )
+				self.assertTrue( mapped(output_[k].indices) )
+				self.assertTrue( mapped(output_[k].indptr) )
+				self.assert_vector_equal(
+						input_[k].toarray(), output_[k].toarray() )
+
+		self.assertTrue( output_[2].flags.c_contiguous )
+		self.assertTrue( output_[3].flags.f_contiguous )
+
+		# fortran indexing: shifted copies, files left untouched
+		mat = input_[4]
+		sme = lfs.write_sparse_matrix(
+				os.getcwd(), self.file_tag + 'mmap_fortran', mat)
+		np.save(sme.data_indices_file, mat.indices + 1)
+		np.save(sme.data_pointers_file, mat.indptr + 1)
+		sme.layout_fortran_indexing = True
+		for i in xrange(2):
+			mat_back = lfs.to_sparse_matrix(sme, mmap_mode='r')
+			self.assert_vector_equal( mat_back.toarray(), mat.toarray() )
@@ -238,6 +238,23 @@ class ObjectivesTestCase(ConradTestCase):
 		obj.change_parameters(weight_underdose=3.)
 		obj.change_parameters(w_under=3.5)
 
+		# parametrized expressions track weight and dose changes
+		parameters = {}
+		obj.parametrize(parameters)
+		expr = obj.primal_expr(cvxpy.Variable(3))
+		obj.parametrize(None)
+		self.assertIn( 'weight_abs', parameters )
+		self.assertIn( 'weight_linear', parameters )
+		self.assertIn( 'target_dose', parameters )
+		self.assertEqual( parameters['weight_abs'].value, obj.weight_abs )
+
+		obj.change_parameters(w_under=2., dose='3 Gy')
+		obj.update_parameters(parameters)
+		self.assertEqual( parameters['weight_abs'].value, obj.weight_abs )
+		self.assertEqual(
+				parameters['weight_linear'].value, obj.weight_linear )
+		self.assertEqual( parameters['target_dose'].value, 3. )
+
 	def test_objective_hinge(self):
 		obj = ObjectiveHinge()
 		self.assertEqual( obj.weight, WEIGHT_HINGE_DEFAULT )
@@ -218,6 +218,115 @@ class DoseFrameTestCase(ConradTestCase):
 		self.assert_vector_equal( v_idx, v_idx_lookup )
 		self.assert_vector_equal( b_idx, b_idx_lookup )
 
+	def test_label_index(self):
+		m, n = 100, 50
+		vl = (10 * np.random.rand(m)).astype(int)
+		bl = (3 * np.random.rand(n)).astype(int)
+
+		d = DoseFrame(voxel_labels=vl, beam_labels=bl)
+		v_index = d.voxel_label_index
+		b_index = d.beam_label_index
+
+		# index built once, reused for lookups
+		self.assertIs( d.voxel_label_index, v_index )
+		self.assertIs( d.beam_label_index, b_index )
+		for label in np.unique(vl):
+			self.assert_vector_equal(
+					d.voxel_lookup_by_label(label), np.flatnonzero(vl == label) )
+		for label in np.unique(bl):
+			self.assert_vector_equal(
+					d.beam_lookup_by_label(label), np.flatnonzero(bl == label) )
+
+		with self.assertRaises(KeyError):
+			d.voxel_lookup_by_label(10)
+		with self.assertRaises(KeyError):
+			d.beam_lookup_by_label(3)
+
+		# index invalidated when labels reassigned
+		vl = (20 * np.random.rand(m)).astype(int)
+		d.voxel_labels = vl
+		self.assertIsNot( d.voxel_label_index, v_index )
+		self.assertIs( d.beam_label_index, b_index )
+		for label in np.unique(vl):
+			self.assert_vector_equal(
+					d.voxel_lookup_by_label(label), np.flatnonzero(vl == label) )
+
+		with self.assertRaises(ValueError):
+			DoseFrame(m, n).voxel_label_index
+		with self.assertRaises(ValueError):
+			DoseFrame(m, n).beam_lookup_by_label(0)
+
+	def test_calculate_doses(self):
+		m, n = 100, 50
+		vl = (4 * np.random.rand(m)).astype(int)
+		vw = 1 + np.random.rand(m)
+		x = np.random.rand(n)
+		for A in [np.random.rand(m, n), sp.rand(m, n, 0.3).tocsr(),
+				  sp.rand(m, n, 0.3).tocsc()]:
+			for labels in [vl, np.sort(vl)]:
+				d = DoseFrame(data=A, voxel_labels=labels, voxel_weights=vw)
+				y = A.dot(x)
+				doses, means = d.calculate_doses(x)
+				self.assertEqual( set(doses.keys()), set(np.unique(labels)) )
+				for label in doses:
+					rows = labels == label
+					self.assert_vector_equal( doses[label], y[rows] )
+					self.assert_scalar_equal(
+							means[label],
+							np.dot(vw[rows], y[rows]) / np.sum(vw[rows]) )
+
+				doses, means = d.calculate_doses(x, labels=[1, 2])
+				self.assertEqual( set(doses.keys()), set([1, 2]) )
+				self.assertEqual( set(means.keys()), set([1, 2]) )
+
+				with self.assertRaises(KeyError):
+					d.calculate_doses(x, labels=[4])
+				with self.assertRaises(ValueError):
+					d.calculate_doses(np.random.rand(n + 1))
+
+		with self.assertRaises(AttributeError):
+			DoseFrame(m, n, voxel_labels=vl).calculate_doses(x)
+
+		# voxel weights given only as per-label subvectors
+		labels = np.unique(vl)
+		d = DoseFrame(
+				data=np.random.rand(m, n), voxel_labels=vl,
+				voxel_weights={k: vw[vl == k] for k in labels})
+		self.assertIsNone( d.voxel_weights.data )
+		with self.assertRaises(AttributeError):
+			d.calculate_doses(x)
+
+	def test_mean_dose_rows(self):
+		m, n = 100, 50
+		vl = (4 * np.random.rand(m)).astype(int)
+		vw = 1 + np.random.rand(m)
+		for A in [np.random.rand(m, n), sp.rand(m, n, 0.3).tocsr(),
+				  sp.rand(m, n, 0.3).tocsc()]:
+			for labels in [vl, np.sort(vl)]:
+				d = DoseFrame(data=A, voxel_labels=labels, voxel_weights=vw)
+				A_mean = d.mean_dose_rows
+				self.assertEqual( A_mean.shape, (len(np.unique(labels)), n) )
+				for k, label in enumerate(np.unique(labels)):
+					rows = np.flatnonzero(labels == label)
+					expected = vec(A[rows, :].T.dot(vw[rows])) / np.sum(vw[rows])
+					self.assert_vector_equal(
+							d.mean_dose_by_label(label), expected )
+					self.assert_vector_equal( A_mean[k, :], expected )
+
+				# cached until dose matrix, labels or weights reassigned
+				self.assertIs( d.mean_dose_rows, A_mean )
+				d.voxel_weights = np.ones(m)
+				self.assertIsNot( d.mean_dose_rows, A_mean )
+				self.assert_vector_equal(
+						d.mean_dose_by_label(labels[0]),
+						vec(A[labels == labels[0], :].mean(axis=0)) )
+
+				with self.assertRaises(KeyError):
+					d.mean_dose_by_label(4)
+
+		with self.assertRaises(AttributeError):
+			DoseFrame(m, n, voxel_labels=vl).mean_dose_rows
+
 	def test_submatrix(self):
 		m, n = 100, 50
 		A = np.random.rand(m, n)
@@ -247,6 +356,30 @@ class DoseFrameTestCase(ConradTestCase):
 		self.assert_vector_equal( d.submatrix(v_label, b_label), A_sub_bv )
 
 class DoseFrameMappingTestCase(ConradTestCase):
+	def test_submatrix_handle(self):
+		m, n = 100, 50
+		A = np.random.rand(m, n)
+		vl = (10 * np.random.rand(m)).astype(int)
+		bl = (3 * np.random.rand(n)).astype(int)
+		d = DoseFrame(data=A, voxel_labels=vl, beam_labels=bl)
+
+		for label in np.unique(vl):
+			handle = d.submatrix_handle(label)
+			self.assertEqual( handle.shape, (np.sum(vl == label), n) )
+			self.assertFalse( handle.materialized )
+			self.assert_vector_equal(
+					handle.materialize(), d.submatrix(label) )
+			self.assertTrue( handle.materialized )
+
+		handle = d.submatrix_handle(vl[0], bl[0])
+		self.assertEqual(
+				handle.shape, (np.sum(vl == vl[0]), np.sum(bl == bl[0])) )
+
+		with self.assertRaises(KeyError):
+			d.submatrix_handle(10)
+		with self.assertRaises(AttributeError):
+			DoseFrame(m, n, voxel_labels=vl).submatrix_handle(0)
+
 	def test_dose_frame_mapping(self):
 		dfm = DoseFrameMapping('source', 'target')
 		self.assertEqual( dfm.source, 'source' )
@@ -389,6 +522,12 @@ class PhysicsTestCase(ConradTestCase):
 		with self.assertRaises(KeyError):
 			p.change_dose_frame('bad key')
 
+		# retrieve
+		self.assertIs( p.retrieve_dose_frame('another frame'), p.frame )
+		self.assertEqual( p.retrieve_dose_frame(DEFAULT_FRAME0_NAME).voxels, m )
+		with self.assertRaises(KeyError):
+			p.retrieve_dose_frame('bad key')
+
 	def test_physics_frame_mappings(self):
 		p = Physics()
 		# available frame mappings
@@ -467,4 +606,13 @@ class PhysicsTestCase(ConradTestCase):
 
 		A0_retrieved = p.dose_matrix_by_label(
 				voxel_label=LABEL, beam_label=LABEL)
-		self.assert_vector_equal( A0, A0_retrieved )
\ No newline at end of file
+		self.assert_vector_equal( A0, A0_retrieved )
+
+		y = np.random.rand(m)
+		doses = p.split_dose_by_label(y, [0, 1])
+		self.assertEqual( set(doses.keys()), set([0, 1]) )
+		for label in (0, 1):
+			self.assert_vector_equal( doses[label], y[voxel_labels == label] )
+		self.assertIs( p.split_dose_by_label(doses, [0, 1]), doses )
+		with self.assertRaises(ValueError):
+			p.split_dose_by_label(np.random.rand(m + 1), [0, 1])
\ No newline at end of file
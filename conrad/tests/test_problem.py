@@ -298,6 +298,18 @@ class PlanningProblemTestCase(ConradTestCase):
 		self.anatomy['tumor'].constraints -= self.anatomy[
 			'tumor'].constraints.last_key
 
+		# warm start from previous (feasible) run
+		ro_warm = RunOutput()
+		feasible = p.solve(self.anatomy.list, ro_warm, slack=False,
+						   verbose=0, warm_start=ro)
+		self.assertIn( 'warm_start', ro_warm.solver_info )
+		self.assertIn( 'iters_saved', ro_warm.solver_info )
+		if not ro_warm.solver_info['warm_start']:
+			self.assertIsNone( ro_warm.solver_info['iters_saved'] )
+		with self.assertRaises(TypeError):
+			p.solve(self.anatomy.list, RunOutput(), slack=False, verbose=0,
+					warm_start='last')
+
 		# no slack, 2-pass
 		# 	- no DVH constraints: request but don't perform 2-pass
 		#	- return code = 1
@@ -0,0 +1,89 @@
+"""
+Unit tests for :mod:`conrad.optimization.profiler`.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import time
+import numpy as np
+
+from conrad.optimization.profiler import *
+from conrad.tests.base import *
+
+class PhaseProfileTestCase(ConradTestCase):
+	def test_phase(self):
+		p = PhaseProfile()
+		self.assertEqual( len(p), 0 )
+		with p.phase('build'):
+			time.sleep(0.01)
+		with p.phase('solve'):
+			pass
+		with p.phase('build'):
+			pass
+		self.assertEqual( p.phases, ['build', 'solve'] )
+		self.assertIn( 'build', p )
+		self.assertEqual( p['build']['calls'], 2 )
+		self.assertTrue( p['build']['wall'] >= 0.01 )
+		self.assertTrue( p['build']['cpu'] >= 0 )
+		self.assert_scalar_equal( p.wall, p['build']['wall'] +
+								  p['solve']['wall'] )
+
+		# phase recorded when body raises
+		with self.assertRaises(RuntimeError):
+			with p.phase('gather'):
+				raise RuntimeError
+		self.assertEqual( p['gather']['calls'], 1 )
+
+	def test_add_merge_table(self):
+		p = PhaseProfile()
+		p.add('build', 1., 0.5)
+		p.add('solve', 3., 6.)
+		p.add('build', 1.)
+		self.assertEqual( p['build'], {'wall': 2., 'cpu': 0.5, 'calls': 2} )
+		self.assert_scalar_equal( p.wall, 5. )
+		self.assert_scalar_equal( p.cpu, 6.5 )
+
+		q = PhaseProfile()
+		q.add('dose', 1., 1.)
+		q += p
+		self.assertEqual( q.phases, ['dose', 'build', 'solve'] )
+		self.assertEqual( q['build']['calls'], 2 )
+		with self.assertRaises(TypeError):
+			q += 1
+
+		table = p.table
+		self.assertEqual( [row['phase'] for row in table], ['build', 'solve'] )
+		self.assert_scalar_equal( table[1]['fraction'], 0.6 )
+		self.assertIn( 'solve', str(p) )
+
+	def test_unmeasured_cpu(self):
+		# CPU time of canonicalization counted under solve
+		p = PhaseProfile()
+		p.add('canonicalize', 1., np.nan)
+		p.add('solve', 3., 6.)
+		self.assert_nan( p['canonicalize']['cpu'] )
+		self.assert_scalar_equal( p.wall, 4. )
+		self.assert_scalar_equal( p.cpu, 6. )
+
+		q = PhaseProfile()
+		q += p
+		self.assert_nan( q['canonicalize']['cpu'] )
+		self.assert_scalar_equal( q.cpu, 6. )
+		self.assertIn( 'canonicalize', str(q) )
@@ -25,6 +25,7 @@ import numpy as np
 
 from conrad.medicine import Structure, Anatomy
 from conrad.medicine.dose import D, Gy
+from conrad.abstract.matrix import SliceCachingMatrix, LazyMatrixSlice
 from conrad.optimization.solver_base import *
 from conrad.tests.base import *
 
@@ -40,6 +41,7 @@ class SolverTestCase(ConradTestCase):
 		self.assertIsInstance( s.slack_vars, dict )
 		self.assertEqual( len(s.slack_vars), 0 )
 		self.assertFalse( s.feasible )
+		self.assertFalse( s.content_hash )
 
 		s.gamma = 1e-4
 		self.assert_scalar_equal( s.gamma, 1e-4 )
@@ -54,6 +56,29 @@ class SolverTestCase(ConradTestCase):
 		with self.assertRaises(ValueError):
 			s.gamma_prioritized('string input')
 
+	def test_solver_matrix_key(self):
+		s = Solver()
+		A = np.random.rand(80, 30)
+		handle = LazyMatrixSlice(
+				SliceCachingMatrix(A), 0, row_indices=np.arange(50))
+		structure = Structure(0, 'oar', False)
+		structure.set_dose_matrices(handle, A_mean=np.ones(30))
+		self.assertTrue( structure.collapsable )
+
+		key = s._Solver__matrix_key
+		self.assertEqual( key(structure), structure.A_version )
+		self.assertEqual( key(structure, True), structure.A_version )
+
+		# content hash: full matrix of collapsable structure not read
+		s.content_hash = True
+		self.assertEqual( key(structure), structure.A_version )
+		self.assertEqual( key(structure, True), structure.A_digest(True) )
+		self.assertFalse( structure.A_materialized )
+
+		structure.constraints += D(30) < 20 * Gy
+		self.assertEqual( key(structure), structure.A_digest() )
+		self.assertFalse( structure.A_materialized )
+
 	def test_solver_dimcheck(self):
 		m0 = 100
 		m1 = 150
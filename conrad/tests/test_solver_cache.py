@@ -0,0 +1,162 @@
+"""
+Unit tests for :mod:`conrad.optimization.solver_cache`.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.medicine import Structure, D
+from conrad.physics import Gy
+from conrad.optimization.solver_cache import *
+from conrad.tests.base import *
+
+class SolverCacheTestCase(ConradTestCase):
+	@classmethod
+	def setUpClass(self):
+		self.m_target = 100
+		self.m_oar = 400
+		self.n = 50
+		self.directory = tempfile.mkdtemp()
+
+	@classmethod
+	def tearDownClass(self):
+		shutil.rmtree(self.directory)
+
+	def setUp(self):
+		self.A_targ = np.random.rand(self.m_target, self.n)
+		self.A_oar = np.random.rand(self.m_oar, self.n)
+		self.structures = [
+				Structure(0, 'target', True, A=self.A_targ),
+				Structure(1, 'oar', False, A=self.A_oar),
+			]
+		self.A = np.vstack((self.A_targ, self.A_oar.mean(0)))
+
+	def test_matrix_fingerprint(self):
+		key = matrix_fingerprint(self.A, self.structures)
+		self.assertIsInstance( key, str )
+		self.assertEqual( key, matrix_fingerprint(
+				self.A.copy(), self.structures) )
+
+		# layout, frame, backend, data type, format and contents all
+		# change fingerprint
+		self.structures[1].constraints += D(30) < 10 * Gy
+		self.assertNotEqual(
+				key, matrix_fingerprint(self.A, self.structures) )
+		self.structures[1].constraints.clear()
+		self.assertEqual( key, matrix_fingerprint(self.A, self.structures) )
+		self.assertNotEqual( key, matrix_fingerprint(
+				self.A, self.structures, frame='frame1') )
+		self.assertNotEqual( key, matrix_fingerprint(
+				self.A, self.structures, backend=(True, False)) )
+		self.assertNotEqual( key, matrix_fingerprint(
+				self.A.astype(np.float32), self.structures) )
+		self.assertNotEqual( key, matrix_fingerprint(
+				sp.csr_matrix(self.A), self.structures) )
+		self.assertNotEqual( matrix_fingerprint(
+				sp.csr_matrix(self.A), self.structures), matrix_fingerprint(
+				sp.csc_matrix(self.A), self.structures) )
+		A_perturbed = self.A.copy()
+		A_perturbed[-1, -1] += 1
+		self.assertNotEqual(
+				key, matrix_fingerprint(A_perturbed, self.structures) )
+
+	def test_solver_cache_store(self):
+		store = SolverCacheStore(capacity=2)
+		cache = {
+				'matrix': np.random.rand(5, 3),
+				'left_preconditioner': np.random.rand(5),
+				'right_preconditioner': np.random.rand(3),
+				'projector': {'type': 'dense_direct', 'matrix': None},
+		}
+		self.assertIsNone( store.lookup('key0') )
+		self.assertEqual( (store.hits, store.misses), (0, 1) )
+
+		store.store('key0', cache)
+		self.assertTrue( 'key0' in store )
+		entry = store.lookup('key0')
+		self.assertEqual( (store.hits, store.misses), (1, 1) )
+		self.assert_vector_equal( entry['matrix'], cache['matrix'] )
+		self.assertEqual( entry['projector'], {'type': 'dense_direct'} )
+
+		# lookups return copies that callers may consume
+		entry.pop('matrix')
+		self.assertTrue( 'matrix' in store.lookup('key0') )
+
+		# least recently used entry evicted beyond capacity
+		store.store('key1', cache)
+		store.lookup('key0')
+		store.store('key2', cache)
+		self.assertEqual( len(store), 2 )
+		self.assertTrue( 'key0' in store )
+		self.assertFalse( 'key1' in store )
+
+		store.clear()
+		self.assertEqual( len(store), 0 )
+		self.assertEqual( store.nbytes, 0 )
+		self.assertEqual( (store.hits, store.misses), (0, 0) )
+
+	def test_solver_cache_store_budget(self):
+		cache = {'matrix': np.random.rand(10, 10)}
+		entry_size = cache['matrix'].nbytes
+		self.assertEqual( SolverCacheStore().budget,
+						  SOLVER_CACHE_BUDGET_DEFAULT )
+
+		# least recently used entry evicted beyond byte budget
+		store = SolverCacheStore(budget=2 * entry_size)
+		store.store('key0', cache)
+		store.store('key1', cache)
+		self.assertEqual( store.nbytes, 2 * entry_size )
+		store.lookup('key0')
+		store.store('key2', cache)
+		self.assertEqual( len(store), 2 )
+		self.assertEqual( store.nbytes, 2 * entry_size )
+		self.assertTrue( 'key0' in store )
+		self.assertFalse( 'key1' in store )
+
+		# entries larger than budget not held in memory
+		store.store('key3', {'matrix': np.random.rand(30, 10)})
+		self.assertFalse( 'key3' in store )
+		self.assertLessEqual( store.nbytes, store.budget )
+
+	def test_solver_cache_store_directory(self):
+		directory = os.path.join(self.directory, 'caches')
+		cache = {
+				'matrix': np.random.rand(5, 3),
+				'projector': {'type': 'dense_direct',
+							  'matrix': np.random.rand(3, 3)},
+				'state_variables': {'rho': 1.5},
+		}
+		SolverCacheStore(directory=directory).store('key0', cache)
+		self.assertTrue( os.path.exists(os.path.join(directory, 'key0.npz')) )
+
+		# new store (e.g., in new session) finds persisted entry
+		store = SolverCacheStore(directory=directory)
+		entry = store.lookup('key0')
+		self.assertEqual( store.hits, 1 )
+		self.assert_vector_equal( entry['matrix'], cache['matrix'] )
+		self.assert_vector_equal(
+				entry['projector']['matrix'], cache['projector']['matrix'] )
+		self.assertEqual( entry['projector']['type'], 'dense_direct' )
+		self.assert_scalar_equal( entry['state_variables']['rho'], 1.5 )
@@ -69,6 +69,10 @@ class SolverCVXPYTestCase(SolverGenericTestCase):
 		s.init_problem(n_beams, gamma=1.2e-3)
 		self.assert_scalar_equal( s.gamma, 1.2e-3 )
 
+		self.assertTrue( s.use_dose_variables )
+		s.init_problem(n_beams, dose_variables=False)
+		self.assertFalse( s.use_dose_variables )
+
 	def assert_problems_equivalent(self, p1, p2):
 		pd1 = p1.get_problem_data('ECOS')
 		pd2 = p2.get_problem_data('ECOS')
@@ -115,7 +119,7 @@ class SolverCVXPYTestCase(SolverGenericTestCase):
 
 		theta = (1 - constr.percentile.fraction) * self.m_target
 		c = s._SolverCVXPY__percentile_constraint_restricted(
-				A, x, constr, beta)
+				A * x, constr, beta)
 		c_direct = cvxpy.sum_entries(
 				cvxpy.pos(beta + (-1) * (A*x - dose))) <= beta * theta
 
@@ -157,7 +161,7 @@ class SolverCVXPYTestCase(SolverGenericTestCase):
 
 		theta = constr.percentile.fraction * self.m_target
 		c = s._SolverCVXPY__percentile_constraint_restricted(
-				A, x, constr, beta)
+				A * x, constr, beta)
 		c_direct = cvxpy.sum_entries(
 				cvxpy.pos(beta + (A*x - dose))) <= beta * theta
 
@@ -186,7 +190,7 @@ class SolverCVXPYTestCase(SolverGenericTestCase):
 
 		theta = (1 - constr.percentile.fraction) * self.m_target
 		c = s._SolverCVXPY__percentile_constraint_restricted(
-				A, x, constr, beta, slack=slack)
+				A * x, constr, beta, slack=slack)
 		c_direct = cvxpy.sum_entries(cvxpy.pos(
 				beta + (-1) * (A * x - (dose - slack)))) <= beta * theta
 
@@ -213,7 +217,7 @@ class SolverCVXPYTestCase(SolverGenericTestCase):
 
 		theta = constr.percentile.fraction * self.m_target
 		c = s._SolverCVXPY__percentile_constraint_restricted(
-				A, x, constr, beta, slack=slack)
+				A * x, constr, beta, slack=slack)
 		c_direct = cvxpy.sum_entries(
 				cvxpy.pos(beta + (A * x - (dose + slack)))) <= beta * theta
 
@@ -253,7 +257,7 @@ class SolverCVXPYTestCase(SolverGenericTestCase):
 		y[:m_exact] += 10
 		A_exact = A[constr.get_maxmargin_fulfillers(y), :]
 
-		c = s._SolverCVXPY__percentile_constraint_exact(A, x, y, constr,
+		c = s._SolverCVXPY__percentile_constraint_exact(A * x, y, constr,
 														had_slack=False)
 		c_direct = A_exact * x >= dose
 		obj_shape, mat_shape = self.assert_problems_equivalent(
@@ -276,7 +280,7 @@ class SolverCVXPYTestCase(SolverGenericTestCase):
 		y[m_exact:] += 10
 		A_exact = A[constr.get_maxmargin_fulfillers(y), :]
 
-		c = s._SolverCVXPY__percentile_constraint_exact(A, x, y, constr,
+		c = s._SolverCVXPY__percentile_constraint_exact(A * x, y, constr,
 														had_slack=False)
 		c_direct = A_exact * x <= dose
 		obj_shape, mat_shape = self.assert_problems_equivalent(
@@ -294,7 +298,9 @@ class SolverCVXPYTestCase(SolverGenericTestCase):
 		x = cvxpy.Variable(self.n)
 		p = cvxpy.Problem(cvxpy.Minimize(0), [x >= 0])
 
-		s.init_problem(self.n, use_slack=False, use_2pass=False)
+		# compare against dose expressions formed directly as A * x
+		s.init_problem(self.n, use_slack=False, use_2pass=False,
+					   dose_variables=False)
 		self.assert_problems_equivalent( p, s.problem )
 
 		# no constraints
@@ -526,6 +532,133 @@ class SolverCVXPYTestCase(SolverGenericTestCase):
 		s.dvh_vars[cid2].value = BETA
 		self.assert_scalar_equal( s.get_dvh_slope(cid2), 1. / BETA )
 
+		# objective and percentile constraint share one dose variable,
+		# coupled to the beam intensities by a single constraint
+		dose_expr = s.dose_expression(structure_list[0])
+		self.assertIsInstance( dose_expr, cvxpy.Variable )
+		self.assertIs( dose_expr, s.dose_expression(structure_list[0]) )
+		n_constraints = len(s.problem.constraints)
+
+		s.init_problem(self.n, use_slack=False, dose_variables=False)
+		s.build(structure_list, exact=False)
+		self.assertNotIsInstance(
+				s.dose_expression(structure_list[0]), cvxpy.Variable )
+		self.assertEqual( len(s.problem.constraints), n_constraints - 1 )
+
+	def test_dose_references(self):
+		references = SolverCVXPY._SolverCVXPY__dose_references
+		tumor = self.anatomy['tumor']
+		oar = self.anatomy['oar']
+		self.assertEqual( references(tumor), 1 )
+		self.assertEqual( references(oar), 0 )
+
+		tumor.constraints += D(20) >= 10 * Gy
+		tumor.constraints += D('mean') >= 10 * Gy
+		oar.constraints += D('max') <= 30 * Gy
+		self.assertEqual( references(tumor), 2 )
+		self.assertEqual( references(oar), 2 )
+
+	def test_build_percentile_constraint(self):
+		s = SolverCVXPY()
+		if s is None:
+			return
+		s.init_problem(self.n, use_slack=False)
+
+		structure_list = self.anatomy.list
+		self.anatomy['tumor'].constraints += D(20) >= 10 * Gy
+		cid = self.anatomy['tumor'].constraints.last_key
+		s.build(structure_list, exact=False)
+		self.assertIn( cid, s.dvh_vars )
+		self.assertIn( cid, s._SolverCVXPY__constraint_indices )
+		self.assertIsInstance(
+				s.dose_expression(self.anatomy['tumor']), cvxpy.Variable )
+
+	def test_build_persistent(self):
+		s = SolverCVXPY()
+		if s is None:
+			return
+		s.init_problem(self.n, use_slack=True, persistent=True)
+		self.assertTrue( s.persistent )
+
+		self.anatomy['tumor'].constraints.clear()
+		self.anatomy['oar'].constraints.clear()
+		structure_list = self.anatomy.list
+		self.anatomy['tumor'].constraints += D(20) >= 10 * Gy
+		cid = self.anatomy['tumor'].constraints.last_key
+
+		s.build(structure_list)
+		problem = s.problem
+		n_constraints = len(problem.constraints)
+		beta = s.dvh_vars[cid]
+
+		# parameter-only edits: problem, variables kept
+		self.anatomy['tumor'].set_constraint(cid, dose=12 * Gy)
+		self.anatomy['tumor'].objective.change_parameters(w_under=2.)
+		s.build(structure_list)
+		self.assertIs( s.problem, problem )
+		self.assertIs( s.dvh_vars[cid], beta )
+
+		# same beam count: problem kept across init_problem
+		s.init_problem(self.n, use_slack=True, persistent=True)
+		s.build(structure_list)
+		self.assertIs( s.problem, problem )
+
+		# structural edit: rebuilt
+		self.anatomy['oar'].constraints += D('max') <= 30 * Gy
+		cid2 = self.anatomy['oar'].constraints.last_key
+		s.build(structure_list)
+		self.assertIsNot( s.problem, problem )
+		self.assertIs( s.dvh_vars[cid], beta )
+		self.assertGreater( len(s.problem.constraints), n_constraints )
+		self.assertIn( cid2, s._SolverCVXPY__constraint_indices )
+
+		# structure made collapsable: dose variable and coupling dropped
+		problem = s.problem
+		self.anatomy['oar'].constraints -= cid2
+		self.assertTrue( self.anatomy['oar'].collapsable )
+		s.build(structure_list)
+		self.assertIsNot( s.problem, problem )
+		self.assertEqual( len(s.problem.constraints), n_constraints )
+
+		# persistent and non-persistent builds agree
+		s_ref = SolverCVXPY()
+		s_ref.init_problem(self.n, use_slack=True)
+		s_ref.build(structure_list)
+		self.assert_problems_equivalent( s.problem, s_ref.problem )
+
+	def test_build_exact_reuse(self):
+		s = SolverCVXPY()
+		if s is None:
+			return
+		s.init_problem(self.n, use_slack=False, use_2pass=True)
+
+		self.anatomy['tumor'].constraints.clear()
+		self.anatomy['oar'].constraints.clear()
+		structure_list = self.anatomy.list
+		self.anatomy['tumor'].constraints += D(20) >= 10 * Gy
+		cid = self.anatomy['tumor'].constraints.last_key
+
+		s.build(structure_list)
+		dose_expr = s.dose_expression(self.anatomy['tumor'])
+		blocks = dict(s._SolverCVXPY__blocks)
+
+		# second pass: percentile constraint made exact from the
+		# first-pass dose expression; other structures' terms kept
+		self.anatomy['tumor'].calc_y(np.random.rand(self.n))
+		s.build(structure_list, exact=True)
+		self.assertIs( s.dose_expression(self.anatomy['tumor']), dose_expr )
+		self.assertNotIn( cid, s.dvh_vars )
+		label_oar = self.anatomy['oar'].label
+		self.assertIs(
+				s._SolverCVXPY__blocks[label_oar], blocks[label_oar] )
+		selections = s._SolverCVXPY__selections
+		self.assertEqual( len(selections), 1 )
+		selection = list(selections.values())[0][1]
+
+		# selection reused for unchanged voxel selection
+		s.build(structure_list, exact=True)
+		self.assertIs( list(selections.values())[0][1], selection )
+
 	def test_solve(self):
 		s = SolverCVXPY()
 		if s is None:
@@ -22,10 +22,12 @@ along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
 from conrad.compat import *
 
 import numpy as np
+import scipy.sparse as sp
 
 from conrad.medicine import Structure, D
 from conrad.physics import Gy
 from conrad.optimization.solver_optkit import *
+from conrad.optimization.solver_cache import SolverCacheStore
 from conrad.tests.base import *
 from conrad.tests.test_solver import SolverGenericTestCase
 
@@ -75,6 +77,34 @@ class SolverOptkitTestCase(SolverGenericTestCase):
 		self.assert_vector_equal( A[:self.m_target, :], self.A_targ )
 		self.assert_vector_equal( A[self.m_target:, :], self.A_oar )
 
+	def test_solver_build_matrix_sparse(self):
+		s = SolverOptkit()
+		if s is None:
+			return
+
+		# sparse target block, collapsable OAR: CSR, no densification
+		self.anatomy[0].A_full = sp.csr_matrix(self.A_targ)
+		A = s._SolverOptkit__build_matrix(self.anatomy.list)
+		self.assertTrue( sp.isspmatrix_csr(A) )
+		self.assertEqual( A.shape, (self.m_target + 1, self.n) )
+		self.assert_vector_equal(
+				A[:self.m_target, :].toarray(), self.A_targ )
+		self.assert_vector_equal(
+				A[self.m_target, :].toarray().ravel(),
+				self.A_oar.sum(0) / self.m_oar )
+
+		# all blocks CSC: CSC, with data type of blocks preserved
+		self.anatomy[0].A_full = sp.csc_matrix(
+				self.A_targ.astype(np.float32))
+		self.anatomy[1].A_full = sp.csc_matrix(self.A_oar.astype(np.float32))
+		self.anatomy[1].constraints += D(30) < 10 * Gy
+		A = s._SolverOptkit__build_matrix(self.anatomy.list)
+		self.assertTrue( sp.isspmatrix_csc(A) )
+		self.assertEqual( A.dtype, np.float32 )
+		self.assertEqual( A.shape, (self.m_target + self.m_oar, self.n) )
+		self.assert_vector_equal(
+				A[self.m_target:, :].toarray(), self.A_oar, 1e-5, 1e-5 )
+
 	def __assert_voxel_objective_default(self, v_objective, compressed=True,
 										 voxweight_targ=1., voxweight_oar=1.):
 		size_expect = self.m_target
@@ -300,4 +330,66 @@ class SolverOptkitTestCase(SolverGenericTestCase):
 		self.assertIsInstance( s.solvetime, float )
 		self.assertIsInstance( s.status, int )
 		self.assertIsInstance( s.objective_value, float )
-		self.assertIsInstance( s.solveiters, int )
\ No newline at end of file
+		self.assertIsInstance( s.solveiters, int )
+	def test_solver_cache_lookup(self):
+		s = SolverOptkit()
+		if s is None:
+			return
+
+		store = SolverCacheStore()
+		s.cache_store = store
+		s.build(self.anatomy.list, frame='frame0')
+		self.assertFalse( s.cache_hit )
+		self.assertEqual( (store.hits, store.misses), (0, 1) )
+		s.solve(verbose=0)
+		self.assertEqual( len(store), 1 )
+
+		# same anatomy and frame: new solver initialized from store
+		s2 = SolverOptkit()
+		s2.cache_store = store
+		report = s2.build(self.anatomy.list, frame='frame0')
+		self.assertTrue( s2.cache_hit )
+		self.assertEqual( (store.hits, store.misses), (1, 1) )
+		self.assertTrue( 'solver cache hit' in report[-1] )
+		s2.solve(verbose=0)
+		self.assertEqual( len(store), 1 )
+
+		# different frame, or lookup disabled: no hit
+		s3 = SolverOptkit()
+		s3.cache_store = store
+		s3.build(self.anatomy.list, frame='frame1')
+		self.assertFalse( s3.cache_hit )
+		s4 = SolverOptkit()
+		s4.cache_store = store
+		s4.build(self.anatomy.list, frame='frame0', auto_cache=False)
+		self.assertIsNone( s4.cache_hit )
+
+	def test_check_for_updates(self):
+		s = SolverOptkit()
+		if s is None:
+			return
+
+		s.build(self.anatomy.list)
+		solver = s.pogs_solver
+
+		# bit-identical matrix: no rebuild
+		self.anatomy[0].A_full = self.A_targ.copy()
+		report = s.build(self.anatomy.list)
+		self.assertIs( s.pogs_solver, solver )
+		self.assertTrue( any('unchanged (same content)' in r for r in report) )
+
+		# version-only comparison: rebuild
+		self.anatomy[0].A_full = self.A_targ.copy()
+		report = s.build(self.anatomy.list, content_hash=False)
+		self.assertIsNot( s.pogs_solver, solver )
+		self.assertTrue( any('block changed' in r for r in report) )
+		solver = s.pogs_solver
+
+		# changed data: only changed block copied
+		A_targ = 2 * self.A_targ
+		self.anatomy[0].A_full = A_targ
+		report = s.build(self.anatomy.list)
+		self.assertIsNot( s.pogs_solver, solver )
+		self.assert_vector_equal(
+				s._SolverOptkit__A_current[:self.m_target, :], A_targ )
+		self.assertTrue( any('unchanged (same version)' in r for r in report) )
@@ -0,0 +1,164 @@
+"""
+Unit tests for :mod:`conrad.optimization.solver_registry`.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.medicine import Structure, D
+from conrad.physics.units import Gy
+from conrad.optimization.solver_registry import *
+from conrad.tests.base import *
+
+class SolverRegistryTestCase(ConradTestCase):
+	def setUp(self):
+		self.m_target = 100
+		self.m_oar = 400
+		self.n = 50
+		self.target = Structure(
+				0, 'target', True, A=np.random.rand(self.m_target, self.n))
+		self.oar = Structure(
+				1, 'oar', False, A=sp.rand(
+						self.m_oar, self.n, density=0.1, format='csr'))
+		self.registry = SolverRegistry([
+				SolverBackend('first_order', 'pogs', CostModel(1., 1e-6),
+							  constraints=False),
+				SolverBackend('interior_point', 'cvxpy',
+							  CostModel(0.1, 1e-6, exponent=1.5),
+							  options={'solver': 'ECOS'}),
+				SolverBackend('missing', 'cvxpy', CostModel(0., 0.),
+							  modules=['conrad_no_such_module']),
+			])
+
+	def test_problem_size(self):
+		size = ProblemSize.from_structures([self.target, self.oar])
+		self.assertEqual( size.beams, self.n )
+		# nontarget with linear objective and no constraints collapses
+		# to its mean dose row
+		self.assertEqual( size.voxels, self.m_target + 1 )
+		self.assertEqual(
+				size.nnz, self.m_target * self.n +
+				np.count_nonzero(self.oar.A_mean) )
+		self.assertFalse( size.sparse )
+		self.assertEqual( size.constraints, 0 )
+
+		self.oar.constraints += D(30) <= 20 * Gy
+		self.oar.constraints += D('max') <= 30 * Gy
+		size = ProblemSize.from_structures([self.target, self.oar])
+		self.assertEqual( size.voxels, self.m_target + self.m_oar )
+		self.assertEqual( size.nnz, self.m_target * self.n + self.oar.A.nnz )
+		self.assertTrue( size.sparse )
+		self.assertEqual( size.constraints, 2 )
+		self.assertEqual( size.constraint_rows, 2 * self.m_oar )
+		self.assertEqual( size.percentile_constraints, 1 )
+
+	def test_cost_model(self):
+		size = ProblemSize(voxels=100, beams=10, nnz=1000, sparse=True)
+		work = 1000 + 100 + 10
+		model = CostModel(0.5, 1e-3, exponent=2., dense_factor=3.)
+		self.assert_scalar_equal( model.estimate(size), 0.5 + 1e-3 * work**2 )
+		size.sparse = False
+		self.assert_scalar_equal(
+				model.estimate(size), 0.5 + 1e-3 * (3 * work)**2 )
+		model.scale = 2.
+		self.assert_scalar_equal(
+				model.estimate(size), 2 * (0.5 + 1e-3 * (3 * work)**2) )
+		self.assert_scalar_equal(
+				model.estimate(size, calibrated=False),
+				0.5 + 1e-3 * (3 * work)**2 )
+
+	def test_registry(self):
+		self.assertEqual( len(self.registry), 3 )
+		self.assertIn( 'FIRST_ORDER', self.registry )
+		self.assertNotIn( 'other', self.registry )
+		with self.assertRaises(TypeError):
+			self.registry.register('backend')
+		self.registry.register(SolverBackend(
+				'missing', 'pogs', CostModel(0., 0.)))
+		self.assertEqual( len(self.registry), 3 )
+		self.assertEqual( self.registry['missing'].solver, 'pogs' )
+		self.registry.unregister('missing')
+		self.assertEqual( len(self.registry), 2 )
+
+	def test_select(self):
+		small = ProblemSize(voxels=10, beams=10, nnz=100)
+		large = ProblemSize(voxels=10000, beams=100, nnz=10**6)
+		constrained = ProblemSize(voxels=10, beams=10, nnz=100,
+								  constraints=1)
+
+		# unavailable backends never selected, despite zero cost
+		self.assertEqual(
+				self.registry.select(small).backend.name, 'interior_point' )
+		self.assertEqual(
+				self.registry.select(large).backend.name, 'first_order' )
+		self.assertEqual(
+				self.registry.select(constrained).backend.name,
+				'interior_point' )
+		self.assertEqual(
+				self.registry.select(large, solvers=['cvxpy']).backend.name,
+				'interior_point' )
+
+		selection = self.registry.select(large, override='interior_point')
+		self.assertTrue( selection.override )
+		self.assertEqual( selection.backend.options['solver'], 'ECOS' )
+		self.assertEqual(
+				set(selection.dict['estimates']),
+				{'first_order', 'interior_point'} )
+		self.assertEqual( selection.dict['size']['nnz'], 10**6 )
+
+		with self.assertRaises(ValueError):
+			self.registry.select(large, override='unknown')
+		with self.assertRaises(ValueError):
+			self.registry.select(large, override='missing')
+		with self.assertRaises(ValueError):
+			self.registry.select(constrained, override='first_order')
+		with self.assertRaises(ValueError):
+			self.registry.select(constrained, solvers=['pogs'])
+
+	def test_calibrate(self):
+		timed = []
+		def timer(backend, structures):
+			timed.append((backend.name, structures))
+			return 2 * backend.cost.estimate(
+					ProblemSize.from_structures(structures),
+					calibrated=False)
+
+		sizes = [(40, 10), (80, 20)]
+		scales = self.registry.calibrate(timer, sizes=sizes, repeats=2)
+		self.assertEqual( set(scales), {'first_order', 'interior_point'} )
+		for name in scales:
+			self.assert_scalar_equal( scales[name], 2. )
+			self.assert_scalar_equal( self.registry[name].cost.scale, 2. )
+		self.assertEqual( len(timed), 2 * len(sizes) * 2 )
+
+		# probes carry constraints only for backends that handle them
+		for name, structures in timed:
+			constrained = sum(s.constraints.size for s in structures) > 0
+			self.assertEqual( constrained, name == 'interior_point' )
+
+	def test_probe_structures(self):
+		structures = probe_structures(200, 20, constrained=False)
+		self.assertEqual( sum(s.size for s in structures), 200 )
+		self.assertTrue( all(s.constraints.size == 0 for s in structures) )
+		structures = probe_structures(200, 20, sparse=True)
+		self.assertTrue( all(sp.issparse(s.A) for s in structures) )
+		self.assertTrue( any(s.constraints.size > 0 for s in structures) )
@@ -25,6 +25,7 @@ import numpy as np
 import scipy.sparse as sp
 
 from conrad.defs import CONRAD_DEBUG_PRINT
+from conrad.abstract.matrix import SliceCachingMatrix, LazyMatrixSlice
 from conrad.medicine.structure import *
 from conrad.medicine.dose import D, Gy, PercentileConstraint
 from conrad.tests.base import *
@@ -220,6 +221,105 @@ class StructureTestCase(ConradTestCase):
 		self.assertIsNone( s.A_full )
 		self.assertIsNone( s.A_mean )
 
+	def test_set_dose_matrices(self):
+		s = Structure('LABEL', 'STRUCTURE NAME', True)
+		A = np.random.rand(50, 300)
+		w = 1 + np.random.rand(50)
+		s.set_dose_matrices(A, voxel_weights=w)
+		self.assertEqual( s.size, 50 )
+		self.assert_vector_equal( s.voxel_weights, w )
+		self.assert_vector_equal( s.A_mean, w.dot(A) / np.sum(w) )
+
+		# precomputed mean dose matrix used as provided
+		A_mean = np.random.rand(300)
+		s.set_dose_matrices(A, A_mean=A_mean, voxel_weights=w)
+		self.assert_vector_equal( s.A_mean, A_mean )
+
+		with self.assertRaises(ValueError):
+			s.set_dose_matrices(A, A_mean=np.random.rand(200))
+		with self.assertRaises(ValueError):
+			s.set_dose_matrices(np.random.rand(40, 300))
+
+	def test_lazy_matrices(self):
+		A = np.random.rand(80, 300)
+		matrix = SliceCachingMatrix(A)
+		handle = LazyMatrixSlice(matrix, 0, row_indices=np.arange(50))
+
+		s = Structure('LABEL', 'STRUCTURE NAME', False)
+		s.A_full = handle
+		self.assertEqual( s.size, 50 )
+		self.assertEqual( s.A_shape, (50, 300) )
+		self.assertTrue( s.plannable )
+		self.assertFalse( s.A_materialized )
+		self.assertFalse( handle.materialized )
+
+		# materialized on access; mean dose derived on demand
+		self.assert_vector_equal( s.A_mean, np.mean(A[:50, :], axis=0) )
+		self.assertTrue( s.A_materialized )
+		self.assert_vector_equal( s.A_full, A[:50, :] )
+
+		self.assertTrue( s.release_matrices() )
+		self.assertFalse( s.A_materialized )
+		self.assertFalse( handle.materialized )
+		self.assertFalse( s.release_matrices() )
+		self.assert_vector_equal( s.A_mean, np.mean(A[:50, :], axis=0) )
+		self.assertFalse( s.A_materialized )
+
+		# dose calculation does not pin lazily assigned matrix
+		x = np.random.rand(300)
+		s.calc_y(x)
+		self.assert_vector_equal( s.y, A[:50, :].dot(x) )
+		self.assertFalse( s.A_materialized )
+		self.assertFalse( handle.materialized )
+
+		# precomputed mean dose: full matrix never materialized
+		s = Structure('LABEL', 'STRUCTURE NAME', False)
+		s.set_dose_matrices(handle, A_mean=np.ones(300))
+		self.assert_vector_equal( s.A_mean, np.ones(300) )
+		self.assertFalse( s.A_materialized )
+
+		# digest of lazy matrix taken without materializing
+		digest = s.A_digest()
+		self.assertIsInstance( digest, str )
+		self.assertFalse( s.A_materialized )
+		self.assertEqual(
+				digest, LazyMatrixSlice(
+						SliceCachingMatrix(A.copy()), 0,
+						row_indices=np.arange(50)).digest )
+		self.assertNotEqual(
+				digest, LazyMatrixSlice(
+						matrix, 0, row_indices=np.arange(1, 51)).digest )
+
+		with self.assertRaises(ValueError):
+			s.A_full = LazyMatrixSlice(matrix, 0, row_indices=np.arange(40))
+
+	def test_matrix_versions(self):
+		s = Structure('LABEL', 'STRUCTURE NAME', True)
+		A = np.random.rand(50, 300)
+		v0 = s.A_version
+		s.A_full = A
+		v1 = s.A_version
+		self.assertTrue( v1 > v0 )
+		digest = s.A_digest()
+		digest_mean = s.A_digest(mean=True)
+		self.assertIsInstance( digest, str )
+		self.assertNotEqual( digest, digest_mean )
+
+		# reassignment of identical data: new version, same content hash
+		s.A_full = A.copy()
+		self.assertTrue( s.A_version > v1 )
+		self.assertEqual( s.A_digest(), digest )
+		self.assertEqual( s.A_digest(mean=True), digest_mean )
+
+		A[0, 0] += 1
+		s.A_full = A
+		self.assertNotEqual( s.A_digest(), digest )
+
+		v2 = s.A_version
+		s.reset_matrices()
+		self.assertTrue( s.A_version > v2 )
+		self.assertIsNone( s.A_digest() )
+
 	def test_create_structure_options(self):
 		# dense
 		s = Structure('LABEL', 'NAME', True, size=400, dose=17 * Gy,
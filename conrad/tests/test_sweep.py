@@ -0,0 +1,132 @@
+"""
+Unit tests for :mod:`conrad.optimization.sweep`.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import numpy as np
+
+from conrad.physics import Physics, Gy
+from conrad.medicine import Anatomy, Structure, D
+from conrad.case import Case
+from conrad.optimization.sweep import *
+from conrad.tests.base import *
+
+class PlanSweepTestCase(ConradTestCase):
+	def setUp(self):
+		m, n = 100, 50
+		self.anatomy = Anatomy([
+				Structure(0, 'PTV', True),
+				Structure(1, 'OAR', False),
+			])
+		self.physics = Physics(
+				dose_matrix=np.random.rand(m, n),
+				voxel_labels=(2 * np.random.rand(m)).astype(int))
+
+	def test_expand_grid(self):
+		variants = expand_grid({'c1': [1, 2, 3], (0, 'w_under'): [4, 5]})
+		self.assertEqual( len(variants), 6 )
+		for v in variants:
+			self.assertEqual( set(v.keys()), set(['c1', (0, 'w_under')]) )
+		self.assertEqual(
+				set((v['c1'], v[(0, 'w_under')]) for v in variants),
+				set([(c, w) for c in [1, 2, 3] for w in [4, 5]]) )
+
+		variants = expand_grid([{'c1': [1, 2]}, {'c2': [3]}])
+		self.assertEqual( variants, [{'c1': 1}, {'c1': 2}, {'c2': 3}] )
+
+		self.assertEqual( expand_grid({}), [{}] )
+
+	def test_apply_restore_variant(self):
+		case = Case(self.anatomy, self.physics)
+		case.anatomy['OAR'].constraints += D(30) < 20 * Gy
+		cid = case.anatomy['OAR'].constraints.last_key
+		w_under = case.anatomy['PTV'].objective.weight_underdose_raw
+
+		variant = {cid: 15 * Gy, (0, 'w_under'): 2 * w_under}
+		snapshot = snapshot_variant(case, variant)
+		apply_variant(case, variant)
+		self.assertEqual(
+				case.anatomy['OAR'].constraints[cid].dose, 15 * Gy )
+		self.assert_scalar_equal(
+				case.anatomy['PTV'].objective.weight_underdose_raw,
+				2 * w_under )
+
+		restore_variant(case, snapshot)
+		self.assertEqual(
+				case.anatomy['OAR'].constraints[cid].dose, 20 * Gy )
+		self.assert_scalar_equal(
+				case.anatomy['PTV'].objective.weight_underdose_raw,
+				w_under )
+
+		with self.assertRaises(ValueError):
+			apply_variant(case, {'not a constraint': 10 * Gy})
+
+	def test_plan_sweep(self):
+		case = Case(self.anatomy, self.physics)
+		case.anatomy['OAR'].constraints += D(30) < 20 * Gy
+		cid = case.anatomy['OAR'].constraints.last_key
+		grid = {cid: [10 * Gy, 15 * Gy], (0, 'w_under'): [1., 2.]}
+
+		for workers in (1, 2):
+			n_runs = len(case.history.runs)
+			runs = case.plan_sweep(
+					grid, workers=workers, tag='sweep{}_'.format(workers),
+					verbose=0)
+			self.assertEqual( len(runs), 4 )
+			self.assertEqual( len(case.history.runs), n_runs + 4 )
+			for i, run in enumerate(runs):
+				self.assertTrue( run.feasible )
+				self.assertIs(
+						case.history['sweep{}_{}'.format(workers, i)], run )
+
+			# case unchanged by sweep
+			self.assertEqual(
+					case.anatomy['OAR'].constraints[cid].dose, 20 * Gy )
+
+	def test_plan_sweep_disjoint_grids(self):
+		case = Case(self.anatomy, self.physics)
+		case.anatomy['OAR'].constraints += D(30) < 20 * Gy
+		cid1 = case.anatomy['OAR'].constraints.last_key
+		case.anatomy['PTV'].constraints += D(90) > 0.8 * Gy
+		cid2 = case.anatomy['PTV'].constraints.last_key
+		grid = [{cid1: [10 * Gy, 15 * Gy]}, {cid2: [0.7 * Gy, 0.9 * Gy]}]
+		variants = expand_grid(grid)
+
+		# constraints expected for each variant, applied to original case
+		expected = []
+		for variant in variants:
+			snapshot = snapshot_variant(case, variant)
+			apply_variant(case, variant)
+			expected.append({
+					cid: str(case.anatomy[label].constraints[cid])
+					for cid, label in ((cid1, 'OAR'), (cid2, 'PTV'))})
+			restore_variant(case, snapshot)
+
+		for workers in (1, 2):
+			runs = case.plan_sweep(
+					grid, workers=workers, tag='disjoint{}_'.format(workers),
+					verbose=0)
+			self.assertEqual( len(runs), len(variants) )
+			for run, constraints in zip(runs, expected):
+				for cid in constraints:
+					self.assertEqual(
+							run.profile.constraints[cid]['constraint'],
+							constraints[cid] )
@@ -0,0 +1,168 @@
+"""
+Unit tests for :mod:`conrad.optimization.voxel_clustering`.
+"""
+"""
+Copyright 2016 Baris Ungun, Anqi Fu
+
+This file is part of CONRAD.
+
+CONRAD is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CONRAD is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CONRAD.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from conrad.compat import *
+
+import numpy as np
+import scipy.sparse as sp
+
+from conrad.abstract.mapping import ClusterMapping
+from conrad.physics.physics import Physics, DoseFrame, DoseFrameMapping
+from conrad.optimization.voxel_clustering import *
+from conrad.tests.base import *
+
+class VoxelClusteringMethodsTestCase(ConradTestCase):
+	def test_sketch_rows(self):
+		A = np.random.rand(40, 30)
+		S = sketch_rows(A, 8, seed=3)
+		self.assertEqual( S.shape, (40, 8) )
+		self.assert_vector_equal( S, sketch_rows(A, 8, seed=3) )
+		self.assert_vector_equal( S, sketch_rows(sp.csr_matrix(A), 8, seed=3) )
+		self.assert_vector_equal( S, sketch_rows(sp.csc_matrix(A), 8, seed=3) )
+
+	def test_nearest_centers(self):
+		centers = np.array([[0., 0.], [10., 0.], [0., 10.]])
+		points = np.array([[1., 1.], [9., -1.], [-1., 11.], [8., 1.]])
+		self.assert_vector_equal(
+				nearest_centers(points, centers), [0, 1, 2, 1] )
+
+	def test_minibatch_kmeans(self):
+		# three well separated blobs, interleaved
+		n_per = 50
+		blobs = np.array([[0., 0., 0.], [20., 0., 0.], [0., 0., 20.]])
+		truth = np.tile(np.arange(3), n_per)
+		points = blobs[truth, :] + np.random.rand(3 * n_per, 3)
+
+		labels = minibatch_kmeans(points, 3, batch_size=30, seed=1)
+		self.assertEqual( labels.size, 3 * n_per )
+		self.assertEqual( labels.max(), 2 )
+		for k in xrange(3):
+			self.assertEqual( len(np.unique(labels[truth == k])), 1 )
+
+		# deterministic given seed
+		self.assert_vector_equal(
+				labels, minibatch_kmeans(points, 3, batch_size=30, seed=1) )
+
+		# degenerate cluster counts
+		self.assert_vector_equal(
+				minibatch_kmeans(points[:4, :], 10), np.arange(4) )
+		self.assert_vector_equal(
+				minibatch_kmeans(points[:4, :], 1), np.zeros(4) )
+
+	def test_aggregation_operator(self):
+		cmap = ClusterMapping([0, 1, 1, 2, 2, 2])
+		A = np.random.rand(6, 4)
+
+		op, weights = aggregation_operator(cmap)
+		self.assert_vector_equal( weights, [1, 2, 3] )
+		self.assert_vector_equal( op.dot(A), cmap.downsample(A) )
+
+		w = np.array([1., 1., 3., 1., 1., 0.])
+		op, weights = aggregation_operator(cmap, w)
+		self.assert_vector_equal( weights, [1, 4, 2] )
+		self.assert_vector_equal( op.dot(A)[1, :], (A[1, :] + 3 * A[2, :]) / 4 )
+		self.assert_vector_equal( op.dot(A)[2, :], (A[3, :] + A[4, :]) / 2 )
+
+		As = reduce_rows(sp.csc_matrix(A), op)
+		self.assertIsInstance( As, sp.csc_matrix )
+		self.assert_vector_equal( As.toarray(), op.dot(A) )
+
+class VoxelClusteringTestCase(ConradTestCase):
+	@classmethod
+	def setUpClass(self):
+		# 3 structures, each with 4 distinct row profiles repeated
+		self.m_per = 4 * 25
+		self.n = 30
+		self.labels = np.repeat([0, 3, 7], self.m_per)
+		profiles = np.random.rand(12, self.n)
+		self.profile = np.hstack([
+				np.tile(np.arange(4), 25) + 4 * k for k in xrange(3)])
+		self.A = profiles[self.profile, :]
+
+	def test_voxel_clustering_init(self):
+		vc = VoxelClustering()
+		self.assertEqual( vc.n_clusters(0, 100), 10 )
+		self.assertEqual( vc.n_clusters(0, 101), 11 )
+
+		vc = VoxelClustering(compression={1: 4})
+		self.assertEqual( vc.n_clusters(1, 100), 25 )
+		self.assertEqual( vc.n_clusters(2, 100), 100 )
+
+		with self.assertRaises(ValueError):
+			VoxelClustering(compression=0.5)
+		with self.assertRaises(ValueError):
+			VoxelClustering(compression={1: 0.5})
+
+	def test_cluster_mapping(self):
+		vc = VoxelClustering(compression=self.m_per / 4.)
+		frame = DoseFrame(data=self.A, voxel_labels=self.labels)
+		cmap, cluster_labels = vc.cluster_mapping(frame)
+
+		self.assertIsInstance( cmap, ClusterMapping )
+		self.assertEqual( cmap.n_points, 3 * self.m_per )
+		self.assertEqual( cmap.n_clusters, 12 )
+		self.assert_vector_equal( cluster_labels, np.repeat([0, 3, 7], 4) )
+		self.assert_vector_equal( cluster_labels[cmap.vec], self.labels )
+
+		# identical rows clustered together
+		for p in xrange(12):
+			self.assertEqual( len(np.unique(cmap.vec[self.profile == p])), 1 )
+
+		with self.assertRaises(AttributeError):
+			vc.cluster_mapping(DoseFrame(3 * self.m_per, self.n))
+
+	def test_cluster(self):
+		vc = VoxelClustering(compression=self.m_per / 4.)
+		x = np.random.rand(self.n)
+
+		for A in (self.A, sp.csr_matrix(self.A), sp.csc_matrix(self.A)):
+			p = Physics(dose_matrix=A, voxel_labels=self.labels)
+			fm = vc.cluster(p, 'clustered')
+
+			self.assertIsInstance( fm, DoseFrameMapping )
+			self.assertEqual( fm.source, p.frame.name )
+			self.assertEqual( fm.target, 'clustered' )
+			self.assertIn( ('frame0', 'clustered'), p.available_frame_mappings )
+			self.assertIs( p.retrieve_frame_mapping(
+					'frame0', 'clustered'), fm )
+
+			f = p.retrieve_dose_frame('clustered')
+			self.assertEqual( f.voxels, 12 )
+			self.assertEqual( f.beams, self.n )
+			self.assertEqual( type(f.dose_matrix.data), type(A) )
+			self.assert_vector_equal( f.voxel_weights.data, 25 * np.ones(12) )
+			self.assert_vector_equal(
+					f.voxel_labels[fm.voxel_map.vec], self.labels )
+
+			# duplicate rows reproduced exactly in clustered frame
+			y_full = self.A.dot(x)
+			y_clustered = f.dose_matrix.data.dot(x)
+			self.assert_vector_equal( y_clustered[fm.voxel_map.vec], y_full )
+
+			with self.assertRaises(ValueError):
+				vc.cluster(p, 'clustered')
+
+		# default target name, explicit source
+		p = Physics(dose_matrix=self.A, voxel_labels=self.labels)
+		fm = vc.cluster(p, source_frame='frame0')
+		self.assertEqual( fm.target, 'frame0_voxel_clustered' )
+		with self.assertRaises(KeyError):
+			vc.cluster(p, source_frame='bad key')
@@ -57,7 +57,15 @@ else:
 				with this :class:`LineAesthetic`. ``1.0`` yields original
 				color; ``0.0`` yields black.
 		"""
-		__verification_line = mpl.lines.Line2D([],[])
+		__verification_line_instance = None
+
+		@property
+		def __verification_line(self):
+			# built on first use, so that matplotlib is imported lazily
+			if LineAesthetic.__verification_line_instance is None:
+				LineAesthetic.__verification_line_instance = \
+						mpl.lines.Line2D([],[])
+			return LineAesthetic.__verification_line_instance
 
 		def __init__(self, aesthetic='dvh_curve', **kwargs):
 			self.__style = '-'
@@ -34,7 +34,7 @@ from conrad.compat import *
 
 import os
 
-from conrad.defs import module_installed
+from conrad.defs import module_installed, LazyModule
 
 # allow for CONRAD use without plotting by making visualization types
 # optional
@@ -42,14 +42,19 @@ PLOTTING_INSTALLED = False
 DISPLAY_AVAILABLE = False
 if module_installed('matplotlib'):
 	PLOTTING_INSTALLED = True
-
-	import matplotlib as mpl
-	import matplotlib.lines
-	import matplotlib.axes
-	import matplotlib.figure
-	import matplotlib.colors
-	if os.getenv('DISPLAY') is None:
-		mpl.use('Agg')
-	else:
-		DISPLAY_AVAILABLE = True
-	import matplotlib.pyplot as plt
\ No newline at end of file
+	DISPLAY_AVAILABLE = os.getenv('DISPLAY') is not None
+
+	def _load_matplotlib():
+		import matplotlib
+		if not DISPLAY_AVAILABLE:
+			matplotlib.use('Agg')
+		import matplotlib.lines
+		import matplotlib.axes
+		import matplotlib.figure
+		import matplotlib.colors
+		import matplotlib.pyplot
+
+	# imported on first use, with lines, axes, figure, colors and pyplot
+	# modules available
+	mpl = LazyModule('matplotlib', on_import=_load_matplotlib)
+	plt = LazyModule('matplotlib.pyplot', on_import=_load_matplotlib)